@@ -1,7 +1,10 @@
 import socket
 import argparse
 
-from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.client.client_handler import ClientHandler, ServerBusyException
+from dropbox_system.common.multiplexer import Multiplexer
+from dropbox_system.common import compression
+from dropbox_system.common.tls import ClientTlsContext
 
 class Client:
     """
@@ -11,67 +14,193 @@ class Client:
     LOGIN_CODE = '2'
     INITIAL_REQUEST_EXPLAINATION = "Press 1 to register, 2 to sign in -> "
 
-    def __init__(self, host: str = '127.0.0.1', port: int = 8080) -> None:
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, chunk_size: int = ClientHandler.DEFAULT_CHUNK_SIZE,
+                 adaptive_chunk_size: bool = False, protocol_version: int = ClientHandler.PROTOCOL_VERSION_1,
+                 requested_compression: int = compression.COMPRESSION_NONE,
+                 tls_context: ClientTlsContext = None, unix_socket_path: str = None) -> None:
         """
         Initializes the client with a specified server address and port, and establishes a socket connection.
         
         Arguments:
         :param host (str): The server's IP address (default is '127.0.0.1').
         :param port (int): The server's port number (default is 8080).
+        :param chunk_size (int): The size of the chunks file content is transferred in.
+        :param adaptive_chunk_size (bool): If True, the chunk size of uploaded files grows while the throughput improves.
+        :param protocol_version (int): The highest protocol version to negotiate with the server. On protocol v2,
+                                       requests are multiplexed on the connection (default is protocol v1).
+        :param requested_compression (int): The codec to compress transferred files with, when they are compressible
+                                            (default is no compression).
+        :param tls_context (ClientTlsContext): If given, the connection is wrapped in TLS with this context, and the
+                                               XOR encryption is off. Clients that share a context resume the TLS
+                                               session of the previous connection to the server.
+        :param unix_socket_path (str): If given, connects to the Unix domain socket of a server on the same host
+                                       at this path, instead of the host and port.
         """
         self.host = host
         self.port = port
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.unix_socket_path = unix_socket_path
+        self.tls_context = tls_context
         self.connected = False
         self._connect()
-        self.handler = ClientHandler(self.sock)
+        self.chunk_size = chunk_size
+        self.adaptive_chunk_size = adaptive_chunk_size
+        self.requested_compression = requested_compression
+        self.handler = ClientHandler(self.sock, chunk_size, adaptive_chunk_size, requested_compression,
+                                     self._reconnect)
+        self.multiplexer = None
+        if self.connected and protocol_version >= ClientHandler.PROTOCOL_VERSION_2:
+            self._start_multiplexing(protocol_version)
     
     def __del__(self) -> None:
         """
         Closing the socket when the client object is destroyed.
         """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the connection. On TLS connections, the session is saved first, so the next client that shares
+        the TLS context resumes it.
+        """
+        if self.connected and self.tls_context is not None:
+            self.tls_context.save_session(self.sock, self.host, self.port)
         self.sock.close()
 
     def _connect(self) -> None:
         """
         Establishes a connection to the server. Updates the connected attribute to True if successful.
         """
+        self.sock = socket.socket(socket.AF_UNIX if self.unix_socket_path else socket.AF_INET, socket.SOCK_STREAM)
         try:
-            self.sock.connect((self.host, self.port))
+            self.sock.connect(self.unix_socket_path or (self.host, self.port))
+            if self.tls_context is not None:
+                self.sock = self.tls_context.wrap_socket(self.sock, self.host, self.port)
             self.connected = True
         except Exception as e:
             print(f"Failed connecting to server - {e}")
 
-    def handle_user_initial_request(self) -> None:
+    def _reconnect(self) -> socket.socket:
+        """
+        Replaces the connection with a new connection to the server, after the server rejected it as busy.
+        Raises ConnectionError if connecting failed.
+
+        Returns:
+            socket.socket: The socket of the new connection.
+        """
+        self.sock.close()
+        self.connected = False
+        self._connect()
+        if not self.connected:
+            raise ConnectionError("Failed reconnecting to the server")
+        return self.sock
+
+    def _start_multiplexing(self, protocol_version: int) -> None:
+        """
+        Negotiates the protocol version with the server, and multiplexes the requests on the connection
+        if protocol v2 was chosen.
+
+        :param protocol_version (int): The highest protocol version to negotiate.
+        """
+        try:
+            negotiated_version = self.handler.negotiate_protocol_version(protocol_version)
+        except ServerBusyException:
+            print("The server is busy, try again later.")
+            self.connected = False
+            return
+        if negotiated_version < ClientHandler.PROTOCOL_VERSION_2:
+            return
+        self.multiplexer = Multiplexer(self.sock)
+        self.multiplexer.start_receiving()
+        self.handler.use_multiplexer(self.multiplexer)
+
+    def open_stream_handler(self) -> ClientHandler:
+        """
+        Creates another handler on the multiplexed connection. Its requests are sent concurrently with the requests
+        of the other handlers, and share the same session (so it can be used after logging in).
+
+        Returns:
+            ClientHandler: The new handler.
+        """
+        if self.multiplexer is None:
+            raise RuntimeError("Concurrent handlers require a protocol v2 connection")
+        stream_handler = ClientHandler(self.multiplexer.open_stream(), self.chunk_size, self.adaptive_chunk_size,
+                                       self.requested_compression)
+        stream_handler.use_multiplexer(self.multiplexer)
+        return stream_handler
+
+    @property
+    def session_token(self) -> bytes:
+        """
+        The session token of the last login (or resumed session) on this connection, or None if the server did not
+        issue one.
+        """
+        return self.handler.session_token
+
+    def resume_session(self, session_token: bytes) -> bool:
+        """
+        Resumes the session of a login of another connection (or of a connection that was lost) with its session token,
+        without sending the credentials again. Requests can be sent with the handler of the client afterwards.
+
+        :param session_token (bytes): The session token of the login (see `session_token`).
+
+        Returns:
+            bool: True if the session was resumed.
+        """
+        return self.handler.send_resume_session_request(session_token)
+
+    def handle_user_initial_request(self) -> bool:
         """
         Handles the user's initial request (register or login).
         Based on the user's input, sends the appropriate request to the server.
+
+        Returns:
+            bool: True if the session is still open after the request (after registering or a failed login),
+                  so another initial request can be handled on the same connection.
         """
-        print("Statring client")
         request = input(self.INITIAL_REQUEST_EXPLAINATION)
 
         if request == self.REGISTER_CODE:
-            self.handler.send_register_request()
+            return self.handler.send_register_request()
         elif request == self.LOGIN_CODE:
-            self.handler.send_login_request()
+            return self.handler.send_login_request()
         else:
             print("Invalid request number, try to connect again please.")
             self.handler.handle_quit_session_command()
+            return False
 
-def get_arguments_from_user() -> tuple:
+def get_arguments_from_user() -> argparse.Namespace:
     """
     Parses command-line arguments to get the server's IP address and port.
     
-    Returns a tuple containing the IP address (str) and port (int).
+    Returns the parsed arguments namespace.
     """
     parser = argparse.ArgumentParser(description="Get network details to start client")
     parser.add_argument('--address', '-i', type=str, default="127.0.0.1", help="IP address to connect")
     parser.add_argument('--port', '-p', type=int, default=8080, help="Port to connect")
-    args = parser.parse_args()
-    return args.address, args.port
+    parser.add_argument('--chunk-size', '-c', type=int, default=ClientHandler.DEFAULT_CHUNK_SIZE,
+                        help="Size of the chunks file content is transferred in")
+    parser.add_argument('--adaptive-chunk-size', '-a', action='store_true',
+                        help="Grow the chunk size while the transfer throughput improves")
+    parser.add_argument('--protocol-version', '-v', type=int, choices=[1, 2], default=ClientHandler.PROTOCOL_VERSION_1,
+                        help="Highest protocol version to negotiate (2 multiplexes requests on the connection)")
+    parser.add_argument('--unix-socket', '-u', type=str,
+                        help="Path of the Unix domain socket of a server on the same host, to connect to instead of TCP")
+    parser.add_argument('--tls', '-t', action='store_true', help="Connect to the server over TLS")
+    parser.add_argument('--tls-ca-file', type=str,
+                        help="Path of a PEM certificate to trust (such as a self-signed server certificate)")
+    parser.add_argument('--compression', '-z', choices=list(compression.COMPRESSION_NAMES.values()),
+                        default=compression.COMPRESSION_NAMES[compression.COMPRESSION_NONE],
+                        help="Codec to compress transferred files with, when they are compressible")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    address, port = get_arguments_from_user()
-    client_instance = Client(address, port)
+    args = get_arguments_from_user()
+    requested_compression = {name: codec for codec, name in compression.COMPRESSION_NAMES.items()}[args.compression]
+    tls_context = ClientTlsContext(args.tls_ca_file) if args.tls or args.tls_ca_file else None
+    client_instance = Client(args.address, args.port, args.chunk_size, args.adaptive_chunk_size, args.protocol_version,
+                             requested_compression, tls_context, args.unix_socket)
     if client_instance.connected:
-        client_instance.handle_user_initial_request()
+        print("Statring client")
+        # Registering and failed logins keep the session open, so the user can go on to log in on the same connection
+        while client_instance.handle_user_initial_request():
+            pass
@@ -1,10 +1,21 @@
 import socket
-import struct
 import getpass
+import random
+import time
 import os
 import re
 
+from dropbox_system.common import message_codec, compression
 from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.multiplexer import Multiplexer, StreamSocket
+
+
+class ServerBusyException(Exception):
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = retry_after
+        self.message = f"The server is busy, retry after {retry_after} seconds."
+        super().__init__(self.message)
+
 
 class ClientHandler(RequestHandler):
     """
@@ -20,15 +31,34 @@ class ClientHandler(RequestHandler):
     LIST_FILES_COMMAND = "L"
     MINIMAL_USERNAME_LENGTH = 8
     MINIMAL_PASSWORD_LENGTH = 8
+    # A connection the server rejected as busy is retried up to MAX_BUSY_RETRIES times, with an exponential backoff
+    # (in seconds) that never waits less than the retry-after hint of the server
+    MAX_BUSY_RETRIES = 5
+    INITIAL_RETRY_DELAY = 0.5
+    MAX_RETRY_DELAY = 30.0
 
-    def __init__(self, sock: socket.socket) -> None:
+    def __init__(self, sock: socket.socket, chunk_size: int = RequestHandler.DEFAULT_CHUNK_SIZE,
+                 adaptive_chunk_size: bool = False, requested_compression: int = compression.COMPRESSION_NONE,
+                 reconnect=None) -> None:
         """
         Initializes the ClientHandler object with a socket (to communicate the server) 
         and a command handler map - mapping between user input and required handling function.
         
         :param sock (socket.socket): The socket connected to the server.
-        """
-        super(ClientHandler, self).__init__(sock)
+        :param chunk_size (int): The size of the chunks file content is transferred in.
+        :param adaptive_chunk_size (bool): If True, the chunk size of uploaded files grows while the throughput improves.
+        :param requested_compression (int): The codec to compress transferred files with, when they are compressible.
+        :param reconnect (callable): A function that opens a new connection to the server and returns its socket.
+                                     If given, the first request of a connection the server rejected as busy is
+                                     retried on a new connection.
+        """
+        super(ClientHandler, self).__init__(sock, chunk_size, adaptive_chunk_size)
+        self.requested_compression = requested_compression
+        self.reconnect = reconnect
+        self.multiplexer = None
+        # The session token of the last login, and its expiry time (in seconds since the epoch), if the server issued one
+        self.session_token = None
+        self.session_token_expires_at = None
         self.command_handlers = \
         {
             self.REMOVE_FILE_COMMAND: self._handle_remove_file_command,
@@ -39,65 +69,152 @@ class ClientHandler(RequestHandler):
             self.CREATE_DIRECTORY_COMMAND: self._handle_create_directory_command,
         }
 
-    def send_register_request(self) -> None:
+    def send_register_request(self) -> bool:
         """
         Getting username and password input from the client, and sending registeration request with the given credentials.
+        The session stays open after registering, so the user can log in on the same connection.
+
+        Returns:
+            bool: True if the session is still open, so another register or login request can be sent.
         """
         username = input("choose username -> ")
         password = getpass.getpass("choose password -> ")
         verify_password = getpass.getpass("enter password again -> ")
 
         if not self._are_passwords_equal(password, verify_password):
-            # Preform session quit with the server
-            self.handle_quit_session_command()
-            return
+            return True
         
         if not self._are_credentials_strong_enough(username, password):
-            # Preform session quit with the server
-            self.handle_quit_session_command()
-            return
+            return True
 
-        request = struct.pack("I", len(username)) + username.encode() + struct.pack("I", len(password)) + password.encode()
+        request = message_codec.REGISTER_REQUEST.pack(username=username, password=password)
 
         print("Sending register request")
-        self._send_request_header(self.REGISTER_REQUEST_CODE, request)
-        self.send_data(request)
-
-        response_type, error_code, _ = self._parse_response_header()
+        try:
+            response_type, error_code, _ = self._send_first_request(self.REGISTER_REQUEST_CODE, request)
+        except ServerBusyException:
+            print("The server is busy, try again later.")
+            return False
         if not self._is_correct_response_type(response_type, self.REGISTER_RESPONE_CODE):
-            return
+            return False
         
         if error_code == self.USER_ALREADY_EXISTS:
             print("User already exists! Try to choose different username.")
         if error_code == self.SUCCESS:
             print("Registered successfully!")
+        if error_code == self.TOO_MANY_ATTEMPTS:
+            print("Too many registration attempts! The server closed the session.")
+            return False
+        return True
 
-    def send_login_request(self) -> None:
+    def send_login_request(self) -> bool:
         """
         Sends a login request to the server.
         It handles the server's response, which can indicate success or errors like a non-existent user 
         or an incorrect password.
-        Upon successful login, the session starts.
+        Upon successful login, the session starts. After a failed login, the session stays open so the user
+        can try again, until the server closes it for too many attempts.
+
+        Returns:
+            bool: True if the login failed and the session is still open, so another register or login request
+                  can be sent.
         """
         request = self._create_login_request()
-        self._send_request_header(self.LOGIN_REQUEST_CODE, request)
-        self.send_data(request)
-
-        response_type, error_code, _ = self._parse_response_header()
+        try:
+            response_type, error_code, response_len = self._send_first_request(self.LOGIN_REQUEST_CODE, request)
+        except ServerBusyException:
+            print("The server is busy, try again later.")
+            return False
 
         if not self._is_correct_response_type(response_type, self.LOGIN_RESPONSE_CODE):
-            return
+            return False
         
         if error_code == self.USER_NOT_EXISTS:
-            print("Username not exists! exiting")
+            print("Username not exists!")
 
         if error_code == self.INCORRECT_PASSWORD:
-            print("Incorrect password! exiting")
+            print("Incorrect password!")
+
+        if error_code == self.TOO_MANY_ATTEMPTS:
+            print("Too many failed logins! The server closed the session.")
+            return False
 
         if error_code == self.SUCCESS:
             print("Logged in successfully!")
+            if response_len:
+                self.session_token_expires_at, self.session_token = \
+                    message_codec.LOGIN_RESPONSE.unpack(self.receive_bytes(response_len))
             self._start_session()
+            return False
+        return True
+
+    def send_resume_session_request(self, session_token: bytes) -> bool:
+        """
+        Resumes the session of a previous login (possibly of another connection) with its session token, instead of
+        sending the credentials again. The session is not started, so the caller can send requests on it.
+
+        :param session_token (bytes): The session token the server answered the login with.
+
+        Returns:
+            bool: True if the session was resumed.
+        """
+        request = message_codec.RESUME_SESSION_REQUEST.pack(token=session_token)
+        try:
+            response_type, error_code, _ = self._send_first_request(self.RESUME_SESSION_REQUEST_CODE, request)
+        except ServerBusyException:
+            print("The server is busy, try again later.")
+            return False
+
+        if not self._is_correct_response_type(response_type, self.RESUME_SESSION_RESPONSE_CODE):
+            return False
+
+        if error_code == self.INVALID_SESSION_TOKEN:
+            print("The session token is invalid or expired, log in again.")
+
+        if error_code == self.TOO_MANY_ATTEMPTS:
+            print("Too many failed logins! The server closed the session.")
+
+        if error_code == self.SUCCESS:
+            print("Session resumed successfully!")
+            self.session_token = session_token
+            return True
+        return False
     
+    def negotiate_protocol_version(self, protocol_version: int) -> int:
+        """
+        Negotiates the protocol version of the connection with the server.
+        Raises ServerBusyException if the server rejected the connection as busy on every retry.
+
+        :param protocol_version (int): The highest protocol version the client supports.
+
+        Returns:
+            int: The protocol version chosen by the server.
+        """
+        request = message_codec.PROTOCOL_NEGOTIATION_REQUEST.pack(protocol_version=protocol_version)
+        response_type, _, response_len = self._send_first_request(self.PROTOCOL_NEGOTIATION_REQUEST_CODE, request)
+        if not self._is_correct_response_type(response_type, self.PROTOCOL_NEGOTIATION_RESPONSE_CODE):
+            return self.PROTOCOL_VERSION_1
+        negotiated_version, = message_codec.PROTOCOL_NEGOTIATION_RESPONSE.unpack(self.receive_bytes(response_len))
+        return negotiated_version
+
+    def use_multiplexer(self, multiplexer: Multiplexer) -> None:
+        """
+        Sends every following request on a new stream of a protocol v2 multiplexed connection.
+
+        :param multiplexer (Multiplexer): The multiplexer of the connection.
+        """
+        self.multiplexer = multiplexer
+        if not isinstance(self.sock, StreamSocket):
+            self.sock = multiplexer.open_stream()
+
+    def _open_request_stream(self) -> None:
+        """
+        On a multiplexed connection, ends the stream of the previous request and opens a new stream for the next one.
+        """
+        if self.multiplexer is not None and self.sock.is_used:
+            self.sock.close()
+            self.sock = self.multiplexer.open_stream()
+
     def _send_request_header(self, request_code: int, request: bytes = b'') -> None:
         """
         Sends a request header to the server with the given request code and request payload.
@@ -105,20 +222,69 @@ class ClientHandler(RequestHandler):
         :param request_code (int): The request code to send.
         :param request (bytes): The request payload (default is an empty byte string).
         """
-        request_header = struct.pack("II", request_code, len(request))
+        self._open_request_stream()
+        request_header = message_codec.REQUEST_HEADER.pack(request_code=request_code, request_len=len(request))
         self.send_header(request_header)
 
+    def _send_request(self, request_code: int, request: bytes) -> None:
+        """
+        Sends a request header and the encrypted request payload to the server, in a single write.
+
+        :param request_code (int): The request code to send.
+        :param request (bytes): The request payload.
+        """
+        self._open_request_stream()
+        request_header = message_codec.REQUEST_HEADER.pack(request_code=request_code, request_len=len(request))
+        self.send_message(request_header, request)
+
+    def _send_first_request(self, request_code: int, request: bytes) -> tuple:
+        """
+        Sends a request that may be the first of a connection (register or login - the session stays open after
+        registering and after failed logins) and parses the response header. If the server rejected the
+        connection as busy, waits and sends the request again on a new connection, up to MAX_BUSY_RETRIES times.
+        Raises ServerBusyException if the server is still busy after the last retry.
+
+        :param request_code (int): The request code to send.
+        :param request (bytes): The request payload.
+
+        Returns:
+            tuple: A tuple containing response_type (int), error_code (int), and response_len (int).
+        """
+        for attempt in range(self.MAX_BUSY_RETRIES + 1):
+            self._send_request(request_code, request)
+            try:
+                return self._parse_response_header()
+            except ServerBusyException as e:
+                if self.reconnect is None or attempt == self.MAX_BUSY_RETRIES:
+                    raise
+                retry_delay = self._get_retry_delay(e.retry_after, attempt)
+                print(f"The server is busy, retrying in {retry_delay:.1f} seconds")
+                time.sleep(retry_delay)
+                self.sock = self.reconnect()
+
+    def _get_retry_delay(self, retry_after: float, attempt: int) -> float:
+        """
+        Returns:
+            float: The time to wait before the given retry attempt, in seconds - an exponential backoff that is
+                   not shorter than the retry-after hint of the server, with a random jitter, so clients that were
+                   rejected together do not retry together.
+        """
+        retry_delay = min(max(retry_after, self.INITIAL_RETRY_DELAY * 2 ** attempt), self.MAX_RETRY_DELAY)
+        return retry_delay * random.uniform(1, 1.5)
+
     def _parse_response_header(self) -> tuple:
         """
         Parses the response header received from the server. Extracts the response type,
         error code, and response length.
+        Raises ServerBusyException if the server rejected the connection as busy.
 
         Returns:
             tuple: A tuple containing response_type (int), error_code (int), and response_len (int).
         """
-        response_type = self.receive_numeric_value()
-        error_code = self.receive_numeric_value()
-        response_len = self.receive_numeric_value()
+        response_type, error_code, response_len = self.receive_header(message_codec.RESPONSE_HEADER)
+        if error_code == self.SERVER_BUSY:
+            retry_after_ms, = message_codec.SERVER_BUSY_RESPONSE.unpack(self.receive_bytes(response_len))
+            raise ServerBusyException(retry_after_ms / 1000)
         return response_type, error_code, response_len
 
     def _is_correct_response_type(self, response_type: int, expected_response_type: int) -> bool:
@@ -182,8 +348,7 @@ class ClientHandler(RequestHandler):
             bytes: The packed request containing the file name.
         """
         file_name = input("Enter file name / directory name to remove. If you choose to remove a directory, all its files will be removed -> ")
-        file_name_len = len(file_name)
-        request = struct.pack("I", file_name_len) + file_name.encode()
+        request = message_codec.REMOVE_FILE_REQUEST.pack(file_name=file_name)
         return request
 
     def _handle_remove_file_command(self) -> None:
@@ -194,8 +359,7 @@ class ClientHandler(RequestHandler):
         request = self._create_remove_file_request()
     
         print("sending request")
-        self._send_request_header(self.REMOVE_FILE_REQUEST_CODE, request)
-        self.send_data(request)
+        self._send_request(self.REMOVE_FILE_REQUEST_CODE, request)
 
         response_type, error_code, _ = self._parse_response_header()
         if not self._is_correct_response_type(response_type, self.REMOVE_FILE_RESPONSE_CODE):
@@ -208,17 +372,23 @@ class ClientHandler(RequestHandler):
         if error_code == self.SUCCESS:
             print("Removed successfully!")
 
-    def _parse_download_file_response(self, response: bytes) -> int:
+    def _parse_download_file_response(self, response: bytes) -> tuple:
         """
         Parses the download file response.
 
         :param response (bytes): The server's response containing the file information.
 
         Returns:
-            int: The length of the file to be downloaded.
+            tuple: The length of the file to be downloaded, and the codec its content is compressed with.
+        """
+        return message_codec.DOWNLOAD_FILE_RESPONSE.unpack(response)
+
+    def _print_compression_report(self) -> None:
+        """
+        Prints the compression statistics of the last transfer, if it was compressed.
         """
-        file_len = struct.unpack("Q", response[:self.FILE_LEN_FIELD_SIZE])[0]
-        return file_len
+        if self.last_compression_report is not None:
+            print(f"File content was {self.last_compression_report}")
 
     def _handle_download_file_command(self) -> None:
         """
@@ -226,12 +396,9 @@ class ClientHandler(RequestHandler):
         to a the requested directory.
         """
         file_name = input("Enter the file name to download -> ")
-        file_name_len = len(file_name)
-
-        request = struct.pack("I", file_name_len) + file_name.encode()
+        request = message_codec.DOWNLOAD_FILE_REQUEST.pack(file_name=file_name, compression=self.requested_compression)
         print("sending request")
-        self._send_request_header(self.DOWNLOAD_FILE_REQUEST_CODE, request)
-        self.send_data(request)
+        self._send_request(self.DOWNLOAD_FILE_REQUEST_CODE, request)
 
         response_type, error_code, response_len = self._parse_response_header()
 
@@ -246,30 +413,48 @@ class ClientHandler(RequestHandler):
         if error_code == self.GOT_DIRECTORY_AS_INPUT:
             print("Please enter a file name, not a directory.")
 
+        if error_code == self.INSUFFICIENT_MEMORY:
+            print("The server has no room for the download right now, try again later.")
+            return
+
         if error_code == self.SUCCESS:
             response = self.receive_bytes(response_len)
-            file_len = self._parse_download_file_response(response)
-            file_content = self.receive_bytes(file_len)
+            file_len, content_compression = self._parse_download_file_response(response)
         
             directory_path = input("Enter directory path to save the file in -> ")
             if not os.path.isdir(directory_path):
                 print("Path not exists, aborting.")
+                # The file content is already on its way, so it must be drained from the socket
+                self.receive_file_content(None, file_len, content_compression)
                 return
             
             file_path = os.path.join(directory_path, os.path.basename(file_name))
 
             if os.path.exists(file_path):
                 print("File with the same name already exists on this directory, try to save it in a different directory.")
+                self.receive_file_content(None, file_len, content_compression)
                 return
 
             try:
-                with open(file_path, "wb") as file:
-                    file.write(file_content)
+                file = open(file_path, "wb")
             except PermissionError:
                 print("Not permitted to write the file on this path, exiting.")
+                self.receive_file_content(None, file_len, content_compression)
+                return
+
+            try:
+                with file:
+                    self.receive_file_content(file, file_len, content_compression)
+            except ValueError:
+                os.remove(file_path)
+                print("Received invalid file content, aborting.")
+                # The rest of the invalid content was not received, so a v1 connection can not be used anymore
+                if self.multiplexer is None:
+                    raise ConnectionError("Connection is out of sync after receiving invalid file content")
                 return
 
             print("File downloaded successfully!")
+            self._print_compression_report()
 
     def _handle_create_directory_command(self) -> None:
         """
@@ -285,12 +470,10 @@ class ClientHandler(RequestHandler):
             print("Invalid directory name, only numbers and letters are allowed for directory name.")
             return
 
-        directory_name_len = len(directory_name)
-        request = struct.pack("I", directory_name_len) + directory_name.encode()
+        request = message_codec.CREATE_DIRECTORY_REQUEST.pack(directory_name=directory_name)
 
         print("sending request")
-        self._send_request_header(self.CREATE_DIRECTORY_REQUEST_CODE, request)
-        self.send_data(request)
+        self._send_request(self.CREATE_DIRECTORY_REQUEST_CODE, request)
 
         response_type, error_code, _ = self._parse_response_header()
 
@@ -332,19 +515,16 @@ class ClientHandler(RequestHandler):
             print("enter relative directory name, and not absolute path (for example, /home/local/dir is not accepted, but moshe/new_dir is accepted)")
             return
         
+        file_len = os.path.getsize(file_path)
         with open(file_path, 'rb') as file:
-            file_content = file.read()
-
-        file_len = len(file_content)
-        file_name_len = len(file_name)
-        requested_dir_len = len(requested_dir)
-        request = struct.pack("QII", file_len, file_name_len, requested_dir_len) + file_name.encode() + requested_dir.encode()
+            content_compression = compression.choose_compression(file, self.requested_compression)
+        request = message_codec.UPLOAD_FILE_REQUEST.pack(file_len=file_len, file_name=file_name,
+                                                         requested_dir=requested_dir, compression=content_compression)
 
         print("sending request")
-        self._send_request_header(self.UPLOAD_FILE_REQUEST_CODE, request)
-        self.send_data(request)
+        self._send_request(self.UPLOAD_FILE_REQUEST_CODE, request)
 
-        response_type, error_code, _ = self._parse_response_header()
+        response_type, error_code, response_len = self._parse_response_header()
 
         if not self._is_correct_response_type(response_type, self.UPLOAD_FILE_RESPONSE_CODE):
             return
@@ -357,18 +537,30 @@ class ClientHandler(RequestHandler):
             print("File with the same name already uploaded to the server! Try to upload other file.")
             return
 
+        if error_code == self.INSUFFICIENT_MEMORY:
+            print("The server has no room for the upload right now, try again later.")
+            return
+
         if error_code == self.START_UPLOADING_FILE:
             print("Start uploading file, it might take a while..")
-            self.send_file_content(file_content, file_len)
+            # The server tells which codec it accepted for the content (no payload means no compression)
+            content_compression, = message_codec.UPLOAD_FILE_RESPONSE.unpack(self.receive_bytes(response_len))
+            with open(file_path, 'rb') as file:
+                self.send_file(file, file_len, content_compression)
             response_type, error_code, _ = self._parse_response_header()
 
             if not self._is_correct_response_type(response_type, self.UPLOAD_FILE_RESPONSE_CODE):
                 return
-            
+
+            if error_code == self.FILE_ALREADY_EXISTS:
+                print("File with the same name was uploaded to the server meanwhile! Try to upload other file.")
+                return
+
             if error_code != self.SUCCESS:
                 print("Error in uploading file, exiting..")
                 return
             print("File uploaded successfully")
+            self._print_compression_report()
     
     def handle_quit_session_command(self) -> None:
         """
@@ -393,8 +585,12 @@ class ClientHandler(RequestHandler):
             )
             if request_type not in self.command_handlers.keys():
                 print("Invalid command, try again")
-            else:
+                continue
+            try:
                 self.command_handlers[request_type]()
+            except ConnectionError:
+                print("Connection to the server was lost, exiting.")
+                return
 
     def _create_login_request(self) -> bytes:
         """
@@ -405,7 +601,8 @@ class ClientHandler(RequestHandler):
         """
         username = input("enter username -> ")
         password = getpass.getpass("enter password -> ")
-        request = struct.pack("I", len(username)) + username.encode() + struct.pack("I", len(password)) + password.encode()
+        # A session token is always requested, so the session can be resumed on other connections
+        request = message_codec.LOGIN_REQUEST.pack(username=username, password=password, request_token=1)
         return request
     
     def _parse_list_files_response(self, response: bytes) -> bytes:
@@ -417,9 +614,7 @@ class ClientHandler(RequestHandler):
         Returns:
             files_list (bytes): The list of files in bytes format.
         """
-        files_list_len = struct.unpack("I", response[:self.NUMERIC_FIELD_SIZE])[0]
-        response = response[self.NUMERIC_FIELD_SIZE:]
-        files_list = response[:files_list_len]
+        files_list, = message_codec.LIST_FILES_RESPONSE.unpack(response)
         return files_list
 
     def _handle_list_files_command(self) -> None:
@@ -0,0 +1,57 @@
+import time
+
+
+class AdaptiveChunkSize:
+    """
+    This class tunes the chunk size of file transfers. It measures the throughput of the sent chunks,
+    and keeps doubling the chunk size as long as the measured throughput keeps improving.
+    Once a bigger chunk size does not improve the throughput, the best chunk size is kept.
+    """
+    GROWTH_FACTOR = 2
+    # A bigger chunk size must improve the throughput by at least 5% to be kept
+    MINIMAL_IMPROVEMENT = 1.05
+    # The throughput of each chunk size is measured over several chunks
+    CHUNKS_PER_MEASUREMENT = 8
+
+    def __init__(self, initial_chunk_size: int, max_chunk_size: int) -> None:
+        """
+        Initializes the tuner with the chunk size to start from.
+
+        :param initial_chunk_size (int): The chunk size to start from.
+        :param max_chunk_size (int): The chunk size will never grow above this size.
+        """
+        self.chunk_size = initial_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.is_growing = initial_chunk_size < max_chunk_size
+        self._best_throughput = 0
+        self._best_chunk_size = initial_chunk_size
+        self._measured_bytes = 0
+        self._measured_duration = 0
+
+    def record(self, sent_bytes: int, duration: float) -> None:
+        """
+        Records a sent chunk, and updates the chunk size once enough chunks were measured.
+
+        :param sent_bytes (int): The size of the sent chunk.
+        :param duration (float): The time it took to send the chunk, in seconds.
+        """
+        if not self.is_growing:
+            return
+
+        self._measured_bytes += sent_bytes
+        self._measured_duration += duration
+        if self._measured_bytes < self.chunk_size * self.CHUNKS_PER_MEASUREMENT:
+            return
+
+        throughput = self._measured_bytes / max(self._measured_duration, time.get_clock_info("perf_counter").resolution)
+        self._measured_bytes = 0
+        self._measured_duration = 0
+
+        if throughput >= self._best_throughput * self.MINIMAL_IMPROVEMENT:
+            self._best_throughput = throughput
+            self._best_chunk_size = self.chunk_size
+            self.chunk_size = min(self.chunk_size * self.GROWTH_FACTOR, self.max_chunk_size)
+            self.is_growing = self._best_chunk_size < self.max_chunk_size
+        else:
+            self.chunk_size = self._best_chunk_size
+            self.is_growing = False
@@ -0,0 +1,192 @@
+"""
+This module implements the wire compression of transferred file content, with the stdlib codecs.
+
+The compression of a transfer is negotiated in the upload / download request - the client asks for a codec, and
+the side that sends the file content decides whether to use it, after sampling the start of the file.
+Compressed content is sent as a sequence of blocks, each prefixed with its uint_32 length, and ends with
+an empty block (the compressed size is not known before the whole file was compressed).
+
+Both compressing and decompressing are done in streaming fashion, so a transfer requires bounded memory.
+"""
+
+import bz2
+import lzma
+import time
+import zlib
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+COMPRESSION_BZ2 = 3
+
+# The compressor and decompressor factories of every supported codec
+COMPRESSION_CODECS = {
+    COMPRESSION_ZLIB: (zlib.compressobj, zlib.decompressobj),
+    COMPRESSION_LZMA: (lzma.LZMACompressor, lzma.LZMADecompressor),
+    COMPRESSION_BZ2: (bz2.BZ2Compressor, bz2.BZ2Decompressor),
+}
+
+COMPRESSION_NAMES = {
+    COMPRESSION_NONE: "none",
+    COMPRESSION_ZLIB: "zlib",
+    COMPRESSION_LZMA: "lzma",
+    COMPRESSION_BZ2: "bz2",
+}
+
+# The size of the start of the file that is compressed to decide whether the file is worth compressing
+SAMPLE_SIZE = 64 * 1024
+# Files whose sample does not compress below this ratio are sent uncompressed
+MAX_COMPRESSIBLE_RATIO = 0.9
+
+
+class CompressionReport:
+    """
+    The compression statistics of a single transfer.
+    """
+
+    def __init__(self, compression: int) -> None:
+        """
+        Initializes an empty report.
+
+        :param compression (int): The codec the transfer was compressed with.
+        """
+        self.compression = compression
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+        self.cpu_time = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """
+        Returns:
+            float: The compressed size relative to the original size (smaller is better).
+        """
+        if not self.original_bytes:
+            return 1.0
+        return self.compressed_bytes / self.original_bytes
+
+    def __str__(self) -> str:
+        return (f"compressed with {COMPRESSION_NAMES[self.compression]} - {self.original_bytes} bytes to "
+                f"{self.compressed_bytes} bytes (ratio {self.ratio:.3f}), {self.cpu_time * 1000:.1f} ms CPU time")
+
+
+def is_supported_compression(compression: int) -> bool:
+    """
+    Returns:
+        bool: True if the given codec is COMPRESSION_NONE or one of the supported codecs.
+    """
+    return compression == COMPRESSION_NONE or compression in COMPRESSION_CODECS
+
+
+def choose_compression(file, compression: int) -> int:
+    """
+    Decides whether the content of a file should be sent compressed, by compressing a sample from the start
+    of the file. The file position is restored after reading the sample.
+
+    :param file: A binary file object, positioned at the start of the content to send.
+    :param compression (int): The requested codec.
+
+    Returns:
+        int: The requested codec, or COMPRESSION_NONE if the content looks incompressible.
+    """
+    if compression not in COMPRESSION_CODECS:
+        return COMPRESSION_NONE
+
+    position = file.tell()
+    sample = file.read(SAMPLE_SIZE)
+    file.seek(position)
+    if not sample:
+        return COMPRESSION_NONE
+
+    compressor = COMPRESSION_CODECS[compression][0]()
+    compressed_sample_len = len(compressor.compress(sample)) + len(compressor.flush())
+    if compressed_sample_len > len(sample) * MAX_COMPRESSIBLE_RATIO:
+        return COMPRESSION_NONE
+    return compression
+
+
+class StreamCompressor:
+    """
+    Compresses content chunk by chunk, and records the compression statistics of the transfer.
+    """
+
+    def __init__(self, compression: int) -> None:
+        """
+        :param compression (int): The codec to compress with.
+        """
+        self._compressor = COMPRESSION_CODECS[compression][0]()
+        self.report = CompressionReport(compression)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Returns:
+            bytes: The compressed content that is ready to be sent (may be empty).
+        """
+        start_time = time.thread_time()
+        compressed = self._compressor.compress(chunk)
+        self._record(len(chunk), len(compressed), start_time)
+        return compressed
+
+    def flush(self) -> bytes:
+        """
+        Returns:
+            bytes: The rest of the compressed content, after all the chunks were compressed.
+        """
+        start_time = time.thread_time()
+        compressed = self._compressor.flush()
+        self._record(0, len(compressed), start_time)
+        return compressed
+
+    def _record(self, original_len: int, compressed_len: int, start_time: float) -> None:
+        self.report.original_bytes += original_len
+        self.report.compressed_bytes += compressed_len
+        self.report.cpu_time += time.thread_time() - start_time
+
+
+class StreamDecompressor:
+    """
+    Decompresses content chunk by chunk, never producing more than max_length bytes at once,
+    and records the compression statistics of the transfer.
+    """
+
+    def __init__(self, compression: int) -> None:
+        """
+        :param compression (int): The codec to decompress with.
+        """
+        self._decompressor = COMPRESSION_CODECS[compression][1]()
+        self._keeps_unconsumed_tail = compression == COMPRESSION_ZLIB
+        self.report = CompressionReport(compression)
+
+    def decompress(self, chunk: bytes, max_length: int):
+        """
+        Decompresses a chunk of compressed content.
+
+        :param chunk (bytes): The compressed chunk.
+        :param max_length (int): The maximal size of every yielded piece of decompressed content.
+
+        Yields:
+            bytes: The decompressed content, in pieces of at most max_length bytes.
+        """
+        self.report.compressed_bytes += len(chunk)
+        while True:
+            start_time = time.thread_time()
+            decompressed = self._decompress_next(chunk, max_length)
+            self.report.cpu_time += time.thread_time() - start_time
+            chunk = b""
+            if not decompressed:
+                return
+            self.report.original_bytes += len(decompressed)
+            yield decompressed
+
+    def _decompress_next(self, chunk: bytes, max_length: int) -> bytes:
+        """
+        Returns:
+            bytes: The next piece of decompressed content, or empty bytes if more input is required.
+        """
+        if self._keeps_unconsumed_tail:
+            # zlib keeps the input it did not decompress yet aside, instead of buffering it
+            return self._decompressor.decompress(self._decompressor.unconsumed_tail + chunk, max_length)
+
+        if not chunk and (self._decompressor.eof or self._decompressor.needs_input):
+            return b""
+        return self._decompressor.decompress(chunk, max_length)
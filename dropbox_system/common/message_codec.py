@@ -0,0 +1,160 @@
+"""
+This module declares the layout of every message of the dropbox protocol, and compiles each layout into a codec
+that packs and parses the message.
+
+A message layout is declared once, as a list of (name, type) fields, where the type is either:
+- A struct format character of a numeric field ("I" for uint_32, "Q" for uint_64).
+- TEXT / BYTES - a variable length field (decoded as a utf-8 string / kept as bytes). Its length is written
+  on a numeric field named "<name>_len", which must be declared before it.
+
+Numeric fields that were added to a message after it was first published are declared with a default value.
+They must be the last fields of the message, and a message that ends before them is parsed with their defaults,
+so peers that do not send them yet are still understood.
+
+Consecutive numeric fields are compiled into a single precompiled struct.Struct, and messages are parsed
+with unpack_from on a memoryview, so parsing never copies the rest of the message.
+"""
+
+import struct
+
+from dropbox_system.common.compression import COMPRESSION_NONE
+
+TEXT = "text"
+BYTES = "bytes"
+LENGTH_FIELD_SUFFIX = "_len"
+
+
+class MessageCodec:
+    """
+    A codec of a single message type, compiled from the declarative layout of the message.
+    """
+
+    def __init__(self, *fields: tuple, defaults: dict = None) -> None:
+        """
+        Compiles the message layout into a list of segments - numeric segments (a struct.Struct and the names
+        of its fields) and variable length segments.
+
+        :param fields (tuple): The (name, type) fields of the message, in the order they are sent.
+        :param defaults (dict): The default values of the optional trailing numeric fields, mapped by their names.
+        """
+        variable_fields = {name for name, field_type in fields if field_type in (TEXT, BYTES)}
+        self.length_fields = {name + LENGTH_FIELD_SUFFIX for name in variable_fields}
+        self.value_fields = [name for name, _ in fields if name not in self.length_fields]
+        self.defaults = dict(defaults or {})
+        self._segments = []
+
+        numeric_format, numeric_names = "", []
+        for name, field_type in fields:
+            # Optional fields start a segment of their own, so a message may end right before them
+            starts_optional_fields = name in self.defaults and numeric_names and numeric_names[-1] not in self.defaults
+            if numeric_names and (field_type in (TEXT, BYTES) or starts_optional_fields):
+                self._segments.append((struct.Struct(numeric_format), numeric_names))
+                numeric_format, numeric_names = "", []
+            if field_type in (TEXT, BYTES):
+                self._segments.append((field_type, name))
+            else:
+                numeric_format += field_type
+                numeric_names.append(name)
+        if numeric_names:
+            self._segments.append((struct.Struct(numeric_format), numeric_names))
+        # Messages of numeric fields only (like headers) have a fixed size, so they can be received in one read
+        self.size = None
+        if all(isinstance(segment_type, struct.Struct) for segment_type, _ in self._segments):
+            self.size = sum(segment_type.size for segment_type, _ in self._segments)
+
+    def pack(self, **values) -> bytes:
+        """
+        Packs a message. The length fields of the variable length fields are filled automatically.
+
+        :param values: The values of the message fields (except the length fields), mapped by their names.
+
+        Returns:
+            bytes: The packed message.
+        """
+        values = {**self.defaults, **values}
+        for length_field in self.length_fields:
+            name = length_field[:-len(LENGTH_FIELD_SUFFIX)]
+            if isinstance(values[name], str):
+                values[name] = values[name].encode()
+            values[length_field] = len(values[name])
+
+        message = bytearray(self._get_packed_size(values))
+        offset = 0
+        for segment_type, segment_fields in self._segments:
+            if isinstance(segment_type, struct.Struct):
+                segment_type.pack_into(message, offset, *(values[name] for name in segment_fields))
+                offset += segment_type.size
+            else:
+                field_value = values[segment_fields]
+                message[offset:offset + len(field_value)] = field_value
+                offset += len(field_value)
+        return bytes(message)
+
+    def _get_packed_size(self, values: dict) -> int:
+        """
+        Returns:
+            int: The size of the message packed from the given values.
+        """
+        return sum(segment_type.size if isinstance(segment_type, struct.Struct) else len(values[segment_fields])
+                   for segment_type, segment_fields in self._segments)
+
+    def unpack(self, message: bytes) -> tuple:
+        """
+        Parses a message without copying it.
+        Raises struct.error if the message is shorter than its declared fields.
+
+        :param message (bytes): The packed message.
+
+        Returns:
+            tuple: The values of the message fields (except the length fields), in the order they were declared.
+        """
+        message = memoryview(message).cast("B")
+        values = dict(self.defaults)
+        offset = 0
+        for segment_type, segment_fields in self._segments:
+            if offset == len(message) and all(name in self.defaults for name in segment_fields):
+                break
+            if isinstance(segment_type, struct.Struct):
+                values.update(zip(segment_fields, segment_type.unpack_from(message, offset)))
+                offset += segment_type.size
+            else:
+                field_len = values[segment_fields + LENGTH_FIELD_SUFFIX]
+                if offset + field_len > len(message):
+                    raise struct.error(f"Field '{segment_fields}' exceeds the message length")
+                field_value = message[offset:offset + field_len]
+                values[segment_fields] = str(field_value, "utf-8") if segment_type == TEXT else bytes(field_value)
+                offset += field_len
+        return tuple(values[name] for name in self.value_fields)
+
+
+REQUEST_HEADER = MessageCodec(("request_code", "I"), ("request_len", "I"))
+RESPONSE_HEADER = MessageCodec(("response_code", "I"), ("error_code", "I"), ("response_len", "I"))
+
+REGISTER_REQUEST = MessageCodec(("username_len", "I"), ("username", TEXT), ("password_len", "I"), ("password", TEXT))
+# If request_token is set, a successful login is answered with a session token (LOGIN_RESPONSE), that resumes the session
+# on other connections (RESUME_SESSION_REQUEST)
+LOGIN_REQUEST = MessageCodec(("username_len", "I"), ("username", TEXT), ("password_len", "I"), ("password", TEXT),
+                             ("request_token", "I"), defaults={"request_token": 0})
+RESUME_SESSION_REQUEST = MessageCodec(("token_len", "I"), ("token", BYTES))
+# The compression fields hold the codecs of `dropbox_system.common.compression`
+UPLOAD_FILE_REQUEST = MessageCodec(("file_len", "Q"), ("file_name_len", "I"), ("requested_dir_len", "I"),
+                                   ("file_name", TEXT), ("requested_dir", TEXT), ("compression", "I"),
+                                   defaults={"compression": COMPRESSION_NONE})
+DOWNLOAD_FILE_REQUEST = MessageCodec(("file_name_len", "I"), ("file_name", TEXT), ("compression", "I"),
+                                     defaults={"compression": COMPRESSION_NONE})
+REMOVE_FILE_REQUEST = MessageCodec(("file_name_len", "I"), ("file_name", TEXT))
+CREATE_DIRECTORY_REQUEST = MessageCodec(("directory_name_len", "I"), ("directory_name", TEXT))
+
+UPLOAD_FILE_RESPONSE = MessageCodec(("compression", "I"), defaults={"compression": COMPRESSION_NONE})
+DOWNLOAD_FILE_RESPONSE = MessageCodec(("file_len", "Q"), ("compression", "I"), defaults={"compression": COMPRESSION_NONE})
+LIST_FILES_RESPONSE = MessageCodec(("files_list_len", "I"), ("files_list", BYTES))
+# The expiry time of the token is in seconds since the epoch
+LOGIN_RESPONSE = MessageCodec(("expires_at", "Q"), ("token_len", "I"), ("token", BYTES))
+
+PROTOCOL_NEGOTIATION_REQUEST = MessageCodec(("protocol_version", "I"))
+PROTOCOL_NEGOTIATION_RESPONSE = MessageCodec(("protocol_version", "I"))
+# The time a client that was rejected with the SERVER_BUSY error code should wait before it reconnects
+SERVER_BUSY_RESPONSE = MessageCodec(("retry_after_ms", "I"))
+# Protocol v2 frames are sent on multiplexed connections, see `dropbox_system.common.multiplexer`
+FRAME_HEADER = MessageCodec(("stream_id", "I"), ("flags", "I"), ("frame_len", "Q"))
+WINDOW_UPDATE = MessageCodec(("window_increment", "Q"))
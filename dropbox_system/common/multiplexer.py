@@ -0,0 +1,404 @@
+"""
+This module implements the multiplexed connections of protocol v2.
+
+On a multiplexed connection, every request is sent on its own stream. A stream carries exactly the same bytes
+a protocol v1 connection would carry for the request (request header, request, responses and file content),
+split into frames. Every frame starts with a FRAME_HEADER - the stream ID (which is the request ID),
+flags and a 64 bit frame length. Frames of different streams are interleaved on the connection, so many
+requests can be in flight at the same time. Stream IDs are assigned when the first frame of a stream is sent,
+so they always reach the remote side in increasing order, no matter in which order the streams were opened.
+
+Every stream has a flow control window on each direction - a side can send at most INITIAL_WINDOW_SIZE bytes
+that were not consumed yet by the other side, which grants more as it consumes them (with window update frames).
+That way, a stream that is consumed slowly never blocks the frames of the other streams.
+
+Each stream is represented by a StreamSocket - a socket-like object, so the existing handlers can run
+on a stream without any change.
+"""
+
+import collections
+import socket
+import ssl
+import threading
+
+from dropbox_system.common import message_codec
+from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.tls import is_tls_socket
+
+
+class ProtocolError(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+        super().__init__(self.message)
+
+
+class StreamSocket:
+    """
+    A socket-like object that sends and receives the data of a single stream of a multiplexed connection.
+    """
+
+    def __init__(self, multiplexer: "Multiplexer", stream_id: int) -> None:
+        """
+        Initializes an open stream.
+
+        :param multiplexer (Multiplexer): The multiplexer of the connection the stream belongs to.
+        :param stream_id (int): The ID of the stream, or None if it is assigned when the first frame is sent.
+        """
+        self.multiplexer = multiplexer
+        self.stream_id = stream_id
+        # A stream is known to the remote side only after data was sent on it
+        self.is_used = False
+        self._incoming_chunks = collections.deque()
+        self._incoming_bytes = 0
+        self._consumed_bytes = 0
+        self._send_window = multiplexer.INITIAL_WINDOW_SIZE
+        self._is_remote_closed = False
+        self._is_closed = False
+        self._condition = threading.Condition()
+
+    def recv_into(self, buffer: memoryview) -> int:
+        """
+        Receives the next available data of the stream into the buffer. Blocks until data is available.
+
+        :param buffer (memoryview): A writable buffer to receive the data into.
+
+        Returns:
+            int: The number of received bytes, or 0 if the remote side closed the stream.
+        """
+        buffer = memoryview(buffer).cast("B")
+        with self._condition:
+            while not self._incoming_chunks and not self._is_remote_closed:
+                self._condition.wait()
+
+            received = 0
+            while self._incoming_chunks and received < len(buffer):
+                chunk = self._incoming_chunks[0]
+                chunk_len = min(len(chunk), len(buffer) - received)
+                buffer[received:received + chunk_len] = chunk[:chunk_len]
+                received += chunk_len
+                if chunk_len == len(chunk):
+                    self._incoming_chunks.popleft()
+                else:
+                    self._incoming_chunks[0] = chunk[chunk_len:]
+
+            self._incoming_bytes -= received
+            self._consumed_bytes += received
+            # Received frames are buffered, so their payload is copied into the buffer of the caller
+            self.multiplexer.connection.counters.count_copy(received)
+            window_increment = 0
+            # Grant the consumed bytes back to the remote side in batches, not on every receive
+            if self._consumed_bytes >= self.multiplexer.INITIAL_WINDOW_SIZE // 2 and not self._is_remote_closed:
+                window_increment, self._consumed_bytes = self._consumed_bytes, 0
+
+        if window_increment:
+            self.multiplexer.send_window_update(self.stream_id, window_increment)
+        return received
+
+    def sendall(self, data: bytes) -> None:
+        """
+        Sends all the data on the stream, split into frames of at most MAX_FRAME_SIZE bytes.
+        Blocks while the send window of the stream is exhausted.
+        Raises ConnectionError if the remote side closed the stream.
+
+        :param data (bytes): The data to be sent.
+        """
+        data = memoryview(data).cast("B")
+        for start in range(0, len(data), self.multiplexer.MAX_FRAME_SIZE):
+            self._send_frame([data[start:start + self.multiplexer.MAX_FRAME_SIZE]])
+
+    def sendmsg(self, buffers: list) -> int:
+        """
+        Sends the buffers on the stream, in a single frame if they fit in one.
+
+        :param buffers (list): The buffers to be sent.
+
+        Returns:
+            int: The number of sent bytes (always all of them).
+        """
+        total_len = sum(len(buffer) for buffer in buffers)
+        if total_len <= self.multiplexer.MAX_FRAME_SIZE:
+            self._send_frame(buffers)
+        else:
+            self.multiplexer.connection.counters.count_copy(total_len)
+            self.sendall(b"".join(buffers))
+        return total_len
+
+    def _send_frame(self, buffers: list) -> None:
+        """
+        Sends a single data frame, once the send window of the stream allows it.
+
+        :param buffers (list): The payload of the frame.
+        """
+        frame_len = sum(len(buffer) for buffer in buffers)
+        with self._condition:
+            while self._send_window < frame_len and not self._is_remote_closed:
+                self._condition.wait()
+            if self._is_remote_closed:
+                raise ConnectionError("Stream closed by the remote side")
+            self._send_window -= frame_len
+            self.is_used = True
+        self.multiplexer.send_stream_frame(self, buffers)
+
+    @property
+    def is_tls(self) -> bool:
+        """
+        Returns:
+            bool: True if the multiplexed connection is encrypted by TLS.
+        """
+        return is_tls_socket(self.multiplexer.connection.sock)
+
+    def setsockopt(self, *args) -> None:
+        """
+        Socket options are set on the connection socket, not on its streams.
+        """
+
+    def close(self) -> None:
+        """
+        Closes the stream - tells the remote side no more data will be sent or received on it.
+        """
+        with self._condition:
+            if self._is_closed:
+                return
+            self._is_closed = True
+            self._incoming_chunks.clear()
+            self._incoming_bytes = 0
+            self._condition.notify_all()
+        self.multiplexer.close_stream(self.stream_id, self.is_used)
+
+    def feed(self, data: memoryview) -> None:
+        """
+        Adds data received for this stream.
+        Raises ProtocolError if the remote side sent more data than the stream window allows.
+
+        :param data (memoryview): The received data.
+        """
+        with self._condition:
+            if self._is_closed:
+                return
+            if self._incoming_bytes + len(data) > self.multiplexer.INITIAL_WINDOW_SIZE:
+                raise ProtocolError(f"Stream {self.stream_id} exceeded its flow control window")
+            self._incoming_chunks.append(data)
+            self._incoming_bytes += len(data)
+            self._condition.notify_all()
+
+    def grant(self, window_increment: int) -> None:
+        """
+        Adds bytes the remote side consumed back to the send window of the stream.
+
+        :param window_increment (int): The number of bytes consumed by the remote side.
+        """
+        with self._condition:
+            self._send_window += window_increment
+            self._condition.notify_all()
+
+    def close_remote(self) -> None:
+        """
+        Marks that the remote side closed the stream.
+        """
+        with self._condition:
+            self._is_remote_closed = True
+            self._condition.notify_all()
+
+
+class Multiplexer:
+    """
+    This class multiplexes streams over a single connection socket, by sending and receiving protocol v2 frames.
+    The client side opens streams, and the server side accepts them.
+    """
+    FRAME_HEADER = message_codec.FRAME_HEADER
+    FRAME_HEADER_SIZE = 16
+    # The sender closed the stream, it will not send or receive more data on it
+    FLAG_CLOSE_STREAM = 1
+    # The payload of the frame is a WINDOW_UPDATE of the stream
+    FLAG_WINDOW_UPDATE = 2
+    MAX_FRAME_SIZE = 64 * 1024
+    INITIAL_WINDOW_SIZE = 1024 * 1024
+
+    def __init__(self, sock: socket.socket) -> None:
+        """
+        Initializes the multiplexer over a connected socket, on which protocol v2 was negotiated.
+
+        :param sock (socket.socket): The connection socket.
+        """
+        self.connection = RequestHandler(sock)
+        self.streams = {}
+        self._last_stream_id = 0
+        self._streams_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._frame_header_buffer = bytearray(self.FRAME_HEADER_SIZE)
+        # True if receiving frames ended since the socket timed out
+        self.timed_out = False
+
+    def open_stream(self) -> StreamSocket:
+        """
+        Opens a new stream on the connection (client side). The stream gets its ID when its first frame is sent.
+
+        Returns:
+            StreamSocket: The opened stream.
+        """
+        return StreamSocket(self, None)
+
+    def send_frame(self, stream_id: int, flags: int, buffers: list) -> None:
+        """
+        Sends a single frame, with the given buffers as its payload.
+
+        :param stream_id (int): The ID of the stream the frame belongs to.
+        :param flags (int): The flags of the frame.
+        :param buffers (list): The payload of the frame.
+        """
+        with self._send_lock:
+            self._send_frame_locked(stream_id, flags, buffers)
+
+    def send_stream_frame(self, stream: StreamSocket, buffers: list) -> None:
+        """
+        Sends a data frame of a stream. The first frame of a stream opened locally assigns its ID - under the send
+        lock, so the remote side sees new stream IDs in increasing order.
+
+        :param stream (StreamSocket): The stream the frame belongs to.
+        :param buffers (list): The payload of the frame.
+        """
+        with self._send_lock:
+            if stream.stream_id is None:
+                with self._streams_lock:
+                    self._last_stream_id += 1
+                    stream.stream_id = self._last_stream_id
+                    self.streams[stream.stream_id] = stream
+            self._send_frame_locked(stream.stream_id, 0, buffers)
+
+    def _send_frame_locked(self, stream_id: int, flags: int, buffers: list) -> None:
+        """
+        Sends a single frame. Must be called while holding the send lock.
+        """
+        frame_len = sum(len(buffer) for buffer in buffers)
+        frame_header = self.FRAME_HEADER.pack(stream_id=stream_id, flags=flags, frame_len=frame_len)
+        self.connection.send_buffers([frame_header] + list(buffers))
+
+    def send_window_update(self, stream_id: int, window_increment: int) -> None:
+        """
+        Grants the remote side more bytes to send on a stream.
+
+        :param stream_id (int): The ID of the stream.
+        :param window_increment (int): The number of bytes consumed from the stream.
+        """
+        window_update = message_codec.WINDOW_UPDATE.pack(window_increment=window_increment)
+        try:
+            self.send_frame(stream_id, self.FLAG_WINDOW_UPDATE, [window_update])
+        except OSError:
+            # The connection is already closed
+            pass
+
+    def close_stream(self, stream_id: int, is_used: bool = True) -> None:
+        """
+        Sends the closing frame of a stream, and forgets the stream.
+
+        :param stream_id (int): The ID of the closed stream.
+        :param is_used (bool): If False, the stream is unknown to the remote side, so no frame is sent.
+        """
+        with self._streams_lock:
+            self.streams.pop(stream_id, None)
+        if not is_used:
+            return
+        try:
+            self.send_frame(stream_id, self.FLAG_CLOSE_STREAM, [])
+        except OSError:
+            # The connection is already closed
+            pass
+
+    def _receive_frame(self) -> tuple:
+        """
+        Receives the next frame from the connection.
+
+        Returns:
+            tuple: The stream ID, flags and payload of the frame.
+        """
+        self.connection.receive_into(self._frame_header_buffer)
+        stream_id, flags, frame_len = self.FRAME_HEADER.unpack(self._frame_header_buffer)
+        if frame_len > self.MAX_FRAME_SIZE:
+            raise ProtocolError(f"Frame of {frame_len} bytes exceeds the maximal frame size")
+        payload = memoryview(bytearray(frame_len))
+        self.connection.receive_into(payload)
+        return stream_id, flags, payload
+
+    def _get_stream(self, stream_id: int, flags: int) -> tuple:
+        """
+        Returns the stream a received frame belongs to. A data frame of a stream ID that was not seen before
+        opens a new stream.
+
+        Returns:
+            tuple: The stream (None if it was already closed locally) and whether it is a new stream.
+        """
+        with self._streams_lock:
+            stream = self.streams.get(stream_id)
+            if stream is not None or stream_id <= self._last_stream_id or flags:
+                return stream, False
+            self._last_stream_id = stream_id
+            stream = StreamSocket(self, stream_id)
+            stream.is_used = True
+            self.streams[stream_id] = stream
+            return stream, True
+
+    def receive_frames(self):
+        """
+        Receives frames from the connection and routes them to their streams, until the connection is closed.
+
+        Yields:
+            StreamSocket: Every new stream opened by the remote side.
+        """
+        try:
+            while True:
+                stream_id, flags, payload = self._receive_frame()
+                stream, is_new_stream = self._get_stream(stream_id, flags)
+                # Frames of streams that were already closed locally are dropped
+                if stream is None:
+                    continue
+
+                if flags & self.FLAG_WINDOW_UPDATE:
+                    stream.grant(message_codec.WINDOW_UPDATE.unpack(payload)[0])
+                elif payload:
+                    stream.feed(payload)
+                if flags & self.FLAG_CLOSE_STREAM:
+                    stream.close_remote()
+
+                if is_new_stream:
+                    yield stream
+        except TimeoutError:
+            self.timed_out = True
+        except (ConnectionError, OSError, ProtocolError):
+            pass
+        finally:
+            with self._streams_lock:
+                streams = list(self.streams.values())
+            for stream in streams:
+                stream.close_remote()
+
+    def stop_receiving(self) -> None:
+        """
+        Stops receiving frames - wakes up receive_frames, which then ends as if the connection was closed.
+        Frames can still be sent on the streams that are already open.
+        """
+        sock = self.connection.sock
+        try:
+            if isinstance(sock, ssl.SSLSocket):
+                # SSLSocket.shutdown drops the TLS layer, which is still needed for sending
+                socket.socket.shutdown(sock, socket.SHUT_RD)
+            else:
+                sock.shutdown(socket.SHUT_RD)
+        except OSError:
+            # The connection is already closed
+            pass
+
+    def start_receiving(self) -> threading.Thread:
+        """
+        Receives frames on a background thread (client side).
+
+        Returns:
+            threading.Thread: The receiving thread.
+        """
+        def receive():
+            for stream in self.receive_frames():
+                # The client never accepts streams opened by the server
+                stream.close()
+
+        receiving_thread = threading.Thread(target=receive, daemon=True)
+        receiving_thread.start()
+        return receiving_thread
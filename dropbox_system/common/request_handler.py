@@ -1,17 +1,29 @@
 import struct
 import socket
+import ssl
 import struct
+import time
 
-from dropbox_system.common.xor_encryption import xor_data
+from dropbox_system.common.xor_encryption import xor_data, XorStream, PlainStream
+from dropbox_system.common.tls import is_tls_socket
+from dropbox_system.common.transfer_counters import TransferCounters
+from dropbox_system.common.adaptive_chunk_size import AdaptiveChunkSize
+from dropbox_system.common.message_codec import MessageCodec
+from dropbox_system.common.compression import COMPRESSION_NONE, StreamCompressor, StreamDecompressor
 
 class RequestHandler:
     """
     This class provides a generic methods for sending and receiving requests, headers,
     and file data, with XOR encryption applied for data transfer.
+    On TLS connections the data is already encrypted by the transport, so the XOR encryption is off.
     """
     # The size of all numeric fields on this protocol is uint_32 (4 bytes) except for file_len field (uint_64)
     NUMERIC_FIELD_SIZE = 4
     FILE_LEN_FIELD_SIZE = 8
+    NUMERIC_FIELD_STRUCT = struct.Struct("I")
+    # File content is transferred in chunks, so transferring a file requires constant memory
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 4 * 1024 * 1024
     REGISTER_REQUEST_CODE = 1000
     LOGIN_REQUEST_CODE = 1001
     QUIT_SESSION_REQUEST_CODE = 1002
@@ -20,6 +32,9 @@ class RequestHandler:
     UPLOAD_FILE_REQUEST_CODE = 1005
     LIST_FILES_REQUEST_CODE = 1006
     CREATE_DIRECTORY_REQUEST_CODE = 1007
+    PROTOCOL_NEGOTIATION_REQUEST_CODE = 1008
+    # 1009 is not used, since its response code is SERVER_BUSY_RESPONSE_CODE
+    RESUME_SESSION_REQUEST_CODE = 1010
     REGISTER_RESPONE_CODE = 2000
     LOGIN_RESPONSE_CODE = 2001
     QUIT_SESSION_RESPONSE_CODE = 2002
@@ -28,6 +43,10 @@ class RequestHandler:
     UPLOAD_FILE_RESPONSE_CODE = 2005
     LIST_FILES_RESPONSE_CODE = 2006
     CREATE_DIRECTORY_RESPONSE_CODE = 2007
+    PROTOCOL_NEGOTIATION_RESPONSE_CODE = 2008
+    # Sent instead of the response to the first request of a connection the server has no room for
+    SERVER_BUSY_RESPONSE_CODE = 2009
+    RESUME_SESSION_RESPONSE_CODE = 2010
     SUCCESS = 0
     USER_NOT_EXISTS = 1
     USER_NOT_LOGGED_IN = 2
@@ -39,14 +58,63 @@ class RequestHandler:
     DIRECTORY_ALREADY_EXISTS = 8
     GOT_DIRECTORY_AS_INPUT = 9
     DIRECTORY_NOT_EXISTS = 10
+    INVALID_FILE_CONTENT = 11
+    SERVER_BUSY = 12
+    # The server has no room in its memory budget for the buffer of a transfer right now
+    INSUFFICIENT_MEMORY = 13
+    # The declared length of a request exceeds the maximal request length, the session is closed
+    REQUEST_TOO_LARGE = 14
+    # The session failed to log in (or registered) too many times, the session is closed
+    TOO_MANY_ATTEMPTS = 15
+    # The session token is invalid or expired, the client should log in with its credentials
+    INVALID_SESSION_TOKEN = 16
 
-    def __init__(self, sock: socket.socket) -> None:
+    # Protocol v1 handles one request at a time on a connection, protocol v2 multiplexes requests on it.
+    PROTOCOL_VERSION_1 = 1
+    PROTOCOL_VERSION_2 = 2
+    SUPPORTED_PROTOCOL_VERSION = PROTOCOL_VERSION_2
+
+    def __init__(self, sock: socket.socket, chunk_size: int = DEFAULT_CHUNK_SIZE, adaptive_chunk_size: bool = False) -> None:
         """
         Initializes the RequestHandler with a socket.
 
         :param sock (socket.socket): The socket used for communication.
+        :param chunk_size (int): The size of the chunks file content is transferred in.
+        :param adaptive_chunk_size (bool): If True, the chunk size of sent files keeps growing (up to MAX_CHUNK_SIZE)
+                                           while the measured throughput keeps improving.
         """
         self.sock = sock
+        self.is_xor_enabled = not is_tls_socket(sock)
+        self.chunk_size = chunk_size
+        self.adaptive_chunk_size = AdaptiveChunkSize(chunk_size, self.MAX_CHUNK_SIZE) if adaptive_chunk_size else None
+        self.counters = TransferCounters()
+        # The CompressionReport of the last compressed file content that was sent or received
+        self.last_compression_report = None
+        self._numeric_field_buffer = bytearray(self.NUMERIC_FIELD_SIZE)
+        self._header_buffers = {}
+        # Limits the time of the socket operations when set (see `dropbox_system.server.session_timeouts`)
+        self.socket_deadline = None
+        # Paces the chunks of file content when set (see `dropbox_system.server.bandwidth_scheduler`)
+        self.transfer_throttle = None
+        self._set_no_delay()
+
+    def _new_xor_stream(self):
+        """
+        Returns:
+            XorStream: A new stream to encrypt/decrypt a message with, or a PlainStream if the XOR encryption is off.
+        """
+        return XorStream() if self.is_xor_enabled else PlainStream()
+
+    def _encrypt(self, data: bytes) -> bytes:
+        """
+        Returns:
+            bytes: The encrypted data, or the data itself if the XOR encryption is off.
+        """
+        if not self.is_xor_enabled:
+            return data
+        xored_data = xor_data(data)
+        self.counters.count_copy(len(xored_data))
+        return xored_data
 
     def __del__(self):
         """
@@ -54,13 +122,47 @@ class RequestHandler:
         """
         self.sock.close()
 
+    def _set_no_delay(self) -> None:
+        """
+        Disables Nagle's algorithm on the socket, so small messages are sent without waiting for previous ACKs.
+        Does nothing for sockets that are not TCP sockets.
+        """
+        try:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
+    def _apply_deadline(self, size: int = 0) -> None:
+        """
+        Sets the socket timeout of the next socket operation by the socket deadline, if there is one.
+        Raises TimeoutError if the deadline already passed.
+
+        :param size (int): The size of a send operation that only returns once all of the data is sent.
+        """
+        if self.socket_deadline is not None:
+            self.sock.settimeout(self.socket_deadline.get_timeout(size))
+
+    def _record_transfer(self, transferred: int) -> None:
+        """
+        Reports the bytes transferred by a socket operation to the socket deadline, if there is one.
+        """
+        if self.socket_deadline is not None:
+            self.socket_deadline.record(transferred)
+
+    def _throttle(self, size: int) -> None:
+        """
+        Waits until a chunk of file content of the given size may be transferred, if there is a transfer throttle.
+        """
+        if self.transfer_throttle is not None:
+            self.transfer_throttle.throttle(size)
+
     def send_header(self, data: bytes) -> None:
         """
         Sends a unencrypted raw data header over the socket.
 
         :param data (bytes): The header data to be sent.
         """
-        self.sock.send(data)
+        self.send_all(data)
 
     def send_data(self, data: bytes) -> None:
         """
@@ -69,52 +171,313 @@ class RequestHandler:
         Args:
             data (bytes): The data to be encrypted and sent.
         """
-        xored_data = xor_data(data)
-        self.sock.send(xored_data)
+        self.send_all(self._encrypt(data))
 
-    def receive_numeric_value(self) -> bytes:
+    def send_message(self, header: bytes, data: bytes = b'') -> None:
         """
-        Receives a numeric value from the server by reading 4 bytes from the socket. This value is then
+        Sends a unencrypted header followed by encrypted data, coalesced into a single scatter/gather write,
+        so a small message is sent in one packet.
+
+        :param header (bytes): The header data to be sent.
+        :param data (bytes): The data to be encrypted and sent after the header.
+        """
+        self.send_buffers([header, self._encrypt(data)])
+
+    def send_buffers(self, buffers: list) -> None:
+        """
+        Sends all the given buffers, in order, with as few socket calls as possible.
+        Uses sendmsg (scatter/gather) when the socket supports it (TLS sockets do not), and retries on partial writes.
+
+        :param buffers (list): The buffers to be sent.
+        """
+        buffers = [memoryview(buffer).cast("B") for buffer in buffers if len(buffer)]
+        if not hasattr(self.sock, "sendmsg") or isinstance(self.sock, ssl.SSLSocket):
+            joined_buffers = b"".join(buffers)
+            self.counters.count_copy(len(joined_buffers))
+            self.send_all(joined_buffers)
+            return
+
+        while buffers:
+            self._apply_deadline()
+            sent = self.sock.sendmsg(buffers)
+            self._record_transfer(sent)
+            self.counters.send_calls += 1
+            self.counters.sent_bytes += sent
+            # Skip the buffers that were fully sent, and trim the one that was partially sent
+            sent_buffers = 0
+            while sent_buffers < len(buffers) and sent >= len(buffers[sent_buffers]):
+                sent -= len(buffers[sent_buffers])
+                sent_buffers += 1
+            buffers = buffers[sent_buffers:]
+            if sent:
+                buffers[0] = buffers[0][sent:]
+
+    def send_all(self, data: bytes) -> None:
+        """
+        Sends all the data on the socket, retrying on partial writes until every byte is sent.
+
+        :param data (bytes): The data to be sent.
+        """
+        self._apply_deadline(len(data))
+        self.sock.sendall(data)
+        self._record_transfer(len(data))
+        self.counters.send_calls += 1
+        self.counters.sent_bytes += len(data)
+
+    def receive_into(self, buffer: memoryview) -> None:
+        """
+        Receives exactly len(buffer) bytes from the socket directly into the given buffer, without
+        allocating or copying. Raises ConnectionError if the socket connection is broken.
+
+        :param buffer (memoryview): A writable buffer to fill with the received data.
+        """
+        buffer = memoryview(buffer).cast("B")
+        total_received = 0
+        while total_received < len(buffer):
+            self._apply_deadline()
+            received = self.sock.recv_into(buffer[total_received:])
+            self._record_transfer(received)
+            self.counters.receive_calls += 1
+            if not received:
+                raise ConnectionError("Socket connection broken")
+            total_received += received
+        self.counters.received_bytes += total_received
+
+    def receive_numeric_value(self) -> int:
+        """
+        Receives a numeric value from the server by reading exactly 4 bytes from the socket. This value is then
         unpacked into an integer.
 
         Returns:
             int: The numeric value received from the server.
         """
-        received_bytes = self.sock.recv(self.NUMERIC_FIELD_SIZE)
-        return struct.unpack('I', received_bytes)[0]
+        self.receive_into(self._numeric_field_buffer)
+        return self.NUMERIC_FIELD_STRUCT.unpack_from(self._numeric_field_buffer)[0]
     
-    def receive_bytes(self, size: int) -> bytes:
+    def receive_header(self, codec: MessageCodec) -> tuple:
+        """
+        Receives an unencrypted fixed-size header (such as REQUEST_HEADER or RESPONSE_HEADER) into a reusable
+        buffer, and parses it with its codec.
+
+        :param codec (MessageCodec): The codec of the header. It must consist of numeric fields only.
+
+        Returns:
+            tuple: The values of the header fields.
         """
-        Receives a specific amount of data from the socket. 
-        Handles connection errors and applies XOR decryption to the received data.
+        header_buffer = self._header_buffers.get(codec)
+        if header_buffer is None:
+            header_buffer = self._header_buffers[codec] = bytearray(codec.size)
+            self.counters.count_allocation(codec.size)
+        self.receive_into(header_buffer)
+        return codec.unpack(header_buffer)
+
+    def receive_bytes(self, size: int) -> bytearray:
+        """
+        Receives a specific amount of data from the socket into a pre-allocated buffer, 
+        and applies XOR decryption in-place on the received data.
         Raises ConnectionError if the socket connection is broken.
 
         :param size (int): The number of bytes to receive.
 
         Returns:
-            bytes: The decrypted data received from the server.
+            bytearray: The decrypted data received from the server.
         """
-        buffer = b''
-        while len(buffer) < size:
-            data = self.sock.recv(size - len(buffer))
-            if not data:
-                raise ConnectionError("Socket connection broken")
-            buffer += data
-        return xor_data(buffer)
+        buffer = bytearray(size)
+        self.counters.count_allocation(size)
+        self.receive_into(buffer)
+        if self.is_xor_enabled:
+            XorStream().update_into(buffer, buffer)
+        return buffer
+
+    def receive_file_content(self, file, file_size: int, compression: int = COMPRESSION_NONE) -> None:
+        """
+        Receives file content from the socket in chunks, decrypts each chunk in-place and writes it to the file.
+        Only one chunk is held in memory at a time.
+        Raises ConnectionError if the socket connection is broken.
+
+        :param file: A binary file object to write the content to. If None, the content is received and discarded.
+        :param file_size (int): The size of the file to receive.
+        :param compression (int): The codec the content was compressed with (see `dropbox_system.common.compression`).
+        """
+        if compression != COMPRESSION_NONE:
+            self._receive_compressed_file_content(file, file_size, compression)
+            return
+
+        self.last_compression_report = None
+        chunk_buffer = memoryview(bytearray(min(self.chunk_size, file_size)))
+        self.counters.count_allocation(len(chunk_buffer))
+        xor_stream = self._new_xor_stream()
+        total_received = 0
+
+        while total_received < file_size:
+            chunk = chunk_buffer[:min(len(chunk_buffer), file_size - total_received)]
+            self._throttle(len(chunk))
+            self.receive_into(chunk)
+            xor_stream.update_into(chunk, chunk)
+            if file is not None:
+                file.write(chunk)
+            total_received += len(chunk)
     
-    def send_file_content(self, file_content: bytes, file_size: int) -> None:
+    def _receive_compressed_file_content(self, file, file_size: int, compression: int) -> None:
         """
-        Sends file content to the server in chunks, with XOR encryption applied to the file content.
+        Receives compressed file content - a sequence of encrypted blocks that ends with an empty block.
+        Every block is received chunk by chunk and decompressed into pieces of at most a chunk size, so memory
+        stays bounded no matter how well the content was compressed.
+        Raises ValueError if the decompressed content does not match the file size. Content that exceeds the file
+        size is rejected as soon as it is decompressed, without receiving the rest of it.
 
-        :param file_content (bytes): The content of the file to be sent.
+        :param file: A binary file object to write the content to. If None, the content is received and discarded.
+        :param file_size (int): The size of the decompressed file.
+        :param compression (int): The codec the content was compressed with.
+        """
+        chunk_buffer = memoryview(bytearray(self.chunk_size))
+        self.counters.count_allocation(len(chunk_buffer))
+        decompressor = StreamDecompressor(compression)
+        xor_stream = self._new_xor_stream()
+        total_written = 0
+
+        while True:
+            self.receive_into(self._numeric_field_buffer)
+            xor_stream.update_into(self._numeric_field_buffer, self._numeric_field_buffer)
+            block_len = self.NUMERIC_FIELD_STRUCT.unpack_from(self._numeric_field_buffer)[0]
+            if not block_len:
+                break
+
+            while block_len:
+                chunk = chunk_buffer[:min(len(chunk_buffer), block_len)]
+                self._throttle(len(chunk))
+                self.receive_into(chunk)
+                xor_stream.update_into(chunk, chunk)
+                block_len -= len(chunk)
+                for decompressed in decompressor.decompress(chunk, self.chunk_size):
+                    total_written += len(decompressed)
+                    if total_written > file_size:
+                        raise ValueError(f"Decompressed content exceeds the {file_size} bytes file size")
+                    if file is not None:
+                        file.write(decompressed)
+
+        self.last_compression_report = decompressor.report
+        if total_written != file_size:
+            raise ValueError(f"Decompressed {total_written} bytes of a {file_size} bytes file")
+
+    def _get_send_chunk_size(self) -> int:
+        """
+        Returns:
+            int: The size of the next chunk to send.
+        """
+        if self.adaptive_chunk_size is not None:
+            return self.adaptive_chunk_size.chunk_size
+        return self.chunk_size
+
+    def _send_chunks(self, encrypt_chunk_into, file_size: int) -> None:
+        """
+        Sends file content in chunks. Each encrypted chunk is written into a reusable buffer and sent from it.
+
+        :param encrypt_chunk_into (callable): Gets a XorStream and a memoryview, fills the memoryview with the next
+                                              encrypted chunk of the file and returns the number of bytes written to it.
         :param file_size (int): The size of the file to be sent.
         """
+        chunk_buffer = memoryview(bytearray(0))
+        xor_stream = self._new_xor_stream()
         total_sent = 0
-        xored_data = xor_data(file_content)
 
         while total_sent < file_size:
-            sent = self.sock.send(xored_data[total_sent:total_sent+1000])
-            if sent == 0:
-                raise RuntimeError("Socket connection broken")
+            chunk_size = min(self._get_send_chunk_size(), file_size - total_sent)
+            if len(chunk_buffer) < chunk_size:
+                chunk_buffer = memoryview(bytearray(chunk_size))
+                self.counters.count_allocation(chunk_size)
+
+            chunk = chunk_buffer[:encrypt_chunk_into(xor_stream, chunk_buffer[:chunk_size])]
+            if not chunk:
+                raise RuntimeError("File ended before all of its content was sent")
+
+            self._throttle(len(chunk))
+            start_time = time.perf_counter()
+            self.send_all(chunk)
+            if self.adaptive_chunk_size is not None:
+                self.adaptive_chunk_size.record(len(chunk), time.perf_counter() - start_time)
 
-            total_sent += sent
+            total_sent += len(chunk)
+
+    def send_file_content(self, file_content: bytes, file_size: int) -> None:
+        """
+        Sends file content in chunks, with XOR encryption applied to the file content.
+        The chunks are sliced from the file content without copying it.
+
+        :param file_content (bytes): The content of the file to be sent.
+        :param file_size (int): The size of the file to be sent.
+        """
+        file_content = memoryview(file_content).cast("B")
+        position = 0
+
+        def encrypt_chunk_into(xor_stream: XorStream, chunk: memoryview) -> int:
+            nonlocal position
+            chunk_len = xor_stream.update_into(file_content[position:position + len(chunk)], chunk)
+            position += chunk_len
+            return chunk_len
+
+        self._send_chunks(encrypt_chunk_into, file_size)
+
+    def send_file(self, file, file_size: int, compression: int = COMPRESSION_NONE) -> None:
+        """
+        Sends the content of a file object in chunks, with XOR encryption applied to the file content.
+        Only one chunk is held in memory at a time.
+
+        :param file: A binary file object to read the content from.
+        :param file_size (int): The size of the file to be sent.
+        :param compression (int): The codec to compress the content with (see `dropbox_system.common.compression`).
+        """
+        if compression != COMPRESSION_NONE:
+            self._send_compressed_file(file, file_size, compression)
+            return
+
+        self.last_compression_report = None
+        def encrypt_chunk_into(xor_stream: XorStream, chunk: memoryview) -> int:
+            chunk_len = file.readinto(chunk)
+            xor_stream.update_into(chunk[:chunk_len], chunk)
+            return chunk_len
+
+        self._send_chunks(encrypt_chunk_into, file_size)
+
+    def _send_compressed_file(self, file, file_size: int, compression: int) -> None:
+        """
+        Compresses the content of a file object chunk by chunk, and sends every compressed output as an encrypted
+        block prefixed with its length. An empty block marks the end of the content.
+
+        :param file: A binary file object to read the content from.
+        :param file_size (int): The size of the file to be sent.
+        :param compression (int): The codec to compress the content with.
+        """
+        chunk_buffer = memoryview(bytearray(min(self.chunk_size, file_size)))
+        self.counters.count_allocation(len(chunk_buffer))
+        compressor = StreamCompressor(compression)
+        xor_stream = self._new_xor_stream()
+        total_read = 0
+
+        while total_read < file_size:
+            chunk_len = file.readinto(chunk_buffer[:min(len(chunk_buffer), file_size - total_read)])
+            if not chunk_len:
+                raise RuntimeError("File ended before all of its content was sent")
+            total_read += chunk_len
+            # The compressor buffers its input, so it does not output a block for every chunk
+            compressed = compressor.compress(chunk_buffer[:chunk_len])
+            if compressed:
+                self._send_compressed_block(xor_stream, compressed)
+
+        compressed = compressor.flush()
+        if compressed:
+            self._send_compressed_block(xor_stream, compressed)
+        self._send_compressed_block(xor_stream, b"")
+        self.last_compression_report = compressor.report
+
+    def _send_compressed_block(self, xor_stream: XorStream, block: bytes) -> None:
+        """
+        Sends a single encrypted block of compressed content, prefixed with its length.
+
+        :param xor_stream (XorStream): The XOR stream of the content.
+        :param block (bytes): The compressed block (empty for the block that marks the end of the content).
+        """
+        block_len = self.NUMERIC_FIELD_STRUCT.pack(len(block))
+        self._throttle(len(block_len) + len(block))
+        self.counters.count_copy(len(block))
+        self.send_buffers([xor_stream.update(block_len), xor_stream.update(block)])
@@ -0,0 +1,121 @@
+"""
+This module implements the TLS transport - connections wrapped with the stdlib ssl module, so OpenSSL encrypts
+the data (in native code, without holding the GIL) instead of the XOR layer.
+
+On TLS connections the XOR layer is turned off, see `is_tls_socket`. Clients keep the TLS session of their last
+connection to every server, so reconnecting resumes the session instead of running a full handshake.
+
+A self-signed certificate for testing can be generated with:
+    python3 -m dropbox_system.common.tls --certificate cert.pem --key key.pem
+"""
+
+import argparse
+import socket
+import ssl
+import subprocess
+import threading
+
+
+def generate_self_signed_certificate(certificate_path: str, key_path: str, common_name: str = "localhost",
+                                     days: int = 365) -> None:
+    """
+    Generates a self-signed certificate and its private key with the openssl command line tool.
+    Raises FileNotFoundError if openssl is not installed, and subprocess.CalledProcessError if it fails.
+
+    :param certificate_path (str): The path to write the PEM certificate to.
+    :param key_path (str): The path to write the PEM private key to.
+    :param common_name (str): The host name the certificate is issued for (also added as a subject alternative name).
+    :param days (int): The number of days the certificate is valid for.
+    """
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-sha256",
+                    "-keyout", key_path, "-out", certificate_path, "-days", str(days),
+                    "-subj", f"/CN={common_name}", "-addext", f"subjectAltName=DNS:{common_name},IP:127.0.0.1"],
+                   check=True, capture_output=True)
+
+
+def create_server_context(certificate_path: str, key_path: str = None) -> ssl.SSLContext:
+    """
+    Creates the TLS context of a server.
+
+    :param certificate_path (str): The path of the PEM certificate of the server.
+    :param key_path (str): The path of the PEM private key of the server, or None if it is in the certificate file.
+
+    Returns:
+        ssl.SSLContext: The server context.
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certificate_path, key_path)
+    return context
+
+
+def is_tls_socket(sock) -> bool:
+    """
+    Returns:
+        bool: True if the data sent on the socket (or socket-like object) is encrypted by TLS.
+    """
+    return isinstance(sock, ssl.SSLSocket) or getattr(sock, "is_tls", False) is True
+
+
+class ClientTlsContext:
+    """
+    The TLS context of a client. Keeps the TLS session of the last connection to every server, so new connections
+    to the same server resume it.
+    """
+
+    def __init__(self, ca_file: str = None) -> None:
+        """
+        Creates the client context.
+
+        :param ca_file (str): The path of a PEM certificate to trust (such as a self-signed server certificate).
+                              If None, the default system certificates are trusted.
+        """
+        self.context = ssl.create_default_context(cafile=ca_file)
+        self.context.minimum_version = ssl.TLSVersion.TLSv1_2
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def wrap_socket(self, sock: socket.socket, host: str, port: int) -> ssl.SSLSocket:
+        """
+        Wraps a connected socket with TLS, and runs the handshake (resuming the last session to the server if any).
+
+        :param sock (socket.socket): The connected socket.
+        :param host (str): The host name of the server, which its certificate is verified against.
+        :param port (int): The port of the server.
+
+        Returns:
+            ssl.SSLSocket: The TLS socket.
+        """
+        with self._sessions_lock:
+            session = self._sessions.get((host, port))
+        return self.context.wrap_socket(sock, server_hostname=host, session=session)
+
+    def save_session(self, tls_socket: ssl.SSLSocket, host: str, port: int) -> None:
+        """
+        Saves the session of a connection, so the next connection to the same server resumes it.
+        Should be called before the socket is closed, after data was received on it (with TLS 1.3 the server sends
+        the session ticket after the handshake).
+
+        :param tls_socket (ssl.SSLSocket): The TLS socket.
+        :param host (str): The host name of the server.
+        :param port (int): The port of the server.
+        """
+        # The session is None if the socket is already closed
+        session = tls_socket.session
+        if session is not None:
+            with self._sessions_lock:
+                self._sessions[(host, port)] = session
+
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the paths of the generated certificate."""
+    parser = argparse.ArgumentParser(description="Generate a self-signed TLS certificate for testing")
+    parser.add_argument('--certificate', '-c', type=str, default="cert.pem", help="Path of the generated certificate")
+    parser.add_argument('--key', '-k', type=str, default="key.pem", help="Path of the generated private key")
+    parser.add_argument('--common-name', '-n', type=str, default="localhost", help="Host name of the server")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    generate_self_signed_certificate(args.certificate, args.key, args.common_name)
+    print(f"Generated {args.certificate} and {args.key}")
@@ -0,0 +1,49 @@
+class TransferCounters:
+    """
+    This class counts the buffer allocations, copies and socket calls made while transferring data,
+    so the memory cost of a transfer can be measured.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes all counters to zero.
+        """
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sets all counters to zero.
+        """
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.copies = 0
+        self.copied_bytes = 0
+        self.receive_calls = 0
+        self.received_bytes = 0
+        self.send_calls = 0
+        self.sent_bytes = 0
+
+    def count_allocation(self, size: int) -> None:
+        """
+        Counts a new buffer allocation.
+
+        :param size (int): The size of the allocated buffer.
+        """
+        self.allocations += 1
+        self.allocated_bytes += size
+
+    def count_copy(self, size: int) -> None:
+        """
+        Counts a copy of data between buffers.
+
+        :param size (int): The number of copied bytes.
+        """
+        self.copies += 1
+        self.copied_bytes += size
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: All the counters, mapped by their names.
+        """
+        return dict(vars(self))
@@ -1,3 +1,22 @@
+"""
+This module implements the XOR encryption used on the dropbox protocol.
+
+The XOR operation is applied on whole buffers at a time, using one of the following backends:
+- numpy: XORs numpy arrays (used by default when numpy is installed).
+- big_integer: converts the buffers to python integers and XORs them at once (pure python fallback).
+- bytewise: XORs the buffers byte by byte (the reference implementation, very slow).
+
+`xor_data` encrypts/decrypts a whole buffer at once, while `XorStream` encrypts/decrypts a stream
+of chunks, keeping track of its offset in the keystream.
+"""
+
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 XOR_KEY = (
     b'l\xab\x05\xe3\xa03Y\xea\x8d@\xbc\xee\x9a\xef\xcb\xcd]\x8aj\xd1u\xa9v\xb7'
     b'T\xf3yi\xae/+2\xf8\xe0\xf4\xd4\xe9\xb2\x05\x0f\xc3\x9dH\xec\xde\xbd\xc6'
@@ -42,17 +61,165 @@ XOR_KEY = (
     b'W\xe7r\x99V\x8e\xfd)\x98n\xae\xbc\xa8\xda\xd2k!\xa9v\x12\x83\x86)P'
 )
 
-def xor_data(data: bytes, key: bytes = XOR_KEY) -> bytes:
+# The keystream is built from whole repetitions of the key, so every block of data starts at the same key offset.
+KEYSTREAM_MIN_SIZE = 1024 * 1024
+
+_keystreams_cache = {}
+_keystreams_cache_lock = threading.Lock()
+
+def get_keystream(key: bytes = XOR_KEY) -> bytes:
+    """
+    Returns the keystream of the given key - the key repeated as many times as needed to reach at least
+    KEYSTREAM_MIN_SIZE bytes, plus one more repetition so a full block can be sliced from any key offset.
+    The keystream is built once per key and cached for the next calls.
+
+    :param key (bytes): The key used for the XOR operation. Default is a predefined XOR_KEY.
+
+    Returns:
+        bytes: The keystream of the key.
+    """
+    keystream = _keystreams_cache.get(key)
+    if keystream is None:
+        with _keystreams_cache_lock:
+            keystream = _keystreams_cache.get(key)
+            if keystream is None:
+                keystream = key * (-(-KEYSTREAM_MIN_SIZE // len(key)) + 1)
+                _keystreams_cache[key] = keystream
+    return keystream
+
+def _xor_bytewise_into(data: memoryview, keystream: memoryview, output: memoryview) -> None:
+    """
+    XORs the data with the beginning of the keystream into the output, byte by byte.
+    """
+    output[:] = bytes(a ^ b for a, b in zip(data, keystream))
+
+def _xor_big_integer_into(data: memoryview, keystream: memoryview, output: memoryview) -> None:
+    """
+    XORs the data with the beginning of the keystream into the output, by converting both of them to integers.
+    """
+    data_len = len(data)
+    xored_value = int.from_bytes(data, "little") ^ int.from_bytes(keystream[:data_len], "little")
+    output[:] = xored_value.to_bytes(data_len, "little")
+
+def _xor_numpy_into(data: memoryview, keystream: memoryview, output: memoryview) -> None:
+    """
+    XORs the data with the beginning of the keystream into the output using numpy arrays, without allocating.
+    """
+    data_array = numpy.frombuffer(data, dtype=numpy.uint8)
+    keystream_array = numpy.frombuffer(keystream, dtype=numpy.uint8, count=len(data_array))
+    numpy.bitwise_xor(data_array, keystream_array, out=numpy.frombuffer(output, dtype=numpy.uint8))
+
+XOR_BACKENDS = {
+    "bytewise": _xor_bytewise_into,
+    "big_integer": _xor_big_integer_into,
+}
+if numpy is not None:
+    XOR_BACKENDS["numpy"] = _xor_numpy_into
+
+DEFAULT_XOR_BACKEND = "numpy" if numpy is not None else "big_integer"
+
+
+class XorStream:
+    """
+    A stateful XOR cipher that remembers its position in the keystream.
+    Chunks of any size that are passed to it in order are encrypted/decrypted exactly as if the whole
+    data was passed to `xor_data` at once.
+    """
+
+    def __init__(self, key: bytes = XOR_KEY, backend: str = None) -> None:
+        """
+        Initializes the stream at key offset 0.
+
+        :param key (bytes): The key used for the XOR operation. Default is a predefined XOR_KEY.
+        :param backend (str): The name of the XOR backend to use (one of XOR_BACKENDS). Default is DEFAULT_XOR_BACKEND.
+        """
+        self.key = key
+        self.offset = 0
+        self._xor_into = XOR_BACKENDS[backend or DEFAULT_XOR_BACKEND]
+        self._keystream = memoryview(get_keystream(key))
+        # A whole number of keys, so the offset is the same before and after xoring a full block
+        self._block_size = len(self._keystream) - len(key)
+
+    def update(self, data: bytes) -> bytes:
+        """
+        Encrypts/decrypts the next chunk of the stream.
+
+        :param data (bytes): The next chunk of data.
+
+        Returns:
+            bytes: The xored chunk.
+        """
+        output = bytearray(len(data))
+        self.update_into(data, output)
+        return bytes(output)
+
+    def update_into(self, source: bytes, destination: bytearray) -> int:
+        """
+        Encrypts/decrypts the next chunk of the stream into a pre-allocated buffer.
+        The source and the destination may be the same buffer (for in-place encryption/decryption).
+
+        :param source (bytes): The next chunk of data.
+        :param destination (bytearray): A writable buffer, at least as long as the source, to write the xored chunk to.
+
+        Returns:
+            int: The number of bytes written to the destination.
+        """
+        source = memoryview(source).cast("B")
+        destination = memoryview(destination).cast("B")
+        source_len = len(source)
+        if len(destination) < source_len:
+            raise ValueError("Destination buffer is too small")
+
+        for start in range(0, source_len, self._block_size):
+            end = min(start + self._block_size, source_len)
+            keystream = self._keystream[self.offset:self.offset + end - start]
+            self._xor_into(source[start:end], keystream, destination[start:end])
+            self.offset = (self.offset + end - start) % len(self.key)
+
+        return source_len
+
+def xor_data(data: bytes, key: bytes = XOR_KEY, backend: str = None) -> bytes:
     """
     Applies XOR encryption/decryption on the input data using the provided key. 
     This function is used for both encryption and decryption.
 
     :param data (bytes): The data to be encrypted or decrypted.
     :param key (bytes): The key used for the XOR operation. Default is a predefined XOR_KEY.
+    :param backend (str): The name of the XOR backend to use (one of XOR_BACKENDS). Default is DEFAULT_XOR_BACKEND.
 
     Returns:
         bytes: The xored data.
     """
-    # If the data is longer than the key, extand it
-    extended_xor_key = key * (int(len(data) / len(key)) + 1)
-    return bytes(a^b for a, b in zip(*map(bytearray, [data, extended_xor_key]))) 
+    return XorStream(key, backend).update(data)
+
+
+class PlainStream:
+    """
+    A drop-in replacement of XorStream that leaves the data as is.
+    Used on connections that are already encrypted by their transport (such as TLS), where the XOR layer is off.
+    """
+
+    def update(self, data: bytes) -> bytes:
+        """
+        Returns:
+            bytes: The chunk, unchanged.
+        """
+        return data
+
+    def update_into(self, source: bytes, destination: bytearray) -> int:
+        """
+        Copies the chunk into a pre-allocated buffer.
+
+        :param source (bytes): The next chunk of data.
+        :param destination (bytearray): A writable buffer, at least as long as the source.
+
+        Returns:
+            int: The number of bytes written to the destination.
+        """
+        source = memoryview(source).cast("B")
+        destination = memoryview(destination).cast("B")
+        source_len = len(source)
+        if len(destination) < source_len:
+            raise ValueError("Destination buffer is too small")
+        destination[:source_len] = source
+        return source_len
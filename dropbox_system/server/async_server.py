@@ -0,0 +1,339 @@
+"""
+This module implements the asyncio server engine - an alternative to the thread per connection engine of `Server`.
+
+All the connections are owned by a single event loop. A connection holds no thread while it is idle - the event loop
+waits for the header of its next request, and only then hands the request to a worker thread of a bounded executor,
+which runs the existing ServerHandler on it (including the file I/O and the database queries of the request).
+While the request is handled, the event loop keeps receiving the data of the connection (such as uploaded file content)
+and sends the responses the handler writes.
+
+The handler talks to the event loop through an EventLoopSocket - a blocking socket-like object, so the handlers run
+unchanged on the asyncio engine.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import ssl
+import threading
+
+from dropbox_system.common import message_codec
+from dropbox_system.server.server import Server
+from dropbox_system.server.server_handler import ServerHandler
+from dropbox_system.server.memory_budget import MemoryBudget
+from dropbox_system.server.bandwidth_scheduler import BandwidthScheduler
+from dropbox_system.server.request_lanes import RequestLanes
+from dropbox_system.server.attempt_limits import AttemptLimits
+from dropbox_system.server.session_tokens import SessionTokens
+from dropbox_system.server.credential_cache import CredentialCache
+from dropbox_system.server.path_locks import PathLocks
+
+
+class EventLoopSocket:
+    """
+    A blocking socket-like object for a worker thread, whose data is received and sent by the event loop.
+    """
+    # The maximal amount of received data that is buffered before the event loop stops reading the connection
+    MAX_BUFFERED_SIZE = 1024 * 1024
+    # The maximal size of the writes that are queued on the event loop without waiting for them to be sent
+    MAX_QUEUED_WRITE_SIZE = 16 * 1024
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter) -> None:
+        """
+        Initializes the socket of a connection.
+
+        :param loop (asyncio.AbstractEventLoop): The event loop that owns the connection.
+        :param writer (asyncio.StreamWriter): The writer of the connection.
+        """
+        self.loop = loop
+        self.writer = writer
+        # A write is complete only once the data was handed to the kernel, so the sent buffers can be reused
+        writer.transport.set_write_buffer_limits(high=0)
+        self.is_tls = writer.get_extra_info("sslcontext") is not None
+        self.buffered_size = 0
+        self._queued_write_size = 0
+        self._incoming_chunks = collections.deque()
+        self._is_eof = False
+        self._condition = threading.Condition()
+        self._data_received = asyncio.Event()
+        self._space_available = asyncio.Event()
+
+    def feed(self, data: bytes) -> None:
+        """
+        Buffers data received on the connection (called by the event loop).
+        """
+        with self._condition:
+            self._incoming_chunks.append(memoryview(data))
+            self.buffered_size += len(data)
+            self._condition.notify_all()
+        self._data_received.set()
+
+    def feed_eof(self) -> None:
+        """
+        Marks the connection as closed by the client.
+        """
+        with self._condition:
+            self._is_eof = True
+            self._condition.notify_all()
+        self.loop.call_soon_threadsafe(self._data_received.set)
+
+    async def wait_for_data(self, size: int) -> bool:
+        """
+        Waits until at least size bytes are buffered (called by the event loop, while no worker thread
+        receives from the socket).
+
+        Returns:
+            bool: True if the data was received, False if the client closed the connection before.
+        """
+        while self.buffered_size < size:
+            if self._is_eof:
+                return False
+            self._data_received.clear()
+            await self._data_received.wait()
+        return True
+
+    async def wait_for_space(self) -> None:
+        """
+        Waits until the buffered data is consumed below MAX_BUFFERED_SIZE (called by the event loop).
+        """
+        while self.buffered_size >= self.MAX_BUFFERED_SIZE:
+            self._space_available.clear()
+            if self.buffered_size >= self.MAX_BUFFERED_SIZE:
+                await self._space_available.wait()
+
+    def peek(self, size: int) -> bytes:
+        """
+        Returns the first size bytes of the buffered data, without consuming them (called by the event loop, once
+        `wait_for_data` returned True for at least size bytes).
+        """
+        with self._condition:
+            data = b""
+            for chunk in self._incoming_chunks:
+                if len(data) >= size:
+                    break
+                data += chunk[:size - len(data)]
+            return data
+
+    def recv_into(self, buffer: memoryview) -> int:
+        """
+        Receives the next buffered data into the buffer. Blocks until data is available.
+
+        :param buffer (memoryview): A writable buffer to receive the data into.
+
+        Returns:
+            int: The number of received bytes, or 0 if the client closed the connection.
+        """
+        buffer = memoryview(buffer).cast("B")
+        with self._condition:
+            while not self._incoming_chunks and not self._is_eof:
+                self._condition.wait()
+
+            was_full = self.buffered_size >= self.MAX_BUFFERED_SIZE
+            received = 0
+            while self._incoming_chunks and received < len(buffer):
+                chunk = self._incoming_chunks[0]
+                chunk_len = min(len(chunk), len(buffer) - received)
+                buffer[received:received + chunk_len] = chunk[:chunk_len]
+                received += chunk_len
+                if chunk_len == len(chunk):
+                    self._incoming_chunks.popleft()
+                else:
+                    self._incoming_chunks[0] = chunk[chunk_len:]
+            self.buffered_size -= received
+
+        if was_full and self.buffered_size < self.MAX_BUFFERED_SIZE:
+            self.loop.call_soon_threadsafe(self._space_available.set)
+        return received
+
+    async def _write(self, data: bytes) -> None:
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def sendall(self, data: bytes) -> None:
+        """
+        Sends all the data on the connection. Blocks until the data was handed to the kernel, except for small
+        writes when nothing is queued on the connection - those are copied and queued without waiting for the event
+        loop (so small responses do not cost a round trip to it).
+        Raises ConnectionError if the connection is broken.
+        """
+        with self._condition:
+            is_queued = self._queued_write_size + len(data) <= self.MAX_QUEUED_WRITE_SIZE and \
+                not self.writer.transport.get_write_buffer_size()
+            if is_queued:
+                self._queued_write_size += len(data)
+        if is_queued:
+            self.loop.call_soon_threadsafe(self._write_queued, bytes(data))
+            return
+        asyncio.run_coroutine_threadsafe(self._write(data), self.loop).result()
+
+    def _write_queued(self, data: bytes) -> None:
+        with self._condition:
+            self._queued_write_size -= len(data)
+        self.writer.write(data)
+
+    def setsockopt(self, *args) -> None:
+        self.writer.get_extra_info("socket").setsockopt(*args)
+
+    def shutdown(self, how: int) -> None:
+        """
+        Stops receiving data - recv_into returns 0 once the buffered data is consumed.
+        Data can still be sent on the connection.
+        """
+        self.feed_eof()
+
+    def close(self) -> None:
+        """
+        Does nothing - the connection is closed by the event loop once its handler is done.
+        """
+
+
+class AsyncServer(Server):
+    """
+    A dropbox server object that handles all the connections on an asyncio event loop, and runs the requests
+    on a bounded pool of worker threads.
+    """
+    DEFAULT_WORKERS = 32
+    # The maximal size of a single read from a connection
+    READ_SIZE = 256 * 1024
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, chunk_size: int = ServerHandler.DEFAULT_CHUNK_SIZE,
+                 adaptive_chunk_size: bool = False, tls_context: ssl.SSLContext = None, unix_socket_path: str = None,
+                 workers: int = DEFAULT_WORKERS, reuse_port: bool = False, memory_budget: MemoryBudget = None,
+                 bandwidth_scheduler: BandwidthScheduler = None, request_lanes: RequestLanes = None,
+                 attempt_limits: AttemptLimits = None, session_tokens: SessionTokens = None,
+                 path_locks: PathLocks = None, credential_cache: CredentialCache = None) -> None:
+        """
+        Initializes the server and binds it, like `Server`.
+
+        :param workers (int): The number of worker threads metadata requests are handled on (the number of metadata
+                              requests that are handled concurrently). Bulk requests (uploads and downloads) are
+                              handled on their own request_lanes.bulk_capacity worker threads.
+        """
+        super(AsyncServer, self).__init__(host, port, chunk_size, adaptive_chunk_size, tls_context, unix_socket_path,
+                                          reuse_port=reuse_port, memory_budget=memory_budget,
+                                          bandwidth_scheduler=bandwidth_scheduler, request_lanes=request_lanes,
+                                          attempt_limits=attempt_limits, session_tokens=session_tokens,
+                                          path_locks=path_locks, credential_cache=credential_cache)
+        self.workers = workers
+        self.executor = None
+        self.bulk_executor = None
+
+    def start(self) -> None:
+        """Starts the server and listening for new client connections."""
+        if not self.is_initialized:
+            return
+
+        print("Server is starting...")
+        try:
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            print("Server is shutting down...")
+        finally:
+            self._close_listening_sockets()
+            print("Server socket closed.")
+
+    async def _serve(self) -> None:
+        """
+        Accepts connections on all the listening sockets, until the event loop is stopped.
+        """
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="request-worker")
+        self.bulk_executor = concurrent.futures.ThreadPoolExecutor(self.request_lanes.bulk_capacity or self.workers,
+                                                                   thread_name_prefix="bulk-request-worker")
+        servers = []
+        if self.server_socket is not None:
+            servers.append(await asyncio.start_server(self._handle_connection, sock=self.server_socket,
+                                                      ssl=self.tls_context, limit=self.READ_SIZE))
+        if self.unix_server_socket is not None:
+            servers.append(await asyncio.start_unix_server(self._handle_connection, sock=self.unix_server_socket,
+                                                           ssl=self.tls_context, limit=self.READ_SIZE))
+        try:
+            await asyncio.gather(*[server.serve_forever() for server in servers])
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.bulk_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Handles a client connection - waits for every request header on the event loop, and handles the request
+        on a worker thread of the lane of the request (so metadata requests never wait behind transfers).
+        """
+        sock = EventLoopSocket(asyncio.get_running_loop(), writer)
+        receiving_task = asyncio.create_task(self._receive(reader, sock))
+        try:
+            # The handlers share the connection pool of the users DB, so creating a handler opens no connection and
+            # is done on the event loop
+            handler = ServerHandler(sock, self.files_directory_path, self.chunk_size, self.adaptive_chunk_size,
+                                    database_communicator=self.database_communicator,
+                                    memory_budget=self.memory_budget, bandwidth_scheduler=self.bandwidth_scheduler,
+                                    request_lanes=self.request_lanes, attempt_limits=self.attempt_limits,
+                                    session_tokens=self.session_tokens, path_locks=self.path_locks)
+            while not handler.should_exit:
+                if not await sock.wait_for_data(message_codec.REQUEST_HEADER.size):
+                    break
+                request_code, _ = message_codec.REQUEST_HEADER.unpack(sock.peek(message_codec.REQUEST_HEADER.size))
+                is_bulk_request = self.request_lanes.classify(request_code) == RequestLanes.BULK
+                if not await self._run_in_worker(handler._handle_next_request,
+                                                 self.bulk_executor if is_bulk_request else self.executor):
+                    break
+                if handler.protocol_version == handler.PROTOCOL_VERSION_2:
+                    # A multiplexed connection runs its own frame loop, and handles its streams on its own threads
+                    multiplexed_connection_executor = self._new_multiplexed_connection_executor()
+                    try:
+                        await self._run_in_worker(handler._start_multiplexed_handler, multiplexed_connection_executor)
+                    finally:
+                        multiplexed_connection_executor.shutdown(wait=False)
+                    break
+        except Exception as e:
+            print(f"Failed handling a connection - {e!r}")
+        finally:
+            receiving_task.cancel()
+            sock.feed_eof()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def _new_multiplexed_connection_executor(self) -> concurrent.futures.Executor:
+        """
+        Returns:
+            concurrent.futures.Executor: An executor with a single thread, for the frame loop of a protocol v2
+                                         connection (so it does not take a worker of the requests executor).
+        """
+        return concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="multiplexed-connection")
+
+    async def _receive(self, reader: asyncio.StreamReader, sock: EventLoopSocket) -> None:
+        """
+        Keeps receiving the data of a connection into its socket, without buffering more than
+        EventLoopSocket.MAX_BUFFERED_SIZE bytes.
+        """
+        while True:
+            await sock.wait_for_space()
+            try:
+                data = await reader.read(self.READ_SIZE)
+            except ConnectionError:
+                data = b""
+            if not data:
+                sock.feed_eof()
+                return
+            sock.feed(data)
+
+    async def _run_in_worker(self, function, executor: concurrent.futures.Executor = None) -> bool:
+        """
+        Runs a blocking function of a connection's handler on a worker thread.
+
+        :param function (callable): The function to run.
+        :param executor (concurrent.futures.Executor): The executor to run the function on. Default is the requests
+                                                       executor.
+
+        Returns:
+            bool: True if the function completed, False if the connection failed.
+        """
+        try:
+            await asyncio.get_running_loop().run_in_executor(executor or self.executor, function)
+            return True
+        except ConnectionError:
+            return False
+        except Exception as e:
+            print(f"Failed handling a request - {e!r}")
+            return False
@@ -0,0 +1,81 @@
+"""
+This module implements the attempt limits of client sessions. A session stays open after registering and after
+a failed login, so a client can register, log in and work on a single connection - but a session may only fail
+to log in (or register) a limited number of times, so a single connection can not be used to guess passwords
+or to flood the users DB.
+
+The attempt that exceeds a limit is answered with the TOO_MANY_ATTEMPTS error code, and the session is closed.
+"""
+
+import threading
+
+
+class AttemptLimits:
+    """
+    The attempt limits of the sessions of a server, and the counters of the sessions they closed.
+    A limit of None (or 0) is unlimited. All the methods are thread safe.
+    """
+    DEFAULT_MAX_LOGIN_ATTEMPTS = 3
+    DEFAULT_MAX_REGISTER_ATTEMPTS = 5
+
+    def __init__(self, max_login_attempts: int = DEFAULT_MAX_LOGIN_ATTEMPTS,
+                 max_register_attempts: int = DEFAULT_MAX_REGISTER_ATTEMPTS) -> None:
+        """
+        Initializes the limits.
+
+        :param max_login_attempts (int): The number of failed logins a session may make. The last of them is
+                                         answered with TOO_MANY_ATTEMPTS, and closes the session.
+        :param max_register_attempts (int): The number of registration requests a session may send. The next
+                                            one is answered with TOO_MANY_ATTEMPTS, and closes the session.
+        """
+        self.max_login_attempts = max_login_attempts or None
+        self.max_register_attempts = max_register_attempts or None
+        self._lock = threading.Lock()
+        self.failed_logins = 0
+        self.closed_sessions = 0
+
+    def count_failed_login(self, session) -> bool:
+        """
+        Counts a failed login of a session.
+
+        :param session (ServerSession): The session that failed to log in.
+
+        Returns:
+            bool: True if the session may try again, False if it ran out of attempts (and should be closed).
+        """
+        with self._lock:
+            self.failed_logins += 1
+            session.failed_login_attempts += 1
+            if self.max_login_attempts is not None and session.failed_login_attempts >= self.max_login_attempts:
+                self.closed_sessions += 1
+                return False
+            return True
+
+    def count_register_attempt(self, session) -> bool:
+        """
+        Counts a registration request of a session.
+
+        :param session (ServerSession): The session that sent the request.
+
+        Returns:
+            bool: True if the request may be handled, False if the session ran out of attempts (and should be closed).
+        """
+        with self._lock:
+            session.register_attempts += 1
+            if self.max_register_attempts is not None and session.register_attempts > self.max_register_attempts:
+                self.closed_sessions += 1
+                return False
+            return True
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The limits, the number of failed logins and the number of sessions that were closed by the limits.
+        """
+        with self._lock:
+            return {
+                "max_login_attempts": self.max_login_attempts,
+                "max_register_attempts": self.max_register_attempts,
+                "failed_logins": self.failed_logins,
+                "closed_sessions": self.closed_sessions,
+            }
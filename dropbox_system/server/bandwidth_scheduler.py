@@ -0,0 +1,211 @@
+"""
+This module implements the bandwidth scheduler of the server - it paces the file content chunks every transfer sends
+or receives with token buckets, so a few large transfers can not take all of the server's bandwidth:
+- The total rate of the server is shared fairly - every active transfer gets an equal share of it, which is
+  recomputed whenever a transfer starts or ends.
+- Optional caps on the rate of every user (shared by all of the user's transfers) and of every connection.
+
+The scheduler also measures the rate every user achieved.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A token bucket - tokens are added at a constant rate, up to the burst size, and every transferred byte takes
+    a token. A transfer that takes more tokens than the bucket holds waits until they are added.
+    All the methods are thread safe.
+    """
+
+    def __init__(self, rate: float, burst: float = None) -> None:
+        """
+        Initializes a full bucket.
+
+        :param rate (float): The rate tokens are added at, in bytes per second.
+        :param burst (float): The maximal number of tokens in the bucket. Default is the tokens of a second.
+        """
+        self._lock = threading.Lock()
+        self.rate = rate
+        self._is_default_burst = burst is None
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._last_refill_time = time.monotonic()
+
+    def _refill(self) -> None:
+        """
+        Adds the tokens of the time that passed since the last refill. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill_time) * self.rate)
+        self._last_refill_time = now
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Changes the rate tokens are added at, from now on (and the burst size, if it is the default one).
+
+        :param rate (float): The new rate, in bytes per second.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            if self._is_default_burst:
+                self.burst = rate
+                self._tokens = min(self._tokens, self.burst)
+
+    def consume(self, size: int) -> float:
+        """
+        Takes tokens for transferring the given number of bytes. The bucket may go into debt, which the following
+        transfers wait for, so a chunk larger than the burst size is still transferred.
+
+        :param size (int): The number of bytes to transfer.
+
+        Returns:
+            float: The time to wait before transferring them, in seconds.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= size
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class UserBandwidth:
+    """
+    The bandwidth of the transfers of a single user.
+    """
+
+    def __init__(self, bucket: TokenBucket = None) -> None:
+        """
+        Initializes the bandwidth of a user with no transfers.
+
+        :param bucket (TokenBucket): The bucket that caps the rate of the user, or None for no cap.
+        """
+        self.bucket = bucket
+        self.active_transfers = 0
+        self.transfers = 0
+        self.transferred_bytes = 0
+        self.transfer_time = 0.0
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The transfers and transferred bytes of the user, and the average rate of its transfers
+                  (in bytes per second).
+        """
+        return {
+            "active_transfers": self.active_transfers,
+            "transfers": self.transfers,
+            "transferred_bytes": self.transferred_bytes,
+            "average_rate": self.transferred_bytes / self.transfer_time if self.transfer_time else 0.0,
+        }
+
+
+class TransferThrottle:
+    """
+    Paces the chunks of a single transfer (see `RequestHandler.transfer_throttle`).
+    """
+
+    def __init__(self, user_bandwidth: UserBandwidth, buckets: list) -> None:
+        """
+        Initializes the throttle of a transfer that just started.
+
+        :param user_bandwidth (UserBandwidth): The bandwidth of the user the transfer belongs to.
+        :param buckets (list): The token buckets every chunk of the transfer takes tokens from.
+        """
+        self.user_bandwidth = user_bandwidth
+        self.buckets = buckets
+        self.transferred_bytes = 0
+        self.start_time = time.monotonic()
+
+    def throttle(self, size: int) -> None:
+        """
+        Waits until the chunk of the given size may be transferred, by all the buckets of the transfer.
+
+        :param size (int): The size of the chunk.
+        """
+        self.transferred_bytes += size
+        wait_time = max([bucket.consume(size) for bucket in self.buckets], default=0.0)
+        if wait_time:
+            time.sleep(wait_time)
+
+
+class BandwidthScheduler:
+    """
+    Shares the bandwidth of the server between the active transfers. All the methods are thread safe.
+    A rate of None (or 0) is unlimited.
+    """
+
+    def __init__(self, total_rate: float = None, user_rate: float = None, connection_rate: float = None) -> None:
+        """
+        Initializes a scheduler with no active transfers.
+
+        :param total_rate (float): The rate (in bytes per second) all the transfers share fairly.
+        :param user_rate (float): The maximal rate (in bytes per second) of all the transfers of a user.
+        :param connection_rate (float): The maximal rate (in bytes per second) of every transfer.
+        """
+        self.total_rate = total_rate or None
+        self.user_rate = user_rate or None
+        self.connection_rate = connection_rate or None
+        self._lock = threading.Lock()
+        self._fair_share_buckets = set()
+        self._users = {}
+
+    def start_transfer(self, username: str) -> TransferThrottle:
+        """
+        Starts a transfer, and gives its fair share of the total rate to it (reducing the shares of the other
+        active transfers).
+
+        :param username (str): The user the transfer belongs to.
+
+        Returns:
+            TransferThrottle: The throttle of the transfer. Must be passed to `end_transfer` once the transfer ends.
+        """
+        with self._lock:
+            user_bandwidth = self._users.get(username)
+            if user_bandwidth is None:
+                user_bandwidth = UserBandwidth(TokenBucket(self.user_rate) if self.user_rate else None)
+                self._users[username] = user_bandwidth
+            user_bandwidth.active_transfers += 1
+
+            buckets = [user_bandwidth.bucket] if user_bandwidth.bucket is not None else []
+            if self.connection_rate:
+                buckets.append(TokenBucket(self.connection_rate))
+            if self.total_rate:
+                fair_share_bucket = TokenBucket(self.total_rate / (len(self._fair_share_buckets) + 1))
+                self._fair_share_buckets.add(fair_share_bucket)
+                self._share_total_rate()
+                buckets.append(fair_share_bucket)
+            return TransferThrottle(user_bandwidth, buckets)
+
+    def end_transfer(self, transfer_throttle: TransferThrottle) -> None:
+        """
+        Ends a transfer, records its rate, and gives its share of the total rate back to the other active transfers.
+
+        :param transfer_throttle (TransferThrottle): The throttle `start_transfer` returned for the transfer.
+        """
+        with self._lock:
+            user_bandwidth = transfer_throttle.user_bandwidth
+            user_bandwidth.active_transfers -= 1
+            user_bandwidth.transfers += 1
+            user_bandwidth.transferred_bytes += transfer_throttle.transferred_bytes
+            user_bandwidth.transfer_time += time.monotonic() - transfer_throttle.start_time
+            for bucket in transfer_throttle.buckets:
+                if bucket in self._fair_share_buckets:
+                    self._fair_share_buckets.remove(bucket)
+                    self._share_total_rate()
+
+    def _share_total_rate(self) -> None:
+        """
+        Sets the rate of every active transfer to an equal share of the total rate. Must be called with the lock held.
+        """
+        for bucket in self._fair_share_buckets:
+            bucket.set_rate(self.total_rate / len(self._fair_share_buckets))
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The transfers, transferred bytes and average rate of every user, mapped by the usernames.
+        """
+        with self._lock:
+            return {username: user_bandwidth.as_dict() for username, user_bandwidth in self._users.items()}
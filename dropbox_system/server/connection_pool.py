@@ -0,0 +1,276 @@
+"""
+This module implements the connection pool of the users DB, shared by all the sessions of a server process:
+- Every thread reads on its own connection, opened on its first read and kept for the life of the thread,
+  so reads of different sessions run in parallel and no connection is opened per session.
+- All the writes are serialized on a single writer connection, and committed (or rolled back) as a whole.
+  Single statement writes (such as registrations) are group committed - the writes that arrive while another
+  transaction commits are committed together in the next transaction, so they share a single fsync.
+- The connections are long lived, so the prepared statements sqlite3 caches on every connection (by the text of
+  the query) are reused by all the sessions.
+
+By default the database is in WAL journal mode - readers do not block the writer (nor the writer the readers), and
+a commit appends to the log instead of rewriting the database pages, with synchronous=NORMAL (a commit is durable
+once the log is checkpointed, and the database is never corrupted on a crash).
+
+The pool measures the time writes wait for the writer connection, and the size of the group commits.
+"""
+
+import contextlib
+import sqlite3
+import threading
+import time
+import weakref
+
+
+class _PendingWrite:
+    """
+    A single statement write, waiting to be committed by the next group commit.
+    """
+
+    def __init__(self, query: str, parameters: tuple) -> None:
+        self.query = query
+        self.parameters = parameters
+        self.is_done = False
+        self.error = None
+
+
+class _ReadConnection:
+    """
+    The read connection of a single thread. Once its thread ends, the holder is collected and the connection is closed.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+        weakref.finalize(self, connection.close)
+
+
+class ConnectionPool:
+    """
+    The connections of a process to a SQLite database. All the methods are thread safe.
+    """
+    # The number of prepared statements cached on every connection
+    STATEMENT_CACHE_SIZE = 64
+    DEFAULT_JOURNAL_MODE = "WAL"
+    DEFAULT_SYNCHRONOUS = "NORMAL"
+    DEFAULT_MMAP_SIZE = 64 * 1024 * 1024
+    JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL")
+    SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+    def __init__(self, db_file_path: str, busy_timeout: float, journal_mode: str = DEFAULT_JOURNAL_MODE,
+                 synchronous: str = DEFAULT_SYNCHRONOUS, mmap_size: int = DEFAULT_MMAP_SIZE,
+                 group_commit: bool = True) -> None:
+        """
+        Initializes the pool and opens its writer connection.
+
+        :param db_file_path (str): The path of the database file.
+        :param busy_timeout (float): The time (in seconds) a query waits for a write of another process to finish,
+                                     before failing with "database is locked".
+        :param journal_mode (str): The journal mode of the database (one of JOURNAL_MODES).
+        :param synchronous (str): The synchronous mode of the connections (one of SYNCHRONOUS_MODES) - how often
+                                  SQLite waits for the writes to reach the disk.
+        :param mmap_size (int): The number of bytes of the database every connection reads through a memory map,
+                                instead of read system calls. 0 disables the memory map.
+        :param group_commit (bool): If True, concurrent single statement writes are committed together (see `write`),
+                                    otherwise every write is committed on its own.
+        """
+        if journal_mode.upper() not in self.JOURNAL_MODES:
+            raise ValueError(f"Invalid journal mode: {journal_mode}")
+        if synchronous.upper() not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid synchronous mode: {synchronous}")
+        self.db_file_path = db_file_path
+        self.busy_timeout = busy_timeout
+        self.journal_mode = journal_mode.upper()
+        self.synchronous = synchronous.upper()
+        self.mmap_size = int(mmap_size)
+        self.group_commit = group_commit
+        self._local = threading.local()
+        self._read_connections = weakref.WeakSet()
+        self._read_connections_lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._writer = self._connect()
+        # The journal mode is a property of the database file, so it is set once (by the writer)
+        self._writer.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        self._pending_writes = []
+        self._pending_writes_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.opened_read_connections = 0
+        self.writes = 0
+        self.commits = 0
+        self.max_group_commit_size = 0
+        self.write_waits = 0
+        self.total_write_wait_time = 0.0
+        self.max_write_wait_time = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Returns:
+            sqlite3.Connection: A new connection to the database.
+        """
+        connection = sqlite3.connect(self.db_file_path, timeout=self.busy_timeout, check_same_thread=False,
+                                     cached_statements=self.STATEMENT_CACHE_SIZE)
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        return connection
+
+    def _acquire_writer(self) -> tuple:
+        """
+        Waits until the writer connection is free, and holds it.
+
+        Returns:
+            tuple: Whether the writer connection was held by another write, and the time it took to acquire it.
+        """
+        start_time = time.perf_counter()
+        waited = not self._writer_lock.acquire(blocking=False)
+        if waited:
+            self._writer_lock.acquire()
+        return waited, time.perf_counter() - start_time
+
+    def _count_writes(self, writes: int, committed_writes: int, waited: bool, wait_time: float) -> None:
+        """
+        Counts writes that held the writer connection.
+
+        :param writes (int): The number of writes.
+        :param committed_writes (int): The number of writes that were committed in a single transaction,
+                                       or 0 if no transaction was committed.
+        :param waited (bool): Whether the writes waited for the writer connection.
+        :param wait_time (float): The time it took to acquire the writer connection, in seconds.
+        """
+        with self._metrics_lock:
+            self.writes += writes
+            if committed_writes:
+                self.commits += 1
+                self.max_group_commit_size = max(self.max_group_commit_size, committed_writes)
+            if waited:
+                self.write_waits += 1
+                self.total_write_wait_time += wait_time
+                self.max_write_wait_time = max(self.max_write_wait_time, wait_time)
+
+    def reader(self) -> sqlite3.Connection:
+        """
+        Returns:
+            sqlite3.Connection: The read connection of the calling thread (opened on its first call). It must not be
+                                used for writes, nor shared with other threads.
+        """
+        read_connection = getattr(self._local, "read_connection", None)
+        if read_connection is None:
+            read_connection = _ReadConnection(self._connect())
+            self._local.read_connection = read_connection
+            with self._read_connections_lock:
+                self._read_connections.add(read_connection)
+            with self._metrics_lock:
+                self.opened_read_connections += 1
+        return read_connection.connection
+
+    @contextlib.contextmanager
+    def writer(self):
+        """
+        Holds the writer connection while the context is active - the writes of the context are committed once
+        it ends, or rolled back if it raised.
+
+        Yields:
+            sqlite3.Connection: The writer connection.
+        """
+        waited, wait_time = self._acquire_writer()
+        try:
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.rollback()
+                self._count_writes(1, 0, waited, wait_time)
+                raise
+            self._writer.commit()
+            self._count_writes(1, 1, waited, wait_time)
+        finally:
+            self._writer_lock.release()
+
+    def write(self, query: str, parameters: tuple = ()) -> None:
+        """
+        Executes a single statement write, and waits until it is committed.
+        With group commit, the write is queued, and the first queued write that gets the writer connection
+        executes all the queued writes in a single transaction - so the writes that arrive while a transaction
+        commits share the next commit. A write that fails does not fail the other writes of its transaction.
+
+        :param query (str): The statement to execute.
+        :param parameters (tuple): The parameters of the statement.
+
+        Raises:
+            sqlite3.Error: If the write failed (e.g. sqlite3.IntegrityError, if it violates a constraint).
+        """
+        if not self.group_commit:
+            with self.writer() as connection:
+                connection.execute(query, parameters)
+            return
+
+        pending_write = _PendingWrite(query, parameters)
+        with self._pending_writes_lock:
+            self._pending_writes.append(pending_write)
+        waited, wait_time = self._acquire_writer()
+        try:
+            # The write may have been committed by the transaction of a write that got the writer connection first
+            if not pending_write.is_done:
+                with self._pending_writes_lock:
+                    pending_writes, self._pending_writes = self._pending_writes, []
+                self._commit_writes(pending_writes)
+                self._count_writes(len(pending_writes), len(pending_writes), waited, wait_time)
+            else:
+                self._count_writes(0, 0, waited, wait_time)
+        finally:
+            self._writer_lock.release()
+        if pending_write.error is not None:
+            raise pending_write.error
+
+    def _commit_writes(self, pending_writes: list) -> None:
+        """
+        Executes the given writes in a single transaction, while the writer connection is held.
+        Every write runs in a savepoint of its own, so a write that fails is rolled back alone.
+
+        :param pending_writes (list): The writes to commit. Every write is marked as done, with its error if it failed.
+        """
+        try:
+            self._writer.execute("BEGIN IMMEDIATE")
+            for pending_write in pending_writes:
+                self._writer.execute("SAVEPOINT pending_write")
+                try:
+                    self._writer.execute(pending_write.query, pending_write.parameters)
+                except sqlite3.Error as error:
+                    self._writer.execute("ROLLBACK TO pending_write")
+                    pending_write.error = error
+                self._writer.execute("RELEASE pending_write")
+            self._writer.commit()
+        except BaseException as error:
+            # The transaction failed as a whole (e.g. the database is locked by another process)
+            self._writer.rollback()
+            for pending_write in pending_writes:
+                pending_write.error = pending_write.error or error
+            if not isinstance(error, sqlite3.Error):
+                raise
+        finally:
+            for pending_write in pending_writes:
+                pending_write.is_done = True
+
+    def close(self) -> None:
+        """
+        Closes the writer connection and the read connections of all the threads.
+        """
+        with self._writer_lock:
+            self._writer.close()
+        with self._read_connections_lock:
+            for read_connection in list(self._read_connections):
+                read_connection.connection.close()
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The number of read connections that are open and that were opened, the number of writes and of the
+                  transactions they were committed in, the largest group commit, and the number of writes that
+                  waited for the writer connection and their total and maximal wait time (in seconds).
+        """
+        with self._read_connections_lock:
+            open_read_connections = len(self._read_connections)
+        with self._metrics_lock:
+            return {"journal_mode": self.journal_mode, "synchronous": self.synchronous,
+                    "open_read_connections": open_read_connections,
+                    "opened_read_connections": self.opened_read_connections, "writes": self.writes,
+                    "commits": self.commits, "max_group_commit_size": self.max_group_commit_size,
+                    "write_waits": self.write_waits, "total_write_wait_time": self.total_write_wait_time,
+                    "max_write_wait_time": self.max_write_wait_time}
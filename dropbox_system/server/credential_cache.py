@@ -0,0 +1,138 @@
+"""
+This module implements the credential cache of the users DB - logins of users that were verified recently (and of
+usernames that were recently found not to exist) are answered from memory, so login storms (e.g. after a restart of
+the server) do not query the users DB for every login.
+
+The cache keeps a keyed digest of the stored password of every user, never the password itself. Entries expire after
+a TTL and the least recently used entries are evicted once the cache is full. The entries of a user are invalidated
+when it is created or removed by the process - a user that is created or removed by another server process is seen
+by this process once its entry expires (unknown usernames are cached for a shorter TTL, so a user that registered on
+another process can log in soon).
+"""
+
+import collections
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+
+class CredentialCache:
+    """
+    The cached credentials of the users of a process. All the methods are thread safe.
+    """
+    DEFAULT_TTL = 60
+    DEFAULT_NEGATIVE_TTL = 5
+    DEFAULT_MAX_ENTRIES = 100000
+    KEY_SIZE = 32
+    # The result of a lookup of a username that is not cached
+    MISS = object()
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL) -> None:
+        """
+        Initializes an empty cache.
+
+        :param ttl (float): The time (in seconds) the credentials of a user are cached for.
+                            None (or 0) disables the cache - every login queries the users DB.
+        :param max_entries (int): The maximal number of cached usernames.
+        :param negative_ttl (float): The time (in seconds) a username that does not exist is cached for.
+                                     None (or 0) disables the caching of unknown usernames.
+        """
+        self.ttl = ttl or None
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl or None
+        self._key = os.urandom(self.KEY_SIZE)
+        # username -> (password digest or None if the user does not exist, expiry time), least recently used first
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl is not None and bool(self.max_entries)
+
+    def digest(self, password: str) -> bytes:
+        """
+        Returns:
+            bytes: The keyed digest of the given password, which is what the cache keeps and compares.
+        """
+        return hmac.new(self._key, password.encode(), hashlib.sha256).digest()
+
+    def lookup(self, username: str):
+        """
+        Looks a user up in the cache.
+
+        :param username (str): The user to look up.
+
+        Returns:
+            The password digest of the user (bytes), None if the user is cached as not existing, or MISS if the user
+            is not cached (or its entry expired).
+        """
+        if not self.enabled:
+            return self.MISS
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return self.MISS
+            self._entries.move_to_end(username)
+            password_digest = entry[0]
+            if password_digest is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return password_digest
+
+    def store(self, username: str, password: str) -> None:
+        """
+        Caches the credentials of a user, as they are stored in the users DB.
+
+        :param username (str): The user to cache.
+        :param password (str): The stored password of the user, or None if the user does not exist.
+        """
+        ttl = self.ttl if password is not None else self.negative_ttl
+        if not self.enabled or ttl is None:
+            return
+        password_digest = self.digest(password) if password is not None else None
+        with self._lock:
+            self._entries[username] = (password_digest, time.monotonic() + ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, username: str) -> None:
+        """
+        Removes a user from the cache, once it is created or removed.
+
+        :param username (str): The user to remove.
+        """
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        """
+        Removes all the users from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The TTL and size of the cache, the number of lookups that hit a user, that hit an unknown username
+                  and that missed, the rate of the lookups that hit, and the number of evicted entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            hit_rate = (self.hits + self.negative_hits) / lookups if lookups else 0.0
+            return {"ttl": self.ttl, "max_entries": self.max_entries, "entries": len(self._entries),
+                    "hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses,
+                    "hit_rate": hit_rate, "evictions": self.evictions}
@@ -1,5 +1,13 @@
 import sqlite3
+import heapq
+import hmac
+import itertools
 import os
+import threading
+import zlib
+
+from dropbox_system.server.connection_pool import ConnectionPool
+from dropbox_system.server.credential_cache import CredentialCache
 
 class UserAlreadyExistsException(Exception):
     def __init__(self, username: str) -> None:
@@ -17,50 +25,153 @@ class UserNotExistsException(Exception):
 class DataBaseCommunicator:
     """
     This class is responsible for creating a dropbox database and communicate it to add / modify data.
+    All the methods are thread safe, so a single instance (see `get_shared`) serves all the sessions of a process.
+
+    The users may be sharded across several database files, each with a connection pool (and a writer) of its own -
+    every username is routed to a shard by a stable hash, so the queries of a user touch a single shard, and the
+    writes of users of different shards run in parallel.
     """
     DB_FILE_NAME = "clients.db"
+    # The name of the files of the shards of the users DB, when it has more than a single shard. The number of shards
+    # is part of the name, so users are never looked up in a shard of another number of shards
+    SHARD_FILE_NAME = "clients_{shard_index}_of_{shards}.db"
+    # The time (in seconds) a query waits for a write of another connection (possibly of another server process)
+    # to finish, before failing with "database is locked"
+    BUSY_TIMEOUT = 30
     CREATE_TABLE_QUERY = '''
                          CREATE TABLE IF NOT EXISTS USERS
                          ( username TEXT PRIMARY KEY,
                          password TEXT NOT NULL  )
                          '''
+    # The queries are constant, so their prepared statements are cached and reused by the pooled connections
+    USERNAME_EXISTS_QUERY = "SELECT 1 FROM USERS WHERE username = ?"
+    PASSWORD_CORRECT_QUERY = "SELECT 1 FROM USERS WHERE username = ? AND password = ?"
+    PASSWORD_QUERY = "SELECT password FROM USERS WHERE username = ?"
+    INSERT_USER_QUERY = "INSERT INTO USERS (username, password) VALUES (?, ?)"
+    DELETE_USER_QUERY = "DELETE FROM USERS WHERE username = ?"
+    DELETE_ALL_USERS_QUERY = "DELETE FROM USERS;"
+    # Users that already exist are skipped by bulk imports
+    INSERT_USERS_QUERY = "INSERT OR IGNORE INTO USERS (username, password) VALUES (?, ?)"
+    ALL_USERS_QUERY = "SELECT username, password FROM USERS ORDER BY username"
+    # The number of users inserted in a single transaction by bulk imports, and read at once by exports
+    DEFAULT_BATCH_SIZE = 50000
 
-    def __init__(self) -> None:
+    _shared = None
+    _shared_pid = None
+    _shared_lock = threading.Lock()
+    # The number of shards and the options of the connection pools of the users DB files (see `configure`)
+    _shards = 1
+    _pool_options = {}
+
+    def __init__(self, connection_pools=None, credential_cache: CredentialCache = None) -> None:
         """
-        Initializes the database communicator and creates the database file if it does not exist.
+        Initializes the database communicator and creates the database files if they do not exist.
+
+        :param connection_pools (ConnectionPool or list): The connections to the database, or a list of the
+                                                          connections to every shard of the database. Default is a new
+                                                          pool of every shard of the users DB of the server.
+        :param credential_cache (CredentialCache): The cache logins are verified against before querying the
+                                                   database. Default is CredentialCache with its default TTL and size.
         """
-        self._create_db_file_if_not_exists()
+        if connection_pools is None:
+            connection_pools = self.create_connection_pools(self._shards)
+        elif isinstance(connection_pools, ConnectionPool):
+            connection_pools = [connection_pools]
+        self.connection_pools = list(connection_pools)
+        self.credential_cache = credential_cache if credential_cache is not None else CredentialCache()
+        for connection_pool in self.connection_pools:
+            with connection_pool.writer() as connection:
+                connection.execute(self.CREATE_TABLE_QUERY)
 
-    def __del__(self) -> None:
+    @classmethod
+    def configure(cls, shards: int = 1, **pool_options) -> None:
         """
-        Closes the database connection when the object is destroyed.
+        Sets the number of shards and the options of the connection pools of the users DB files that are created
+        afterwards (such as the pools of the shared communicator of every server process).
+
+        :param shards (int): The number of files the users are sharded across.
+        :param pool_options: Keyword arguments of ConnectionPool (journal_mode, synchronous, mmap_size, group_commit).
         """
-        self.conn.close()
+        cls._shards = shards
+        cls._pool_options = pool_options
 
-    def _create_db_file_if_not_exists(self) -> None:
+    @classmethod
+    def get_shard_file_name(cls, shards: int, shard_index: int) -> str:
+        """
+        Returns:
+            str: The name of the database file of a shard of the users DB. A users DB of a single shard is a single
+                 file of the unsharded name.
         """
-        Creates the database file and the USERS table if it does not already exist.
+        return cls.DB_FILE_NAME if shards == 1 else cls.SHARD_FILE_NAME.format(shard_index=shard_index, shards=shards)
+
+    @classmethod
+    def create_connection_pools(cls, shards: int, db_directory_path: str = None) -> list:
         """
-        directory_name = os.path.dirname(os.path.abspath(__file__))
-        self.db_file_path = os.path.join(directory_name, self.DB_FILE_NAME)
-        self.conn = sqlite3.connect(self.db_file_path, check_same_thread=False) 
-        self.cursor = self.conn.cursor()
+        Opens the connection pools of the shards of a users DB, with the configured options.
+
+        :param shards (int): The number of shards.
+        :param db_directory_path (str): The directory of the database files. Default is the directory of the server.
 
-        self.cursor.execute(self.CREATE_TABLE_QUERY)
+        Returns:
+            list: The connection pool of every shard.
+        """
+        if db_directory_path is None:
+            db_directory_path = os.path.dirname(os.path.abspath(__file__))
+        return [ConnectionPool(os.path.join(db_directory_path, cls.get_shard_file_name(shards, shard_index)),
+                               cls.BUSY_TIMEOUT, **cls._pool_options) for shard_index in range(shards)]
+
+    @classmethod
+    def get_shared(cls) -> "DataBaseCommunicator":
+        """
+        Returns:
+            DataBaseCommunicator: The database communicator of the users DB shared by the whole process (created on
+                                  the first call). A forked process gets its own, since SQLite connections must not
+                                  be used across a fork.
+        """
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared_pid != os.getpid():
+                cls._shared = cls()
+                cls._shared_pid = os.getpid()
+            return cls._shared
+
+    def close(self) -> None:
+        """
+        Closes all the connections to the database.
+        """
+        for connection_pool in self.connection_pools:
+            connection_pool.close()
 
     def remove_database_file(self) -> None:
         """
-        Removes the database file if it exists.
+        Removes the database files (of all the shards) if they exist.
         """
-        if os.path.exists(self.db_file_path):
-            os.remove(self.db_file_path)
+        for connection_pool in self.connection_pools:
+            if os.path.exists(connection_pool.db_file_path):
+                os.remove(connection_pool.db_file_path)
 
     def remove_data_from_users_table(self) -> None:
         """
         Deletes all entries from the USERS table.
         """
-        self.cursor.execute("DELETE FROM USERS;")
-        self.conn.commit()
+        for connection_pool in self.connection_pools:
+            with connection_pool.writer() as connection:
+                connection.execute(self.DELETE_ALL_USERS_QUERY)
+        self.credential_cache.clear()
+
+    def get_shard_index(self, username: str) -> int:
+        """
+        Returns:
+            int: The shard the given user is stored in. The hash is stable, so every process (and every run of the
+                 server) routes a username to the same shard.
+        """
+        return zlib.crc32(username.encode()) % len(self.connection_pools)
+
+    def get_connection_pool(self, username: str) -> ConnectionPool:
+        """
+        Returns:
+            ConnectionPool: The connections to the shard the given user is stored in.
+        """
+        return self.connection_pools[self.get_shard_index(username)]
     
     def is_username_exists(self, username: str) -> bool:
         """
@@ -71,8 +182,8 @@ class DataBaseCommunicator:
         Returns:
             bool: True if the username exists, otherwise False.
         """
-        self.cursor.execute("SELECT 1 FROM USERS WHERE username = ?", (username,))
-        result = self.cursor.fetchone()
+        result = self.get_connection_pool(username).reader().execute(self.USERNAME_EXISTS_QUERY,
+                                                                     (username,)).fetchone()
         return result is not None
         
     def create_new_user(self, username: str, password: str) -> None:
@@ -82,11 +193,81 @@ class DataBaseCommunicator:
         :param username (str): The username of the new user.
         :param password (str): The password of the new user.
         """
-        if self.is_username_exists(username):
+        try:
+            # The insert is group committed with concurrent registrations. An existing user is rejected by the
+            # primary key of the table, so no existence check is needed (and two connections, possibly of different
+            # server processes, cannot both create the same user)
+            self.get_connection_pool(username).write(self.INSERT_USER_QUERY, (username, password))
+        except sqlite3.IntegrityError:
             raise UserAlreadyExistsException(username)
-        self.cursor.execute('INSERT INTO USERS (username, password) VALUES (?, ?)', (username, password))
-        self.conn.commit()
+        finally:
+            # The username may be cached as not existing
+            self.credential_cache.invalidate(username)
     
+    def create_new_users(self, users, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Creates many users in the USERS table, batch_size users in a transaction (of every shard).
+        Users that already exist are skipped.
+
+        :param users (iterable): The (username, password) pairs of the new users. It is consumed lazily, so it may be
+                                 a generator of a large file.
+        :param batch_size (int): The number of users inserted in a single transaction.
+
+        Returns:
+            int: The number of users that were created.
+        """
+        users = iter(users)
+        created_users = 0
+        while True:
+            batch = list(itertools.islice(users, batch_size))
+            if not batch:
+                break
+            shard_batches = [[] for _ in self.connection_pools]
+            for user in batch:
+                shard_batches[self.get_shard_index(user[0])].append(user)
+            for connection_pool, shard_batch in zip(self.connection_pools, shard_batches):
+                if not shard_batch:
+                    continue
+                with connection_pool.writer() as connection:
+                    total_changes = connection.total_changes
+                    connection.executemany(self.INSERT_USERS_QUERY, shard_batch)
+                    created_users += connection.total_changes - total_changes
+            # Some of the usernames may be cached as not existing
+            for username, _ in batch:
+                self.credential_cache.invalidate(username)
+        return created_users
+
+    def iterate_users(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Reads all the users of the USERS table, ordered by username, batch_size users at a time (of every shard), so
+        the table is never read into memory as a whole.
+
+        :param batch_size (int): The number of users read at once.
+
+        Yields:
+            tuple: The username and the password of every user.
+        """
+        # Every shard is ordered by username, so merging the shards keeps the order
+        yield from heapq.merge(*[self._iterate_shard_users(connection_pool, batch_size)
+                                 for connection_pool in self.connection_pools])
+
+    def _iterate_shard_users(self, connection_pool: ConnectionPool, batch_size: int):
+        """
+        Reads all the users of a single shard, ordered by username, batch_size users at a time.
+
+        Yields:
+            tuple: The username and the password of every user of the shard.
+        """
+        cursor = connection_pool.reader().execute(self.ALL_USERS_QUERY)
+        try:
+            while True:
+                users = cursor.fetchmany(batch_size)
+                if not users:
+                    break
+                yield from users
+        finally:
+            cursor.close()
+
     def remove_username(self, username: str) -> None:
         """
         Removes a user from the USERS table.
@@ -95,8 +276,9 @@ class DataBaseCommunicator:
         """
         if not self.is_username_exists(username):
             raise UserNotExistsException(username)
-        self.cursor.execute('DELETE FROM USERS WHERE username = ?', (username,))
-        self.conn.commit()
+        with self.get_connection_pool(username).writer() as connection:
+            connection.execute(self.DELETE_USER_QUERY, (username,))
+        self.credential_cache.invalidate(username)
 
     def is_password_correct(self, username: str, password: str) -> bool:
         """
@@ -108,6 +290,33 @@ class DataBaseCommunicator:
         Returns:
             bool: True if the password is correct, otherwise False.
         """
-        self.cursor.execute('SELECT 1 FROM USERS WHERE username = ? AND password = ?', (username, password))
-        result = self.cursor.fetchone()
+        result = self.get_connection_pool(username).reader().execute(self.PASSWORD_CORRECT_QUERY,
+                                                                     (username, password)).fetchone()
         return result is not None
+
+    def verify_credentials(self, username: str, password: str) -> bool:
+        """
+        Verifies the credentials of a login - against the credential cache, or with a single query of the database
+        if the user is not cached (whose result is cached).
+
+        :param username (str): The username of the user.
+        :param password (str): The password to verify.
+
+        Returns:
+            bool: True if the password is correct, otherwise False.
+
+        Raises:
+            UserNotExistsException: If the username does not exist.
+        """
+        password_digest = self.credential_cache.lookup(username)
+        if password_digest is CredentialCache.MISS:
+            result = self.get_connection_pool(username).reader().execute(self.PASSWORD_QUERY, (username,)).fetchone()
+            stored_password = result[0] if result is not None else None
+            self.credential_cache.store(username, stored_password)
+            if stored_password is None:
+                raise UserNotExistsException(username)
+            return hmac.compare_digest(stored_password.encode(), password.encode())
+
+        if password_digest is None:
+            raise UserNotExistsException(username)
+        return hmac.compare_digest(password_digest, self.credential_cache.digest(password))
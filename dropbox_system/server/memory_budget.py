@@ -0,0 +1,85 @@
+"""
+This module implements the memory budget of the server - a server-wide bound on the bytes the buffers of in-flight
+transfers may hold. Every transfer reserves the size of its buffer before allocating it, and releases it once the
+transfer ends. A transfer that does not fit waits until other transfers release enough bytes, and is rejected if
+they do not within a timeout, so a burst of concurrent transfers can not exhaust the server's memory.
+"""
+
+import threading
+
+
+class MemoryBudget:
+    """
+    A budget of bytes that transfers reserve their buffers against. All the methods are thread safe.
+    """
+    DEFAULT_CAPACITY = 256 * 1024 * 1024
+    # The time a reservation waits for enough bytes to be released, in seconds
+    DEFAULT_WAIT_TIMEOUT = 10
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, wait_timeout: float = DEFAULT_WAIT_TIMEOUT) -> None:
+        """
+        Initializes an empty budget.
+
+        :param capacity (int): The number of bytes that can be reserved at the same time.
+        :param wait_timeout (float): The time a reservation waits for enough bytes to be released, in seconds.
+        """
+        if capacity < 1:
+            raise ValueError("A memory budget requires a capacity of at least one byte")
+        self.capacity = capacity
+        self.wait_timeout = wait_timeout
+        self._condition = threading.Condition()
+        self.reserved = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sets all metrics to zero, and the peak reserved bytes to the currently reserved bytes.
+        """
+        with self._condition:
+            self.peak_reserved = self.reserved
+            self.reservations = 0
+            self.waits = 0
+            self.rejected = 0
+
+    def reserve(self, size: int) -> bool:
+        """
+        Reserves bytes of the budget, waiting up to wait_timeout seconds for other reservations to release enough
+        bytes. Every successful reservation must be released by `release`.
+
+        :param size (int): The number of bytes to reserve.
+
+        Returns:
+            bool: True if the bytes were reserved, False if the reservation was rejected (since enough bytes were not
+                  released in time, or size exceeds the capacity).
+        """
+        with self._condition:
+            if size > self.capacity:
+                self.rejected += 1
+                return False
+            if self.reserved + size > self.capacity:
+                self.waits += 1
+                if not self._condition.wait_for(lambda: self.reserved + size <= self.capacity, self.wait_timeout):
+                    self.rejected += 1
+                    return False
+            self.reserved += size
+            self.reservations += 1
+            self.peak_reserved = max(self.peak_reserved, self.reserved)
+        return True
+
+    def release(self, size: int) -> None:
+        """
+        Releases reserved bytes, and wakes up the reservations that wait for them.
+
+        :param size (int): The number of bytes to release.
+        """
+        with self._condition:
+            self.reserved -= size
+            self._condition.notify_all()
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The capacity, the currently and peak reserved bytes and the reservation counters, mapped by their names.
+        """
+        with self._condition:
+            return {name: value for name, value in vars(self).items() if not name.startswith("_")}
@@ -0,0 +1,164 @@
+"""
+This module implements the path locks of the server, so concurrent sessions (possibly of the same user) do not race
+on the same files - e.g. a directory is not removed while a file is uploaded into it, and a file is not removed
+while it is downloaded.
+
+Locks are hierarchical read/write locks - an operation on a path takes a shared lock on every directory above it
+(up to the user directory), and a shared (read) or exclusive (write) lock on the path itself. So operations on
+different paths run in parallel, and only operations on the same path, or on a path and a directory above it,
+wait for each other.
+
+Paths are mapped to a fixed number of striped locks (by their hash), so the memory of the locks does not grow with
+the number of files. Paths that share a stripe may wait for each other needlessly, which is rare with enough stripes.
+The stripes of an operation are always acquired in the same (ascending) order, so operations never deadlock.
+
+The locks are per server process - the sessions of other processes of a multi-process server are still handled by
+the exclusive creation of uploaded files, and by handling files that were removed meanwhile.
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+
+class ReadWriteLock:
+    """
+    A read/write lock - many readers or a single writer may hold it. Waiting writers have priority over new readers,
+    so writers do not starve.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes a free lock.
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire(self, exclusive: bool) -> bool:
+        """
+        Waits until the lock is acquired.
+
+        :param exclusive (bool): If True, acquires the lock for writing, otherwise for reading.
+
+        Returns:
+            bool: True if the lock was held by a conflicting holder, so the caller had to wait.
+        """
+        with self._condition:
+            if exclusive:
+                is_free = lambda: not self._writer and not self._readers
+                if is_free():
+                    self._writer = True
+                    return False
+                self._waiting_writers += 1
+                self._condition.wait_for(is_free)
+                self._waiting_writers -= 1
+                self._writer = True
+                return True
+
+            is_free = lambda: not self._writer and not self._waiting_writers
+            waited = not is_free()
+            self._condition.wait_for(is_free)
+            self._readers += 1
+            return waited
+
+    def release(self, exclusive: bool) -> None:
+        """
+        Releases the lock.
+
+        :param exclusive (bool): Whether the lock was acquired for writing.
+        """
+        with self._condition:
+            if exclusive:
+                self._writer = False
+            else:
+                self._readers -= 1
+            self._condition.notify_all()
+
+
+class PathLocks:
+    """
+    The striped, hierarchical read/write locks of the paths of the users files. All the methods are thread safe.
+    """
+    DEFAULT_STRIPES = 1024
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES) -> None:
+        """
+        Initializes the locks, all free.
+
+        :param stripes (int): The number of locks paths are mapped to.
+        """
+        self.stripes = stripes
+        self._locks = [ReadWriteLock() for _ in range(stripes)]
+        self._metrics_lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended_acquisitions = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _get_stripes(self, path: str, exclusive: bool, root: str) -> list:
+        """
+        Returns:
+            list: The (stripe index, exclusive) pairs of the locks of an operation on the path, in the order they are
+                  acquired. A stripe that is needed both shared and exclusively is acquired exclusively.
+        """
+        path = os.path.normpath(path)
+        root = os.path.normpath(root)
+        stripes = {hash(path) % self.stripes: exclusive}
+        # The directories above the path are locked shared, up to the root
+        while path != root and os.path.dirname(path) != path:
+            path = os.path.dirname(path)
+            stripe = hash(path) % self.stripes
+            stripes[stripe] = stripes.get(stripe, False)
+        return sorted(stripes.items())
+
+    @contextlib.contextmanager
+    def locked(self, path: str, exclusive: bool, root: str):
+        """
+        Holds the locks of an operation on a path while the context is active.
+
+        :param path (str): The path of the operation.
+        :param exclusive (bool): If True, the path is locked for writing (creating, writing or removing it),
+                                 otherwise for reading. The directories above it are always locked for reading.
+        :param root (str): The directory the hierarchy ends at (the user directory), which is locked for reading too.
+        """
+        stripes = self._get_stripes(path, exclusive, root)
+        start_time = time.perf_counter()
+        acquired = []
+        try:
+            waited = False
+            for stripe, is_exclusive in stripes:
+                waited |= self._locks[stripe].acquire(is_exclusive)
+                acquired.append((stripe, is_exclusive))
+            self._count_acquisition(waited, time.perf_counter() - start_time)
+            yield
+        finally:
+            for stripe, is_exclusive in reversed(acquired):
+                self._locks[stripe].release(is_exclusive)
+
+    def _count_acquisition(self, waited: bool, wait_time: float) -> None:
+        """
+        Counts the locks of an operation that were acquired.
+
+        :param waited (bool): Whether the operation waited for a conflicting operation.
+        :param wait_time (float): The time it took to acquire the locks, in seconds.
+        """
+        with self._metrics_lock:
+            self.acquisitions += 1
+            if waited:
+                self.contended_acquisitions += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The number of operations that locked paths, the number of them that waited for conflicting
+                  operations, and their total and maximal wait time (in seconds).
+        """
+        with self._metrics_lock:
+            return {"stripes": self.stripes, "acquisitions": self.acquisitions,
+                    "contended_acquisitions": self.contended_acquisitions,
+                    "total_wait_time": self.total_wait_time, "max_wait_time": self.max_wait_time}
@@ -0,0 +1,155 @@
+"""
+This module implements the request lanes of the server - requests are classified into latency-sensitive metadata
+requests (login, register, list, create directory, remove...) and bulk requests (uploads and downloads), and every
+class is handled on its own lane:
+- The bulk lane has a bounded capacity - at most bulk_capacity transfers are handled concurrently, and the other
+  transfers wait for them. The metadata lane never waits for the bulk lane.
+- Metadata requests have priority - while metadata requests are handled, every chunk of a transfer waits (for
+  MAX_BULK_YIELD_TIME at most), so the metadata requests get the CPU and the disk.
+
+Every lane measures the latency of its requests, so the p99 latency of metadata requests can be watched while
+the server is flooded with transfers.
+"""
+
+import collections
+import statistics
+import threading
+import time
+
+from dropbox_system.common.request_handler import RequestHandler
+
+
+class Lane:
+    """
+    The lane of a single class of requests. All the methods are thread safe.
+    """
+    # The number of latest request latencies the latency percentiles are computed from
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self, name: str, capacity: int = None) -> None:
+        """
+        Initializes an empty lane.
+
+        :param name (str): The name of the class of the requests of the lane.
+        :param capacity (int): The number of requests that are handled concurrently, or None for no limit.
+        """
+        self.name = name
+        self.capacity = capacity
+        self._semaphore = threading.Semaphore(capacity) if capacity else None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.handled = 0
+        self.waits = 0
+        self.total_wait_time = 0.0
+        self._latencies = collections.deque(maxlen=self.LATENCY_SAMPLES)
+
+    def enter(self) -> float:
+        """
+        Waits until the lane has room for another request, and counts it as an active request.
+
+        Returns:
+            float: The time the request entered the lane, to pass to `exit`.
+        """
+        start_time = time.perf_counter()
+        if self._semaphore is not None and not self._semaphore.acquire(blocking=False):
+            self._semaphore.acquire()
+            with self._lock:
+                self.waits += 1
+                self.total_wait_time += time.perf_counter() - start_time
+        with self._lock:
+            self.active += 1
+        return start_time
+
+    def exit(self, start_time: float) -> None:
+        """
+        Counts a request that was handled, and gives its room to the next request.
+
+        :param start_time (float): The time the request entered the lane (returned by `enter`).
+        """
+        with self._lock:
+            self.active -= 1
+            self.handled += 1
+            self._latencies.append(time.perf_counter() - start_time)
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The active, handled and waiting requests of the lane, and the p50 and p99 latency (in seconds)
+                  of its latest requests.
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            metrics = {"active": self.active, "handled": self.handled, "waits": self.waits,
+                       "total_wait_time": self.total_wait_time}
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        metrics["p50_latency"] = percentiles[49]
+        metrics["p99_latency"] = percentiles[98]
+        return metrics
+
+
+class RequestLanes:
+    """
+    Classifies requests into metadata and bulk requests, and handles every request on the lane of its class.
+    """
+    METADATA = "metadata"
+    BULK = "bulk"
+    BULK_REQUEST_CODES = frozenset([RequestHandler.UPLOAD_FILE_REQUEST_CODE, RequestHandler.DOWNLOAD_FILE_REQUEST_CODE])
+    DEFAULT_BULK_CAPACITY = 8
+    # The maximal time a chunk of a transfer waits for the metadata requests that are handled, and the interval
+    # the metadata lane is checked at meanwhile, in seconds
+    MAX_BULK_YIELD_TIME = 0.005
+    BULK_YIELD_INTERVAL = 0.0005
+
+    def __init__(self, bulk_capacity: int = DEFAULT_BULK_CAPACITY, prioritize_metadata: bool = True) -> None:
+        """
+        Initializes the lanes.
+
+        :param bulk_capacity (int): The number of transfers that are handled concurrently, or None for no limit.
+        :param prioritize_metadata (bool): If True, the chunks of transfers wait while metadata requests are handled.
+        """
+        self.bulk_capacity = bulk_capacity
+        self.prioritize_metadata = prioritize_metadata
+        self.lanes = {self.METADATA: Lane(self.METADATA), self.BULK: Lane(self.BULK, bulk_capacity)}
+
+    def classify(self, request_code: int) -> str:
+        """
+        Returns:
+            str: The class of the request of the given code (METADATA or BULK).
+        """
+        return self.BULK if request_code in self.BULK_REQUEST_CODES else self.METADATA
+
+    def handle(self, request_code: int, handle_request, request: bytes) -> None:
+        """
+        Handles a request on the lane of its class.
+
+        :param request_code (int): The code of the request.
+        :param handle_request (callable): The handler of the request (from `ServerHandler.request_handlers`).
+        :param request (bytes): The request data.
+        """
+        lane = self.lanes[self.classify(request_code)]
+        start_time = lane.enter()
+        try:
+            handle_request(request)
+        finally:
+            lane.exit(start_time)
+
+    def yield_to_metadata(self) -> None:
+        """
+        Waits while metadata requests are handled, for MAX_BULK_YIELD_TIME at most (called before every chunk of
+        a transfer).
+        """
+        if not self.prioritize_metadata:
+            return
+        metadata_lane = self.lanes[self.METADATA]
+        end_time = time.perf_counter() + self.MAX_BULK_YIELD_TIME
+        while metadata_lane.active and time.perf_counter() < end_time:
+            time.sleep(self.BULK_YIELD_INTERVAL)
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The metrics of every lane, mapped by the class of its requests.
+        """
+        return {name: lane.as_dict() for name, lane in self.lanes.items()}
@@ -0,0 +1,92 @@
+"""
+A utility that migrates the users DB of the server to another number of shards (see the --db-shards of the server),
+e.g. from the single clients.db file to 8 shard files.
+
+The users are copied from the source shards to the target shards (every user to the shard of its username), in
+large transactions, and the number of users of the target is verified against the source. The source files are
+kept unless --remove-source is given. The server must be stopped while the users DB is resharded, and started with
+the new --db-shards afterwards.
+
+Usage:
+    python3 -m dropbox_system.server.reshard_users --to-shards N [--from-shards N] [--remove-source]
+"""
+
+import argparse
+import os
+import time
+
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+
+
+class ReshardException(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+        super().__init__(self.message)
+
+
+def reshard_users(from_shards: int, to_shards: int, db_directory_path: str = None, remove_source: bool = False,
+                  batch_size: int = DataBaseCommunicator.DEFAULT_BATCH_SIZE) -> int:
+    """
+    Copies all the users of a users DB of from_shards shards to a users DB of to_shards shards.
+
+    :param from_shards (int): The number of shards of the existing users DB.
+    :param to_shards (int): The number of shards of the new users DB.
+    :param db_directory_path (str): The directory of the database files. Default is the directory of the server.
+    :param remove_source (bool): If True, the files of the existing users DB are removed once the users are copied.
+    :param batch_size (int): The number of users copied in a single transaction.
+
+    Returns:
+        int: The number of copied users.
+
+    Raises:
+        ReshardException: If the numbers of shards are equal, a file of the existing users DB is missing, or the new
+                          users DB already has users.
+    """
+    if from_shards == to_shards:
+        raise ReshardException(f"The users DB already has {to_shards} shards.")
+    if db_directory_path is None:
+        # The users DB is in the directory of the server modules
+        db_directory_path = os.path.dirname(os.path.abspath(__file__))
+    for shard_index in range(from_shards):
+        shard_file_name = DataBaseCommunicator.get_shard_file_name(from_shards, shard_index)
+        if not os.path.exists(os.path.join(db_directory_path, shard_file_name)):
+            raise ReshardException(f"The users DB of {from_shards} shards has no file {shard_file_name}.")
+    source = DataBaseCommunicator(DataBaseCommunicator.create_connection_pools(from_shards, db_directory_path))
+    target = DataBaseCommunicator(DataBaseCommunicator.create_connection_pools(to_shards, db_directory_path))
+    try:
+        if next(target.iterate_users(batch_size=1), None) is not None:
+            raise ReshardException(f"The users DB of {to_shards} shards already has users.")
+        copied_users = target.create_new_users(source.iterate_users(batch_size), batch_size)
+        source_users = sum(1 for _ in source.iterate_users(batch_size))
+        if copied_users != source_users:
+            raise ReshardException(f"Copied {copied_users} users out of {source_users}.")
+    finally:
+        target.close()
+        source.close()
+    if remove_source:
+        source.remove_database_file()
+    return copied_users
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the numbers of shards."""
+    parser = argparse.ArgumentParser(description="Migrate the users DB to another number of shards")
+    parser.add_argument('--from-shards', type=int, default=1, help="Number of shards of the existing users DB")
+    parser.add_argument('--to-shards', type=int, required=True, help="Number of shards of the new users DB")
+    parser.add_argument('--db-directory', type=str, default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Directory of the database files")
+    parser.add_argument('--remove-source', action='store_true',
+                        help="Remove the files of the existing users DB once the users are copied")
+    parser.add_argument('--batch-size', '-b', type=int, default=DataBaseCommunicator.DEFAULT_BATCH_SIZE,
+                        help="Number of users copied in a single transaction")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    start_time = time.perf_counter()
+    try:
+        copied_users = reshard_users(args.from_shards, args.to_shards, args.db_directory, args.remove_source,
+                                     args.batch_size)
+    except ReshardException as error:
+        raise SystemExit(error.message)
+    print(f"Copied {copied_users} users from {args.from_shards} to {args.to_shards} shards "
+          f"in {time.perf_counter() - start_time:.2f} seconds")
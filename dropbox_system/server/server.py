@@ -1,44 +1,162 @@
 import socket
+import ssl
 import threading
 import argparse
+import functools
 import shutil
+import stat
+import time
 import os
 
 from dropbox_system.server.server_handler import ServerHandler
 from dropbox_system.server.db_communicator import DataBaseCommunicator
+from dropbox_system.server.worker_pool import WorkerPool
+from dropbox_system.server.session_timeouts import SessionTimeouts
+from dropbox_system.server.memory_budget import MemoryBudget
+from dropbox_system.server.bandwidth_scheduler import BandwidthScheduler
+from dropbox_system.server.request_lanes import RequestLanes
+from dropbox_system.server.attempt_limits import AttemptLimits
+from dropbox_system.server.session_tokens import SessionTokens
+from dropbox_system.server.credential_cache import CredentialCache
+from dropbox_system.server.connection_pool import ConnectionPool
+from dropbox_system.server.path_locks import PathLocks
+from dropbox_system.common import tls, message_codec
+from dropbox_system.common.request_handler import RequestHandler
 
 class Server:
     """
     A dropbox server object that can handle multiple clients simultaneously.
     """
     FILES_DIRECTORY_NAME = "user_files"
+    # Every session is handled on a worker thread, and up to DEFAULT_QUEUE_SIZE sessions wait for a free worker
+    DEFAULT_WORKERS = 256
+    DEFAULT_QUEUE_SIZE = 256
+    # The maximal time the accepting thread spends on answering a client that is rejected as busy, in seconds
+    REJECT_TIMEOUT = 0.5
 
-    def __init__(self, host: str = '127.0.0.1', port: int = 8080) -> None:
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, chunk_size: int = ServerHandler.DEFAULT_CHUNK_SIZE,
+                 adaptive_chunk_size: bool = False, tls_context: ssl.SSLContext = None,
+                 unix_socket_path: str = None, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 metrics_interval: float = None, reuse_port: bool = False,
+                 session_timeouts: SessionTimeouts = None, memory_budget: MemoryBudget = None,
+                 bandwidth_scheduler: BandwidthScheduler = None, request_lanes: RequestLanes = None,
+                 attempt_limits: AttemptLimits = None, session_tokens: SessionTokens = None,
+                 path_locks: PathLocks = None, credential_cache: CredentialCache = None) -> None:
         """
-        Initializes the server and binds it to the specified host and port.
+        Initializes the server and binds it to the specified host and port, and/or to a Unix domain socket path.
 
         :param host (str): The host address to bind to (default is '127.0.0.1').
-        :param port (int): The port number to bind to (default is 8080).
+        :param port (int): The port number to bind to (default is 8080). If None, the server does not listen on TCP.
+        :param chunk_size (int): The size of the chunks file content is transferred in.
+        :param adaptive_chunk_size (bool): If True, the chunk size of downloaded files grows while the throughput improves.
+        :param tls_context (ssl.SSLContext): If given, client connections are wrapped in TLS with this context
+                                             (see `tls.create_server_context`), and the XOR encryption is off on them.
+        :param unix_socket_path (str): If given, the server also listens on a Unix domain socket at this path, so clients
+                                       on the same host skip the TCP/IP stack.
+        :param workers (int): The number of sessions that are handled concurrently, each on its own worker thread.
+        :param queue_size (int): The number of sessions that wait for a free worker. Clients that connect while the
+                                 queue is full are answered with the SERVER_BUSY error code and a retry-after hint.
+        :param metrics_interval (float): If given, the metrics of the worker pool are printed every metrics_interval
+                                         seconds (they are printed when the server stops anyway).
+        :param reuse_port (bool): If True, the TCP port is bound with SO_REUSEPORT, so the servers of several
+                                  processes can listen on it (see `supervisor.Supervisor`).
+        :param session_timeouts (SessionTimeouts): The idle, header and minimal transfer rate timeouts of the sessions,
+                                                   so dead or slow clients do not hold a worker forever.
+                                                   Default is SessionTimeouts with its default timeouts.
+        :param memory_budget (MemoryBudget): The budget the buffers of in-flight transfers are reserved against.
+                                             Default is MemoryBudget with its default capacity.
+        :param bandwidth_scheduler (BandwidthScheduler): Shares the bandwidth of the server between the transfers,
+                                                         and measures the rate of every user.
+                                                         Default is BandwidthScheduler with no rate limits.
+        :param request_lanes (RequestLanes): The lanes metadata and bulk requests are handled on, so metadata requests
+                                             do not wait behind transfers. Default is RequestLanes with its default
+                                             bulk capacity.
+        :param attempt_limits (AttemptLimits): The number of failed logins and registrations a session may make
+                                               before it is closed (sessions stay open after registering and after
+                                               failed logins). Default is AttemptLimits with its default limits.
+        :param session_tokens (SessionTokens): Issues the session tokens clients resume their sessions on other
+                                               connections with, without a query of the users DB. Default is
+                                               SessionTokens with its default lifetime and a random secret.
+        :param path_locks (PathLocks): The locks of the paths of the users files, so conflicting file operations of
+                                       concurrent sessions wait for each other. Default is PathLocks with its default
+                                       number of stripes.
+        :param credential_cache (CredentialCache): The cache logins are verified against before querying the users
+                                                   DB. Default is the cache of the users DB of the process (a
+                                                   CredentialCache with its default TTL and size).
         """
         self.is_initialized = False
         self.host = host
         self.port = port
-        self.database_communicator = DataBaseCommunicator()
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.unix_socket_path = unix_socket_path
+        self.chunk_size = chunk_size
+        self.adaptive_chunk_size = adaptive_chunk_size
+        self.tls_context = tls_context
+        self.worker_pool = WorkerPool(self.handle_client, workers, queue_size)
+        self.metrics_interval = metrics_interval
+        self.session_timeouts = session_timeouts if session_timeouts is not None else SessionTimeouts()
+        self.memory_budget = memory_budget if memory_budget is not None else MemoryBudget()
+        self.bandwidth_scheduler = bandwidth_scheduler if bandwidth_scheduler is not None else BandwidthScheduler()
+        self.request_lanes = request_lanes if request_lanes is not None else RequestLanes()
+        self.attempt_limits = attempt_limits if attempt_limits is not None else AttemptLimits()
+        self.session_tokens = session_tokens if session_tokens is not None else SessionTokens()
+        self.path_locks = path_locks if path_locks is not None else PathLocks()
+        # Shared by all the sessions, so the connections to the users DB are pooled instead of opened per session
+        self.database_communicator = DataBaseCommunicator.get_shared()
+        if credential_cache is not None:
+            self.database_communicator.credential_cache = credential_cache
+        self.server_socket = None
+        self.unix_server_socket = None
         self.files_directory_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), self.FILES_DIRECTORY_NAME)
 
+        if self.port is not None:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if reuse_port:
+                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            if not self._listen(self.server_socket, (self.host, self.port)):
+                return
+            print(f"Server started and listening on {self.host}:{self.port}{' (TLS)' if tls_context else ''}")
+
+        if self.unix_socket_path is not None:
+            self._remove_stale_unix_socket()
+            self.unix_server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if not self._listen(self.unix_server_socket, self.unix_socket_path):
+                return
+            print(f"Server started and listening on {self.unix_socket_path}{' (TLS)' if tls_context else ''}")
+
+        self.is_initialized = self.server_socket is not None or self.unix_server_socket is not None
+
+    def _listen(self, server_socket: socket.socket, address) -> bool:
+        """
+        Binds a server socket to the address and starts listening on it.
+
+        :param server_socket (socket.socket): The server socket.
+        :param address: The address to bind to - a (host, port) tuple, or a Unix domain socket path.
+
+        Returns:
+            bool: True if the server socket is listening, False if binding it failed.
+        """
         try:
-            self.server_socket.bind((self.host, self.port))
+            server_socket.bind(address)
         except OSError as e:
             if e.errno == 99:
                 print("Cannot assaign the requested address. Exiting.")
             else:
                 print(f"{e}, exiting.")
-            return
+            return False
 
-        self.server_socket.listen(60)  # Listen for up to 60 connections
-        print(f"Server started and listening on {self.host}:{self.port}")
-        self.is_initialized = True
+        server_socket.listen(60)  # Listen for up to 60 connections
+        return True
+
+    def _remove_stale_unix_socket(self) -> None:
+        """
+        Removes the Unix domain socket file left behind by a previous server, so binding to its path does not fail.
+        Files that are not sockets are kept, so binding fails instead of deleting them.
+        """
+        try:
+            if stat.S_ISSOCK(os.stat(self.unix_socket_path).st_mode):
+                os.remove(self.unix_socket_path)
+        except FileNotFoundError:
+            pass
 
     def remove_all_users_files(self) -> None:
         """Removes all files and directories in the user's files directory."""
@@ -56,36 +174,241 @@ class Server:
         Args:
             client_socket (socket.socket): The socket object for the connected client.
         """
-        handler = ServerHandler(client_socket, self.files_directory_path)
+        if self.tls_context is not None:
+            # The handshake runs on the client's thread, so a slow client does not block accepting other clients
+            try:
+                client_socket = self.tls_context.wrap_socket(client_socket, server_side=True)
+            except (ssl.SSLError, OSError) as e:
+                print(f"TLS handshake with client failed - {e}")
+                client_socket.close()
+                return
+
+        handler = ServerHandler(client_socket, self.files_directory_path, self.chunk_size, self.adaptive_chunk_size,
+                                database_communicator=self.database_communicator,
+                                session_timeouts=self.session_timeouts, memory_budget=self.memory_budget,
+                                bandwidth_scheduler=self.bandwidth_scheduler, request_lanes=self.request_lanes,
+                                attempt_limits=self.attempt_limits, session_tokens=self.session_tokens,
+                                path_locks=self.path_locks)
         handler.start_handler()
 
+    def _accept_clients(self, server_socket: socket.socket) -> None:
+        """
+        Accepts client connections on a listening socket, and queues every client for the worker pool.
+        Clients the queue has no room for are rejected.
+
+        :param server_socket (socket.socket): The listening socket.
+        """
+        while True:
+            client_socket, _ = server_socket.accept()
+            if not self.worker_pool.submit(client_socket):
+                self._reject_client(client_socket)
+
+    def _reject_client(self, client_socket: socket.socket) -> None:
+        """
+        Answers a client the worker pool has no room for with the SERVER_BUSY error code and a retry-after hint
+        (instead of the response to its first request), and closes the connection.
+        It runs on the accepting thread, so it waits for the client for REJECT_TIMEOUT seconds at most.
+
+        :param client_socket (socket.socket): The socket object of the rejected client.
+        """
+        retry_after_ms = int(self.worker_pool.get_retry_after() * 1000)
+        response = message_codec.SERVER_BUSY_RESPONSE.pack(retry_after_ms=retry_after_ms)
+        response_header = message_codec.RESPONSE_HEADER.pack(response_code=RequestHandler.SERVER_BUSY_RESPONSE_CODE,
+                                                             error_code=RequestHandler.SERVER_BUSY,
+                                                             response_len=len(response))
+        try:
+            client_socket.settimeout(self.REJECT_TIMEOUT)
+            if self.tls_context is not None:
+                client_socket = self.tls_context.wrap_socket(client_socket, server_side=True)
+            RequestHandler(client_socket).send_message(response_header, response)
+            # Closing a socket with unread data resets the connection, and the client may lose the response.
+            # So the request the client already sent is read (without waiting for more) before closing it.
+            socket.socket.shutdown(client_socket, socket.SHUT_WR)
+            client_socket.setblocking(False)
+            while socket.socket.recv(client_socket, RequestHandler.DEFAULT_CHUNK_SIZE):
+                pass
+        except (ssl.SSLError, OSError):
+            pass
+        finally:
+            client_socket.close()
+
+    def _print_metrics(self) -> None:
+        """
+        Prints the metrics of the worker pool, the counters of the sessions that timed out, the reserved bytes
+        of the memory budget, the rates of the users, the latency of the request lanes, the sessions that were
+        closed by the attempt limits, the sessions that were resumed by session tokens, the contention of the
+        path locks and the wait times of the users DB connection pool.
+        """
+        print(f"Worker pool metrics: {self.worker_pool.metrics.as_dict()}")
+        print(f"Session timeouts: {self.session_timeouts.counters.as_dict()}")
+        print(f"Memory budget: {self.memory_budget.as_dict()}")
+        print(f"User bandwidth: {self.bandwidth_scheduler.as_dict()}")
+        print(f"Request lanes: {self.request_lanes.as_dict()}")
+        print(f"Attempt limits: {self.attempt_limits.as_dict()}")
+        print(f"Session tokens: {self.session_tokens.as_dict()}")
+        print(f"Path locks: {self.path_locks.as_dict()}")
+        print(f"Users DB connection pools: "
+              f"{[connection_pool.as_dict() for connection_pool in self.database_communicator.connection_pools]}")
+        print(f"Credential cache: {self.database_communicator.credential_cache.as_dict()}")
+
+    def _report_metrics(self) -> None:
+        """
+        Prints the metrics every metrics_interval seconds.
+        """
+        while True:
+            time.sleep(self.metrics_interval)
+            self._print_metrics()
+
     def start(self) -> None:
         """Starts the server and listening for new client connections."""
         if not self.is_initialized:
             return
 
         print("Server is starting...")
+        listening_sockets = [sock for sock in [self.server_socket, self.unix_server_socket] if sock is not None]
+        self.worker_pool.start()
+        if self.metrics_interval is not None:
+            threading.Thread(target=self._report_metrics, daemon=True).start()
         try:
-            while True:
-                client_socket, _ = self.server_socket.accept()
-                client_thread = threading.Thread(target=self.handle_client, args=(client_socket,))
-                client_thread.start()
-                
+            # Every listening socket but the last one is accepted on from its own thread
+            for server_socket in listening_sockets[:-1]:
+                threading.Thread(target=self._accept_clients, args=(server_socket,), daemon=True).start()
+            self._accept_clients(listening_sockets[-1])
+
         except KeyboardInterrupt:
             print("Server is shutting down...")
         finally:
-            self.server_socket.close()
+            self._close_listening_sockets()
             print("Server socket closed.")
+            self._print_metrics()
+
+    def _close_listening_sockets(self) -> None:
+        """Closes the listening sockets, and removes the Unix domain socket file."""
+        for server_socket in [self.server_socket, self.unix_server_socket]:
+            if server_socket is not None:
+                server_socket.close()
+        if self.unix_server_socket is not None and os.path.exists(self.unix_socket_path):
+            os.remove(self.unix_socket_path)
 
-def get_arguments_from_user() -> tuple:
+def get_arguments_from_user() -> argparse.Namespace:
     """Parses command line arguments to get network details for starting the server."""
     parser = argparse.ArgumentParser(description="Get network details to start client")
     parser.add_argument('--address', '-i', type=str, default="127.0.0.1", help="Binding address")
     parser.add_argument('--port', '-p', type=int, default=8080, help="Port to connect")
-    args = parser.parse_args()
-    return args.address, args.port
+    parser.add_argument('--chunk-size', '-c', type=int, default=ServerHandler.DEFAULT_CHUNK_SIZE,
+                        help="Size of the chunks file content is transferred in")
+    parser.add_argument('--adaptive-chunk-size', '-a', action='store_true',
+                        help="Grow the chunk size while the transfer throughput improves")
+    parser.add_argument('--unix-socket', '-u', type=str,
+                        help="Path of a Unix domain socket to listen on too, for clients on the same host")
+    parser.add_argument('--no-tcp', action='store_true', help="Listen only on the Unix domain socket")
+    parser.add_argument('--tls-certificate', type=str, help="Path of a PEM certificate, to serve clients over TLS")
+    parser.add_argument('--tls-key', type=str,
+                        help="Path of the PEM private key of the TLS certificate (if it is not in the certificate file)")
+    parser.add_argument('--engine', '-e', choices=["threads", "asyncio"], default="threads",
+                        help="Serve every connection on its own thread, or all connections on an asyncio event loop")
+    parser.add_argument('--workers', '-w', type=int,
+                        help="Number of threads sessions are handled on with the threads engine (default "
+                             f"{Server.DEFAULT_WORKERS}), or requests are handled on with the asyncio engine (default 32)")
+    parser.add_argument('--queue-size', '-q', type=int, default=Server.DEFAULT_QUEUE_SIZE,
+                        help="Number of sessions that wait for a free worker with the threads engine, before new "
+                             "sessions are rejected as busy")
+    parser.add_argument('--metrics-interval', type=float,
+                        help="Print the metrics of the worker pool every METRICS_INTERVAL seconds")
+    parser.add_argument('--idle-timeout', type=float, default=SessionTimeouts.DEFAULT_IDLE_TIMEOUT,
+                        help="Close sessions that send no request for IDLE_TIMEOUT seconds (0 to disable)")
+    parser.add_argument('--header-timeout', type=float, default=SessionTimeouts.DEFAULT_HEADER_TIMEOUT,
+                        help="Close sessions whose request takes more than HEADER_TIMEOUT seconds to arrive "
+                             "(0 to disable)")
+    parser.add_argument('--min-transfer-rate', type=float, default=SessionTimeouts.DEFAULT_MIN_TRANSFER_RATE,
+                        help="Close sessions that transfer file content slower than MIN_TRANSFER_RATE bytes per "
+                             f"second, measured over {SessionTimeouts.DEFAULT_TRANSFER_WINDOW} seconds (0 to disable)")
+    parser.add_argument('--memory-budget', type=int, default=MemoryBudget.DEFAULT_CAPACITY // (1024 * 1024),
+                        help="Memory (in MB) the buffers of all in-flight transfers may hold together. Transfers wait "
+                             "for room in it, and are rejected if none is released in time")
+    parser.add_argument('--total-bandwidth', type=float,
+                        help="Bandwidth (in MB/s) all the transfers share fairly. Default is unlimited")
+    parser.add_argument('--user-bandwidth', type=float,
+                        help="Maximal bandwidth (in MB/s) of all the transfers of a user. Default is unlimited")
+    parser.add_argument('--connection-bandwidth', type=float,
+                        help="Maximal bandwidth (in MB/s) of every transfer. Default is unlimited")
+    parser.add_argument('--bulk-capacity', type=int, default=RequestLanes.DEFAULT_BULK_CAPACITY,
+                        help="Number of uploads and downloads that are handled concurrently, while metadata requests "
+                             "are handled on their own lane (0 for no limit)")
+    parser.add_argument('--no-metadata-priority', action='store_true',
+                        help="Do not pause the chunks of transfers while metadata requests are handled")
+    parser.add_argument('--max-login-attempts', type=int, default=AttemptLimits.DEFAULT_MAX_LOGIN_ATTEMPTS,
+                        help="Number of failed logins a session may make before it is closed (0 for no limit)")
+    parser.add_argument('--max-register-attempts', type=int, default=AttemptLimits.DEFAULT_MAX_REGISTER_ATTEMPTS,
+                        help="Number of registration requests a session may send before it is closed (0 for no limit)")
+    parser.add_argument('--session-token-lifetime', type=float, default=SessionTokens.DEFAULT_LIFETIME,
+                        help="Time (in seconds) the session tokens of logins are valid for, to resume the sessions on "
+                             "other connections (0 disables the tokens)")
+    parser.add_argument('--path-lock-stripes', type=int, default=PathLocks.DEFAULT_STRIPES,
+                        help="Number of read/write locks the paths of the users files are mapped to")
+    parser.add_argument('--credential-cache-ttl', type=float, default=CredentialCache.DEFAULT_TTL,
+                        help="Time (in seconds) the verified credentials of users are cached for, so logins do not "
+                             "query the users DB (0 disables the cache)")
+    parser.add_argument('--credential-cache-size', type=int, default=CredentialCache.DEFAULT_MAX_ENTRIES,
+                        help="Maximal number of users whose credentials are cached")
+    parser.add_argument('--db-shards', type=int, default=1,
+                        help="Number of files the users DB is sharded across (by a hash of the username), so writes "
+                             "of users of different shards run in parallel. See dropbox_system.server.reshard_users")
+    parser.add_argument('--db-journal-mode', type=str.upper, choices=ConnectionPool.JOURNAL_MODES,
+                        default=ConnectionPool.DEFAULT_JOURNAL_MODE, help="Journal mode of the users DB")
+    parser.add_argument('--db-synchronous', type=str.upper, choices=ConnectionPool.SYNCHRONOUS_MODES,
+                        default=ConnectionPool.DEFAULT_SYNCHRONOUS,
+                        help="Synchronous mode of the users DB connections (how often SQLite waits for the disk)")
+    parser.add_argument('--db-mmap-size', type=int, default=ConnectionPool.DEFAULT_MMAP_SIZE // (1024 * 1024),
+                        help="Size (in MB) of the memory map the users DB is read through (0 disables it)")
+    parser.add_argument('--no-group-commit', action='store_true',
+                        help="Commit every registration in a transaction of its own, instead of committing "
+                             "concurrent registrations together")
+    parser.add_argument('--processes', '-n', type=int,
+                        help="Run the server in PROCESSES worker processes that share the TCP port (SO_REUSEPORT), "
+                             "and restart every worker process that dies")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    address, port = get_arguments_from_user()
-    server_instance = Server(address, port)
-    server_instance.start()
\ No newline at end of file
+    args = get_arguments_from_user()
+    if args.no_tcp and not args.unix_socket:
+        raise SystemExit("--no-tcp requires --unix-socket")
+    if args.processes and (args.no_tcp or args.unix_socket):
+        raise SystemExit("--processes shares a TCP port between the processes, and does not support --unix-socket")
+    tls_context = tls.create_server_context(args.tls_certificate, args.tls_key) if args.tls_certificate else None
+    port = None if args.no_tcp else args.port
+    memory_budget = MemoryBudget(args.memory_budget * 1024 * 1024)
+    request_lanes = RequestLanes(args.bulk_capacity or None, not args.no_metadata_priority)
+    bandwidth_scheduler = BandwidthScheduler(*[bandwidth * 1024 * 1024 if bandwidth else None for bandwidth in
+                                               [args.total_bandwidth, args.user_bandwidth, args.connection_bandwidth]])
+    attempt_limits = AttemptLimits(args.max_login_attempts, args.max_register_attempts)
+    # Created before the worker processes are forked, so all of them share the secret of the tokens
+    session_tokens = SessionTokens(args.session_token_lifetime)
+    path_locks = PathLocks(args.path_lock_stripes)
+    credential_cache = CredentialCache(args.credential_cache_ttl, args.credential_cache_size)
+    # Configured before the worker processes are forked, so every process opens the users DB with these options
+    DataBaseCommunicator.configure(args.db_shards, journal_mode=args.db_journal_mode, synchronous=args.db_synchronous,
+                                   mmap_size=args.db_mmap_size * 1024 * 1024, group_commit=not args.no_group_commit)
+    if args.engine == "asyncio":
+        # Imported here, since the asyncio engine is built on this module
+        from dropbox_system.server.async_server import AsyncServer
+        create_server = functools.partial(AsyncServer, args.address, port, args.chunk_size, args.adaptive_chunk_size,
+                                          tls_context, args.unix_socket, args.workers or AsyncServer.DEFAULT_WORKERS,
+                                          reuse_port=bool(args.processes), memory_budget=memory_budget,
+                                          bandwidth_scheduler=bandwidth_scheduler, request_lanes=request_lanes,
+                                          attempt_limits=attempt_limits, session_tokens=session_tokens,
+                                          path_locks=path_locks, credential_cache=credential_cache)
+    else:
+        session_timeouts = SessionTimeouts(args.idle_timeout, args.header_timeout, args.min_transfer_rate)
+        create_server = functools.partial(Server, args.address, port, args.chunk_size, args.adaptive_chunk_size,
+                                          tls_context, args.unix_socket, args.workers or Server.DEFAULT_WORKERS,
+                                          args.queue_size, args.metrics_interval, reuse_port=bool(args.processes),
+                                          session_timeouts=session_timeouts, memory_budget=memory_budget,
+                                          bandwidth_scheduler=bandwidth_scheduler, request_lanes=request_lanes,
+                                          attempt_limits=attempt_limits, session_tokens=session_tokens,
+                                          path_locks=path_locks, credential_cache=credential_cache)
+    if args.processes:
+        from dropbox_system.server.supervisor import Supervisor
+        Supervisor(create_server, args.processes).start()
+    else:
+        create_server().start()
@@ -1,33 +1,106 @@
 import os
-import struct
 import shutil
 import socket
-import struct
+import contextlib
+import concurrent.futures
 
 import dropbox_system.server.request_parser
+from dropbox_system.common import message_codec, compression
 from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.multiplexer import Multiplexer, StreamSocket
 from dropbox_system.server.db_communicator import DataBaseCommunicator
+from dropbox_system.server.session_timeouts import SessionTimeouts
+from dropbox_system.server.memory_budget import MemoryBudget
+from dropbox_system.server.bandwidth_scheduler import BandwidthScheduler
+from dropbox_system.server.request_lanes import RequestLanes
+from dropbox_system.server.attempt_limits import AttemptLimits
+from dropbox_system.server.session_tokens import SessionTokens
+from dropbox_system.server.path_locks import PathLocks
+
+
+class RequestTooLargeException(Exception):
+    def __init__(self, request_id: int, request_len: int) -> None:
+        self.request_id = request_id
+        self.message = f"Request {request_id} of {request_len} bytes exceeds the maximal request length"
+        super().__init__(self.message)
+
+
+class ServerSession:
+    """
+    The state of a user session. On protocol v2 connections, it is shared by the handlers of all the streams.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes a session with no logged in user, and no login or registration attempts.
+        """
+        self.logged_in_user = None
+        self.user_directory_path = None
+        self.failed_login_attempts = 0
+        self.register_attempts = 0
 
 
 class ServerHandler(RequestHandler):
     """
     This class is handling various of requests, sent by a client and waiting for a response.
     """
-
-    def __init__(self, sock: socket.socket, files_directory_path: str) -> None:
+    # The number of requests of a protocol v2 connection that are handled concurrently
+    MAX_CONCURRENT_STREAMS = 8
+    # Requests carry names and credentials only (file content is transferred after them), so a longer declared request
+    # length is not trusted and not allocated
+    MAX_REQUEST_LEN = 64 * 1024
+    # Every response code is the code of its request + RESPONSE_CODE_OFFSET
+    RESPONSE_CODE_OFFSET = RequestHandler.REGISTER_RESPONE_CODE - RequestHandler.REGISTER_REQUEST_CODE
+
+    def __init__(self, sock: socket.socket, files_directory_path: str,
+                 chunk_size: int = RequestHandler.DEFAULT_CHUNK_SIZE, adaptive_chunk_size: bool = False,
+                 session: ServerSession = None, database_communicator: DataBaseCommunicator = None,
+                 session_timeouts: SessionTimeouts = None, memory_budget: MemoryBudget = None,
+                 bandwidth_scheduler: BandwidthScheduler = None, request_lanes: RequestLanes = None,
+                 attempt_limits: AttemptLimits = None, session_tokens: SessionTokens = None,
+                 path_locks: PathLocks = None) -> None:
         """
         Initiating the ServerHandler with a socket, database communicator, and files directory path.
 
         :param sock (socket.socket): The socket to handle communication.
-        :param database_communicator (DataBaseCommunicator): The object for database operations with the users DB.
         :param files_directory_path (str): The path where user files are stored.
+        :param chunk_size (int): The size of the chunks file content is transferred in.
+        :param adaptive_chunk_size (bool): If True, the chunk size of downloaded files grows while the throughput improves.
+        :param session (ServerSession): The user session to handle requests of. Default is a new session.
+        :param database_communicator (DataBaseCommunicator): The object for database operations with the users DB.
+                                                             Default is the database communicator shared by the
+                                                             process (so no connection is opened per session).
+        :param session_timeouts (SessionTimeouts): If given, the session is closed once it is idle, receives a request
+                                                   or transfers file content for longer than these timeouts allow.
+        :param memory_budget (MemoryBudget): If given, the buffers of file transfers are reserved against it, and
+                                             transfers it has no room for are answered with INSUFFICIENT_MEMORY.
+        :param bandwidth_scheduler (BandwidthScheduler): If given, the chunks of file transfers are paced by it.
+        :param request_lanes (RequestLanes): If given, every request is handled on the lane of its class (metadata or
+                                             bulk), and the chunks of file transfers yield to metadata requests.
+        :param attempt_limits (AttemptLimits): The number of failed logins and registrations the session may make,
+                                               before it is closed. Default is AttemptLimits with its default limits.
+        :param session_tokens (SessionTokens): If given, clients that log in may ask for a session token, and resume
+                                               their session on other connections with it.
+        :param path_locks (PathLocks): If given, every file operation holds the locks of its path, so it does not
+                                       race with conflicting operations of other sessions.
         """
-        super(ServerHandler, self).__init__(sock)
-        self.database_communicator = DataBaseCommunicator()
-        self.logged_in_user = None
+        super(ServerHandler, self).__init__(sock, chunk_size, adaptive_chunk_size)
+        self.session_timeouts = session_timeouts
+        self.memory_budget = memory_budget
+        self.bandwidth_scheduler = bandwidth_scheduler
+        self.request_lanes = request_lanes
+        self.attempt_limits = attempt_limits if attempt_limits is not None else AttemptLimits()
+        self.session_tokens = session_tokens
+        self.path_locks = path_locks
+        if session_timeouts is not None:
+            self.socket_deadline = session_timeouts.new_deadline()
+        self.database_communicator = database_communicator if database_communicator is not None \
+            else DataBaseCommunicator.get_shared()
+        self.session = session if session is not None else ServerSession()
         self.files_directory_path = files_directory_path
         self._create_users_directory_if_not_exists()
         self.should_exit = False
+        self.protocol_version = self.PROTOCOL_VERSION_1
         self.request_handlers = \
         {
             self.REGISTER_REQUEST_CODE: self._handle_register_request,
@@ -38,36 +111,202 @@ class ServerHandler(RequestHandler):
             self.UPLOAD_FILE_REQUEST_CODE: self._handle_upload_file_request,
             self.LIST_FILES_REQUEST_CODE: self._handle_list_files_request,
             self.CREATE_DIRECTORY_REQUEST_CODE: self._handle_create_directory_request,
+            self.PROTOCOL_NEGOTIATION_REQUEST_CODE: self._handle_protocol_negotiation_request,
+            self.RESUME_SESSION_REQUEST_CODE: self._handle_resume_session_request,
         }
 
+    @property
+    def logged_in_user(self) -> str:
+        return self.session.logged_in_user
+
+    @logged_in_user.setter
+    def logged_in_user(self, logged_in_user: str) -> None:
+        self.session.logged_in_user = logged_in_user
+
+    @property
+    def user_directory_path(self) -> str:
+        return self.session.user_directory_path
+
+    @user_directory_path.setter
+    def user_directory_path(self, user_directory_path: str) -> None:
+        self.session.user_directory_path = user_directory_path
+
     def start_handler(self) -> None:
         """
         Start handling incoming user commands in a loop until the server exits.
+        Once protocol v2 is negotiated, the connection is handled as a multiplexed connection.
+        A session that times out is counted and closed.
+        """
+        try:
+            while not self.should_exit:
+                if self.protocol_version == self.PROTOCOL_VERSION_2:
+                    self._start_multiplexed_handler()
+                    return
+                self._handle_next_request()
+        except TimeoutError:
+            self._close_timed_out_session()
+
+    def _close_timed_out_session(self) -> None:
+        """
+        Counts the timeout of the session, and closes its connection right away (instead of when the handler is
+        deleted), so the peer learns the session is over.
+        """
+        if self.socket_deadline is not None:
+            print(f"Closing a session that timed out on the {self.socket_deadline.phase} phase")
+            self.socket_deadline.count_timeout()
+        self.should_exit = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _handle_next_request(self) -> None:
         """
-        while not self.should_exit:
+        Receive the next request and handle it.
+        """
+        try:
             request_id, message = self._parse_user_command()
+        except RequestTooLargeException as e:
+            # The request is not received, so the rest of the connection can not be parsed anymore
+            print(f"Closing a session - {e.message}")
+            response_header = self._create_response_header(e.request_id + self.RESPONSE_CODE_OFFSET,
+                                                           self.REQUEST_TOO_LARGE)
+            self.send_header(response_header)
+            self.should_exit = True
+            return
+        if self.request_lanes is not None:
+            self.request_lanes.handle(request_id, self.request_handlers[request_id], message)
+        else:
             self.request_handlers[request_id](message)
 
+    def _start_multiplexed_handler(self) -> None:
+        """
+        Handle a protocol v2 connection - every stream carries a single request, and up to MAX_CONCURRENT_STREAMS
+        requests are handled concurrently, by handlers that share the session of this handler.
+        The frames of all the streams arrive on the same socket, so it is only limited by the idle timeout - the
+        connection ends once no frame arrives for that long.
+        """
+        socket_deadline, self.socket_deadline = self.socket_deadline, None
+        if socket_deadline is not None:
+            self.sock.settimeout(self.session_timeouts.idle_timeout)
+        multiplexer = Multiplexer(self.sock)
+        with concurrent.futures.ThreadPoolExecutor(self.MAX_CONCURRENT_STREAMS) as executor:
+            for stream in multiplexer.receive_frames():
+                executor.submit(self._handle_stream, multiplexer, stream)
+        if multiplexer.timed_out and socket_deadline is not None:
+            socket_deadline.expect_request()
+            self.socket_deadline = socket_deadline
+            self._close_timed_out_session()
+
+    def _handle_stream(self, multiplexer: Multiplexer, stream: StreamSocket) -> None:
+        """
+        Handle the request sent on a stream of a protocol v2 connection, then end the stream.
+        If the request ends the session, no more streams are received on the connection.
+
+        :param multiplexer (Multiplexer): The multiplexer of the connection.
+        :param stream (StreamSocket): The stream to handle.
+        """
+        stream_handler = ServerHandler(stream, self.files_directory_path, self.chunk_size,
+                                       self.adaptive_chunk_size is not None, self.session, self.database_communicator,
+                                       memory_budget=self.memory_budget, bandwidth_scheduler=self.bandwidth_scheduler,
+                                       request_lanes=self.request_lanes, attempt_limits=self.attempt_limits,
+                                       session_tokens=self.session_tokens, path_locks=self.path_locks)
+        try:
+            stream_handler._handle_next_request()
+        except ConnectionError:
+            pass
+        except Exception as e:
+            # The stream is closed below, so the client stops waiting for a response
+            print(f"Failed handling the request of stream {stream.stream_id} - {e!r}")
+        finally:
+            stream.close()
+
+        if stream_handler.should_exit:
+            self.should_exit = True
+            multiplexer.stop_receiving()
+
     def _create_users_directory_if_not_exists(self) -> None:
         """
         Create a directory for user files if it does not already exist.
         """
-        if not os.path.exists(self.files_directory_path):
-            os.mkdir(self.files_directory_path)
+        os.makedirs(self.files_directory_path, exist_ok=True)
 
     def _parse_user_command(self) -> tuple:
         """
         Parse the requested user command by analyzing the received socket data.
+        Raises RequestTooLargeException if the declared request length exceeds MAX_REQUEST_LEN.
 
         Returns:
             tuple: A tuple containing the request ID and the message content.
         """
-        request_id = self.receive_numeric_value()
-        request_len = self.receive_numeric_value()
+        if self.socket_deadline is not None:
+            self.socket_deadline.expect_request()
+        request_id, request_len = self.receive_header(message_codec.REQUEST_HEADER)
+        if request_len > self.MAX_REQUEST_LEN:
+            raise RequestTooLargeException(request_id, request_len)
         message = self.receive_bytes(request_len)
+        if self.socket_deadline is not None:
+            self.socket_deadline.stop()
         return request_id, message
 
-        
+    def _throttle(self, size: int) -> None:
+        """
+        Waits until a chunk of file content may be transferred - by the transfer throttle, and while metadata requests
+        are handled (see `RequestLanes.yield_to_metadata`).
+        """
+        super(ServerHandler, self)._throttle(size)
+        if self.request_lanes is not None:
+            self.request_lanes.yield_to_metadata()
+
+    def _transfer_file_content(self, transfer, *args) -> None:
+        """
+        Run a function that transfers file content (send_file or receive_file_content) - its socket operations are
+        limited by the minimal transfer rate, and its chunks are paced by the bandwidth scheduler.
+
+        :param transfer (callable): The function that transfers the content.
+        :param args: The arguments of the function.
+        """
+        if self.socket_deadline is not None:
+            self.socket_deadline.start_transfer()
+        if self.bandwidth_scheduler is not None:
+            self.transfer_throttle = self.bandwidth_scheduler.start_transfer(self.logged_in_user)
+        try:
+            transfer(*args)
+        finally:
+            if self.transfer_throttle is not None:
+                self.bandwidth_scheduler.end_transfer(self.transfer_throttle)
+                self.transfer_throttle = None
+        # A transfer that timed out keeps the phase of its deadline, so the timeout is counted by it
+        if self.socket_deadline is not None:
+            self.socket_deadline.stop()
+
+    def _lock_path(self, path: str, exclusive: bool):
+        """
+        Returns:
+            A context manager that holds the locks of an operation on a path of the user directory
+            (see `PathLocks.locked`), or does nothing if there are no path locks.
+        """
+        if self.path_locks is None:
+            return contextlib.nullcontext()
+        return self.path_locks.locked(path, exclusive, self.user_directory_path)
+
+    def _reserve_memory(self, size: int) -> bool:
+        """
+        Reserves bytes of the memory budget for the buffer of a transfer, if there is a budget.
+
+        Returns:
+            bool: True if the bytes were reserved (or there is no budget), False if the budget had no room for them.
+        """
+        return self.memory_budget is None or self.memory_budget.reserve(size)
+
+    def _release_memory(self, size: int) -> None:
+        """
+        Releases bytes that were reserved by `_reserve_memory`.
+        """
+        if self.memory_budget is not None:
+            self.memory_budget.release(size)
+
     def _create_response_header(self, response_code: int, error_code: int, response: bytes = b'') -> bytes:
         """
         Pack a response header for a new message.
@@ -79,57 +318,127 @@ class ServerHandler(RequestHandler):
         Returns:
             bytes: The packed response header.
         """
-        return struct.pack("III", response_code, error_code, len(response))
+        return message_codec.RESPONSE_HEADER.pack(response_code=response_code, error_code=error_code,
+                                                  response_len=len(response))
     
     def _handle_register_request(self, request: bytes) -> None:
         """
-        Handle a registration request.
+        Handle a registration request. The session stays open, so the client can log in on the same connection,
+        unless it sent too many registration requests.
 
         :param request (bytes): The request data containing registration information (username, password..).
         """
         username, password = dropbox_system.server.request_parser.parse_register_request(request)
+        if not self.attempt_limits.count_register_attempt(self.session):
+            self._close_session_after_too_many_attempts(self.REGISTER_RESPONE_CODE)
+            return
         try:
             self.database_communicator.create_new_user(username, password)
             user_directory_path = os.path.join(self.files_directory_path, username)
-            if not os.path.exists(user_directory_path):
-                os.mkdir(user_directory_path)
+            os.makedirs(user_directory_path, exist_ok=True)
             response_header = self._create_response_header(self.REGISTER_RESPONE_CODE, self.SUCCESS)
         except dropbox_system.server.db_communicator.UserAlreadyExistsException:
             response_header = self._create_response_header(self.REGISTER_RESPONE_CODE, self.USER_ALREADY_EXISTS)
 
         self.send_header(response_header)
-        self.should_exit = True
 
     def _handle_login_request(self, request: bytes) -> None:
         """
-        Handle a login request.
+        Handle a login request. After a failed login the session stays open, so the client can try again,
+        until it runs out of login attempts.
+        If the client asked for a session token (and tokens are enabled), a successful login is answered with one.
 
-        :param request (bytes): The request data containing login information (username, password).
+        :param request (bytes): The request data containing login information (username, password, request_token).
         """
-        username, password = dropbox_system.server.request_parser.parse_login_request(request)
-        if self.database_communicator.is_username_exists(username):
-            if self.database_communicator.is_password_correct(username, password):
-                response_header = self._create_response_header(self.LOGIN_RESPONSE_CODE, self.SUCCESS)
-                self.logged_in_user = username
-                self.user_directory_path = os.path.join(self.files_directory_path, self.logged_in_user)
-                if not os.path.exists(self.user_directory_path):
-                    os.mkdir(self.user_directory_path)
-
+        username, password, request_token = dropbox_system.server.request_parser.parse_login_request(request)
+        try:
+            is_password_correct = self.database_communicator.verify_credentials(username, password)
+            error_code = self.SUCCESS if is_password_correct else self.INCORRECT_PASSWORD
+        except dropbox_system.server.db_communicator.UserNotExistsException:
+            error_code = self.USER_NOT_EXISTS
+
+        if error_code == self.SUCCESS:
+            self._log_in(username)
+            if request_token and self.session_tokens is not None and self.session_tokens.enabled:
+                token, expires_at = self.session_tokens.issue(username)
+                response = message_codec.LOGIN_RESPONSE.pack(expires_at=expires_at, token=token)
+                response_header = self._create_response_header(self.LOGIN_RESPONSE_CODE, self.SUCCESS, response)
+                self.send_message(response_header, response)
             else:
-                response_header = self._create_response_header(self.LOGIN_RESPONSE_CODE, self.INCORRECT_PASSWORD)
-                self.should_exit = True
-        else:
-            response_header = self._create_response_header(self.LOGIN_RESPONSE_CODE, self.USER_NOT_EXISTS)
-            self.should_exit = True
-        
-        self.send_header(response_header)
+                self.send_header(self._create_response_header(self.LOGIN_RESPONSE_CODE, self.SUCCESS))
+            return
+
+        if not self.attempt_limits.count_failed_login(self.session):
+            self._close_session_after_too_many_attempts(self.LOGIN_RESPONSE_CODE)
+            return
+        self.send_header(self._create_response_header(self.LOGIN_RESPONSE_CODE, error_code))
 
-    def _write_file_content(self, file_path: str, file_content: bytes) -> None:
+    def _handle_resume_session_request(self, request: bytes) -> None:
         """
-        Write the content of a file to the specified path.
+        Handle a request to resume a session with the session token of a previous login. The token is verified by
+        its signature and expiry time only, so the users DB is not queried.
+        An invalid token counts as a failed login.
+
+        :param request (bytes): The request data containing the session token.
         """
-        with open(file_path, 'wb') as file:
-            file.write(file_content)
+        token = dropbox_system.server.request_parser.parse_resume_session_request(request)
+        username = self.session_tokens.verify(token) if self.session_tokens is not None else None
+        if username is not None:
+            self._log_in(username)
+            self.send_header(self._create_response_header(self.RESUME_SESSION_RESPONSE_CODE, self.SUCCESS))
+            return
+
+        if not self.attempt_limits.count_failed_login(self.session):
+            self._close_session_after_too_many_attempts(self.RESUME_SESSION_RESPONSE_CODE)
+            return
+        self.send_header(self._create_response_header(self.RESUME_SESSION_RESPONSE_CODE, self.INVALID_SESSION_TOKEN))
+
+    def _log_in(self, username: str) -> None:
+        """
+        Logs the session in as the given user.
+
+        :param username (str): The user to log in as.
+        """
+        self.logged_in_user = username
+        self.user_directory_path = os.path.join(self.files_directory_path, self.logged_in_user)
+        os.makedirs(self.user_directory_path, exist_ok=True)
+
+    def _close_session_after_too_many_attempts(self, response_code: int) -> None:
+        """
+        Answers the request that exceeded the attempt limits of the session with TOO_MANY_ATTEMPTS, and closes
+        the session.
+
+        :param response_code (int): The code of the response to the request.
+        """
+        print("Closing a session that ran out of login or registration attempts")
+        self.send_header(self._create_response_header(response_code, self.TOO_MANY_ATTEMPTS))
+        self.should_exit = True
+
+    def _write_file_content(self, file_path: str, file_len: int,
+                            content_compression: int = compression.COMPRESSION_NONE) -> None:
+        """
+        Receive the content of an uploaded file and write it to the specified path, chunk by chunk.
+        Raises ValueError if the content does not match the file length. If receiving the content fails for any
+        reason (invalid content, a timeout, or a connection that dropped), the partially written file is removed.
+        Raises FileExistsError if a file was created at the path meanwhile (by another session, possibly of another
+        server process), after receiving and discarding the content.
+        """
+        # The file is created exclusively, so concurrent uploads of the same file never write to the same file
+        try:
+            file = open(file_path, 'xb')
+        except FileExistsError:
+            with open(os.devnull, 'wb') as discarded_file:
+                self._transfer_file_content(self.receive_file_content, discarded_file, file_len, content_compression)
+            raise
+        try:
+            with file:
+                self._transfer_file_content(self.receive_file_content, file, file_len, content_compression)
+        except BaseException:
+            # A partially written file is removed, so it can be uploaded again
+            os.remove(file_path)
+            raise
+        if content_compression != compression.COMPRESSION_NONE:
+            print(f"Uploaded file {file_path} {self.last_compression_report}")
 
     def _handle_upload_file_request(self, request: bytes) -> None:
         """
@@ -137,7 +446,8 @@ class ServerHandler(RequestHandler):
 
         :param request (bytes): The request data containing relevant information for the upload operation.
         """
-        file_len, file_name, requested_dir = dropbox_system.server.request_parser.parse_upload_request(request)
+        file_len, file_name, requested_dir, requested_compression = \
+            dropbox_system.server.request_parser.parse_upload_request(request)
         requested_path = os.path.join(self.user_directory_path, requested_dir)
         file_path = os.path.join(requested_path, file_name)
 
@@ -146,21 +456,64 @@ class ServerHandler(RequestHandler):
             self.send_header(response_header)
             return
         
-        if not os.path.exists(requested_path):
-            response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.DIRECTORY_NOT_EXISTS)
-            self.send_header(response_header)
-            return
+        # The file is locked from the existence checks until it is stored, so the directory it is uploaded into is
+        # not removed meanwhile
+        with self._lock_path(file_path, exclusive=True):
+            if not os.path.exists(requested_path):
+                response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.DIRECTORY_NOT_EXISTS)
+                self.send_header(response_header)
+                return
+
+            if os.path.exists(file_path):
+                response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.FILE_ALREADY_EXISTS)
+                self.send_header(response_header)
+                return
+
+            # The client already sampled the file, so the requested codec is accepted if it is supported.
+            # The accepted codec is sent only if it is not COMPRESSION_NONE, since clients that do not compress
+            # uploads do not expect any response payload.
+            content_compression = requested_compression if compression.is_supported_compression(requested_compression) \
+                else compression.COMPRESSION_NONE
+            # The content is received into a single chunk buffer (compressed content is decompressed chunk by chunk)
+            buffer_size = self.chunk_size if content_compression != compression.COMPRESSION_NONE \
+                else min(self.chunk_size, file_len)
+            if not self._reserve_memory(buffer_size):
+                response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.INSUFFICIENT_MEMORY)
+                self.send_header(response_header)
+                return
+            try:
+                self._receive_uploaded_file(file_path, file_len, content_compression)
+            finally:
+                self._release_memory(buffer_size)
+
+    def _receive_uploaded_file(self, file_path: str, file_len: int, content_compression: int) -> None:
+        """
+        Tell the client to start uploading the content of a file, receive it and respond whether it was stored.
+
+        :param file_path (str): The path to store the file at.
+        :param file_len (int): The size of the file.
+        :param content_compression (int): The accepted codec of the content.
+        """
+        response = b''
+        if content_compression != compression.COMPRESSION_NONE:
+            response = message_codec.UPLOAD_FILE_RESPONSE.pack(compression=content_compression)
+        response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.START_UPLOADING_FILE, response)
+        self.send_message(response_header, response)
 
-        if os.path.exists(file_path):
+        try:
+            self._write_file_content(file_path, file_len, content_compression)
+        except FileExistsError:
             response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.FILE_ALREADY_EXISTS)
             self.send_header(response_header)
             return
-        
-        response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.START_UPLOADING_FILE)
-        self.send_header(response_header)
-
-        file_content = self.receive_bytes(file_len)
-        self._write_file_content(file_path, file_content)
+        except ValueError:
+            response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.INVALID_FILE_CONTENT)
+            self.send_header(response_header)
+            # The rest of the invalid content was not received, so a v1 connection can not be used anymore
+            # (a protocol v2 stream is closed after every request anyway)
+            if not isinstance(self.sock, StreamSocket):
+                self.should_exit = True
+            return
             
         response_header = self._create_response_header(self.UPLOAD_FILE_RESPONSE_CODE, self.SUCCESS)
         self.send_header(response_header)
@@ -179,13 +532,14 @@ class ServerHandler(RequestHandler):
             return
 
         full_path = os.path.join(self.user_directory_path, directory_name)
-        if os.path.exists(full_path):
-            response_header = self._create_response_header(self.CREATE_DIRECTORY_RESPONSE_CODE, self.DIRECTORY_ALREADY_EXISTS)
-            self.send_header(response_header)
-        else:
-            os.makedirs(full_path)
+        # The directory may be created concurrently by another session, so its existence is checked by creating it
+        try:
+            with self._lock_path(full_path, exclusive=True):
+                os.makedirs(full_path)
             response_header = self._create_response_header(self.CREATE_DIRECTORY_RESPONSE_CODE, self.SUCCESS)
-            self.send_header(response_header)
+        except FileExistsError:
+            response_header = self._create_response_header(self.CREATE_DIRECTORY_RESPONSE_CODE, self.DIRECTORY_ALREADY_EXISTS)
+        self.send_header(response_header)
     
     def _handle_download_file_request(self, request: bytes) -> None:
         """
@@ -193,7 +547,7 @@ class ServerHandler(RequestHandler):
 
         :param request (bytes): The request data containing relevant information for the download operation.
         """
-        file_name = dropbox_system.server.request_parser.parse_download_request(request)
+        file_name, requested_compression = dropbox_system.server.request_parser.parse_download_request(request)
 
         if self.logged_in_user is None:
             response_header = self._create_response_header(self.DOWNLOAD_FILE_RESPONSE_CODE, self.USER_NOT_LOGGED_IN)
@@ -201,7 +555,17 @@ class ServerHandler(RequestHandler):
             return
 
         file_path = os.path.join(self.user_directory_path, file_name)
+        # The file is locked until it is sent, so it is not removed or replaced meanwhile
+        with self._lock_path(file_path, exclusive=False):
+            self._send_downloaded_file(file_path, requested_compression)
+
+    def _send_downloaded_file(self, file_path: str, requested_compression: int) -> None:
+        """
+        Send the content of a downloaded file, or respond why it can not be downloaded.
 
+        :param file_path (str): The path of the file.
+        :param requested_compression (int): The codec the client asked the content to be compressed with.
+        """
         if not os.path.exists(file_path):
             response_header = self._create_response_header(self.DOWNLOAD_FILE_RESPONSE_CODE, self.FILE_NOT_EXISTS)
             self.send_header(response_header)
@@ -212,14 +576,33 @@ class ServerHandler(RequestHandler):
             self.send_header(response_header)
             return
 
-        with open(file_path, "rb") as file:
-            file_content = file.read()
-        file_length = len(file_content)
-        response = struct.pack("Q", file_length)
-        response_header = self._create_response_header(self.DOWNLOAD_FILE_RESPONSE_CODE, self.SUCCESS, response)
-        self.send_header(response_header)
-        self.send_data(response)
-        self.send_file_content(file_content, file_length)
+        try:
+            file = open(file_path, "rb")
+        except FileNotFoundError:
+            # The file was removed meanwhile by another session
+            response_header = self._create_response_header(self.DOWNLOAD_FILE_RESPONSE_CODE, self.FILE_NOT_EXISTS)
+            self.send_header(response_header)
+            return
+
+        with file:
+            file_length = os.fstat(file.fileno()).st_size
+            # The content is sent from a single chunk buffer, that grows up to MAX_CHUNK_SIZE with an adaptive chunk size
+            max_chunk_size = self.MAX_CHUNK_SIZE if self.adaptive_chunk_size is not None else self.chunk_size
+            buffer_size = min(max_chunk_size, file_length)
+            if not self._reserve_memory(buffer_size):
+                response_header = self._create_response_header(self.DOWNLOAD_FILE_RESPONSE_CODE, self.INSUFFICIENT_MEMORY)
+                self.send_header(response_header)
+                return
+            try:
+                content_compression = compression.choose_compression(file, requested_compression)
+                response = message_codec.DOWNLOAD_FILE_RESPONSE.pack(file_len=file_length, compression=content_compression)
+                response_header = self._create_response_header(self.DOWNLOAD_FILE_RESPONSE_CODE, self.SUCCESS, response)
+                self.send_message(response_header, response)
+                self._transfer_file_content(self.send_file, file, file_length, content_compression)
+            finally:
+                self._release_memory(buffer_size)
+            if content_compression != compression.COMPRESSION_NONE:
+                print(f"Downloaded file {file_path} {self.last_compression_report}")
 
     def _remove_file(self, file_path: str) -> None:
         """
@@ -229,14 +612,19 @@ class ServerHandler(RequestHandler):
         """
         file_path = os.path.join(self.user_directory_path, file_path)
 
-        if not os.path.exists(file_path):
-            response_header = self._create_response_header(self.REMOVE_FILE_RESPONSE_CODE, self.FILE_NOT_EXISTS)
-        elif os.path.isdir(file_path):
-            shutil.rmtree(file_path)
-            response_header = self._create_response_header(self.REMOVE_FILE_RESPONSE_CODE, self.SUCCESS)
-        else:
-            os.remove(file_path)
+        try:
+            # A removed directory is locked exclusively, so it waits for the operations on the paths inside it
+            with self._lock_path(file_path, exclusive=True):
+                if not os.path.exists(file_path):
+                    raise FileNotFoundError(file_path)
+                if os.path.isdir(file_path):
+                    shutil.rmtree(file_path)
+                else:
+                    os.remove(file_path)
             response_header = self._create_response_header(self.REMOVE_FILE_RESPONSE_CODE, self.SUCCESS)
+        except FileNotFoundError:
+            # Also raised when the file is removed meanwhile by another session
+            response_header = self._create_response_header(self.REMOVE_FILE_RESPONSE_CODE, self.FILE_NOT_EXISTS)
 
         self.send_header(response_header)
 
@@ -255,6 +643,21 @@ class ServerHandler(RequestHandler):
 
         self._remove_file(file_name)
 
+    def _handle_protocol_negotiation_request(self, request: bytes) -> None:
+        """
+        Handle a protocol negotiation request. The highest protocol version supported by both sides is chosen,
+        and the rest of the connection is handled with it.
+
+        :params request (bytes): The request data containing the highest protocol version the client supports.
+        """
+        requested_version, = message_codec.PROTOCOL_NEGOTIATION_REQUEST.unpack(request)
+        protocol_version = max(self.PROTOCOL_VERSION_1, min(requested_version, self.SUPPORTED_PROTOCOL_VERSION))
+
+        response = message_codec.PROTOCOL_NEGOTIATION_RESPONSE.pack(protocol_version=protocol_version)
+        response_header = self._create_response_header(self.PROTOCOL_NEGOTIATION_RESPONSE_CODE, self.SUCCESS, response)
+        self.send_message(response_header, response)
+        self.protocol_version = protocol_version
+
     def _handle_quit_session_request(self, request: bytes) -> None:
         """
         Handle a request to quit the user session.
@@ -278,15 +681,14 @@ class ServerHandler(RequestHandler):
         
         all_items = []
 
-        for root, dirs, files in os.walk(self.user_directory_path):
-            for name in dirs + files:
-                relative_path = os.path.relpath(os.path.join(root, name), self.user_directory_path)
-                all_items.append(relative_path)
+        with self._lock_path(self.user_directory_path, exclusive=False):
+            for root, dirs, files in os.walk(self.user_directory_path):
+                for name in dirs + files:
+                    relative_path = os.path.relpath(os.path.join(root, name), self.user_directory_path)
+                    all_items.append(relative_path)
 
         dir_list = " , ".join(all_items)
-        dir_list_len = len(dir_list)
 
-        response = struct.pack("I", dir_list_len) + dir_list.encode()
+        response = message_codec.LIST_FILES_RESPONSE.pack(files_list=dir_list.encode())
         response_header = self._create_response_header(self.LIST_FILES_RESPONSE_CODE, self.SUCCESS, response)
-        self.send_header(response_header)
-        self.send_data(response)
+        self.send_message(response_header, response)
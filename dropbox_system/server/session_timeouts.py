@@ -0,0 +1,179 @@
+"""
+This module implements the timeouts of client sessions, so sessions of dead or slow peers do not hold a server
+thread (and its buffers) forever:
+- Idle timeout - the time a session may wait for the next request to start.
+- Header timeout - the time a request header and its payload may take to arrive, once the request started
+  (so a client that trickles a request byte by byte is disconnected).
+- Minimal transfer rate - file content must be transferred at least at this rate, measured over windows of
+  a few seconds (so a slow upload or download of a huge file can not stall forever).
+
+A session that times out is closed, and counted by the kind of its timeout.
+"""
+
+import threading
+import time
+
+
+class TimeoutCounters:
+    """
+    This class counts the sessions that were closed by each kind of timeout. All the methods are thread safe.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes all counters to zero.
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sets all counters to zero.
+        """
+        with self._lock:
+            self.idle_timeouts = 0
+            self.header_timeouts = 0
+            self.transfer_timeouts = 0
+
+    def count_timeout(self, phase: str) -> None:
+        """
+        Counts a session that was closed by a timeout.
+
+        :param phase (str): The phase of the session that timed out (SocketDeadline.IDLE, HEADER or TRANSFER).
+        """
+        with self._lock:
+            setattr(self, f"{phase}_timeouts", getattr(self, f"{phase}_timeouts") + 1)
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: All the counters, mapped by their names.
+        """
+        with self._lock:
+            return {name: value for name, value in vars(self).items() if not name.startswith("_")}
+
+
+class SessionTimeouts:
+    """
+    The timeouts of the sessions of a server, and the counters of the sessions that timed out.
+    A timeout of None (or 0) is disabled.
+    """
+    DEFAULT_IDLE_TIMEOUT = 600
+    DEFAULT_HEADER_TIMEOUT = 30
+    # In bytes per second, measured over windows of DEFAULT_TRANSFER_WINDOW seconds
+    DEFAULT_MIN_TRANSFER_RATE = 1024
+    DEFAULT_TRANSFER_WINDOW = 30
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, header_timeout: float = DEFAULT_HEADER_TIMEOUT,
+                 min_transfer_rate: float = DEFAULT_MIN_TRANSFER_RATE,
+                 transfer_window: float = DEFAULT_TRANSFER_WINDOW) -> None:
+        """
+        Initializes the timeouts.
+
+        :param idle_timeout (float): The time (in seconds) a session may wait for its next request.
+        :param header_timeout (float): The time (in seconds) a request header and payload may take to arrive, from
+                                       the first received byte of the request.
+        :param min_transfer_rate (float): The minimal rate (in bytes per second) file content is transferred at.
+        :param transfer_window (float): The time (in seconds) the transfer rate is measured over.
+        """
+        self.idle_timeout = idle_timeout or None
+        self.header_timeout = header_timeout or None
+        self.min_transfer_rate = min_transfer_rate or None
+        self.transfer_window = transfer_window
+        self.counters = TimeoutCounters()
+
+    def new_deadline(self) -> "SocketDeadline":
+        """
+        Returns:
+            SocketDeadline: A deadline for the socket operations of a new session.
+        """
+        return SocketDeadline(self)
+
+
+class SocketDeadline:
+    """
+    Limits the time of the socket operations of a single session, by the phase the session is in.
+    A RequestHandler applies it (see `RequestHandler.socket_deadline`) - it sets the socket timeout before every
+    socket operation to get_timeout(), and reports the transferred bytes to record() after it.
+    """
+    IDLE = "idle"
+    HEADER = "header"
+    TRANSFER = "transfer"
+
+    def __init__(self, timeouts: SessionTimeouts) -> None:
+        """
+        Initializes a deadline with no time limit, until a phase starts.
+
+        :param timeouts (SessionTimeouts): The timeouts of the server.
+        """
+        self.timeouts = timeouts
+        self.phase = None
+        self.deadline = None
+        self._window_bytes = 0
+
+    def _expire_in(self, timeout: float) -> None:
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def expect_request(self) -> None:
+        """
+        Starts waiting for the next request (the idle phase). Once its first bytes are received,
+        the rest of the request is limited by the header timeout.
+        """
+        self.phase = self.IDLE
+        self._expire_in(self.timeouts.idle_timeout)
+
+    def start_transfer(self) -> None:
+        """
+        Starts transferring file content - every window must transfer at least min_transfer_rate bytes per second.
+        """
+        self.phase = self.TRANSFER
+        self._window_bytes = 0
+        self._expire_in(self.timeouts.transfer_window if self.timeouts.min_transfer_rate else None)
+
+    def stop(self) -> None:
+        """
+        Removes the time limit (while the server handles a request).
+        """
+        self.phase = None
+        self.deadline = None
+
+    def get_timeout(self, size: int = 0) -> float:
+        """
+        Raises TimeoutError if the deadline already passed.
+
+        :param size (int): The size of a send operation that only returns once all of the data is sent. Such an
+                           operation gets enough time to send the data at the minimal transfer rate.
+
+        Returns:
+            float: The timeout of the next socket operation, in seconds (None for no timeout).
+        """
+        if self.deadline is None:
+            return None
+        timeout = self.deadline - time.monotonic()
+        if self.phase == self.TRANSFER and size:
+            timeout = max(timeout, size / self.timeouts.min_transfer_rate)
+        if timeout <= 0:
+            raise TimeoutError(f"The session timed out in the {self.phase} phase")
+        return timeout
+
+    def record(self, transferred: int) -> None:
+        """
+        Records the bytes transferred by a socket operation.
+
+        :param transferred (int): The number of transferred bytes.
+        """
+        if self.phase == self.IDLE and transferred:
+            self.phase = self.HEADER
+            self._expire_in(self.timeouts.header_timeout)
+        elif self.phase == self.TRANSFER and self.deadline is not None:
+            self._window_bytes += transferred
+            # Once the window transferred enough bytes, the next window starts
+            if self._window_bytes >= self.timeouts.min_transfer_rate * self.timeouts.transfer_window:
+                self._window_bytes = 0
+                self._expire_in(self.timeouts.transfer_window)
+
+    def count_timeout(self) -> None:
+        """
+        Counts a timeout of the current phase.
+        """
+        self.timeouts.counters.count_timeout(self.phase)
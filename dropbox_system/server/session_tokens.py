@@ -0,0 +1,113 @@
+"""
+This module implements signed session tokens - a client that logged in may ask for a token, and resume its
+authenticated session on other connections with it (parallel connections, or a reconnect after a network blip),
+without sending its credentials again and without a query of the users DB.
+
+A token holds the username and the expiry time of the session, signed with an HMAC-SHA256 of a secret of the server
+(the token is opaque to the client). A token is valid until it expires, even if the user is removed meanwhile.
+The server processes of a multi-process server share the secret, so a token resumes the session on any of them.
+"""
+
+import hashlib
+import hmac
+import os
+import struct
+import threading
+import time
+
+from dropbox_system.common import message_codec
+
+# The signed part of a token, followed by its signature
+SESSION_TOKEN_PAYLOAD = message_codec.MessageCodec(("expires_at", "Q"), ("username_len", "I"),
+                                                   ("username", message_codec.TEXT))
+
+
+class SessionTokens:
+    """
+    Issues and verifies the session tokens of a server. All the methods are thread safe.
+    """
+    DEFAULT_LIFETIME = 60 * 60
+    SECRET_SIZE = 32
+    SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+    def __init__(self, lifetime: float = DEFAULT_LIFETIME, secret: bytes = None) -> None:
+        """
+        Initializes the tokens of a server.
+
+        :param lifetime (float): The time (in seconds) a token is valid for, from the login it was issued on.
+                                 None (or 0) disables the tokens - no token is issued, and no session is resumed.
+        :param secret (bytes): The key tokens are signed with. Default is a new random secret, so the tokens of
+                               the server are not valid after it restarts.
+        """
+        self.lifetime = lifetime or None
+        self._secret = secret if secret is not None else os.urandom(self.SECRET_SIZE)
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.resumed = 0
+        self.expired = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.lifetime is not None
+
+    def _sign(self, payload: bytes) -> bytes:
+        """
+        Returns:
+            bytes: The signature of the given token payload.
+        """
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    def issue(self, username: str) -> tuple:
+        """
+        Issues a token of a session of the given user.
+
+        :param username (str): The user that logged in.
+
+        Returns:
+            tuple: The token (bytes), and its expiry time (int, in seconds since the epoch).
+        """
+        expires_at = int(time.time() + self.lifetime)
+        payload = SESSION_TOKEN_PAYLOAD.pack(expires_at=expires_at, username=username)
+        with self._lock:
+            self.issued += 1
+        return payload + self._sign(payload), expires_at
+
+    def verify(self, token: bytes) -> str:
+        """
+        Verifies the signature and the expiry time of a token.
+
+        :param token (bytes): The token the client sent.
+
+        Returns:
+            str: The user of the session of the token, or None if the token is invalid or expired.
+        """
+        payload, signature = token[:-self.SIGNATURE_SIZE], token[-self.SIGNATURE_SIZE:]
+        if not self.enabled or len(token) <= self.SIGNATURE_SIZE or \
+                not hmac.compare_digest(signature, self._sign(payload)):
+            return self._count("rejected")
+        try:
+            expires_at, username = SESSION_TOKEN_PAYLOAD.unpack(payload)
+        except (struct.error, UnicodeDecodeError):
+            return self._count("rejected")
+        if expires_at <= time.time():
+            return self._count("expired")
+        self._count("resumed")
+        return username
+
+    def _count(self, counter: str) -> None:
+        """
+        Increments one of the counters of the tokens.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: The lifetime of the tokens, and the number of tokens that were issued, resumed a session, expired
+                  and were rejected.
+        """
+        with self._lock:
+            return {"lifetime": self.lifetime, "issued": self.issued, "resumed": self.resumed,
+                    "expired": self.expired, "rejected": self.rejected}
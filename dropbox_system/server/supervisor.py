@@ -0,0 +1,102 @@
+"""
+This module implements the multi-process mode of the server - a supervisor process that forks worker processes,
+each running its own server on the same TCP port (bound with SO_REUSEPORT, so the kernel balances the incoming
+connections between them). Every process has its own GIL, so the XOR encryption, the parsing and the hashing of the
+transfers scale with the number of cores.
+
+The worker processes share the users DB (SQLite locks the database file between processes) and the user files tree
+(whose files and directories are created exclusively, so concurrent sessions never overwrite each other).
+The supervisor restarts every worker process that dies.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import signal
+import sys
+import time
+
+
+class Supervisor:
+    """
+    A supervisor of the worker processes of a multi-process server.
+    """
+    # A worker that dies sooner than MIN_WORKER_UPTIME seconds after it was started (such as a worker that fails
+    # to bind) is restarted after RESTART_DELAY seconds, so a failing worker is not restarted in a busy loop
+    MIN_WORKER_UPTIME = 1
+    RESTART_DELAY = 1
+
+    def __init__(self, create_server, processes: int) -> None:
+        """
+        Initializes the supervisor. The worker processes are started by `start`.
+
+        :param create_server (callable): A function that creates the server of a worker process (called in the worker
+                                         process, after it was forked). The server must bind its TCP port with
+                                         SO_REUSEPORT.
+        :param processes (int): The number of worker processes.
+        """
+        self.create_server = create_server
+        self.processes = processes
+        self.restarts = 0
+        # The worker processes are forked, so the server factory does not have to be picklable
+        self._context = multiprocessing.get_context("fork")
+        self._workers = {}
+
+    def start(self) -> None:
+        """
+        Starts the worker processes, and keeps restarting every worker that dies until the supervisor is stopped
+        (with SIGINT or SIGTERM). Then stops all the workers.
+        """
+        signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+        print(f"Supervisor is starting {self.processes} worker processes...")
+        try:
+            for worker_index in range(self.processes):
+                self._start_worker(worker_index)
+            while True:
+                self._restart_dead_workers()
+        except KeyboardInterrupt:
+            print("Supervisor is shutting down...")
+        finally:
+            self._stop_workers()
+
+    def _start_worker(self, worker_index: int) -> None:
+        """
+        Starts the worker process of the given index.
+        """
+        worker = self._context.Process(target=self._run_worker, name=f"server-worker-{worker_index}", daemon=True)
+        worker.start()
+        self._workers[worker_index] = (worker, time.monotonic())
+
+    def _run_worker(self) -> None:
+        """
+        Runs the server of a worker process. Exits with status 1 if the server failed to bind.
+        """
+        server_instance = self.create_server()
+        if not server_instance.is_initialized:
+            sys.exit(1)
+        server_instance.start()
+
+    def _restart_dead_workers(self) -> None:
+        """
+        Waits until at least one worker process dies, and restarts the workers that died.
+        """
+        sentinels = {worker.sentinel: worker_index for worker_index, (worker, _) in self._workers.items()}
+        for sentinel in multiprocessing.connection.wait(list(sentinels)):
+            worker_index = sentinels[sentinel]
+            worker, start_time = self._workers[worker_index]
+            worker.join()
+            print(f"Worker process {worker.pid} exited with status {worker.exitcode}, restarting it")
+            if time.monotonic() - start_time < self.MIN_WORKER_UPTIME:
+                time.sleep(self.RESTART_DELAY)
+            self.restarts += 1
+            self._start_worker(worker_index)
+
+    def _stop_workers(self) -> None:
+        """
+        Terminates all the worker processes and waits for them to exit.
+        """
+        for worker, _ in self._workers.values():
+            if worker.is_alive():
+                worker.terminate()
+        for worker, _ in self._workers.values():
+            worker.join()
+        print("All worker processes stopped.")
@@ -0,0 +1,171 @@
+"""
+An admin tool of the users DB of the server, for provisioning many users at once (without registering every one of
+them on a connection of its own) and for exporting the users.
+
+Users files are CSV files with a `username,password` header, or JSONL files with a
+`{"username": ..., "password": ...}` object in every line (the format is chosen by the extension of the file,
+unless --format is given).
+- import - inserts the users of the file in large transactions, skipping users that already exist, and creates
+  their directories of files. Invalid lines are reported and skipped.
+- export - writes all the users to the file ('-' for the standard output), reading the users DB in batches.
+
+The tool may run while the server runs - server processes see an imported user once the credential cache entry of
+its username expires.
+
+Usage:
+    python3 -m dropbox_system.server.users_admin {import,export} <users_file> [--format csv|jsonl] [--shards N]
+                                                 [--batch-size N]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+from dropbox_system.server.server import Server
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ("username", "password")
+
+
+def get_file_format(users_file_path: str, file_format: str = None) -> str:
+    """
+    Returns:
+        str: The given format, or the format of the extension of the users file (CSV unless it is a JSONL file).
+    """
+    if file_format is not None:
+        return file_format
+    return "jsonl" if os.path.splitext(users_file_path)[1].lower() in (".jsonl", ".json") else "csv"
+
+def is_valid_username(username) -> bool:
+    """
+    Returns:
+        bool: True if the username is a non empty string that is a valid name of a directory of files
+              (a single path component).
+    """
+    return isinstance(username, str) and username not in ("", ".", "..") and \
+        not any(separator in username for separator in ("/", os.sep, "\0"))
+
+def read_users(users_file, file_format: str):
+    """
+    Reads the users of a users file lazily, skipping (and reporting) invalid lines.
+
+    :param users_file (file): The users file, opened for reading text.
+    :param file_format (str): The format of the file (one of FORMATS).
+
+    Yields:
+        tuple: The username and the password of every valid user.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(users_file)
+        if reader.fieldnames is None or not set(FIELDS).issubset(reader.fieldnames):
+            raise ValueError(f"The CSV file must have a header with the fields: {', '.join(FIELDS)}")
+        lines = ((reader.line_num, row) for row in reader)
+    else:
+        lines = ((line_number, line) for line_number, line in enumerate(users_file, start=1) if line.strip())
+
+    for line_number, line in lines:
+        try:
+            user = line if file_format == "csv" else json.loads(line)
+            username, password = user["username"], user["password"]
+        except (ValueError, TypeError, KeyError):
+            print(f"Skipping line {line_number}: not a user", file=sys.stderr)
+            continue
+        if not is_valid_username(username) or not isinstance(password, str) or not password:
+            print(f"Skipping line {line_number}: invalid username or password", file=sys.stderr)
+            continue
+        yield username, password
+
+def import_users(database_communicator: DataBaseCommunicator, users_file_path: str, file_format: str,
+                 files_directory_path: str, batch_size: int = DataBaseCommunicator.DEFAULT_BATCH_SIZE) -> tuple:
+    """
+    Creates the users of a users file, and their directories of files.
+
+    :param database_communicator (DataBaseCommunicator): The users DB.
+    :param users_file_path (str): The path of the users file.
+    :param file_format (str): The format of the file (one of FORMATS).
+    :param files_directory_path (str): The directory the directories of the users files are in.
+    :param batch_size (int): The number of users inserted in a single transaction.
+
+    Returns:
+        tuple: The number of valid users in the file, and the number of them that were created (the others exist).
+    """
+    valid_users = 0
+
+    def create_user_directories(users):
+        nonlocal valid_users
+        for username, password in users:
+            valid_users += 1
+            os.makedirs(os.path.join(files_directory_path, username), exist_ok=True)
+            yield username, password
+
+    with open(users_file_path, newline="") as users_file:
+        created_users = database_communicator.create_new_users(
+            create_user_directories(read_users(users_file, file_format)), batch_size)
+    return valid_users, created_users
+
+def export_users(database_communicator: DataBaseCommunicator, users_file, file_format: str,
+                 batch_size: int = DataBaseCommunicator.DEFAULT_BATCH_SIZE) -> int:
+    """
+    Writes all the users of the users DB to a users file.
+
+    :param database_communicator (DataBaseCommunicator): The users DB.
+    :param users_file (file): The users file, opened for writing text.
+    :param file_format (str): The format of the file (one of FORMATS).
+    :param batch_size (int): The number of users read from the users DB at once.
+
+    Returns:
+        int: The number of exported users.
+    """
+    users = database_communicator.iterate_users(batch_size)
+    if file_format == "csv":
+        writer = csv.writer(users_file)
+        writer.writerow(FIELDS)
+        exported_users = 0
+        for user in users:
+            writer.writerow(user)
+            exported_users += 1
+        return exported_users
+
+    exported_users = 0
+    for username, password in users:
+        users_file.write(json.dumps({"username": username, "password": password}) + "\n")
+        exported_users += 1
+    return exported_users
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the command of the tool."""
+    parser = argparse.ArgumentParser(description="Import users to the users DB, or export them")
+    parser.add_argument('command', choices=["import", "export"], help="Import users from the file, or export to it")
+    parser.add_argument('users_file', type=str, help="Path of the users file ('-' exports to the standard output)")
+    parser.add_argument('--format', '-f', choices=FORMATS, help="Format of the users file (default is by extension)")
+    parser.add_argument('--batch-size', '-b', type=int, default=DataBaseCommunicator.DEFAULT_BATCH_SIZE,
+                        help="Number of users inserted in a single transaction (or read at once on export)")
+    parser.add_argument('--shards', '-s', type=int, default=1,
+                        help="Number of files the users DB is sharded across (the --db-shards of the server)")
+    parser.add_argument('--files-directory', type=str,
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), Server.FILES_DIRECTORY_NAME),
+                        help="Directory the imported users directories of files are created in")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    file_format = get_file_format(args.users_file, args.format)
+    DataBaseCommunicator.configure(args.shards)
+    database_communicator = DataBaseCommunicator()
+    start_time = time.perf_counter()
+    if args.command == "import":
+        valid_users, created_users = import_users(database_communicator, args.users_file, file_format,
+                                                  args.files_directory, args.batch_size)
+        print(f"Imported {created_users} users ({valid_users - created_users} already exist) "
+              f"in {time.perf_counter() - start_time:.2f} seconds")
+    elif args.users_file == "-":
+        export_users(database_communicator, sys.stdout, file_format, args.batch_size)
+    else:
+        with open(args.users_file, "w", newline="") as users_file:
+            exported_users = export_users(database_communicator, users_file, file_format, args.batch_size)
+        print(f"Exported {exported_users} users in {time.perf_counter() - start_time:.2f} seconds")
+    database_communicator.close()
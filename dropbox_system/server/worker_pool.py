@@ -0,0 +1,172 @@
+"""
+This module implements the worker pool the server handles its client sessions on - a fixed number of worker threads
+and a bounded queue of sessions that wait for a free worker.
+
+When the queue is full, new sessions are rejected instead of queued (the server answers them with the SERVER_BUSY
+error code), so a burst of connections cannot exhaust the server's memory or make the latency of the admitted
+sessions worse. The pool measures its queue depth, the time sessions wait in the queue and the rejected sessions,
+so the number of workers and the queue size can be sized for the load.
+"""
+
+import queue
+import threading
+import time
+
+
+class WorkerPoolMetrics:
+    """
+    This class measures the wait queue of a worker pool. All the methods are thread safe.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes all metrics to zero.
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sets all metrics to zero.
+        """
+        with self._lock:
+            self.queue_depth = 0
+            self.peak_queue_depth = 0
+            self.busy_workers = 0
+            self.queued = 0
+            self.started = 0
+            self.rejected = 0
+            self.total_wait_time = 0.0
+            self.max_wait_time = 0.0
+
+    def count_queued(self, queue_depth: int) -> None:
+        """
+        Counts a session that was added to the queue.
+
+        :param queue_depth (int): The number of sessions in the queue, after the session was added.
+        """
+        with self._lock:
+            self.queued += 1
+            self.queue_depth = queue_depth
+            self.peak_queue_depth = max(self.peak_queue_depth, queue_depth)
+
+    def count_rejection(self) -> None:
+        """
+        Counts a session that was rejected, since the queue was full.
+        """
+        with self._lock:
+            self.rejected += 1
+
+    def count_started(self, wait_time: float, queue_depth: int) -> None:
+        """
+        Counts a session that was taken from the queue by a worker.
+
+        :param wait_time (float): The time the session waited in the queue, in seconds.
+        :param queue_depth (int): The number of sessions in the queue, after the session was taken.
+        """
+        with self._lock:
+            self.started += 1
+            self.queue_depth = queue_depth
+            self.busy_workers += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def count_finished(self) -> None:
+        """
+        Counts a session whose worker finished handling it.
+        """
+        with self._lock:
+            self.busy_workers -= 1
+
+    @property
+    def average_wait_time(self) -> float:
+        """
+        Returns:
+            float: The average time sessions waited in the queue before a worker took them, in seconds.
+        """
+        return self.total_wait_time / self.started if self.started else 0.0
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: All the metrics, mapped by their names.
+        """
+        with self._lock:
+            metrics = {name: value for name, value in vars(self).items() if not name.startswith("_")}
+            metrics["average_wait_time"] = self.average_wait_time
+        return metrics
+
+
+class WorkerPool:
+    """
+    A fixed number of worker threads that handle the submitted items, with a bounded queue of items
+    that wait for a free worker.
+    """
+    # The bounds of the retry-after hint given to rejected sessions, in seconds
+    MIN_RETRY_AFTER = 0.5
+    MAX_RETRY_AFTER = 30.0
+
+    def __init__(self, handle, workers: int, queue_size: int) -> None:
+        """
+        Initializes the pool. The workers are started by `start`.
+
+        :param handle (callable): The function the workers call with every submitted item.
+        :param workers (int): The number of worker threads.
+        :param queue_size (int): The maximal number of items that wait for a free worker.
+        """
+        if workers < 1 or queue_size < 1:
+            raise ValueError("A worker pool requires at least one worker and room for one queued item")
+        self.handle = handle
+        self.workers = workers
+        self.queue_size = queue_size
+        self.metrics = WorkerPoolMetrics()
+        self._queue = queue.Queue(queue_size)
+        self._threads = []
+
+    def start(self) -> None:
+        """
+        Starts the worker threads. They are daemon threads, so they do not keep a stopped server alive.
+        """
+        for _ in range(self.workers - len(self._threads)):
+            worker_thread = threading.Thread(target=self._work, daemon=True)
+            worker_thread.start()
+            self._threads.append(worker_thread)
+
+    def submit(self, item) -> bool:
+        """
+        Queues an item for the next free worker, unless the queue is full.
+
+        :param item: The item to handle.
+
+        Returns:
+            bool: True if the item was queued, False if it was rejected.
+        """
+        try:
+            self._queue.put_nowait((item, time.perf_counter()))
+        except queue.Full:
+            self.metrics.count_rejection()
+            return False
+        self.metrics.count_queued(self._queue.qsize())
+        return True
+
+    def get_retry_after(self) -> float:
+        """
+        Returns:
+            float: The time a rejected session should wait before it retries, in seconds - the average time
+                   admitted sessions waited in the queue, within MIN_RETRY_AFTER and MAX_RETRY_AFTER.
+        """
+        return min(max(self.metrics.average_wait_time, self.MIN_RETRY_AFTER), self.MAX_RETRY_AFTER)
+
+    def _work(self) -> None:
+        """
+        Handles the queued items, one at a time, forever.
+        """
+        while True:
+            item, queued_time = self._queue.get()
+            self.metrics.count_started(time.perf_counter() - queued_time, self._queue.qsize())
+            try:
+                self.handle(item)
+            except Exception as e:
+                print(f"Failed handling a client - {e!r}")
+            finally:
+                self.metrics.count_finished()
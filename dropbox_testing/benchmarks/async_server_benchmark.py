@@ -0,0 +1,113 @@
+"""
+Compares the thread per connection engine of the server with the asyncio engine, with many concurrent clients:
+- The threads and the memory (RSS) the server process holds for the connections.
+- The requests per second the server handles when every client sends LIST requests back to back.
+
+The server runs in a subprocess (python3 -m dropbox_system.server.server), and its threads and memory are read from
+/proc, so the benchmark runs on Linux only. Opening 10k connections requires a high enough open files limit -
+every connection takes a socket on each side, and a database connection (the users DB file) on the server side.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.async_server_benchmark [--clients 1000 10000] [--duration SECONDS]
+"""
+
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+
+from dropbox_system.common import message_codec
+from dropbox_system.common.request_handler import RequestHandler
+
+HOST = "127.0.0.1"
+# The server listens with a backlog of 60, so the clients connect in batches that fit in it
+CONNECT_BATCH_SIZE = 50
+LIST_REQUEST = message_codec.REQUEST_HEADER.pack(request_code=RequestHandler.LIST_FILES_REQUEST_CODE, request_len=0)
+
+
+def read_process_status(pid: int) -> dict:
+    """
+    Returns:
+        dict: The fields of /proc/<pid>/status.
+    """
+    with open(f"/proc/{pid}/status") as status_file:
+        return dict(line.split(":", 1) for line in status_file)
+
+def start_server(engine: str, port: int) -> subprocess.Popen:
+    """
+    Starts a server subprocess with the given engine, and waits until it listens.
+    """
+    server_process = subprocess.Popen([sys.executable, "-m", "dropbox_system.server.server", "--engine", engine,
+                                       "--port", str(port)], stdout=subprocess.DEVNULL)
+    time.sleep(2)
+    return server_process
+
+async def send_requests(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, end_time: float) -> int:
+    """
+    Sends LIST requests on a connection until end_time, waiting for every response before sending the next request.
+
+    Returns:
+        int: The number of completed requests.
+    """
+    completed_requests = 0
+    while time.perf_counter() < end_time:
+        writer.write(LIST_REQUEST)
+        # The client is not logged in, so the response is a header only
+        await reader.readexactly(message_codec.RESPONSE_HEADER.size)
+        completed_requests += 1
+    return completed_requests
+
+async def measure(engine: str, port: int, number_of_clients: int, duration: float) -> None:
+    """
+    Connects the clients to a server with the given engine, and prints the measurements.
+    """
+    server_process = start_server(engine, port)
+    idle_status = read_process_status(server_process.pid)
+    connections = []
+    try:
+        for batch_start in range(0, number_of_clients, CONNECT_BATCH_SIZE):
+            batch_size = min(CONNECT_BATCH_SIZE, number_of_clients - batch_start)
+            connections += await asyncio.gather(*[asyncio.open_connection(HOST, port) for _ in range(batch_size)])
+        # Let the server finish setting up the accepted connections
+        await asyncio.sleep(1)
+        connected_status = read_process_status(server_process.pid)
+
+        end_time = time.perf_counter() + duration
+        completed_requests = await asyncio.gather(*[send_requests(reader, writer, end_time)
+                                                    for reader, writer in connections])
+        loaded_status = read_process_status(server_process.pid)
+        print(f"{engine:<8} {number_of_clients:>6} clients  "
+              f"threads {int(connected_status['Threads']):>6} (under load {int(loaded_status['Threads'])})  "
+              f"RSS {int(connected_status['VmRSS'].split()[0]) / 1024:>8.1f} MB "
+              f"(no clients {int(idle_status['VmRSS'].split()[0]) / 1024:.1f} MB)  "
+              f"{sum(completed_requests) / duration:>9.0f} requests/s")
+    except (OSError, asyncio.IncompleteReadError) as e:
+        print(f"{engine:<8} {number_of_clients:>6} clients  failed - {e!r}")
+    finally:
+        for _, writer in connections:
+            writer.close()
+        server_process.kill()
+        server_process.wait()
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Compare the thread per connection and the asyncio server engines")
+    parser.add_argument('--clients', '-n', type=int, nargs="+", default=[1000, 10000],
+                        help="Numbers of concurrent clients to measure")
+    parser.add_argument('--duration', '-d', type=float, default=5, help="Duration of every measurement in seconds")
+    parser.add_argument('--port', '-p', type=int, default=8090, help="Port of the first benchmarked server")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    # Every connection takes a file descriptor on each side
+    _, open_files_hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (open_files_hard_limit, open_files_hard_limit))
+    port = args.port
+    for number_of_clients in args.clients:
+        for engine in ["threads", "asyncio"]:
+            asyncio.run(measure(engine, port, number_of_clients, args.duration))
+            # The port of the previous server may still be in TIME_WAIT
+            port += 1
@@ -0,0 +1,137 @@
+"""
+Measures how the download throughput of the server scales with the number of worker processes
+(python3 -m dropbox_system.server.server --processes N), against a single process server.
+
+Every client runs in its own process (so the clients are not limited by a single GIL either), logs in, uploads a file
+and keeps downloading it until the end of the measurement. The throughput only scales up to the number of cores of
+the host, which are shared by the server and the clients.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.multi_process_benchmark [--processes 1 2 4] [--clients CLIENTS]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.common import message_codec
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+import dropbox_system.server.server as server
+from dropbox_testing.benchmarks.transfer_benchmark import NullFile
+
+HOST = "127.0.0.1"
+PASSWORD = "Benchmark1!"
+
+
+def start_server(port: int, processes: int) -> subprocess.Popen:
+    """
+    Starts a server subprocess with the given number of worker processes (0 for a single process server),
+    and waits until it listens.
+    """
+    command = [sys.executable, "-m", "dropbox_system.server.server", "--port", str(port)]
+    if processes:
+        command += ["--processes", str(processes)]
+    server_process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    time.sleep(2)
+    return server_process
+
+def get_username(port: int, client_index: int) -> str:
+    """
+    Returns:
+        str: The username of a benchmark client.
+    """
+    return f"multi_process_benchmark_{port}_{client_index}"
+
+def remove_users(port: int, number_of_clients: int) -> None:
+    """
+    Removes the users of the benchmark clients and their files.
+    """
+    database_communicator = DataBaseCommunicator()
+    files_directory_path = os.path.join(os.path.dirname(os.path.abspath(server.__file__)),
+                                        server.Server.FILES_DIRECTORY_NAME)
+    for client_index in range(number_of_clients):
+        username = get_username(port, client_index)
+        if database_communicator.is_username_exists(username):
+            database_communicator.remove_username(username)
+        shutil.rmtree(os.path.join(files_directory_path, username), ignore_errors=True)
+
+def log_in(port: int, username: str) -> ClientHandler:
+    """
+    Connects to the server, registers a new user and logs in with it on the same connection.
+
+    Returns:
+        ClientHandler: The handler of the connection.
+    """
+    handler = ClientHandler(socket.create_connection((HOST, port)))
+    request = message_codec.LOGIN_REQUEST.pack(username=username, password=PASSWORD)
+    handler._send_first_request(ClientHandler.REGISTER_REQUEST_CODE, request)
+    handler._send_first_request(ClientHandler.LOGIN_REQUEST_CODE, request)
+    return handler
+
+def run_client(port: int, client_index: int, file_size: int, duration: float) -> int:
+    """
+    Logs in, uploads a file and keeps downloading it for the given duration.
+
+    Returns:
+        int: The number of downloaded bytes.
+    """
+    handler = log_in(port, get_username(port, client_index))
+
+    file_name = "benchmark_file"
+    request = message_codec.UPLOAD_FILE_REQUEST.pack(file_len=file_size, file_name=file_name, requested_dir="")
+    handler._send_request(ClientHandler.UPLOAD_FILE_REQUEST_CODE, request)
+    handler._parse_response_header()
+    handler.send_file_content(os.urandom(file_size), file_size)
+    handler._parse_response_header()
+
+    downloaded_bytes = 0
+    end_time = time.perf_counter() + duration
+    request = message_codec.DOWNLOAD_FILE_REQUEST.pack(file_name=file_name)
+    while time.perf_counter() < end_time:
+        handler._send_request(ClientHandler.DOWNLOAD_FILE_REQUEST_CODE, request)
+        _, _, response_len = handler._parse_response_header()
+        file_len, content_compression = message_codec.DOWNLOAD_FILE_RESPONSE.unpack(handler.receive_bytes(response_len))
+        handler.receive_file_content(NullFile(), file_len, content_compression)
+        downloaded_bytes += file_len
+    handler._send_request_header(ClientHandler.QUIT_SESSION_REQUEST_CODE)
+    return downloaded_bytes
+
+def measure(port: int, processes: int, number_of_clients: int, file_size: int, duration: float) -> None:
+    """
+    Runs the clients against a server with the given number of worker processes, and prints the throughput.
+    """
+    server_process = start_server(port, processes)
+    try:
+        with multiprocessing.Pool(number_of_clients) as pool:
+            downloaded_bytes = pool.starmap(run_client, [(port, client_index, file_size, duration)
+                                                         for client_index in range(number_of_clients)])
+    finally:
+        server_process.terminate()
+        server_process.wait()
+        remove_users(port, number_of_clients)
+
+    mode = f"{processes} worker processes" if processes else "single process"
+    print(f"{mode:<20} {number_of_clients} clients  {sum(downloaded_bytes) / duration / 1000 / 1000:>8.1f} MB/s")
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Measure the throughput scaling of the multi-process server")
+    parser.add_argument('--processes', '-n', type=int, nargs="+", default=[1, 2, 4],
+                        help="Numbers of worker processes to measure")
+    parser.add_argument('--clients', '-c', type=int, default=8, help="Number of concurrent client processes")
+    parser.add_argument('--size', '-s', type=int, default=16, help="Size of the downloaded file in MB")
+    parser.add_argument('--duration', '-d', type=float, default=5, help="Duration of every measurement in seconds")
+    parser.add_argument('--port', '-p', type=int, default=8290, help="Port of the first benchmarked server")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    # The port of the previous server may still be in TIME_WAIT, so every server listens on its own port
+    for server_index, processes in enumerate([0] + args.processes):
+        measure(args.port + server_index, processes, args.clients, args.size * 1024 * 1024, args.duration)
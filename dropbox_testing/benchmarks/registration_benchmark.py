@@ -0,0 +1,84 @@
+"""
+Measures the registrations per second of the users DB (`DataBaseCommunicator.create_new_user`), when many sessions
+register at once, with different options of its connection pool:
+- rollback journal - the default journal of SQLite with synchronous=FULL, every registration committed on its own.
+- WAL - WAL journal mode, every registration committed on its own (--no-group-commit).
+- WAL + group commit - concurrent registrations are committed together.
+The WAL modes are measured with synchronous=FULL (every commit waits for the disk, so group commit saves the
+fsyncs), and with synchronous=NORMAL (the default of the server, commits do not wait for the disk).
+
+Every registration thread registers its own users on a database of a temporary directory, and a tenth of the
+registrations are of usernames that already exist. For every mode, the registrations per second, the number of
+commits and the largest group commit are printed.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.registration_benchmark [--threads N] [--registrations N]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from dropbox_system.server.connection_pool import ConnectionPool
+from dropbox_system.server.db_communicator import DataBaseCommunicator, UserAlreadyExistsException
+
+PASSWORD = "Benchmark1!"
+MODES = {
+    "rollback journal": {"journal_mode": "DELETE", "synchronous": "FULL", "group_commit": False},
+    "WAL FULL": {"journal_mode": "WAL", "synchronous": "FULL", "group_commit": False},
+    "WAL FULL + group": {"journal_mode": "WAL", "synchronous": "FULL", "group_commit": True},
+    "WAL NORMAL": {"journal_mode": "WAL", "synchronous": "NORMAL", "group_commit": False},
+    "WAL NORMAL + group": {"journal_mode": "WAL", "synchronous": "NORMAL", "group_commit": True},
+}
+
+
+def register_users(database_communicator: DataBaseCommunicator, thread_index: int, registrations: int) -> None:
+    """
+    Registers the users of a thread. Every tenth registration is of a user the thread already registered.
+    """
+    for registration_index in range(registrations):
+        user_index = registration_index - 1 if registration_index % 10 == 9 else registration_index
+        try:
+            database_communicator.create_new_user(f"user_{thread_index}_{user_index}", PASSWORD)
+        except UserAlreadyExistsException:
+            pass
+
+def measure(mode: str, threads: int, registrations: int) -> None:
+    """
+    Registers the users of all the threads on a new database with the options of the given mode, and prints the
+    registrations per second.
+    """
+    with tempfile.TemporaryDirectory() as db_directory:
+        connection_pool = ConnectionPool(os.path.join(db_directory, DataBaseCommunicator.DB_FILE_NAME),
+                                         DataBaseCommunicator.BUSY_TIMEOUT, **MODES[mode])
+        database_communicator = DataBaseCommunicator(connection_pool)
+        registration_threads = [threading.Thread(target=register_users,
+                                                 args=(database_communicator, thread_index, registrations))
+                                for thread_index in range(threads)]
+        start_time = time.perf_counter()
+        for registration_thread in registration_threads:
+            registration_thread.start()
+        for registration_thread in registration_threads:
+            registration_thread.join()
+        duration = time.perf_counter() - start_time
+        metrics = connection_pool.as_dict()
+        database_communicator.close()
+
+    print(f"{mode:<20} {threads * registrations / duration:>9.0f} registrations/s  "
+          f"commits {metrics['commits']:>6}  max group commit {metrics['max_group_commit_size']:>4}  "
+          f"max write wait {metrics['max_write_wait_time'] * 1000:>7.1f} ms")
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Measure the registrations per second of the users DB")
+    parser.add_argument('--threads', '-t', type=int, default=32, help="Number of concurrently registering threads")
+    parser.add_argument('--registrations', '-r', type=int, default=200, help="Number of registrations of a thread")
+    parser.add_argument('--modes', nargs="+", choices=list(MODES), default=list(MODES), help="Modes to measure")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    for mode in args.modes:
+        measure(mode, args.threads, args.registrations)
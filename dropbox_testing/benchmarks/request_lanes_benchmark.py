@@ -0,0 +1,176 @@
+"""
+Measures the latency of metadata requests (LIST) during a storm of downloads, with and without the request lanes
+of the server (python3 -m dropbox_system.server.server --bulk-capacity N):
+- idle - no downloads, the baseline latency.
+- shared lanes - downloads and metadata requests compete for the same threads and CPU
+  (--bulk-capacity 0 --no-metadata-priority).
+- separate lanes - downloads run on a bounded bulk lane, and yield to metadata requests (the default).
+
+The downloading clients run in their own processes and keep downloading a large file. The metadata clients run on
+threads, and send a LIST request every --interval seconds. For every mode, the p50/p99 LIST latency and the download
+throughput are printed.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.request_lanes_benchmark [--bulk-clients N] [--metadata-clients N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.common import message_codec
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+import dropbox_system.server.server as server
+from dropbox_testing.benchmarks.transfer_benchmark import NullFile
+
+HOST = "127.0.0.1"
+PASSWORD = "Benchmark1!"
+MODES = {
+    "idle": None,
+    "shared lanes": ["--bulk-capacity", "0", "--no-metadata-priority"],
+    "separate lanes": [],
+}
+
+
+def start_server(port: int, server_arguments: list) -> subprocess.Popen:
+    """
+    Starts a server subprocess with the given arguments, and waits until it listens.
+    """
+    command = [sys.executable, "-m", "dropbox_system.server.server", "--port", str(port)] + server_arguments
+    server_process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    time.sleep(2)
+    return server_process
+
+def get_username(port: int, kind: str, client_index: int) -> str:
+    """
+    Returns:
+        str: The username of a benchmark client.
+    """
+    return f"request_lanes_benchmark_{port}_{kind}_{client_index}"
+
+def remove_users(usernames: list) -> None:
+    """
+    Removes the users of the benchmark clients and their files.
+    """
+    database_communicator = DataBaseCommunicator()
+    files_directory_path = os.path.join(os.path.dirname(os.path.abspath(server.__file__)),
+                                        server.Server.FILES_DIRECTORY_NAME)
+    for username in usernames:
+        if database_communicator.is_username_exists(username):
+            database_communicator.remove_username(username)
+        shutil.rmtree(os.path.join(files_directory_path, username), ignore_errors=True)
+
+def log_in(port: int, username: str) -> ClientHandler:
+    """
+    Registers a new user and logs in with it, on the same connection.
+
+    Returns:
+        ClientHandler: The handler of the logged in connection.
+    """
+    request = message_codec.LOGIN_REQUEST.pack(username=username, password=PASSWORD)
+    handler = ClientHandler(socket.create_connection((HOST, port)))
+    handler._send_first_request(ClientHandler.REGISTER_REQUEST_CODE, request)
+    handler._send_first_request(ClientHandler.LOGIN_REQUEST_CODE, request)
+    return handler
+
+def run_bulk_client(port: int, client_index: int, file_size: int, duration: float) -> int:
+    """
+    Logs in, uploads a file and keeps downloading it for the given duration.
+
+    Returns:
+        int: The number of downloaded bytes.
+    """
+    handler = log_in(port, get_username(port, "bulk", client_index))
+    file_name = "benchmark_file"
+    request = message_codec.UPLOAD_FILE_REQUEST.pack(file_len=file_size, file_name=file_name, requested_dir="")
+    handler._send_request(ClientHandler.UPLOAD_FILE_REQUEST_CODE, request)
+    handler._parse_response_header()
+    handler.send_file_content(os.urandom(file_size), file_size)
+    handler._parse_response_header()
+
+    downloaded_bytes = 0
+    end_time = time.perf_counter() + duration
+    request = message_codec.DOWNLOAD_FILE_REQUEST.pack(file_name=file_name)
+    while time.perf_counter() < end_time:
+        handler._send_request(ClientHandler.DOWNLOAD_FILE_REQUEST_CODE, request)
+        _, _, response_len = handler._parse_response_header()
+        file_len, content_compression = message_codec.DOWNLOAD_FILE_RESPONSE.unpack(handler.receive_bytes(response_len))
+        handler.receive_file_content(NullFile(), file_len, content_compression)
+        downloaded_bytes += file_len
+    handler._send_request_header(ClientHandler.QUIT_SESSION_REQUEST_CODE)
+    return downloaded_bytes
+
+def run_metadata_client(port: int, client_index: int, end_time: float, interval: float, latencies: list) -> None:
+    """
+    Logs in, and keeps sending LIST requests until the end time, recording the latency of every request.
+    """
+    handler = log_in(port, get_username(port, "metadata", client_index))
+    while time.perf_counter() < end_time:
+        start_time = time.perf_counter()
+        handler._send_request_header(ClientHandler.LIST_FILES_REQUEST_CODE)
+        _, _, response_len = handler._parse_response_header()
+        handler.receive_bytes(response_len)
+        latencies.append(time.perf_counter() - start_time)
+        time.sleep(interval)
+    handler._send_request_header(ClientHandler.QUIT_SESSION_REQUEST_CODE)
+
+def measure(port: int, mode: str, args: argparse.Namespace) -> None:
+    """
+    Runs the metadata clients (and the downloading clients, unless the mode is idle) against a server, and prints
+    the measurements.
+    """
+    server_arguments = MODES[mode]
+    bulk_clients = args.bulk_clients if server_arguments is not None else 0
+    server_process = start_server(port, server_arguments or [])
+    latencies = []
+    try:
+        with multiprocessing.Pool(max(bulk_clients, 1)) as pool:
+            bulk_results = pool.starmap_async(run_bulk_client, [(port, client_index, args.size * 1024 * 1024,
+                                                                 args.duration + args.warmup)
+                                                                for client_index in range(bulk_clients)])
+            # The downloads start before the metadata clients, so the whole measurement runs during the storm
+            time.sleep(args.warmup)
+            end_time = time.perf_counter() + args.duration
+            metadata_threads = [threading.Thread(target=run_metadata_client,
+                                                 args=(port, client_index, end_time, args.interval, latencies))
+                                for client_index in range(args.metadata_clients)]
+            for metadata_thread in metadata_threads:
+                metadata_thread.start()
+            for metadata_thread in metadata_threads:
+                metadata_thread.join()
+            downloaded_bytes = sum(bulk_results.get())
+    finally:
+        server_process.terminate()
+        server_process.wait()
+        remove_users([get_username(port, "bulk", client_index) for client_index in range(bulk_clients)] +
+                     [get_username(port, "metadata", client_index) for client_index in range(args.metadata_clients)])
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"{mode:<16} LIST latency p50 {percentiles[49] * 1000:>7.2f} ms  p99 {percentiles[98] * 1000:>7.2f} ms  "
+          f"({len(latencies)} requests)  |  downloads {downloaded_bytes / (args.duration + args.warmup) / 1000 / 1000:>7.1f} MB/s")
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Measure the metadata latency during a storm of downloads")
+    parser.add_argument('--bulk-clients', '-b', type=int, default=16, help="Number of downloading client processes")
+    parser.add_argument('--metadata-clients', '-m', type=int, default=4, help="Number of LIST client threads")
+    parser.add_argument('--size', '-s', type=int, default=8, help="Size of the downloaded file in MB")
+    parser.add_argument('--interval', type=float, default=0.02, help="Time between the LIST requests of a client")
+    parser.add_argument('--duration', '-d', type=float, default=10, help="Duration of every measurement in seconds")
+    parser.add_argument('--warmup', type=float, default=2, help="Time the downloads run before the measurement")
+    parser.add_argument('--port', '-p', type=int, default=8390, help="Port of the first benchmarked server")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    # The port of the previous server may still be in TIME_WAIT, so every server listens on its own port
+    for mode_index, mode in enumerate(MODES):
+        measure(args.port + mode_index, mode, args)
@@ -0,0 +1,108 @@
+"""
+Measures the round trip latency of small requests (LIST, CREATE_DIRECTORY, REMOVE) over TCP, when every
+header and payload is sent separately with Nagle's algorithm enabled (the previous framing),
+and when they are coalesced into a single write with TCP_NODELAY (the current framing).
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.small_request_benchmark [--requests REQUESTS]
+"""
+
+import argparse
+import socket
+import statistics
+import struct
+import tempfile
+import threading
+import time
+
+from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.server.server_handler import ServerHandler
+
+
+def use_separate_sends(handler) -> None:
+    """
+    Makes the handler send headers and payloads separately with Nagle's algorithm enabled, like the previous framing.
+    """
+    handler.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+    handler.send_message = lambda header, data=b'': (handler.send_header(header), handler.send_data(data))
+
+def start_server_handler(listening_socket: socket.socket, user_directory_path: str, coalesced: bool) -> threading.Thread:
+    """
+    Accepts a single connection and handles it with a logged in ServerHandler on a background thread.
+    """
+    def serve():
+        client_socket, _ = listening_socket.accept()
+        handler = ServerHandler(client_socket, user_directory_path)
+        handler.logged_in_user = "benchmark"
+        handler.user_directory_path = user_directory_path
+        if not coalesced:
+            use_separate_sends(handler)
+        try:
+            handler.start_handler()
+        except ConnectionError:
+            pass
+
+    server_thread = threading.Thread(target=serve, daemon=True)
+    server_thread.start()
+    return server_thread
+
+def send_request(handler: ClientHandler, request_code: int, request: bytes) -> None:
+    """
+    Sends a request and receives its response.
+    """
+    if request:
+        handler._send_request(request_code, request)
+    else:
+        handler._send_request_header(request_code)
+    _, _, response_len = handler._parse_response_header()
+    if response_len:
+        handler.receive_bytes(response_len)
+
+def measure_round_trips(number_of_requests: int, coalesced: bool) -> dict:
+    """
+    Sends small requests to a ServerHandler and returns the round trip latencies (in ms) of each request type.
+    """
+    listening_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listening_socket.bind(("127.0.0.1", 0))
+    listening_socket.listen(1)
+
+    latencies = {"LIST": [], "CREATE_DIRECTORY": [], "REMOVE": []}
+    with tempfile.TemporaryDirectory() as user_directory_path:
+        server_thread = start_server_handler(listening_socket, user_directory_path, coalesced)
+        client_socket = socket.create_connection(listening_socket.getsockname())
+        handler = ClientHandler(client_socket)
+        if not coalesced:
+            use_separate_sends(handler)
+
+        for index in range(number_of_requests):
+            directory_name = f"directory{index}".encode()
+            directory_request = struct.pack("I", len(directory_name)) + directory_name
+            for request_type, request_code, request in [
+                ("LIST", ClientHandler.LIST_FILES_REQUEST_CODE, b""),
+                ("CREATE_DIRECTORY", ClientHandler.CREATE_DIRECTORY_REQUEST_CODE, directory_request),
+                ("REMOVE", ClientHandler.REMOVE_FILE_REQUEST_CODE, directory_request),
+            ]:
+                start_time = time.perf_counter()
+                send_request(handler, request_code, request)
+                latencies[request_type].append((time.perf_counter() - start_time) * 1000)
+
+        handler._send_request_header(ClientHandler.QUIT_SESSION_REQUEST_CODE)
+        server_thread.join()
+    listening_socket.close()
+    return latencies
+
+def get_arguments_from_user() -> int:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Benchmark the round trip latency of small requests")
+    parser.add_argument('--requests', '-r', type=int, default=200, help="Number of requests of each type")
+    args = parser.parse_args()
+    return args.requests
+
+if __name__ == "__main__":
+    number_of_requests = get_arguments_from_user()
+    for coalesced in [False, True]:
+        framing = "coalesced + TCP_NODELAY" if coalesced else "separate sends + Nagle"
+        for request_type, request_latencies in measure_round_trips(number_of_requests, coalesced).items():
+            p99 = statistics.quantiles(request_latencies, n=100)[98]
+            print(f"{framing:<24} {request_type:<17} median {statistics.median(request_latencies):>7.3f} ms  "
+                  f"p99 {p99:>7.3f} ms")
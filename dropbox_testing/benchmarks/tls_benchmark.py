@@ -0,0 +1,121 @@
+"""
+Compares the XOR transport with the TLS transport:
+- The throughput of transferring a large file with RequestHandler, over a plain TCP connection (XOR encrypted)
+  and over a TLS connection (where the XOR encryption is off).
+- The latency of a full TLS handshake and of a handshake that resumes the previous session.
+
+A self-signed certificate is generated for the benchmark (requires the openssl command line tool).
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.tls_benchmark [--size SIZE_IN_MB] [--handshakes HANDSHAKES]
+"""
+
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from dropbox_system.common import tls
+from dropbox_system.common.request_handler import RequestHandler
+from dropbox_testing.benchmarks.transfer_benchmark import NullFile
+
+HOST = "127.0.0.1"
+
+
+def connect(listening_socket: socket.socket, server_context=None, client_context=None) -> tuple:
+    """
+    Connects a client to the listening socket, wrapping both sides in TLS if the contexts are given.
+
+    Returns:
+        tuple: The client and server sockets.
+    """
+    accepted = {}
+    port = listening_socket.getsockname()[1]
+
+    def accept():
+        server_socket, _ = listening_socket.accept()
+        if server_context is not None:
+            server_socket = server_context.wrap_socket(server_socket, server_side=True)
+        accepted["socket"] = server_socket
+
+    accepting_thread = threading.Thread(target=accept)
+    accepting_thread.start()
+    client_socket = socket.create_connection((HOST, port))
+    if client_context is not None:
+        client_socket = client_context.wrap_socket(client_socket, HOST, port)
+    accepting_thread.join()
+    return client_socket, accepted["socket"]
+
+def measure_transfer(transport: str, client_socket: socket.socket, server_socket: socket.socket,
+                     content: bytes) -> None:
+    """
+    Sends the content from the client to the server and prints the throughput.
+    """
+    sender = RequestHandler(client_socket)
+    receiver = RequestHandler(server_socket)
+    sender_thread = threading.Thread(target=sender.send_file_content, args=(content, len(content)))
+
+    start_time = time.perf_counter()
+    sender_thread.start()
+    receiver.receive_file_content(NullFile(), len(content))
+    duration = time.perf_counter() - start_time
+    sender_thread.join()
+
+    print(f"{transport:<16} {len(content) / duration / 1000 / 1000:>8.1f} MB/s  "
+          f"(xor {'on' if sender.is_xor_enabled else 'off'})")
+
+def measure_handshakes(listening_socket: socket.socket, server_context, client_context: tls.ClientTlsContext,
+                       handshakes: int, resume: bool) -> None:
+    """
+    Connects handshakes times and prints the average connection time.
+    """
+    port = listening_socket.getsockname()[1]
+    total_duration = 0
+    reused = 0
+    for _ in range(handshakes):
+        start_time = time.perf_counter()
+        client_socket, server_socket = connect(listening_socket, server_context, client_context)
+        total_duration += time.perf_counter() - start_time
+        reused += client_socket.session_reused
+
+        # With TLS 1.3 the session ticket arrives after the handshake, with the first data
+        server_socket.sendall(b"x")
+        client_socket.recv(1)
+        if resume:
+            client_context.save_session(client_socket, HOST, port)
+        client_socket.close()
+        server_socket.close()
+
+    print(f"{'resumed' if resume else 'full'} handshake {total_duration / handshakes * 1000:>8.2f} ms  "
+          f"(sessions reused {reused}/{handshakes})")
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Compare the XOR transport with the TLS transport")
+    parser.add_argument('--size', '-s', type=int, default=256, help="Size of the transferred file in MB")
+    parser.add_argument('--handshakes', '-n', type=int, default=100, help="Number of handshakes to measure")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    content = os.urandom(args.size * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as certificates_directory:
+        certificate_path = os.path.join(certificates_directory, "cert.pem")
+        key_path = os.path.join(certificates_directory, "key.pem")
+        tls.generate_self_signed_certificate(certificate_path, key_path)
+        server_context = tls.create_server_context(certificate_path, key_path)
+        client_context = tls.ClientTlsContext(certificate_path)
+        # Sessions are never saved in this context, so every connection runs a full handshake
+        full_handshake_client_context = tls.ClientTlsContext(certificate_path)
+
+    with socket.create_server((HOST, 0)) as listening_socket:
+        print(f"Transferring {args.size} MB:")
+        measure_transfer("xor over tcp", *connect(listening_socket), content)
+        measure_transfer("tls", *connect(listening_socket, server_context, client_context), content)
+
+        print(f"Connecting {args.handshakes} times:")
+        measure_handshakes(listening_socket, server_context, full_handshake_client_context, args.handshakes,
+                           resume=False)
+        measure_handshakes(listening_socket, server_context, client_context, args.handshakes, resume=True)
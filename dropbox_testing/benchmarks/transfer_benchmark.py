@@ -0,0 +1,130 @@
+"""
+Measures the throughput, the buffer allocations and copies and the peak memory of transferring a large file
+with RequestHandler:
+- Receiving it into memory by concatenating received bytes (the way it was received before receive_bytes),
+  into memory (receive_bytes) and streamed to a file (receive_file_content).
+- Sending it (send_file_content) with different chunk sizes, and with adaptive chunk size.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.transfer_benchmark [--size SIZE_IN_MB]
+"""
+
+import argparse
+import socket
+import threading
+import time
+import tracemalloc
+
+from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.xor_encryption import xor_data
+
+
+class NullFile:
+    """A binary file object that discards everything written to it."""
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+
+def send_in_background(sock: socket.socket, data: bytes) -> threading.Thread:
+    """
+    Sends the data on the socket from a background thread.
+    """
+    sender_thread = threading.Thread(target=sock.sendall, args=(data,), daemon=True)
+    sender_thread.start()
+    return sender_thread
+
+def receive_by_concatenation(handler: RequestHandler, size: int) -> bytes:
+    """
+    Receives data by growing a bytes object and decrypting it into a new one, counting the copies it makes.
+    """
+    buffer = b''
+    while len(buffer) < size:
+        data = handler.sock.recv(size - len(buffer))
+        handler.counters.receive_calls += 1
+        handler.counters.count_allocation(len(buffer) + len(data))
+        handler.counters.count_copy(len(buffer) + len(data))
+        buffer += data
+    handler.counters.count_copy(len(buffer))
+    return xor_data(buffer)
+
+def measure_receive(receive_method: str, encrypted_data: bytes) -> None:
+    """
+    Receives the encrypted data with the given RequestHandler method and prints the measurements.
+    """
+    sender_socket, receiver_socket = socket.socketpair()
+    handler = RequestHandler(receiver_socket)
+    sender_thread = send_in_background(sender_socket, encrypted_data)
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    if receive_method == "receive_by_concatenation":
+        receive_by_concatenation(handler, len(encrypted_data))
+    elif receive_method == "receive_bytes":
+        handler.receive_bytes(len(encrypted_data))
+    else:
+        handler.receive_file_content(NullFile(), len(encrypted_data))
+    duration = time.perf_counter() - start_time
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sender_thread.join()
+    sender_socket.close()
+    counters = handler.counters
+    print(f"{receive_method:<22} {len(encrypted_data) / duration / 1000 / 1000:>8.1f} MB/s  "
+          f"peak memory {peak_memory / 1000 / 1000:>8.2f} MB  "
+          f"allocations {counters.allocations} ({counters.allocated_bytes} bytes)  "
+          f"copies {counters.copies} ({counters.copied_bytes} bytes)  "
+          f"recv calls {counters.receive_calls}")
+
+def drain_in_background(sock: socket.socket) -> threading.Thread:
+    """
+    Receives and discards everything sent to the socket from a background thread, until the socket is closed.
+    """
+    def drain():
+        buffer = bytearray(1024 * 1024)
+        while sock.recv_into(buffer):
+            pass
+
+    receiver_thread = threading.Thread(target=drain, daemon=True)
+    receiver_thread.start()
+    return receiver_thread
+
+def measure_send(file_content: bytes, chunk_size: int, adaptive_chunk_size: bool) -> None:
+    """
+    Sends the file content with send_file_content and prints the measurements.
+    """
+    sender_socket, receiver_socket = socket.socketpair()
+    handler = RequestHandler(sender_socket, chunk_size, adaptive_chunk_size)
+    receiver_thread = drain_in_background(receiver_socket)
+
+    start_time = time.perf_counter()
+    handler.send_file_content(file_content, len(file_content))
+    duration = time.perf_counter() - start_time
+
+    sender_socket.shutdown(socket.SHUT_WR)
+    receiver_thread.join()
+    receiver_socket.close()
+    counters = handler.counters
+    final_chunk_size = handler.adaptive_chunk_size.chunk_size if adaptive_chunk_size else chunk_size
+    description = f"send_file_content({chunk_size}{', adaptive' if adaptive_chunk_size else ''})"
+    print(f"{description:<36} {len(file_content) / duration / 1000 / 1000:>8.1f} MB/s  "
+          f"send calls {counters.send_calls}  final chunk size {final_chunk_size}")
+
+def get_arguments_from_user() -> int:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Benchmark the RequestHandler receive path")
+    parser.add_argument('--size', '-s', type=int, default=50, help="Size of the transferred file in MB")
+    args = parser.parse_args()
+    return args.size
+
+if __name__ == "__main__":
+    size = get_arguments_from_user()
+    encrypted_data = xor_data(b"A" * size * 1000 * 1000)
+    for receive_method in ["receive_by_concatenation", "receive_bytes", "receive_file_content"]:
+        measure_receive(receive_method, encrypted_data)
+
+    file_content = b"A" * size * 1000 * 1000
+    measure_send(file_content, 1000, False)
+    measure_send(file_content, RequestHandler.DEFAULT_CHUNK_SIZE, False)
+    measure_send(file_content, 1000, True)
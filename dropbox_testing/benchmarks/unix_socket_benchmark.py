@@ -0,0 +1,98 @@
+"""
+Compares TCP over the loopback interface with a Unix domain socket, for clients on the same host as the server:
+- The round trip latency of small requests (LIST) to a ServerHandler.
+- The throughput of transferring a large file with RequestHandler.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.unix_socket_benchmark [--requests REQUESTS] [--size SIZE_IN_MB]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.common.request_handler import RequestHandler
+from dropbox_testing.benchmarks.small_request_benchmark import start_server_handler, send_request
+from dropbox_testing.benchmarks.transfer_benchmark import NullFile
+
+
+def create_listening_socket(transport: str, directory_path: str) -> socket.socket:
+    """
+    Creates a listening socket of the given transport ("tcp" or "unix").
+    """
+    if transport == "tcp":
+        return socket.create_server(("127.0.0.1", 0))
+    listening_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listening_socket.bind(os.path.join(directory_path, "server.sock"))
+    listening_socket.listen(1)
+    return listening_socket
+
+def connect(listening_socket: socket.socket) -> socket.socket:
+    """
+    Connects a client socket of the same family to the listening socket.
+    """
+    client_socket = socket.socket(listening_socket.family, socket.SOCK_STREAM)
+    client_socket.connect(listening_socket.getsockname())
+    return client_socket
+
+def measure_round_trips(transport: str, number_of_requests: int) -> None:
+    """
+    Sends LIST requests to a ServerHandler and prints the round trip latencies.
+    """
+    with tempfile.TemporaryDirectory() as directory_path:
+        listening_socket = create_listening_socket(transport, directory_path)
+        user_directory_path = os.path.join(directory_path, "user")
+        os.mkdir(user_directory_path)
+        server_thread = start_server_handler(listening_socket, user_directory_path, coalesced=True)
+        handler = ClientHandler(connect(listening_socket))
+
+        latencies = []
+        for _ in range(number_of_requests):
+            start_time = time.perf_counter()
+            send_request(handler, ClientHandler.LIST_FILES_REQUEST_CODE, b"")
+            latencies.append((time.perf_counter() - start_time) * 1000)
+
+        handler._send_request_header(ClientHandler.QUIT_SESSION_REQUEST_CODE)
+        server_thread.join()
+        listening_socket.close()
+
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    print(f"{transport:<5} LIST round trip  median {statistics.median(latencies):>7.3f} ms  p99 {p99:>7.3f} ms")
+
+def measure_transfer(transport: str, content: bytes) -> None:
+    """
+    Sends the content between two RequestHandlers and prints the throughput.
+    """
+    with tempfile.TemporaryDirectory() as directory_path:
+        listening_socket = create_listening_socket(transport, directory_path)
+        sender = RequestHandler(connect(listening_socket))
+        receiver = RequestHandler(listening_socket.accept()[0])
+        sender_thread = threading.Thread(target=sender.send_file_content, args=(content, len(content)))
+
+        start_time = time.perf_counter()
+        sender_thread.start()
+        receiver.receive_file_content(NullFile(), len(content))
+        duration = time.perf_counter() - start_time
+        sender_thread.join()
+        listening_socket.close()
+
+    print(f"{transport:<5} transfer         {len(content) / duration / 1000 / 1000:>8.1f} MB/s")
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Compare TCP over loopback with a Unix domain socket")
+    parser.add_argument('--requests', '-r', type=int, default=2000, help="Number of requests to measure")
+    parser.add_argument('--size', '-s', type=int, default=256, help="Size of the transferred file in MB")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    content = os.urandom(args.size * 1024 * 1024)
+    for transport in ["tcp", "unix"]:
+        measure_round_trips(transport, args.requests)
+        measure_transfer(transport, content)
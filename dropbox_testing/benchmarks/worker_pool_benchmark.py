@@ -0,0 +1,97 @@
+"""
+Measures a burst of short sessions against servers with different worker pool sizes, to size the pool:
+- The session latency (from connecting until the response to the first request, including the retries of
+  sessions that were rejected as busy).
+- The metrics of the worker pool - peak queue depth, average and maximal wait time, and rejected sessions.
+
+Every session connects, sends a LIST request and quits, while holding its worker for --hold seconds
+(standing in for the requests of a real session).
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.worker_pool_benchmark [--clients CLIENTS] [--pools WORKERS:QUEUE_SIZE ...]
+"""
+
+import argparse
+import contextlib
+import io
+import socket
+import statistics
+import threading
+import time
+
+from dropbox_system.client.client_handler import ClientHandler, ServerBusyException
+from dropbox_system.server.server import Server
+
+HOST = "127.0.0.1"
+
+
+def run_session(port: int, latencies: list, failures: list) -> None:
+    """
+    Runs a single session, and records its latency (or its failure).
+    """
+    start_time = time.perf_counter()
+    try:
+        handler = ClientHandler(socket.create_connection((HOST, port)),
+                                reconnect=lambda: socket.create_connection((HOST, port)))
+        handler._send_first_request(ClientHandler.LIST_FILES_REQUEST_CODE, b"")
+        latencies.append(time.perf_counter() - start_time)
+        handler.handle_quit_session_command()
+    except (ServerBusyException, OSError) as e:
+        failures.append(e)
+
+def measure(port: int, workers: int, queue_size: int, number_of_clients: int, hold_time: float) -> None:
+    """
+    Starts a server with the given worker pool, runs a burst of sessions against it and prints the measurements.
+    """
+    server_instance = Server(HOST, port, workers=workers, queue_size=queue_size)
+    if not server_instance.is_initialized:
+        return
+    handle_client = server_instance.handle_client
+
+    def hold_and_handle_client(client_socket: socket.socket) -> None:
+        time.sleep(hold_time)
+        handle_client(client_socket)
+
+    server_instance.worker_pool.handle = hold_and_handle_client
+
+    latencies, failures = [], []
+    # The messages the server and the clients print are hidden, so only the measurements are printed
+    with contextlib.redirect_stdout(io.StringIO()):
+        threading.Thread(target=server_instance.start, daemon=True).start()
+        client_threads = [threading.Thread(target=run_session, args=(port, latencies, failures))
+                          for _ in range(number_of_clients)]
+        for client_thread in client_threads:
+            client_thread.start()
+        for client_thread in client_threads:
+            client_thread.join()
+
+    metrics = server_instance.worker_pool.metrics.as_dict()
+    p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else float("nan")
+    print(f"workers {workers:>4} queue {queue_size:>5}  "
+          f"latency median {statistics.median(latencies) * 1000 if latencies else float('nan'):>8.1f} ms  "
+          f"p99 {p99 * 1000:>8.1f} ms  failed {len(failures):>4}  |  "
+          f"peak queue {metrics['peak_queue_depth']:>5}  wait avg {metrics['average_wait_time'] * 1000:>7.1f} ms  "
+          f"max {metrics['max_wait_time'] * 1000:>7.1f} ms  rejected {metrics['rejected']:>5}")
+
+def parse_pool(pool: str) -> tuple:
+    """
+    Returns:
+        tuple: The number of workers and the queue size of a WORKERS:QUEUE_SIZE argument.
+    """
+    workers, queue_size = pool.split(":")
+    return int(workers), int(queue_size)
+
+def get_arguments_from_user() -> argparse.Namespace:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Measure a burst of sessions against different worker pool sizes")
+    parser.add_argument('--clients', '-n', type=int, default=300, help="Number of sessions in the burst")
+    parser.add_argument('--pools', type=parse_pool, nargs="+", default=[(16, 16), (16, 64), (64, 256), (256, 256)],
+                        help="Worker pool sizes to measure, as WORKERS:QUEUE_SIZE")
+    parser.add_argument('--hold', type=float, default=0.05, help="Time every session holds its worker, in seconds")
+    parser.add_argument('--port', '-p', type=int, default=8190, help="Port of the first benchmarked server")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = get_arguments_from_user()
+    for pool_index, (workers, queue_size) in enumerate(args.pools):
+        measure(args.port + pool_index, workers, queue_size, args.clients, args.hold)
@@ -0,0 +1,44 @@
+"""
+Measures the throughput (MB/s) of every available XOR backend.
+
+Usage:
+    python3 -m dropbox_testing.benchmarks.xor_benchmark [--size SIZE_IN_MB] [--repeat REPEAT]
+"""
+
+import argparse
+import os
+import time
+
+from dropbox_system.common.xor_encryption import xor_data, XOR_BACKENDS
+
+# The bytewise backend is very slow, so it is measured on a smaller buffer.
+BYTEWISE_MAX_SIZE = 2 * 1000 * 1000
+
+def measure_backend(backend: str, data: bytes, repeat: int) -> float:
+    """
+    Runs xor_data with the given backend on the data and returns the best throughput in MB/s.
+    """
+    best_duration = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        xor_data(data, backend=backend)
+        duration = time.perf_counter() - start_time
+        if best_duration is None or duration < best_duration:
+            best_duration = duration
+    return len(data) / best_duration / 1000 / 1000
+
+def get_arguments_from_user() -> tuple:
+    """Parses command line arguments to get the benchmark parameters."""
+    parser = argparse.ArgumentParser(description="Benchmark the XOR backends")
+    parser.add_argument('--size', '-s', type=int, default=50, help="Size of the xored buffer in MB")
+    parser.add_argument('--repeat', '-r', type=int, default=3, help="Number of runs per backend")
+    args = parser.parse_args()
+    return args.size, args.repeat
+
+if __name__ == "__main__":
+    size, repeat = get_arguments_from_user()
+    data = os.urandom(size * 1000 * 1000)
+    for backend in XOR_BACKENDS:
+        backend_data = data[:BYTEWISE_MAX_SIZE] if backend == "bytewise" else data
+        throughput = measure_backend(backend, backend_data, repeat)
+        print(f"{backend:<12} {len(backend_data) / 1000 / 1000:>6.0f} MB  {throughput:>10.1f} MB/s")
@@ -1,10 +1,15 @@
 import pytest
+import subprocess
+import sys
 import threading
 import time
 
 import dropbox_testing.system_tests.utils as utils
 import dropbox_testing.system_tests.constants as constants
 import dropbox_system.server.server as server
+import dropbox_system.server.async_server as async_server
+from dropbox_system.common import tls
+from dropbox_system.server.session_timeouts import SessionTimeouts
 
 @pytest.fixture(scope="session")
 def server_startup():
@@ -36,4 +41,190 @@ def server_startup():
     server_instance.remove_all_users_files()
     server_instance.database_communicator.remove_data_from_users_table()
 
-    server_thread.join(timeout=1)
\ No newline at end of file
+    server_thread.join(timeout=1)
+
+@pytest.fixture(scope="session")
+def tls_server_startup(tmp_path_factory):
+    """
+    Before:
+      * Generate a self-signed certificate for the server
+      * Decide a listening port for the server
+      * Start a TLS server on a thread
+
+    After:
+      * Remove uploaded files and database info
+      * End the server thread
+
+    Yields the listening port of the server and the path of its certificate.
+    """
+    certificates_directory = tmp_path_factory.mktemp("tls")
+    certificate_path = str(certificates_directory / "cert.pem")
+    key_path = str(certificates_directory / "key.pem")
+    tls.generate_self_signed_certificate(certificate_path, key_path)
+
+    listening_port = utils.generate_server_listening_port()
+    server_instance = server.Server(constants.LOCAL_HOST, listening_port,
+                                    tls_context=tls.create_server_context(certificate_path, key_path))
+
+    server_thread = threading.Thread(target=server_instance.start, daemon=True)
+    server_thread.start()
+
+    # Wait for server startup
+    time.sleep(2)
+
+    yield listening_port, certificate_path
+
+    server_instance.remove_all_users_files()
+    server_instance.database_communicator.remove_data_from_users_table()
+
+    server_thread.join(timeout=1)
+
+
+@pytest.fixture(scope="session")
+def unix_socket_server_startup(tmp_path_factory):
+    """
+    Before:
+      * Decide a Unix domain socket path for the server
+      * Start a server that listens only on the Unix domain socket, on a thread
+
+    After:
+      * Remove uploaded files and database info
+      * End the server thread
+
+    Yields the Unix domain socket path of the server.
+    """
+    unix_socket_path = str(tmp_path_factory.mktemp("unix_socket") / "server.sock")
+    server_instance = server.Server(port=None, unix_socket_path=unix_socket_path)
+
+    server_thread = threading.Thread(target=server_instance.start, daemon=True)
+    server_thread.start()
+
+    # Wait for server startup
+    time.sleep(2)
+
+    yield unix_socket_path
+
+    server_instance.remove_all_users_files()
+    server_instance.database_communicator.remove_data_from_users_table()
+
+    server_thread.join(timeout=1)
+
+
+@pytest.fixture(scope="session")
+def async_server_startup():
+    """
+    Before:
+      * Decide a listening port for the server
+      * Start a server with the asyncio engine on a thread
+
+    After:
+      * Remove uploaded files and database info
+      * End the server thread
+
+    Yields the listening port of the server.
+    """
+    listening_port = utils.generate_server_listening_port()
+    server_instance = async_server.AsyncServer(constants.LOCAL_HOST, listening_port, workers=4)
+
+    server_thread = threading.Thread(target=server_instance.start, daemon=True)
+    server_thread.start()
+
+    # Wait for server startup
+    time.sleep(2)
+
+    yield listening_port
+
+    server_instance.remove_all_users_files()
+    server_instance.database_communicator.remove_data_from_users_table()
+
+    server_thread.join(timeout=1)
+
+
+@pytest.fixture(scope="session")
+def busy_server_startup():
+    """
+    Before:
+      * Decide a listening port for the server
+      * Start a server with a single worker and room for a single queued session, on a thread
+
+    After:
+      * Remove uploaded files and database info
+      * End the server thread
+
+    Yields the listening port of the server.
+    """
+    listening_port = utils.generate_server_listening_port()
+    server_instance = server.Server(constants.LOCAL_HOST, listening_port, workers=1, queue_size=1)
+
+    server_thread = threading.Thread(target=server_instance.start, daemon=True)
+    server_thread.start()
+
+    # Wait for server startup
+    time.sleep(2)
+
+    yield listening_port
+
+    server_instance.remove_all_users_files()
+    server_instance.database_communicator.remove_data_from_users_table()
+
+    server_thread.join(timeout=1)
+
+
+@pytest.fixture(scope="session")
+def multi_process_server_startup():
+    """
+    Before:
+      * Decide a listening port for the server
+      * Start a server with two worker processes in a subprocess
+
+    After:
+      * Stop the server (the supervisor stops its worker processes)
+      * Remove uploaded files and database info
+
+    Yields the listening port of the server and the server process (the supervisor).
+    """
+    listening_port = utils.generate_server_listening_port()
+    server_process = subprocess.Popen([sys.executable, "-m", "dropbox_system.server.server", "--port", str(listening_port),
+                                       "--processes", "2"], stdout=subprocess.DEVNULL)
+
+    # Wait for server startup
+    time.sleep(2)
+
+    yield listening_port, server_process
+
+    server_process.terminate()
+    server_process.wait()
+    # A server that does not listen, to clean up after the server processes
+    server_instance = server.Server(port=None)
+    server_instance.remove_all_users_files()
+    server_instance.database_communicator.remove_data_from_users_table()
+
+
+@pytest.fixture(scope="session")
+def timeouts_server_startup():
+    """
+    Before:
+      * Decide a listening port for the server
+      * Start a server with a single worker and short session timeouts, on a thread
+
+    After:
+      * Remove uploaded files and database info
+      * End the server thread
+
+    Yields the listening port of the server, and the server instance (to check its timeout counters).
+    """
+    listening_port = utils.generate_server_listening_port()
+    session_timeouts = SessionTimeouts(idle_timeout=1, header_timeout=1, min_transfer_rate=1000, transfer_window=1)
+    server_instance = server.Server(constants.LOCAL_HOST, listening_port, workers=1,
+                                    session_timeouts=session_timeouts)
+
+    server_thread = threading.Thread(target=server_instance.start, daemon=True)
+    server_thread.start()
+
+    # Wait for server startup
+    time.sleep(2)
+
+    yield listening_port, server_instance
+
+    server_instance.remove_all_users_files()
+    server_instance.database_communicator.remove_data_from_users_table()
@@ -0,0 +1,43 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.utils as utils
+import dropbox_testing.system_tests.constants as constants
+from dropbox_system.client.client_handler import ClientHandler, ServerBusyException
+
+from dropbox_testing.system_tests.fixtures import busy_server_startup
+
+
+def test_busy_server_rejects_and_client_retries(busy_server_startup, capfd):
+    """
+    Occupy the single worker of the server and its single queue slot with idle clients.
+    Verify a new connection is rejected with the SERVER_BUSY error code, and a client that registers
+    backs off and succeeds once the idle clients disconnect.
+    """
+    listening_port = busy_server_startup
+    working_client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+    queued_client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+    time.sleep(0.5)
+
+    rejected_handler = ClientHandler(socket.create_connection((constants.LOCAL_HOST, listening_port)))
+    with pytest.raises(ServerBusyException) as raised:
+        rejected_handler._send_first_request(ClientHandler.LIST_FILES_REQUEST_CODE, b"")
+    assert raised.value.retry_after > 0
+
+    def disconnect_idle_clients():
+        time.sleep(1)
+        working_client_instance.close()
+        queued_client_instance.close()
+
+    disconnecting_thread = threading.Thread(target=disconnect_idle_clients)
+    disconnecting_thread.start()
+    utils.register_new_user("admission_control_user", client.Client(constants.LOCAL_HOST, listening_port))
+    disconnecting_thread.join()
+
+    captured = capfd.readouterr()
+    assert "The server is busy, retrying in" in captured.out
+    assert "Registered successfully!" in captured.out
@@ -0,0 +1,64 @@
+import os
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.constants as constants
+import dropbox_testing.system_tests.utils as utils
+
+from dropbox_testing.system_tests.fixtures import async_server_startup
+
+
+def test_async_server_sanity(async_server_startup, capfd):
+    """
+    Register, upload a file, list the files and download the file on a server with the asyncio engine.
+    Verify all the requests complete successfully and the file content survives the transfer.
+    """
+    listening_port = async_server_startup
+    username = "async_server_user"
+    file_name = "async_server_file.txt"
+    test_directory = "/tmp/async_server_test"
+    file_path = os.path.join("/tmp", file_name)
+    downloaded_file_path = os.path.join(test_directory, file_name)
+    file_content = "S" * 3000000
+
+    os.mkdir(test_directory)
+    with open(file_path, "w") as file:
+        file.write(file_content)
+
+    utils.register_new_user(username, client.Client(constants.LOCAL_HOST, listening_port))
+    utils.login_and_preform_actions(username, client.Client(constants.LOCAL_HOST, listening_port),
+                                    ["U", file_path, "", "L", "D", file_name, test_directory, "Q"])
+
+    with open(downloaded_file_path, "r") as file:
+        assert file.read() == file_content
+    os.remove(downloaded_file_path)
+
+    # Protocol v2 connections run their own frame loop on the asyncio engine too
+    utils.login_and_preform_actions(username, client.Client(constants.LOCAL_HOST, listening_port, protocol_version=2),
+                                    ["D", file_name, test_directory, "Q"])
+
+    with open(downloaded_file_path, "r") as file:
+        assert file.read() == file_content
+
+    os.remove(file_path)
+    os.remove(downloaded_file_path)
+    os.rmdir(test_directory)
+
+    captured = capfd.readouterr()
+    assert "File uploaded successfully" in captured.out
+    assert "Files and directories list - async_server_file.txt" in captured.out
+
+def test_async_server_idle_connections(async_server_startup, capfd):
+    """
+    Open more idle connections than the server has worker threads, then login and list the files on another connection.
+    Verify the idle connections do not hold the workers, so the requests are handled.
+    """
+    listening_port = async_server_startup
+    username = "async_server_idle_user"
+    idle_client_instances = [client.Client(constants.LOCAL_HOST, listening_port) for _ in range(20)]
+    assert all(client_instance.connected for client_instance in idle_client_instances)
+
+    utils.register_new_user(username, client.Client(constants.LOCAL_HOST, listening_port))
+    utils.login_and_preform_actions(username, client.Client(constants.LOCAL_HOST, listening_port), ["L", "Q"])
+
+    captured = capfd.readouterr()
+    assert "Files and directories list - " in captured.out
@@ -7,6 +7,7 @@ from unittest import mock
 import dropbox_system.client.client as client
 import dropbox_testing.system_tests.utils as utils
 import dropbox_testing.system_tests.constants as constants
+from dropbox_system.server.attempt_limits import AttemptLimits
 
 from dropbox_testing.system_tests.fixtures import server_startup
 
@@ -22,7 +23,43 @@ def test_login_with_non_existing_user(server_startup, capfd):
     utils.login_and_preform_actions(non_existing_username, client_instance)
     
     captured = capfd.readouterr()
-    assert "Username not exists! exiting" in captured.out
+    assert "Username not exists!" in captured.out
+
+def test_failed_login_keeps_session_open(server_startup, capfd):
+    """
+    Fail to log in, register and then log in and list the files, all on a single connection.
+    Verify the session stays open after the failed login and after registering.
+    """
+    username = "failed_login_keeps_session_open_test"
+    listening_port = server_startup
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+
+    utils.login_and_preform_actions(username, client_instance)
+    utils.register_new_user(username, client_instance)
+    utils.login_and_preform_actions(username, client_instance, ["L", "Q"])
+
+    captured = capfd.readouterr()
+    assert "Username not exists!" in captured.out
+    assert "Registered successfully!" in captured.out
+    assert "Logged in successfully!" in captured.out
+    assert "Exiting session" in captured.out
+
+def test_too_many_failed_logins(server_startup, capfd):
+    """
+    Fail to log in on a single connection until the server runs out of login attempts.
+    Verify the last attempt closes the session.
+    """
+    listening_port = server_startup
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+
+    for _ in range(AttemptLimits.DEFAULT_MAX_LOGIN_ATTEMPTS - 1):
+        utils.login_and_preform_actions("non_existing", client_instance)
+    with mock.patch('builtins.input', side_effect=[client.Client.LOGIN_CODE, "non_existing"]):
+        with mock.patch('getpass.getpass', side_effect=[constants.DEFAULT_PASSWORD]):
+            assert not client_instance.handle_user_initial_request()
+
+    captured = capfd.readouterr()
+    assert "Too many failed logins! The server closed the session." in captured.out
 
 def test_upload_non_existing_file(server_startup, capfd):
     """
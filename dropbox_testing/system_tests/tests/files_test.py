@@ -2,6 +2,8 @@ import os
 
 from unittest import mock
 
+from dropbox_system.common import compression
+
 import dropbox_system.client.client as client
 import dropbox_testing.system_tests.constants as constants
 import dropbox_testing.system_tests.utils as utils
@@ -45,4 +47,39 @@ def test_upload_and_download_large_file(server_startup, capfd):
     os.rmdir(test_directory)
     
     captured = capfd.readouterr()
-    assert "File downloaded successfully" in captured.out
\ No newline at end of file
+    assert "File downloaded successfully" in captured.out
+def test_upload_and_download_compressed_file(server_startup, capfd):
+    """
+    Upload and download a compressible file with every compression codec.
+    Verify the downloaded content is the expected content, and the transfers were compressed.
+    """
+    listening_port = server_startup
+    file_directory = "/tmp"
+    test_directory = "/tmp/compressed_file"
+    file_content = "A" * 5000000 # 5MB file
+
+    os.mkdir(test_directory)
+    for codec, codec_name in compression.COMPRESSION_NAMES.items():
+        if codec == compression.COMPRESSION_NONE:
+            continue
+        username = f"compressed_file_{codec_name}_test"
+        file_name = f"compressed_file_{codec_name}.txt"
+        file_path = os.path.join(file_directory, file_name)
+        downloaded_file_path = os.path.join(test_directory, file_name)
+        with open(file_path, "w") as file:
+            file.write(file_content)
+
+        utils.register_new_user(username, client.Client(constants.LOCAL_HOST, listening_port))
+        login_client_instance = client.Client(constants.LOCAL_HOST, listening_port, requested_compression=codec)
+        utils.login_and_preform_actions(username, login_client_instance, ["U", file_path, "", "D", file_name, test_directory, "Q"])
+
+        with open(downloaded_file_path, "r") as file:
+            assert file.read() == file_content
+        os.remove(file_path)
+        os.remove(downloaded_file_path)
+
+        captured = capfd.readouterr()
+        assert "File downloaded successfully" in captured.out
+        assert captured.out.count(f"File content was compressed with {codec_name}") == 2
+
+    os.rmdir(test_directory)
@@ -0,0 +1,87 @@
+import os
+import signal
+import threading
+import time
+
+import dropbox_system.client.client as client
+from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.common import message_codec
+import dropbox_testing.system_tests.constants as constants
+import dropbox_testing.system_tests.utils as utils
+
+from dropbox_testing.system_tests.fixtures import multi_process_server_startup
+
+NUMBER_OF_CLIENTS_RUNNING_TOGETHER = 8
+
+
+def get_worker_pids(server_process):
+    """
+    Returns the PIDs of the worker processes of a multi-process server.
+    """
+    with open(f"/proc/{server_process.pid}/task/{server_process.pid}/children") as children_file:
+        return [int(pid) for pid in children_file.read().split()]
+
+def send_register_request(listening_port, username, error_codes):
+    """
+    Sends a register request on a new connection, and records the error code of the response.
+    (The request is sent directly, since the user input can not be mocked on several threads at once.)
+    """
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+    request = message_codec.REGISTER_REQUEST.pack(username=username, password=constants.DEFAULT_PASSWORD)
+    _, error_code, _ = client_instance.handler._send_first_request(ClientHandler.REGISTER_REQUEST_CODE, request)
+    error_codes.append(error_code)
+
+def test_multi_process_concurrent_registration(multi_process_server_startup, capfd):
+    """
+    Register the same user from several clients at once, on a server with two worker processes.
+    Verify exactly one registration succeeds, and the user can log in and upload files on any worker process.
+    """
+    listening_port, _ = multi_process_server_startup
+    username = "multi_process_user"
+    file_path = "/tmp/multi_process_file.txt"
+    with open(file_path, "w") as file:
+        file.write("M" * 100000)
+
+    error_codes = []
+    registering_threads = [threading.Thread(target=send_register_request, args=(listening_port, username, error_codes))
+                           for _ in range(NUMBER_OF_CLIENTS_RUNNING_TOGETHER)]
+    for registering_thread in registering_threads:
+        registering_thread.start()
+    for registering_thread in registering_threads:
+        registering_thread.join()
+
+    assert error_codes.count(ClientHandler.SUCCESS) == 1
+    assert error_codes.count(ClientHandler.USER_ALREADY_EXISTS) == NUMBER_OF_CLIENTS_RUNNING_TOGETHER - 1
+
+    for _ in range(4):
+        utils.login_and_preform_actions(username, client.Client(constants.LOCAL_HOST, listening_port), ["L", "Q"])
+    utils.login_and_preform_actions(username, client.Client(constants.LOCAL_HOST, listening_port),
+                                    ["U", file_path, "", "R", os.path.basename(file_path), "Q"])
+    os.remove(file_path)
+
+    captured = capfd.readouterr()
+    assert captured.out.count("Logged in successfully!") == 5
+    assert "File uploaded successfully" in captured.out
+
+def test_multi_process_worker_restart(multi_process_server_startup, capfd):
+    """
+    Kill a worker process of a server with two worker processes.
+    Verify the supervisor starts a new worker process, and clients are still served.
+    """
+    listening_port, server_process = multi_process_server_startup
+    worker_pids = get_worker_pids(server_process)
+    assert len(worker_pids) == 2
+
+    os.kill(worker_pids[0], signal.SIGKILL)
+    # A worker that dies right after it started is restarted after a delay
+    time.sleep(2.5)
+    restarted_worker_pids = get_worker_pids(server_process)
+    assert len(restarted_worker_pids) == 2
+    assert worker_pids[0] not in restarted_worker_pids
+    assert worker_pids[1] in restarted_worker_pids
+
+    for client_index in range(4):
+        utils.register_new_user(f"multi_process_user_{client_index}",
+                                client.Client(constants.LOCAL_HOST, listening_port))
+    captured = capfd.readouterr()
+    assert captured.out.count("Registered successfully!") == 4
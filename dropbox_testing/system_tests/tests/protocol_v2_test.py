@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.constants as constants
+import dropbox_testing.system_tests.utils as utils
+from dropbox_system.common import message_codec
+
+from dropbox_testing.system_tests.fixtures import server_startup
+
+
+class EndOfUserInput(Exception):
+    """
+    Raised instead of the next user input, to leave the session without quitting it.
+    """
+
+def test_protocol_v2_sanity(server_startup, capfd):
+    """
+    Login with a protocol v2 client, upload a file, list the files and download the file.
+    Verify all the requests complete successfully over the multiplexed connection.
+    """
+    listening_port = server_startup
+    username = "protocol_v2_sanity_user"
+    file_name = "protocol_v2_file.txt"
+    test_directory = "/tmp/protocol_v2_test"
+    file_path = os.path.join("/tmp", file_name)
+    downloaded_file_path = os.path.join(test_directory, file_name)
+    file_content = "B" * 3000000
+
+    os.mkdir(test_directory)
+    with open(file_path, "w") as file:
+        file.write(file_content)
+
+    utils.register_new_user(username, client.Client(constants.LOCAL_HOST, listening_port))
+
+    login_client_instance = client.Client(constants.LOCAL_HOST, listening_port, protocol_version=2)
+    assert login_client_instance.multiplexer is not None
+    utils.login_and_preform_actions(username, login_client_instance, ["U", file_path, "", "L", "D", file_name, test_directory, "Q"])
+
+    with open(downloaded_file_path, "r") as file:
+        assert file.read() == file_content
+
+    os.remove(file_path)
+    os.remove(downloaded_file_path)
+    os.rmdir(test_directory)
+
+    captured = capfd.readouterr()
+    assert "File uploaded successfully" in captured.out
+    assert "Files and directories list - protocol_v2_file.txt" in captured.out
+    assert "File downloaded successfully" in captured.out
+
+def test_protocol_v2_concurrent_requests(server_startup, capfd):
+    """
+    Start downloading a large file on one stream of a protocol v2 connection, without consuming it.
+    Verify a list request sent on another stream of the same connection completes meanwhile.
+    """
+    listening_port = server_startup
+    username = "protocol_v2_concurrent_user"
+    file_name = "protocol_v2_large_file.txt"
+    file_path = os.path.join("/tmp", file_name)
+    file_size = 20000000
+
+    with open(file_path, "w") as file:
+        file.write("C" * file_size)
+
+    utils.register_new_user(username, client.Client(constants.LOCAL_HOST, listening_port))
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port, protocol_version=2)
+    with pytest.raises(EndOfUserInput):
+        utils.login_and_preform_actions(username, client_instance, ["U", file_path, "", EndOfUserInput()])
+    os.remove(file_path)
+
+    download_handler = client_instance.open_stream_handler()
+    list_handler = client_instance.open_stream_handler()
+
+    download_request = message_codec.DOWNLOAD_FILE_REQUEST.pack(file_name=file_name)
+    download_handler._send_request(download_handler.DOWNLOAD_FILE_REQUEST_CODE, download_request)
+    response_type, error_code, download_response_len = download_handler._parse_response_header()
+    assert (response_type, error_code) == (download_handler.DOWNLOAD_FILE_RESPONSE_CODE, download_handler.SUCCESS)
+
+    list_handler._send_request_header(list_handler.LIST_FILES_REQUEST_CODE)
+    response_type, error_code, response_len = list_handler._parse_response_header()
+    assert (response_type, error_code) == (list_handler.LIST_FILES_RESPONSE_CODE, list_handler.SUCCESS)
+    assert file_name.encode() in list_handler.receive_bytes(response_len)
+
+    download_response = download_handler.receive_bytes(download_response_len)
+    file_len, content_compression = message_codec.DOWNLOAD_FILE_RESPONSE.unpack(download_response)
+    assert file_len == file_size
+    download_handler.receive_file_content(None, file_len, content_compression)
@@ -0,0 +1,43 @@
+import socket
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.utils as utils
+import dropbox_testing.system_tests.constants as constants
+from dropbox_system.common import message_codec
+from dropbox_system.common.request_handler import RequestHandler
+
+from dropbox_testing.system_tests.fixtures import timeouts_server_startup
+
+
+def test_idle_client_is_disconnected(timeouts_server_startup, capfd):
+    """
+    Occupy the single worker of the server with a client that sends nothing.
+    Verify the server disconnects it once its idle timeout passes, so the worker serves a new client.
+    """
+    listening_port, server_instance = timeouts_server_startup
+    idle_timeouts = server_instance.session_timeouts.counters.idle_timeouts
+    idle_socket = socket.create_connection((constants.LOCAL_HOST, listening_port))
+    idle_socket.settimeout(5)
+
+    utils.register_new_user("idle_timeout_user", client.Client(constants.LOCAL_HOST, listening_port))
+
+    assert idle_socket.recv(1) == b""
+    assert server_instance.session_timeouts.counters.idle_timeouts > idle_timeouts
+    captured = capfd.readouterr()
+    assert "Registered successfully!" in captured.out
+
+
+def test_trickling_client_is_disconnected(timeouts_server_startup):
+    """
+    Send only the first byte of a request header, and verify the server disconnects the client once its header
+    timeout passes.
+    """
+    listening_port, server_instance = timeouts_server_startup
+    header_timeouts = server_instance.session_timeouts.counters.header_timeouts
+    header = message_codec.REQUEST_HEADER.pack(request_code=RequestHandler.LIST_FILES_REQUEST_CODE, request_len=0)
+    trickling_socket = socket.create_connection((constants.LOCAL_HOST, listening_port))
+    trickling_socket.settimeout(5)
+    trickling_socket.sendall(header[:1])
+
+    assert trickling_socket.recv(1) == b""
+    assert server_instance.session_timeouts.counters.header_timeouts == header_timeouts + 1
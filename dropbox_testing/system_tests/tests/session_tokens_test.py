@@ -0,0 +1,42 @@
+from unittest import mock
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.constants as constants
+import dropbox_testing.system_tests.utils as utils
+
+from dropbox_testing.system_tests.fixtures import server_startup
+
+def test_resume_session_on_another_connection(server_startup, capfd):
+    """
+    Register and log in, then resume the session on another connection with the session token of the login,
+    and list the files on it.
+    Verify the session is resumed without sending the credentials.
+    """
+    listening_port = server_startup
+    username = "resume_session_user"
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+    utils.register_new_user(username, client_instance)
+    utils.login_and_preform_actions(username, client_instance, ["Q"])
+    assert client_instance.session_token is not None
+
+    resumed_client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+    assert resumed_client_instance.resume_session(client_instance.session_token)
+    with mock.patch('builtins.input', side_effect=["L", "Q"]):
+        resumed_client_instance.handler._start_session()
+
+    captured = capfd.readouterr()
+    assert "Session resumed successfully!" in captured.out
+    assert "Exiting session" in captured.out
+
+def test_resume_session_with_invalid_token(server_startup, capfd):
+    """
+    Resume a session with a token the server did not issue.
+    Verify the session is not resumed.
+    """
+    listening_port = server_startup
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+
+    assert not client_instance.resume_session(b"invalid session token, not signed by the server")
+
+    captured = capfd.readouterr()
+    assert "The session token is invalid or expired, log in again." in captured.out
@@ -24,15 +24,15 @@ def single_client_actions(client_index, listening_port, file_path):
     test_directory = f"/tmp/client_{{client_index}}"
     os.mkdir(test_directory)
 
-    registration_client_instance = client.Client(constants.LOCAL_HOST, listening_port)
-    utils.register_new_user(username, registration_client_instance)
+    # The session stays open after registering, so every client registers, logs in and works on a single connection
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port)
+    utils.register_new_user(username, client_instance)
 
-    login_client_instance = client.Client(constants.LOCAL_HOST, listening_port)
-    print(f"{{datetime.datetime.now().strftime("%H:%M:%S")}} - Uploading a big file and then downloading it for client number {{client_index}}")
-    utils.login_and_preform_actions(username, login_client_instance, [
+    print(f"{{datetime.datetime.now().strftime('%H:%M:%S')}} - Uploading a big file and then downloading it for client number {{client_index}}")
+    utils.login_and_preform_actions(username, client_instance, [
         "L", "C", "newfolder", "U", file_path, "", "L", "D", os.path.basename(file_path), test_directory, "Q"
     ])
-    print(f"{{datetime.datetime.now().strftime("%H:%M:%S")}} - Client number {{client_index}} finished")
+    print(f"{{datetime.datetime.now().strftime('%H:%M:%S')}} - Client number {{client_index}} finished")
     shutil.rmtree(test_directory)
 
 single_client_actions({client_index}, {listening_port}, '{file_path}')
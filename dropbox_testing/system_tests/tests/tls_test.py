@@ -0,0 +1,57 @@
+import os
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.constants as constants
+import dropbox_testing.system_tests.utils as utils
+from dropbox_system.common.tls import ClientTlsContext
+
+from dropbox_testing.system_tests.fixtures import tls_server_startup
+
+
+def test_tls_upload_and_download(tls_server_startup, capfd):
+    """
+    Register, upload a file and download it over TLS.
+    Verify the file content survives the transfer, and that the second connection resumed the TLS session.
+    """
+    listening_port, certificate_path = tls_server_startup
+    tls_context = ClientTlsContext(certificate_path)
+    username = "tls_user"
+    file_name = "tls_file.txt"
+    test_directory = "/tmp/tls_test"
+    file_path = os.path.join("/tmp", file_name)
+    downloaded_file_path = os.path.join(test_directory, file_name)
+    file_content = "T" * 3000000
+
+    os.mkdir(test_directory)
+    with open(file_path, "w") as file:
+        file.write(file_content)
+
+    register_client_instance = client.Client(constants.LOCAL_HOST, listening_port, tls_context=tls_context)
+    assert not register_client_instance.handler.is_xor_enabled
+    utils.register_new_user(username, register_client_instance)
+    register_client_instance.close()
+
+    login_client_instance = client.Client(constants.LOCAL_HOST, listening_port, tls_context=tls_context)
+    assert login_client_instance.sock.session_reused
+    utils.login_and_preform_actions(username, login_client_instance, ["U", file_path, "", "D", file_name, test_directory, "Q"])
+
+    with open(downloaded_file_path, "r") as file:
+        assert file.read() == file_content
+
+    os.remove(file_path)
+    os.remove(downloaded_file_path)
+    os.rmdir(test_directory)
+
+    captured = capfd.readouterr()
+    assert "File uploaded successfully" in captured.out
+
+def test_tls_client_rejects_untrusted_server(tls_server_startup, capfd):
+    """
+    Connect to the TLS server without trusting its self-signed certificate.
+    Verify the client refuses the connection.
+    """
+    listening_port, _ = tls_server_startup
+    client_instance = client.Client(constants.LOCAL_HOST, listening_port, tls_context=ClientTlsContext())
+
+    assert not client_instance.connected
+    assert "CERTIFICATE_VERIFY_FAILED" in capfd.readouterr().out
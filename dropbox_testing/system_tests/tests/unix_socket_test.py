@@ -0,0 +1,40 @@
+import os
+
+import dropbox_system.client.client as client
+import dropbox_testing.system_tests.utils as utils
+
+from dropbox_testing.system_tests.fixtures import unix_socket_server_startup
+
+
+def test_unix_socket_upload_and_download(unix_socket_server_startup, capfd):
+    """
+    Register, upload a file, list the files and download the file over a Unix domain socket.
+    Verify all the requests complete successfully and the file content survives the transfer.
+    """
+    unix_socket_path = unix_socket_server_startup
+    username = "unix_socket_user"
+    file_name = "unix_socket_file.txt"
+    test_directory = "/tmp/unix_socket_test"
+    file_path = os.path.join("/tmp", file_name)
+    downloaded_file_path = os.path.join(test_directory, file_name)
+    file_content = "U" * 3000000
+
+    os.mkdir(test_directory)
+    with open(file_path, "w") as file:
+        file.write(file_content)
+
+    utils.register_new_user(username, client.Client(unix_socket_path=unix_socket_path))
+    login_client_instance = client.Client(unix_socket_path=unix_socket_path)
+    assert login_client_instance.connected
+    utils.login_and_preform_actions(username, login_client_instance, ["U", file_path, "", "L", "D", file_name, test_directory, "Q"])
+
+    with open(downloaded_file_path, "r") as file:
+        assert file.read() == file_content
+
+    os.remove(file_path)
+    os.remove(downloaded_file_path)
+    os.rmdir(test_directory)
+
+    captured = capfd.readouterr()
+    assert "File uploaded successfully" in captured.out
+    assert "Files and directories list - unix_socket_file.txt" in captured.out
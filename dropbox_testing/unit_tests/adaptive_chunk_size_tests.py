@@ -0,0 +1,46 @@
+import unittest
+
+from dropbox_system.common.adaptive_chunk_size import AdaptiveChunkSize
+
+
+class TestAdaptiveChunkSize(unittest.TestCase):
+    INITIAL_CHUNK_SIZE = 1024
+    MAX_CHUNK_SIZE = 8 * 1024
+
+    def _record_measurement(self, tuner, throughput):
+        """
+        Records enough chunks of the current chunk size (with the given throughput) to complete a measurement.
+        """
+        for _ in range(tuner.CHUNKS_PER_MEASUREMENT):
+            tuner.record(tuner.chunk_size, tuner.chunk_size / throughput)
+
+    def test_grows_while_throughput_improves(self):
+        """
+        Check the method `record` of AdaptiveChunkSize.
+        Record an improving throughput and verify the chunk size grows up to the maximal chunk size.
+        """
+        tuner = AdaptiveChunkSize(self.INITIAL_CHUNK_SIZE, self.MAX_CHUNK_SIZE)
+        for throughput in [100, 200, 300, 400]:
+            self._record_measurement(tuner, throughput)
+
+        self.assertEqual(tuner.chunk_size, self.MAX_CHUNK_SIZE)
+        self.assertFalse(tuner.is_growing)
+
+    def test_keeps_best_chunk_size(self):
+        """
+        Check the method `record` of AdaptiveChunkSize.
+        Record a throughput that stops improving and verify the best chunk size is kept.
+        """
+        tuner = AdaptiveChunkSize(self.INITIAL_CHUNK_SIZE, self.MAX_CHUNK_SIZE)
+        self._record_measurement(tuner, 100)
+        self._record_measurement(tuner, 200)
+        self._record_measurement(tuner, 150)
+
+        self.assertEqual(tuner.chunk_size, self.INITIAL_CHUNK_SIZE * 2)
+        self.assertFalse(tuner.is_growing)
+
+        self._record_measurement(tuner, 1000)
+        self.assertEqual(tuner.chunk_size, self.INITIAL_CHUNK_SIZE * 2)
+
+if __name__ == '__main__':
+    unittest.main()
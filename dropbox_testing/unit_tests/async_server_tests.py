@@ -0,0 +1,106 @@
+import unittest
+import asyncio
+import socket
+
+from dropbox_system.server.async_server import EventLoopSocket
+
+
+class TestEventLoopSocket(unittest.TestCase):
+    def setUp(self):
+        self.loop_socket, self.remote_socket = socket.socketpair()
+
+    def tearDown(self):
+        self.loop_socket.close()
+        self.remote_socket.close()
+
+    def _run(self, test_coroutine_function):
+        """
+        Runs a test coroutine with an EventLoopSocket on the local end of the socket pair.
+        """
+        async def run():
+            _, writer = await asyncio.open_connection(sock=self.loop_socket)
+            try:
+                await test_coroutine_function(EventLoopSocket(asyncio.get_running_loop(), writer))
+            finally:
+                writer.close()
+
+        asyncio.run(run())
+
+    def test_recv_into(self):
+        """
+        Check the method recv_into of EventLoopSocket.
+        Feed chunks of data and receive them into buffers of a different size. Verify the data is received in order,
+        and 0 is returned once the connection was closed and all the data was consumed.
+        """
+        async def test(sock):
+            sock.feed(b"abc")
+            sock.feed(b"defgh")
+            sock.feed_eof()
+
+            buffer = bytearray(4)
+            self.assertEqual(await asyncio.to_thread(sock.recv_into, buffer), 4)
+            self.assertEqual(buffer, b"abcd")
+            self.assertEqual(await asyncio.to_thread(sock.recv_into, buffer), 4)
+            self.assertEqual(buffer, b"efgh")
+            self.assertEqual(sock.buffered_size, 0)
+            self.assertEqual(await asyncio.to_thread(sock.recv_into, buffer), 0)
+
+        self._run(test)
+
+    def test_peek(self):
+        """
+        Check the method peek of EventLoopSocket.
+        Feed chunks of data, and verify peek returns the first bytes across chunks without consuming them.
+        """
+        async def test(sock):
+            sock.feed(b"ab")
+            sock.feed(b"cdef")
+            self.assertEqual(sock.peek(3), b"abc")
+            self.assertEqual(sock.buffered_size, 6)
+            buffer = bytearray(6)
+            self.assertEqual(await asyncio.to_thread(sock.recv_into, buffer), 6)
+            self.assertEqual(buffer, b"abcdef")
+
+        self._run(test)
+
+    def test_wait_for_space(self):
+        """
+        Check the method wait_for_space of EventLoopSocket.
+        Fill the buffer and verify the event loop waits until the worker thread consumes some of it.
+        """
+        async def test(sock):
+            sock.feed(bytes(EventLoopSocket.MAX_BUFFERED_SIZE))
+            waiting = asyncio.create_task(sock.wait_for_space())
+            await asyncio.sleep(0.05)
+            self.assertFalse(waiting.done())
+
+            await asyncio.to_thread(sock.recv_into, bytearray(1))
+            await asyncio.wait_for(waiting, timeout=1)
+
+        self._run(test)
+
+    def test_sendall(self):
+        """
+        Check the method sendall of EventLoopSocket.
+        Send data from a worker thread and verify it arrives at the remote end, even if the buffer is reused.
+        """
+        async def test(sock):
+            buffer = bytearray(b"A" * 500000)
+
+            def send():
+                sock.sendall(buffer)
+                buffer[:] = b"B" * len(buffer)
+
+            def receive():
+                received = bytearray()
+                while len(received) < len(buffer):
+                    received += self.remote_socket.recv(len(buffer))
+                return received
+
+            _, received = await asyncio.gather(asyncio.to_thread(send), asyncio.to_thread(receive))
+            self.assertEqual(received, b"A" * len(buffer))
+
+        self._run(test)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from dropbox_system.server.attempt_limits import AttemptLimits
+from dropbox_system.server.server_handler import ServerSession
+
+
+class TestAttemptLimits(unittest.TestCase):
+    def test_failed_logins_are_counted_per_session(self):
+        """
+        Check a session runs out of login attempts on its max_login_attempts failed login, regardless of the failed
+        logins of other sessions.
+        """
+        attempt_limits = AttemptLimits(max_login_attempts=2)
+        session, other_session = ServerSession(), ServerSession()
+        assert attempt_limits.count_failed_login(session)
+        assert attempt_limits.count_failed_login(other_session)
+        assert not attempt_limits.count_failed_login(session)
+        metrics = attempt_limits.as_dict()
+        assert metrics["failed_logins"] == 3
+        assert metrics["closed_sessions"] == 1
+
+    def test_register_attempts(self):
+        """
+        Check a session may send max_register_attempts registration requests, and not more.
+        """
+        attempt_limits = AttemptLimits(max_register_attempts=2)
+        session = ServerSession()
+        assert attempt_limits.count_register_attempt(session)
+        assert attempt_limits.count_register_attempt(session)
+        assert not attempt_limits.count_register_attempt(session)
+
+    def test_unlimited_attempts(self):
+        """
+        Check limits of 0 do not close sessions.
+        """
+        attempt_limits = AttemptLimits(max_login_attempts=0, max_register_attempts=0)
+        session = ServerSession()
+        for _ in range(100):
+            assert attempt_limits.count_failed_login(session)
+            assert attempt_limits.count_register_attempt(session)
+        assert attempt_limits.as_dict()["closed_sessions"] == 0
+
+
+if __name__ == "__main__":
+    unittest.main()
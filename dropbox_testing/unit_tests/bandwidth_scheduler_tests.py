@@ -0,0 +1,117 @@
+import unittest
+import io
+import time
+from unittest.mock import MagicMock, patch
+
+from dropbox_system.server.bandwidth_scheduler import BandwidthScheduler, TokenBucket
+from dropbox_system.common.request_handler import RequestHandler
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.time = 1000.0
+        patcher = patch("dropbox_system.server.bandwidth_scheduler.time.monotonic", side_effect=lambda: self.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+        """
+        Check a full bucket transfers its burst size without waiting, and the next bytes wait for their tokens.
+        """
+        bucket = TokenBucket(rate=100)
+        assert bucket.consume(100) == 0
+        assert bucket.consume(50) == 0.5
+        self.time += 1
+        assert bucket.consume(50) == 0
+
+    def test_tokens_do_not_exceed_burst(self):
+        """
+        Check an idle bucket does not collect more tokens than its burst size.
+        """
+        bucket = TokenBucket(rate=100, burst=10)
+        self.time += 100
+        assert bucket.consume(30) == 0.2
+
+    def test_set_rate(self):
+        """
+        Check changing the rate applies to the tokens added from then on.
+        """
+        bucket = TokenBucket(rate=100)
+        bucket.consume(100)
+        bucket.set_rate(10)
+        assert bucket.consume(10) == 1
+
+
+class TestBandwidthScheduler(unittest.TestCase):
+    def test_total_rate_is_shared_fairly(self):
+        """
+        Check every active transfer gets an equal share of the total rate, and the share of a transfer that ends is
+        given back to the others.
+        """
+        scheduler = BandwidthScheduler(total_rate=300)
+        first_throttle = scheduler.start_transfer("first")
+        second_throttle = scheduler.start_transfer("second")
+        third_throttle = scheduler.start_transfer("second")
+        assert [throttle.buckets[-1].rate for throttle in [first_throttle, second_throttle, third_throttle]] == [100] * 3
+
+        scheduler.end_transfer(third_throttle)
+        assert first_throttle.buckets[-1].rate == 150
+        assert second_throttle.buckets[-1].rate == 150
+
+    def test_user_rate_is_shared_by_the_transfers_of_the_user(self):
+        """
+        Check all the transfers of a user take tokens from the same bucket, and transfers of other users do not.
+        """
+        scheduler = BandwidthScheduler(user_rate=100, connection_rate=1000)
+        first_throttle = scheduler.start_transfer("user")
+        second_throttle = scheduler.start_transfer("user")
+        other_throttle = scheduler.start_transfer("other")
+        assert first_throttle.buckets[0] is second_throttle.buckets[0]
+        assert other_throttle.buckets[0] is not first_throttle.buckets[0]
+        # Every transfer has its own connection bucket
+        assert first_throttle.buckets[1] is not second_throttle.buckets[1]
+
+        with patch("dropbox_system.server.bandwidth_scheduler.time.sleep") as mock_sleep:
+            first_throttle.throttle(100)
+            mock_sleep.assert_not_called()
+            second_throttle.throttle(50)
+            assert 0.45 < mock_sleep.call_args[0][0] <= 0.5
+
+    def test_unlimited_transfers_are_not_paced(self):
+        """
+        Check a scheduler with no rates does not pace transfers, and still measures them.
+        """
+        scheduler = BandwidthScheduler()
+        throttle = scheduler.start_transfer("user")
+        with patch("dropbox_system.server.bandwidth_scheduler.time.sleep") as mock_sleep:
+            throttle.throttle(10 ** 9)
+        mock_sleep.assert_not_called()
+        scheduler.end_transfer(throttle)
+        user_bandwidth = scheduler.as_dict()["user"]
+        assert user_bandwidth["transfers"] == 1
+        assert user_bandwidth["active_transfers"] == 0
+        assert user_bandwidth["transferred_bytes"] == 10 ** 9
+        assert user_bandwidth["average_rate"] > 0
+
+    def test_chunks_of_sent_file_are_paced(self):
+        """
+        Check every chunk of a file sent by a RequestHandler goes through its transfer throttle, and the transfer
+        is paced at the rate of the connection.
+        """
+        scheduler = BandwidthScheduler(connection_rate=20 * 1024)
+        handler = RequestHandler(MagicMock(), chunk_size=4 * 1024)
+        handler.transfer_throttle = scheduler.start_transfer("user")
+        file_size = 30 * 1024
+
+        start_time = time.monotonic()
+        handler.send_file(io.BytesIO(bytes(file_size)), file_size)
+        elapsed_time = time.monotonic() - start_time
+        scheduler.end_transfer(handler.transfer_throttle)
+
+        assert handler.transfer_throttle.transferred_bytes == file_size
+        # The first second of the transfer is the burst of the bucket
+        assert 0.4 < elapsed_time < 2
+
+
+if __name__ == "__main__":
+    unittest.main()
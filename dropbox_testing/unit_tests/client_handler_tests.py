@@ -2,7 +2,7 @@ import unittest
 import struct
 import socket
 from unittest.mock import patch, MagicMock
-from dropbox_system.client.client_handler import ClientHandler
+from dropbox_system.client.client_handler import ClientHandler, ServerBusyException
 from dropbox_system.common.xor_encryption import xor_data
 
 class TestServerHandler(unittest.TestCase):
@@ -31,10 +31,26 @@ class TestServerHandler(unittest.TestCase):
         error_code = ClientHandler.SUCCESS
         response_len = 10
 
-        with patch.object(self.client_handler, 'receive_numeric_value', side_effect=[response_type, error_code, response_len]):
-            parsed_response = self.client_handler._parse_response_header()
+        self.mock_socket.recv_into.side_effect = self._mock_recv_into(struct.pack("III", response_type, error_code, response_len))
+        parsed_response = self.client_handler._parse_response_header()
 
         self.assertEqual(parsed_response, (response_type, error_code, response_len))
+        self.assertEqual(self.mock_socket.recv_into.call_count, 1)
+
+    def _mock_recv_into(self, data):
+        """
+        Returns a recv_into function that receives the given data.
+        """
+        data_view = memoryview(data)
+
+        def recv_into(buffer):
+            nonlocal data_view
+            received = min(len(buffer), len(data_view))
+            buffer[:received] = data_view[:received]
+            data_view = data_view[received:]
+            return received
+
+        return recv_into
     
     def test_handle_quit_session_command(self):
         self.client_handler.QUIT_SESSION_REQUEST_CODE = 999
@@ -46,10 +62,25 @@ class TestServerHandler(unittest.TestCase):
 
         mock_send_header.assert_called_once_with(packed_request)
 
-    @patch.object(ClientHandler, '_send_request_header')
-    @patch.object(ClientHandler, 'send_data')
+    def test_send_request(self):
+        """
+        Test the `_send_request` method of the `ClientHandler` class.
+        Verify the header and the encrypted request are sent together in a single write.
+        """
+        request_code = ClientHandler.REMOVE_FILE_REQUEST_CODE
+        request = b"request"
+        packed_header = struct.pack("II", request_code, len(request))
+        self.mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
+
+        self.client_handler._send_request(request_code, request)
+
+        self.mock_socket.sendmsg.assert_called_once()
+        sent_buffers = self.mock_socket.sendmsg.call_args[0][0]
+        self.assertEqual(b"".join(sent_buffers), packed_header + xor_data(request))
+
+    @patch.object(ClientHandler, '_send_request')
     @patch.object(ClientHandler, '_parse_response_header', return_value=(ClientHandler.REMOVE_FILE_REQUEST_CODE, ClientHandler.SUCCESS, 0))
-    def test_handle_remove_file_command(self, mock_parse, mock_send_data, mock_send_header):
+    def test_handle_remove_file_command(self, mock_parse, mock_send_request):
         """
         Test the `_handle_remove_file_command` method of the `ClientHandler` class.
         """
@@ -59,8 +90,60 @@ class TestServerHandler(unittest.TestCase):
         with patch('builtins.input', return_value=file_name):
             self.client_handler._handle_remove_file_command()
 
-        mock_send_header.assert_called_once_with(self.client_handler.REMOVE_FILE_REQUEST_CODE, request)
-        mock_send_data.assert_called_once_with(request)
+        mock_send_request.assert_called_once_with(self.client_handler.REMOVE_FILE_REQUEST_CODE, request)
+
+    def test_parse_busy_response_header(self):
+        """
+        Test the `_parse_response_header` method of the `ClientHandler` class, when the server is busy.
+        Verify ServerBusyException is raised with the retry-after hint of the server.
+        """
+        busy_response = struct.pack("III", ClientHandler.SERVER_BUSY_RESPONSE_CODE, ClientHandler.SERVER_BUSY, 4) + \
+            xor_data(struct.pack("I", 1500))
+        self.mock_socket.recv_into.side_effect = self._mock_recv_into(busy_response)
+
+        with self.assertRaises(ServerBusyException) as raised:
+            self.client_handler._parse_response_header()
+        self.assertEqual(raised.exception.retry_after, 1.5)
+
+    @patch('time.sleep')
+    @patch.object(ClientHandler, '_send_request')
+    def test_send_first_request_retries_when_busy(self, mock_send_request, mock_sleep):
+        """
+        Test the `_send_first_request` method of the `ClientHandler` class.
+        The server rejects the first two connections as busy - verify the request is sent again on a new connection
+        after waiting at least the retry-after hint, and the response of the third connection is returned.
+        """
+        new_socket = MagicMock(spec=socket.socket)
+        reconnect = MagicMock(return_value=new_socket)
+        self.client_handler.reconnect = reconnect
+        login_response = (ClientHandler.LOGIN_RESPONSE_CODE, ClientHandler.SUCCESS, 0)
+
+        with patch.object(ClientHandler, '_parse_response_header',
+                          side_effect=[ServerBusyException(2), ServerBusyException(2), login_response]):
+            response = self.client_handler._send_first_request(ClientHandler.LOGIN_REQUEST_CODE, b"request")
+
+        self.assertEqual(response, login_response)
+        self.assertEqual(mock_send_request.call_count, 3)
+        self.assertEqual(reconnect.call_count, 2)
+        self.assertIs(self.client_handler.sock, new_socket)
+        for (retry_delay,), _ in mock_sleep.call_args_list:
+            self.assertGreaterEqual(retry_delay, 2)
+
+    @patch('time.sleep')
+    @patch.object(ClientHandler, '_send_request')
+    def test_send_first_request_gives_up_when_busy(self, mock_send_request, mock_sleep):
+        """
+        Test the `_send_first_request` method of the `ClientHandler` class, when the server stays busy.
+        Verify ServerBusyException is raised after MAX_BUSY_RETRIES retries.
+        """
+        self.client_handler.reconnect = MagicMock(return_value=self.mock_socket)
+
+        with patch.object(ClientHandler, '_parse_response_header', side_effect=ServerBusyException(0)):
+            with self.assertRaises(ServerBusyException):
+                self.client_handler._send_first_request(ClientHandler.LOGIN_REQUEST_CODE, b"request")
+
+        self.assertEqual(mock_send_request.call_count, ClientHandler.MAX_BUSY_RETRIES + 1)
+        self.assertEqual(mock_sleep.call_count, ClientHandler.MAX_BUSY_RETRIES)
 
     def test_are_passwords_equal(self):
         password = "PaVdsets13!"
@@ -34,6 +34,20 @@ class TestClient(unittest.TestCase):
         self.assertFalse(client.connected)
         mock_socket_instance.connect.assert_called_with(('127.0.0.1', 8080))
 
+    @patch('socket.socket')
+    def test_client_connection_unix_socket(self, mock_socket):
+        """
+        Test the constructor of the `Client` class with a Unix domain socket path.
+        Verify a Unix domain socket is connected to the path.
+        """
+        mock_socket_instance = MagicMock()
+        mock_socket.return_value = mock_socket_instance
+
+        client = Client(unix_socket_path='/tmp/dropbox_server_test.sock')
+        self.assertTrue(client.connected)
+        mock_socket.assert_called_once_with(socket.AF_UNIX, socket.SOCK_STREAM)
+        mock_socket_instance.connect.assert_called_with('/tmp/dropbox_server_test.sock')
+
     @patch('builtins.input', return_value=Client.REGISTER_CODE)
     @patch.object(ClientHandler, 'send_register_request')
     @patch('socket.socket')
@@ -87,9 +101,9 @@ class TestClient(unittest.TestCase):
         """
         Test the argument parser that executed on the __main__ function.
         """
-        address, port = get_arguments_from_user()
-        self.assertEqual(address, '192.168.1.1')
-        self.assertEqual(port, 9090)
+        args = get_arguments_from_user()
+        self.assertEqual(args.address, '192.168.1.1')
+        self.assertEqual(args.port, 9090)
 
 if __name__ == '__main__':
     unittest.main()
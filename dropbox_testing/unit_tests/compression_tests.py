@@ -0,0 +1,55 @@
+import unittest
+import io
+import os
+
+from dropbox_system.common import compression
+
+
+class TestCompression(unittest.TestCase):
+    COMPRESSIBLE_CONTENT = b"A" * 200000
+
+    def test_choose_compression_compressible_file(self):
+        """
+        Check the function choose_compression.
+        Verify a compressible file is sent with the requested codec, and the file position is restored.
+        """
+        file = io.BytesIO(self.COMPRESSIBLE_CONTENT)
+        for codec in compression.COMPRESSION_CODECS:
+            self.assertEqual(compression.choose_compression(file, codec), codec)
+            self.assertEqual(file.tell(), 0)
+
+    def test_choose_compression_incompressible_file(self):
+        """
+        Check the function choose_compression.
+        Verify random content, empty files and unsupported codecs are sent uncompressed.
+        """
+        self.assertEqual(compression.choose_compression(io.BytesIO(os.urandom(100000)), compression.COMPRESSION_ZLIB),
+                         compression.COMPRESSION_NONE)
+        self.assertEqual(compression.choose_compression(io.BytesIO(b""), compression.COMPRESSION_ZLIB),
+                         compression.COMPRESSION_NONE)
+        self.assertEqual(compression.choose_compression(io.BytesIO(self.COMPRESSIBLE_CONTENT), 100),
+                         compression.COMPRESSION_NONE)
+
+    def test_decompress_bounded_pieces(self):
+        """
+        Check the method `decompress` of StreamDecompressor.
+        Decompress highly compressed content and verify it is restored in pieces of at most max_length bytes.
+        """
+        max_length = 4096
+        for codec, (compressor_factory, _) in compression.COMPRESSION_CODECS.items():
+            with self.subTest(codec=compression.COMPRESSION_NAMES[codec]):
+                compressor = compressor_factory()
+                compressed = compressor.compress(self.COMPRESSIBLE_CONTENT) + compressor.flush()
+
+                decompressor = compression.StreamDecompressor(codec)
+                pieces = []
+                for start in range(0, len(compressed), 100):
+                    pieces.extend(decompressor.decompress(compressed[start:start + 100], max_length))
+
+                self.assertTrue(all(len(piece) <= max_length for piece in pieces))
+                self.assertEqual(b"".join(pieces), self.COMPRESSIBLE_CONTENT)
+                self.assertEqual(decompressor.report.original_bytes, len(self.COMPRESSIBLE_CONTENT))
+                self.assertEqual(decompressor.report.compressed_bytes, len(compressed))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import Mock
+
+from dropbox_system.server.connection_pool import ConnectionPool
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+from dropbox_system.server.server_handler import ServerHandler
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.db_directory = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.db_directory.name, "test.db"), busy_timeout=5)
+        with self.pool.writer() as connection:
+            connection.execute("CREATE TABLE ITEMS (item TEXT PRIMARY KEY)")
+
+    def tearDown(self):
+        self.pool.close()
+        self.db_directory.cleanup()
+
+    def test_read_connection_per_thread(self):
+        """
+        Check a thread reads on the same connection every time, and other threads read on connections of their own.
+        """
+        assert self.pool.reader() is self.pool.reader()
+        other_thread_connections = []
+        thread = threading.Thread(target=lambda: other_thread_connections.append(self.pool.reader()))
+        thread.start()
+        thread.join()
+        assert other_thread_connections[0] is not self.pool.reader()
+        assert self.pool.as_dict()["opened_read_connections"] == 2
+
+    def test_writes_are_committed_or_rolled_back(self):
+        """
+        Check the writes of a writer context are visible to the readers once it ends, and rolled back if it raised.
+        """
+        with self.pool.writer() as connection:
+            connection.execute("INSERT INTO ITEMS VALUES ('first')")
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.pool.writer() as connection:
+                connection.execute("INSERT INTO ITEMS VALUES ('second')")
+                connection.execute("INSERT INTO ITEMS VALUES ('first')")
+        assert self.pool.reader().execute("SELECT item FROM ITEMS").fetchall() == [("first",)]
+
+    def test_writes_are_serialized(self):
+        """
+        Check a write waits while another write holds the writer connection, and the wait is measured.
+        """
+        writer_acquired, release_writer = threading.Event(), threading.Event()
+
+        def hold_writer():
+            with self.pool.writer():
+                writer_acquired.set()
+                release_writer.wait()
+
+        holding_thread = threading.Thread(target=hold_writer)
+        holding_thread.start()
+        writer_acquired.wait()
+        threading.Timer(0.1, release_writer.set).start()
+        with self.pool.writer() as connection:
+            connection.execute("INSERT INTO ITEMS VALUES ('item')")
+        holding_thread.join()
+
+        metrics = self.pool.as_dict()
+        assert metrics["writes"] == 3
+        assert metrics["write_waits"] == 1
+        assert metrics["max_write_wait_time"] >= 0.05
+
+    def test_wal_journal_mode(self):
+        """
+        Check the database is in WAL journal mode with the default options, and invalid modes are rejected.
+        """
+        assert self.pool.reader().execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert self.pool.reader().execute("PRAGMA synchronous").fetchone() == (1,)
+        with self.assertRaises(ValueError):
+            ConnectionPool(self.pool.db_file_path, busy_timeout=5, synchronous="NORMAL; DROP TABLE ITEMS")
+
+    def test_group_commit(self):
+        """
+        Check writes that queue up while the writer connection is held are committed in a single transaction,
+        and a write that violates the primary key fails alone.
+        """
+        writer_acquired, release_writer = threading.Event(), threading.Event()
+        errors = []
+
+        def hold_writer():
+            with self.pool.writer():
+                writer_acquired.set()
+                release_writer.wait()
+
+        def write(item):
+            try:
+                self.pool.write("INSERT INTO ITEMS VALUES (?)", (item,))
+            except sqlite3.IntegrityError as error:
+                errors.append(error)
+
+        holding_thread = threading.Thread(target=hold_writer)
+        holding_thread.start()
+        writer_acquired.wait()
+        items = ["first", "second", "third", "first"]
+        writing_threads = [threading.Thread(target=write, args=(item,)) for item in items]
+        for writing_thread in writing_threads:
+            writing_thread.start()
+        while len(self.pool._pending_writes) < len(items):
+            time.sleep(0.01)
+        release_writer.set()
+        for thread in [holding_thread] + writing_threads:
+            thread.join()
+
+        assert len(errors) == 1
+        assert sorted(self.pool.reader().execute("SELECT item FROM ITEMS").fetchall()) == \
+            [("first",), ("second",), ("third",)]
+        metrics = self.pool.as_dict()
+        assert metrics["max_group_commit_size"] == len(items)
+        # The table creation, the held writer and the group commit
+        assert metrics["commits"] == 3
+
+    def test_write_without_group_commit(self):
+        """
+        Check every write is committed on its own when group commit is off.
+        """
+        pool = ConnectionPool(self.pool.db_file_path, busy_timeout=5, group_commit=False)
+        pool.write("INSERT INTO ITEMS VALUES (?)", ("first",))
+        with self.assertRaises(sqlite3.IntegrityError):
+            pool.write("INSERT INTO ITEMS VALUES (?)", ("first",))
+        pool.write("INSERT INTO ITEMS VALUES (?)", ("second",))
+        assert pool.as_dict()["commits"] == 2
+        pool.close()
+
+    def test_read_connection_is_closed_with_its_thread(self):
+        """
+        Check the read connection of a thread that ended is closed.
+        """
+        thread = threading.Thread(target=self.pool.reader)
+        thread.start()
+        thread.join()
+        # The thread-local data of the thread is released once it ends
+        for _ in range(50):
+            if self.pool.as_dict()["open_read_connections"] == 0:
+                break
+            time.sleep(0.01)
+        assert self.pool.as_dict()["open_read_connections"] == 0
+
+    def test_server_handlers_share_the_database_communicator(self):
+        """
+        Check ServerHandlers do not open a database communicator of their own.
+        """
+        assert ServerHandler(Mock(), 'path').database_communicator is DataBaseCommunicator.get_shared()
+        assert ServerHandler(Mock(), 'path').database_communicator is DataBaseCommunicator.get_shared()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+
+from dropbox_system.server.credential_cache import CredentialCache
+
+
+class TestCredentialCache(unittest.TestCase):
+    def test_lookup_and_store(self):
+        """
+        Check a user is missed until its credentials are stored, and then hit with the digest of its password.
+        """
+        credential_cache = CredentialCache(ttl=60)
+        assert credential_cache.lookup("user") is CredentialCache.MISS
+
+        credential_cache.store("user", "pass")
+        assert credential_cache.lookup("user") == credential_cache.digest("pass")
+        assert credential_cache.lookup("user") != credential_cache.digest("wrong")
+        assert credential_cache.as_dict()["hits"] == 2
+        assert credential_cache.as_dict()["misses"] == 1
+
+    def test_negative_caching(self):
+        """
+        Check an unknown username is cached as not existing, until its entry is invalidated.
+        """
+        credential_cache = CredentialCache(ttl=60, negative_ttl=5)
+        credential_cache.store("user", None)
+        assert credential_cache.lookup("user") is None
+        assert credential_cache.as_dict()["negative_hits"] == 1
+
+        credential_cache.invalidate("user")
+        assert credential_cache.lookup("user") is CredentialCache.MISS
+
+    def test_expiry(self):
+        """
+        Check the entries of users expire after the TTL, and of unknown usernames after the negative TTL.
+        """
+        credential_cache = CredentialCache(ttl=60, negative_ttl=5)
+        with patch("time.monotonic", return_value=100):
+            credential_cache.store("user", "pass")
+            credential_cache.store("unknown", None)
+        with patch("time.monotonic", return_value=110):
+            assert credential_cache.lookup("user") == credential_cache.digest("pass")
+            assert credential_cache.lookup("unknown") is CredentialCache.MISS
+        with patch("time.monotonic", return_value=160):
+            assert credential_cache.lookup("user") is CredentialCache.MISS
+        assert credential_cache.as_dict()["entries"] == 0
+
+    def test_size_bound(self):
+        """
+        Check the least recently used users are evicted once the cache is full.
+        """
+        credential_cache = CredentialCache(ttl=60, max_entries=2)
+        credential_cache.store("first", "pass")
+        credential_cache.store("second", "pass")
+        credential_cache.lookup("first")
+        credential_cache.store("third", "pass")
+
+        assert credential_cache.lookup("second") is CredentialCache.MISS
+        assert credential_cache.lookup("first") is not CredentialCache.MISS
+        assert credential_cache.lookup("third") is not CredentialCache.MISS
+        assert credential_cache.as_dict()["evictions"] == 1
+
+    def test_disabled(self):
+        """
+        Check a cache with no TTL never caches users.
+        """
+        credential_cache = CredentialCache(ttl=0)
+        credential_cache.store("user", "pass")
+        assert not credential_cache.enabled
+        assert credential_cache.lookup("user") is CredentialCache.MISS
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
-import sqlite3
+import os
+import tempfile
+import threading
+from unittest.mock import patch
 
 from dropbox_system.server.db_communicator import DataBaseCommunicator, UserAlreadyExistsException, UserNotExistsException
+from dropbox_system.server.connection_pool import ConnectionPool
 
 
 class TestDataBaseCommunicator(unittest.TestCase):
@@ -9,15 +13,16 @@ class TestDataBaseCommunicator(unittest.TestCase):
     DEFAULT_PASSWORD = "password"
 
     def setUp(self):
-        # Instead of using file based database, I create memory based db.
-        self.db = DataBaseCommunicator()
-        self.db.conn = sqlite3.connect(':memory:')
-        self.db.cursor = self.db.conn.cursor()
-        self.db.cursor.execute(DataBaseCommunicator.CREATE_TABLE_QUERY)
-        self.db.conn.commit()
+        # Instead of using the database of the server, every test uses a database of its own. The pool opens a
+        # connection per thread, so the database is a temporary file (every connection to ':memory:' is a new database)
+        self.db_directory = tempfile.TemporaryDirectory()
+        connection_pool = ConnectionPool(os.path.join(self.db_directory.name, DataBaseCommunicator.DB_FILE_NAME),
+                                         DataBaseCommunicator.BUSY_TIMEOUT)
+        self.db = DataBaseCommunicator(connection_pool)
 
     def tearDown(self):
-        self.db.conn.close()
+        self.db.close()
+        self.db_directory.cleanup()
 
     def test_create_new_user(self):
         """
@@ -33,6 +38,49 @@ class TestDataBaseCommunicator(unittest.TestCase):
         with self.assertRaises(UserAlreadyExistsException):
             self.db.create_new_user(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)
 
+    def test_create_new_user_concurrently(self):
+        """
+        Check the method `create_new_user` of DataBaseCommunicator, when many threads create the same user at once.
+        Verify the user is created once, and the other threads receive UserAlreadyExistsException instead of a
+        database error.
+        """
+        results = []
+
+        def create_user():
+            try:
+                self.db.create_new_user(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)
+                results.append(True)
+            except UserAlreadyExistsException:
+                results.append(False)
+
+        threads = [threading.Thread(target=create_user) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), [False] * 7 + [True])
+
+    def test_create_users_from_many_threads(self):
+        """
+        Check the method `create_new_user` of DataBaseCommunicator, when it is called from many threads at once
+        (like the sessions of a server share it).
+        Verify every user is created once, and every thread reads the users on a connection of its own.
+        """
+        def create_users(thread_index):
+            for user_index in range(10):
+                self.db.create_new_user(f"user_{thread_index}_{user_index}", self.DEFAULT_PASSWORD)
+
+        threads = [threading.Thread(target=create_users, args=(thread_index,)) for thread_index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(self.db.is_username_exists(f"user_{thread_index}_{user_index}")
+                            for thread_index in range(8) for user_index in range(10)))
+        self.assertEqual(self.db.connection_pools[0].as_dict()["writes"], 1 + 8 * 10)
+
     def test_remove_username(self):     
         """
         Check the method `remove_username` of DataBaseCommunicator.
@@ -73,6 +121,44 @@ class TestDataBaseCommunicator(unittest.TestCase):
 
         self.assertFalse(self.db.is_password_correct(self.DEFAULT_USERNAME, wrong_password))
 
+    def test_verify_credentials(self):
+        """
+        Check the method `verify_credentials` of DataBaseCommunicator.
+        Verify it raises UserNotExistsException for a non existing user, and that the user is found once it is created.
+        Then verify the password with a single query, and verify it again from the credential cache without querying.
+        """
+        with self.assertRaises(UserNotExistsException):
+            self.db.verify_credentials(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)
+        self.db.create_new_user(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)
+
+        self.assertTrue(self.db.verify_credentials(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD))
+        with patch.object(self.db.connection_pools[0], 'reader') as reader:
+            self.assertTrue(self.db.verify_credentials(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD))
+            self.assertFalse(self.db.verify_credentials(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD + "blabla"))
+        self.assertFalse(reader.called)
+
+        self.db.remove_username(self.DEFAULT_USERNAME)
+        with self.assertRaises(UserNotExistsException):
+            self.db.verify_credentials(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)
+
+    def test_create_new_users(self):
+        """
+        Check the methods `create_new_users` and `iterate_users` of DataBaseCommunicator.
+        Create many users in small batches, including a user that already exists and a username that is cached as not
+        existing. Verify the existing user is skipped, and all the users are read in order.
+        """
+        self.db.create_new_user(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)
+        with self.assertRaises(UserNotExistsException):
+            self.db.verify_credentials("user_0", self.DEFAULT_PASSWORD)
+        users = [(f"user_{user_index}", self.DEFAULT_PASSWORD) for user_index in range(10)]
+
+        created_users = self.db.create_new_users(iter(users + [(self.DEFAULT_USERNAME, "other")]), batch_size=3)
+
+        self.assertEqual(created_users, 10)
+        self.assertTrue(self.db.verify_credentials("user_0", self.DEFAULT_PASSWORD))
+        self.assertEqual(list(self.db.iterate_users(batch_size=4)),
+                         sorted(users + [(self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD)]))
+
     def test_all_exceptions(self):
         """
         Check the exceptions of DataBaseCommunicator.
@@ -88,5 +174,64 @@ class TestDataBaseCommunicator(unittest.TestCase):
         with self.assertRaises(UserNotExistsException):
             self.db.remove_username(non_existing_user)
 
+class TestShardedDataBaseCommunicator(unittest.TestCase):
+    SHARDS = 4
+    DEFAULT_PASSWORD = "password"
+
+    def setUp(self):
+        self.db_directory = tempfile.TemporaryDirectory()
+        self.db = DataBaseCommunicator(DataBaseCommunicator.create_connection_pools(self.SHARDS,
+                                                                                    self.db_directory.name))
+
+    def tearDown(self):
+        self.db.close()
+        self.db_directory.cleanup()
+
+    def test_users_are_routed_to_their_shard(self):
+        """
+        Create many users, and verify every user is stored only in the shard of its username, every shard has users,
+        and all the users are read in order.
+        """
+        usernames = [f"user_{user_index}" for user_index in range(40)]
+        for username in usernames:
+            self.db.create_new_user(username, self.DEFAULT_PASSWORD)
+
+        for shard_index, connection_pool in enumerate(self.db.connection_pools):
+            shard_usernames = [username for username, in
+                               connection_pool.reader().execute("SELECT username FROM USERS").fetchall()]
+            self.assertTrue(shard_usernames)
+            self.assertTrue(all(self.db.get_shard_index(username) == shard_index for username in shard_usernames))
+        self.assertEqual([username for username, _ in self.db.iterate_users(batch_size=3)], sorted(usernames))
+        self.assertTrue(all(self.db.verify_credentials(username, self.DEFAULT_PASSWORD) for username in usernames))
+
+        self.db.remove_username(usernames[0])
+        self.assertFalse(self.db.is_username_exists(usernames[0]))
+        with self.assertRaises(UserAlreadyExistsException):
+            self.db.create_new_user(usernames[1], self.DEFAULT_PASSWORD)
+
+    def test_writes_of_different_shards_run_in_parallel(self):
+        """
+        Hold the writer of the shard of a user, and create a user of another shard meanwhile.
+        Verify the user is created without waiting for the held writer.
+        """
+        held_username = "held"
+        other_username = next(f"other_{user_index}" for user_index in range(100)
+                              if self.db.get_shard_index(f"other_{user_index}") != self.db.get_shard_index(held_username))
+
+        with self.db.get_connection_pool(held_username).writer():
+            self.db.create_new_user(other_username, self.DEFAULT_PASSWORD)
+
+        self.assertTrue(self.db.is_username_exists(other_username))
+        self.assertEqual(self.db.get_connection_pool(other_username).as_dict()["write_waits"], 0)
+
+    def test_shard_files(self):
+        """
+        Check every shard is a file of its own, and a users DB of a single shard is the unsharded file.
+        """
+        self.assertEqual(sorted(file_name for file_name in os.listdir(self.db_directory.name)
+                                if file_name.endswith(".db")),
+                         sorted(f"clients_{shard_index}_of_{self.SHARDS}.db" for shard_index in range(self.SHARDS)))
+        self.assertEqual(DataBaseCommunicator.get_shard_file_name(1, 0), DataBaseCommunicator.DB_FILE_NAME)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import unittest
+import threading
+import time
+
+from dropbox_system.server.memory_budget import MemoryBudget
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def test_reserve_and_release(self):
+        """
+        Check reserved bytes are counted until they are released, and the peak reserved bytes are kept.
+        """
+        memory_budget = MemoryBudget(capacity=100)
+        assert memory_budget.reserve(60)
+        assert memory_budget.reserve(40)
+        memory_budget.release(60)
+        metrics = memory_budget.as_dict()
+        assert metrics["reserved"] == 40
+        assert metrics["peak_reserved"] == 100
+        assert metrics["reservations"] == 2
+
+    def test_reservation_larger_than_capacity_is_rejected(self):
+        """
+        Check a reservation that can never fit is rejected right away.
+        """
+        memory_budget = MemoryBudget(capacity=100, wait_timeout=10)
+        start_time = time.monotonic()
+        assert not memory_budget.reserve(101)
+        assert time.monotonic() - start_time < 1
+        assert memory_budget.rejected == 1
+
+    def test_reservation_is_rejected_after_wait_timeout(self):
+        """
+        Check a reservation that does not fit is rejected once wait_timeout passes without a release.
+        """
+        memory_budget = MemoryBudget(capacity=100, wait_timeout=0.1)
+        assert memory_budget.reserve(80)
+        assert not memory_budget.reserve(40)
+        assert memory_budget.waits == 1
+        assert memory_budget.rejected == 1
+        assert memory_budget.reserved == 80
+
+    def test_reservation_waits_for_release(self):
+        """
+        Check a reservation that does not fit waits until enough bytes are released.
+        """
+        memory_budget = MemoryBudget(capacity=100, wait_timeout=5)
+        assert memory_budget.reserve(80)
+        releasing_thread = threading.Timer(0.1, memory_budget.release, args=(80,))
+        releasing_thread.start()
+        assert memory_budget.reserve(40)
+        releasing_thread.join()
+        assert memory_budget.waits == 1
+        assert memory_budget.reserved == 40
+
+    def test_reset(self):
+        """
+        Check reset zeroes the metrics and keeps the current reservations.
+        """
+        memory_budget = MemoryBudget(capacity=100)
+        memory_budget.reserve(30)
+        memory_budget.reserve(50)
+        memory_budget.release(50)
+        memory_budget.reset()
+        assert memory_budget.as_dict() == {"capacity": 100, "wait_timeout": MemoryBudget.DEFAULT_WAIT_TIMEOUT,
+                                           "reserved": 30, "peak_reserved": 30, "reservations": 0, "waits": 0,
+                                           "rejected": 0}
+
+    def test_invalid_capacity(self):
+        """
+        Check a budget can not be created without capacity.
+        """
+        with self.assertRaises(ValueError):
+            MemoryBudget(capacity=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import struct
+
+from dropbox_system.common import message_codec, compression
+from dropbox_system.common.message_codec import MessageCodec, TEXT
+
+
+class TestMessageCodec(unittest.TestCase):
+    DEFAULT_USERNAME = "username"
+    DEFAULT_PASSWORD = "password"
+    DEFAULT_FILENAME = "file.txt"
+    DEFAULT_REQUESTED_DIR = "dir"
+    DEFAULT_FILE_LEN = 500
+
+    def test_pack_register_request(self):
+        """
+        Check the method `pack` of MessageCodec.
+        Pack a register request and verify it has the protocol layout, with the length fields filled automatically.
+        """
+        expected = struct.pack("I", len(self.DEFAULT_USERNAME)) + self.DEFAULT_USERNAME.encode() + \
+                   struct.pack("I", len(self.DEFAULT_PASSWORD)) + self.DEFAULT_PASSWORD.encode()
+        packed = message_codec.REGISTER_REQUEST.pack(username=self.DEFAULT_USERNAME, password=self.DEFAULT_PASSWORD)
+        self.assertEqual(packed, expected)
+
+    def test_pack_upload_request(self):
+        """
+        Check the method `pack` of MessageCodec.
+        Pack an upload request and verify consecutive numeric fields are packed together, before the text fields.
+        """
+        expected = struct.pack("QII", self.DEFAULT_FILE_LEN, len(self.DEFAULT_FILENAME), len(self.DEFAULT_REQUESTED_DIR)) + \
+                   self.DEFAULT_FILENAME.encode() + self.DEFAULT_REQUESTED_DIR.encode() + \
+                   struct.pack("I", compression.COMPRESSION_ZLIB)
+        packed = message_codec.UPLOAD_FILE_REQUEST.pack(file_len=self.DEFAULT_FILE_LEN, file_name=self.DEFAULT_FILENAME,
+                                                        requested_dir=self.DEFAULT_REQUESTED_DIR,
+                                                        compression=compression.COMPRESSION_ZLIB)
+        self.assertEqual(packed, expected)
+
+    def test_unpack_packed_message(self):
+        """
+        Check the methods `pack` and `unpack` of MessageCodec.
+        Pack messages and verify unpacking them returns the packed values, without the length fields.
+        """
+        packed = message_codec.UPLOAD_FILE_REQUEST.pack(file_len=self.DEFAULT_FILE_LEN, file_name=self.DEFAULT_FILENAME,
+                                                        requested_dir=self.DEFAULT_REQUESTED_DIR)
+        self.assertEqual(message_codec.UPLOAD_FILE_REQUEST.unpack(packed),
+                         (self.DEFAULT_FILE_LEN, self.DEFAULT_FILENAME, self.DEFAULT_REQUESTED_DIR,
+                          compression.COMPRESSION_NONE))
+
+        packed = message_codec.LIST_FILES_RESPONSE.pack(files_list=b"a.txt , b.txt")
+        self.assertEqual(message_codec.LIST_FILES_RESPONSE.unpack(memoryview(packed)), (b"a.txt , b.txt",))
+
+    def test_unpack_truncated_message(self):
+        """
+        Check the method `unpack` of MessageCodec.
+        Unpack a message that is shorter than its declared text length and expect to receive struct.error.
+        """
+        codec = MessageCodec(("name_len", "I"), ("name", TEXT))
+        with self.assertRaises(struct.error):
+            codec.unpack(struct.pack("I", 10) + b"short")
+
+    def test_unpack_message_without_optional_fields(self):
+        """
+        Check the method `unpack` of MessageCodec.
+        Unpack a message that ends before its optional trailing fields, and verify they get their default values.
+        """
+        codec = MessageCodec(("file_len", "Q"), ("compression", "I"), ("level", "I"), defaults={"compression": 0, "level": 6})
+        self.assertEqual(codec.unpack(struct.pack("Q", self.DEFAULT_FILE_LEN)), (self.DEFAULT_FILE_LEN, 0, 6))
+        self.assertEqual(codec.unpack(codec.pack(file_len=self.DEFAULT_FILE_LEN, compression=2, level=9)),
+                         (self.DEFAULT_FILE_LEN, 2, 9))
+
+if __name__ == '__main__':
+    unittest.main()
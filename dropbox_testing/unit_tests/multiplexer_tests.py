@@ -0,0 +1,101 @@
+import unittest
+import socket
+import threading
+import queue
+
+from dropbox_system.common.multiplexer import Multiplexer
+
+
+class TestMultiplexer(unittest.TestCase):
+    def setUp(self):
+        client_socket, server_socket = socket.socketpair()
+        self.client_multiplexer = Multiplexer(client_socket)
+        self.server_multiplexer = Multiplexer(server_socket)
+        self.client_multiplexer.start_receiving()
+        self.accepted_streams = queue.Queue()
+        threading.Thread(target=self._accept_streams, daemon=True).start()
+
+    def _accept_streams(self):
+        """
+        Receives the frames of the server side, and collects the streams opened by the client.
+        """
+        for stream in self.server_multiplexer.receive_frames():
+            self.accepted_streams.put(stream)
+
+    def tearDown(self):
+        self.client_multiplexer.connection.sock.close()
+        self.server_multiplexer.connection.sock.close()
+
+    def _receive_exactly(self, stream, size):
+        """
+        Receives exactly size bytes from a stream.
+        """
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            chunk_len = stream.recv_into(view[received:])
+            self.assertNotEqual(chunk_len, 0)
+            received += chunk_len
+        return bytes(buffer)
+
+    def test_stream_round_trip(self):
+        """
+        Check the streams of Multiplexer.
+        Open a stream, send data larger than a frame on it, and verify the server accepts the stream and receives the data.
+        Then reply on the stream, close it and verify the client receives the reply followed by the end of the stream.
+        """
+        data = b"A" * (Multiplexer.MAX_FRAME_SIZE * 3 + 1)
+        client_stream = self.client_multiplexer.open_stream()
+        client_stream.sendall(data)
+
+        server_stream = self.accepted_streams.get(timeout=5)
+        self.assertEqual(server_stream.stream_id, client_stream.stream_id)
+        self.assertEqual(self._receive_exactly(server_stream, len(data)), data)
+        # Received frames are buffered by the multiplexer, so receiving from a stream copies their payload
+        self.assertEqual(self.server_multiplexer.connection.counters.copied_bytes, len(data))
+
+        server_stream.sendmsg([b"reply ", b"data"])
+        server_stream.close()
+        self.assertEqual(self._receive_exactly(client_stream, len(b"reply data")), b"reply data")
+        self.assertEqual(client_stream.recv_into(bytearray(1)), 0)
+
+    def test_slow_stream_does_not_block_other_streams(self):
+        """
+        Check the flow control of Multiplexer.
+        Send more than a window of data on a stream that is not consumed, and verify data sent on another stream
+        is still received. Then consume the first stream and verify all of its data arrives.
+        """
+        first_client_stream = self.client_multiplexer.open_stream()
+        second_client_stream = self.client_multiplexer.open_stream()
+        first_client_stream.sendall(b"1")
+        second_client_stream.sendall(b"2")
+        first_server_stream = self.accepted_streams.get(timeout=5)
+        second_server_stream = self.accepted_streams.get(timeout=5)
+
+        large_data = b"L" * (Multiplexer.INITIAL_WINDOW_SIZE * 3)
+        sender_thread = threading.Thread(target=first_server_stream.sendall, args=(large_data,), daemon=True)
+        sender_thread.start()
+        second_server_stream.sendall(b"small")
+
+        self.assertEqual(self._receive_exactly(second_client_stream, len(b"small")), b"small")
+        self.assertEqual(self._receive_exactly(first_client_stream, len(large_data)), large_data)
+        sender_thread.join()
+    def test_streams_used_out_of_order(self):
+        """
+        Check the stream IDs of Multiplexer.
+        Open two streams and send on the second one before the first one, and verify the server accepts both
+        streams, with the data of each one.
+        """
+        first_client_stream = self.client_multiplexer.open_stream()
+        second_client_stream = self.client_multiplexer.open_stream()
+        second_client_stream.sendall(b"2")
+        first_client_stream.sendall(b"1")
+
+        accepted_streams = [self.accepted_streams.get(timeout=5), self.accepted_streams.get(timeout=5)]
+        self.assertEqual([self._receive_exactly(stream, 1) for stream in accepted_streams], [b"2", b"1"])
+        self.assertEqual([stream.stream_id for stream in accepted_streams],
+                         [second_client_stream.stream_id, first_client_stream.stream_id])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import threading
+import time
+from unittest.mock import Mock
+
+from dropbox_system.server.path_locks import PathLocks, ReadWriteLock
+from dropbox_system.server.server_handler import ServerHandler
+
+ROOT = "/files/user"
+
+
+class TestPathLocks(unittest.TestCase):
+    def _hold(self, path_locks: PathLocks, path: str, exclusive: bool) -> tuple:
+        """
+        Holds the locks of a path on another thread, until the returned event is set.
+
+        Returns:
+            tuple: The holding thread, and the event that releases the locks.
+        """
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            with path_locks.locked(path, exclusive, ROOT):
+                locked.set()
+                release.wait()
+
+        holding_thread = threading.Thread(target=hold)
+        holding_thread.start()
+        locked.wait()
+        return holding_thread, release
+
+    def _is_blocked(self, path_locks: PathLocks, path: str, exclusive: bool) -> bool:
+        """
+        Returns:
+            bool: True if locking the path waits for more than 0.1 seconds (the waiting thread is left to finish
+                  once the locks are released).
+        """
+        locked = threading.Event()
+
+        def lock():
+            with path_locks.locked(path, exclusive, ROOT):
+                locked.set()
+
+        threading.Thread(target=lock, daemon=True).start()
+        return not locked.wait(0.1)
+
+    def test_unrelated_paths_do_not_wait(self):
+        """
+        Check exclusive operations on different files of the same directory run in parallel.
+        """
+        path_locks = PathLocks()
+        holding_thread, release = self._hold(path_locks, os.path.join(ROOT, "dir", "first"), exclusive=True)
+        assert not self._is_blocked(path_locks, os.path.join(ROOT, "dir", "second"), exclusive=True)
+        assert not self._is_blocked(path_locks, ROOT, exclusive=False)
+        release.set()
+        holding_thread.join()
+        assert path_locks.as_dict()["contended_acquisitions"] == 0
+
+    def test_removed_directory_waits_for_the_paths_inside_it(self):
+        """
+        Check removing a directory waits for an upload into one of its sub directories, and the upload waits for
+        the removal of the directory.
+        """
+        path_locks = PathLocks()
+        directory_path = os.path.join(ROOT, "dir")
+        holding_thread, release = self._hold(path_locks, os.path.join(directory_path, "sub", "file"), exclusive=True)
+        assert self._is_blocked(path_locks, directory_path, exclusive=True)
+        release.set()
+        holding_thread.join()
+
+        holding_thread, release = self._hold(path_locks, directory_path, exclusive=True)
+        assert self._is_blocked(path_locks, os.path.join(directory_path, "file"), exclusive=True)
+        release.set()
+        holding_thread.join()
+        time.sleep(0.1)
+        metrics = path_locks.as_dict()
+        assert metrics["contended_acquisitions"] == 2
+        assert metrics["max_wait_time"] >= 0.1
+
+    def test_readers_share_writers_are_exclusive(self):
+        """
+        Check downloads of the same file run in parallel, and removing the file waits for them.
+        """
+        path_locks = PathLocks()
+        file_path = os.path.join(ROOT, "file")
+        holding_thread, release = self._hold(path_locks, file_path, exclusive=False)
+        assert not self._is_blocked(path_locks, file_path, exclusive=False)
+        assert self._is_blocked(path_locks, file_path, exclusive=True)
+        release.set()
+        holding_thread.join()
+
+    def test_shared_stripe_does_not_deadlock(self):
+        """
+        Check a single stripe (every path shares the same lock) still serializes operations without deadlocking,
+        when an operation needs the stripe both shared and exclusively.
+        """
+        path_locks = PathLocks(stripes=1)
+        threads = [threading.Thread(target=lambda index=index: self._lock_briefly(path_locks, index)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+            assert not thread.is_alive()
+        assert path_locks.as_dict()["acquisitions"] == 8
+
+    def _lock_briefly(self, path_locks: PathLocks, index: int) -> None:
+        with path_locks.locked(os.path.join(ROOT, "dir", str(index)), index % 2 == 0, ROOT):
+            time.sleep(0.01)
+
+    def test_waiting_writer_has_priority(self):
+        """
+        Check new readers wait for a writer that waits for the current readers, so writers do not starve.
+        """
+        lock = ReadWriteLock()
+        lock.acquire(exclusive=False)
+        writer_thread = threading.Thread(target=lambda: (lock.acquire(exclusive=True), lock.release(exclusive=True)))
+        writer_thread.start()
+        time.sleep(0.1)
+
+        reader_acquired = threading.Event()
+        reader_thread = threading.Thread(target=lambda: (lock.acquire(exclusive=False), reader_acquired.set()))
+        reader_thread.start()
+        assert not reader_acquired.wait(0.1)
+        lock.release(exclusive=False)
+        writer_thread.join()
+        reader_thread.join()
+        assert reader_acquired.is_set()
+
+    def test_server_handler_locks_removed_path(self):
+        """
+        Check the ServerHandler removes a file while holding an exclusive lock of its path.
+        """
+        path_locks = PathLocks()
+        handler = ServerHandler(Mock(), 'path', path_locks=path_locks)
+        handler.logged_in_user = 'user'
+        handler.user_directory_path = ROOT
+        handler._remove_file("file")
+        assert path_locks.as_dict()["acquisitions"] == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,35 +1,271 @@
 import unittest
 import struct
-from unittest.mock import MagicMock
+import io
+import itertools
+import socket
+from unittest.mock import MagicMock, patch
 
 from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.xor_encryption import xor_data
+from dropbox_system.common import compression, message_codec
 
 
 class TestServerHandler(unittest.TestCase):
     def test_send_header(self):
         """
         Check the method send_header of RequestHandler.
-        Call the funtion and verify socket.send is triggered with the required parameter.
+        Call the funtion and verify socket.sendall is triggered with the required parameter.
         """
         mock_socket = MagicMock()
         handler = RequestHandler(mock_socket)
         header = b'HEADER'
         handler.send_header(header)
-        mock_socket.send.assert_called_once_with(header)
+        mock_socket.sendall.assert_called_once_with(header)
     
+    def _mock_received_data(self, mock_socket, data, max_chunk_size):
+        """
+        Makes socket.recv_into return the given data, at most max_chunk_size bytes per call (like short reads of a real socket).
+        """
+        data_view = memoryview(data)
+
+        def recv_into(buffer):
+            nonlocal data_view
+            received = min(len(buffer), max_chunk_size, len(data_view))
+            buffer[:received] = data_view[:received]
+            data_view = data_view[received:]
+            return received
+
+        mock_socket.recv_into.side_effect = recv_into
+
     def test_receive_numeric_value(self):
         """
         Check the method receive_numeric_value of RequestHandler.
-        Call the funtion and verify socket.recv is triggered and returned the right value.
+        Call the funtion and verify socket.recv_into is triggered and returned the right value.
         """
         mock_socket = MagicMock()
         handler = RequestHandler(mock_socket)
-        mock_socket.recv.return_value = struct.pack('I', 1234)
+        self._mock_received_data(mock_socket, struct.pack('I', 1234), handler.NUMERIC_FIELD_SIZE)
         
         result = handler.receive_numeric_value()
         self.assertEqual(result, 1234)
-        mock_socket.recv.assert_called_once_with(handler.NUMERIC_FIELD_SIZE)
+        mock_socket.recv_into.assert_called_once()
+
+    def test_receive_numeric_value_short_reads(self):
+        """
+        Check the method receive_numeric_value of RequestHandler.
+        Make the socket return one byte per recv call, and verify the whole value is received.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket)
+        self._mock_received_data(mock_socket, struct.pack('I', 1234), 1)
+
+        result = handler.receive_numeric_value()
+        self.assertEqual(result, 1234)
+        self.assertEqual(mock_socket.recv_into.call_count, handler.NUMERIC_FIELD_SIZE)
+
+    def test_receive_header_short_reads(self):
+        """
+        Check the method receive_header of RequestHandler.
+        Make the socket return 1 byte per call, and verify the header is received and parsed with its codec,
+        reusing the same buffer for every header.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket)
+        headers = struct.pack("III", 2004, 0, 8) + struct.pack("III", 2006, 5, 0)
+        self._mock_received_data(mock_socket, headers, 1)
+
+        self.assertEqual(handler.receive_header(message_codec.RESPONSE_HEADER), (2004, 0, 8))
+        self.assertEqual(handler.receive_header(message_codec.RESPONSE_HEADER), (2006, 5, 0))
+        self.assertEqual(mock_socket.recv_into.call_count, len(headers))
+        self.assertEqual(handler.counters.allocations, 1)
+
+    def test_receive_bytes(self):
+        """
+        Check the method receive_bytes of RequestHandler.
+        Call the funtion and verify the received data is decrypted, and a single buffer is allocated.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket)
+        data = b"data" * 1000
+        self._mock_received_data(mock_socket, xor_data(data), 1500)
+
+        result = handler.receive_bytes(len(data))
+        self.assertEqual(result, data)
+        self.assertEqual(handler.counters.allocations, 1)
+        self.assertEqual(handler.counters.copies, 0)
+
+    def test_receive_bytes_connection_broken(self):
+        """
+        Check the method receive_bytes of RequestHandler.
+        Close the connection before all data is received and expect to receive ConnectionError.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket)
+        self._mock_received_data(mock_socket, b"data", 1500)
+
+        with self.assertRaises(ConnectionError):
+            handler.receive_bytes(10)
+
+    def test_receive_file_content(self):
+        """
+        Check the method receive_file_content of RequestHandler.
+        Receive a file larger than a single chunk and verify the decrypted content is written to the file.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket)
+        file_content = b"A" * (handler.chunk_size * 2 + 10)
+        self._mock_received_data(mock_socket, xor_data(file_content), handler.chunk_size)
+
+        file = io.BytesIO()
+        handler.receive_file_content(file, len(file_content))
+        self.assertEqual(file.getvalue(), file_content)
     
+    def _mock_sent_data(self, mock_socket):
+        """
+        Collects the data sent with socket.sendall into a bytearray, and returns it.
+        """
+        sent_data = bytearray()
+        mock_socket.sendall.side_effect = sent_data.extend
+        return sent_data
+
+    def test_send_file_content(self):
+        """
+        Check the method send_file_content of RequestHandler.
+        Send a file larger than a single chunk and verify the encrypted content is sent in chunks.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket, chunk_size=1500)
+        sent_data = self._mock_sent_data(mock_socket)
+        file_content = b"data" * 1000
+
+        handler.send_file_content(file_content, len(file_content))
+        self.assertEqual(sent_data, xor_data(file_content))
+        self.assertEqual(mock_socket.sendall.call_count, 3)
+        self.assertEqual(handler.counters.allocations, 1)
+
+    def test_send_file(self):
+        """
+        Check the method send_file of RequestHandler.
+        Send a file object and verify its encrypted content is sent.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket, chunk_size=1500)
+        sent_data = self._mock_sent_data(mock_socket)
+        file_content = b"data" * 1000
+
+        handler.send_file(io.BytesIO(file_content), len(file_content))
+        self.assertEqual(sent_data, xor_data(file_content))
+
+    def test_send_file_adaptive_chunk_size(self):
+        """
+        Check the method send_file of RequestHandler with adaptive chunk size.
+        Send a large file and verify the chunk size grows while the content is still sent correctly.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket, chunk_size=1024, adaptive_chunk_size=True)
+        sent_data = self._mock_sent_data(mock_socket)
+        file_content = b"A" * 1024 * 1024
+
+        with patch('time.perf_counter', side_effect=itertools.count()):
+            handler.send_file(io.BytesIO(file_content), len(file_content))
+        self.assertEqual(sent_data, xor_data(file_content))
+        self.assertGreater(handler.adaptive_chunk_size.chunk_size, 1024)
+
+    def test_compressed_file_round_trip(self):
+        """
+        Check the methods send_file and receive_file_content of RequestHandler with every compression codec.
+        Send a compressible file, receive the sent data and verify the content is restored and was sent compressed.
+        """
+        file_content = b"dropbox " * 100000
+        for codec in compression.COMPRESSION_CODECS:
+            with self.subTest(codec=compression.COMPRESSION_NAMES[codec]):
+                sending_socket = MagicMock()
+                sent_data = bytearray()
+                sending_socket.sendmsg.side_effect = lambda buffers: sent_data.extend(b"".join(buffers)) or \
+                                                                     sum(len(buffer) for buffer in buffers)
+                sender = RequestHandler(sending_socket, chunk_size=16 * 1024)
+                sender.send_file(io.BytesIO(file_content), len(file_content), codec)
+                self.assertLess(len(sent_data), len(file_content) // 10)
+                self.assertEqual(sender.last_compression_report.original_bytes, len(file_content))
+
+                receiving_socket = MagicMock()
+                self._mock_received_data(receiving_socket, sent_data, 1000)
+                receiver = RequestHandler(receiving_socket, chunk_size=16 * 1024)
+                file = io.BytesIO()
+                receiver.receive_file_content(file, len(file_content), codec)
+                self.assertEqual(file.getvalue(), file_content)
+                self.assertLess(receiver.last_compression_report.ratio, 0.1)
+
+    def test_receive_compressed_file_content_size_mismatch(self):
+        """
+        Check the method receive_file_content of RequestHandler with compression.
+        Receive compressed content that is longer than the declared file size and expect to receive ValueError
+        as soon as the size is exceeded, without writing more than the file size or receiving the rest of the content.
+        """
+        file_content = b"A" * 10000
+        sending_socket = MagicMock()
+        sent_data = bytearray()
+        sending_socket.sendmsg.side_effect = lambda buffers: sent_data.extend(b"".join(buffers)) or \
+                                                             sum(len(buffer) for buffer in buffers)
+        RequestHandler(sending_socket).send_file(io.BytesIO(file_content), len(file_content), compression.COMPRESSION_ZLIB)
+
+        receiving_socket = MagicMock()
+        self._mock_received_data(receiving_socket, sent_data, len(sent_data))
+        receiver = RequestHandler(receiving_socket)
+        file = io.BytesIO()
+        with self.assertRaises(ValueError):
+            receiver.receive_file_content(file, 100, compression.COMPRESSION_ZLIB)
+        self.assertLessEqual(len(file.getvalue()), 100)
+        # The empty block that ends the content was never received
+        self.assertLess(receiver.counters.received_bytes, len(sent_data))
+
+    def test_send_message_partial_writes(self):
+        """
+        Check the method send_message of RequestHandler.
+        Make the socket send only 3 bytes per sendmsg call, and verify the header and the encrypted data are fully sent.
+        """
+        mock_socket = MagicMock()
+        handler = RequestHandler(mock_socket)
+        sent_data = bytearray()
+
+        def sendmsg(buffers):
+            sent = b"".join(buffers)[:3]
+            sent_data.extend(sent)
+            return len(sent)
+
+        mock_socket.sendmsg.side_effect = sendmsg
+        header = b"HEADER"
+        data = b"data"
+        handler.send_message(header, data)
+        self.assertEqual(sent_data, header + xor_data(data))
+        self.assertEqual(mock_socket.sendmsg.call_count, 4)
+        # Only the encryption of the data copies it, the header is sent from its own buffer
+        self.assertEqual((handler.counters.copies, handler.counters.copied_bytes), (1, len(data)))
+
+    def test_send_message_without_sendmsg(self):
+        """
+        Check the method send_message of RequestHandler, on a socket that does not support sendmsg.
+        Verify the header and the encrypted data are joined into a single buffer, and the copy is counted.
+        """
+        mock_socket = MagicMock(spec=["sendall", "setsockopt", "close"])
+        handler = RequestHandler(mock_socket)
+        header = b"HEADER"
+        data = b"data"
+        handler.send_message(header, data)
+
+        mock_socket.sendall.assert_called_once_with(header + xor_data(data))
+        self.assertEqual(handler.counters.copies, 2)
+        self.assertEqual(handler.counters.copied_bytes, len(data) + len(header) + len(data))
+
+    def test_no_delay_enabled(self):
+        """
+        Check the constructor of RequestHandler.
+        Verify Nagle's algorithm is disabled on the socket.
+        """
+        mock_socket = MagicMock()
+        RequestHandler(mock_socket)
+        mock_socket.setsockopt.assert_called_once_with(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     def test_socket_close_on_request_handler_del(self):
         """
         Check the __del__ function of RequestHandler.
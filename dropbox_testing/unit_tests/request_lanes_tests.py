@@ -0,0 +1,117 @@
+import unittest
+import threading
+import time
+from unittest.mock import Mock
+
+from dropbox_system.server.request_lanes import Lane, RequestLanes
+from dropbox_system.server.server_handler import ServerHandler
+
+
+class TestRequestLanes(unittest.TestCase):
+    def test_classify_request_handlers(self):
+        """
+        Check every request the ServerHandler handles is classified, and only transfers are bulk requests.
+        """
+        request_lanes = RequestLanes()
+        handler = ServerHandler(Mock(), 'path')
+        classes = {request_code: request_lanes.classify(request_code) for request_code in handler.request_handlers}
+        assert {request_code for request_code, request_class in classes.items() if request_class == RequestLanes.BULK} \
+            == {handler.UPLOAD_FILE_REQUEST_CODE, handler.DOWNLOAD_FILE_REQUEST_CODE}
+        assert classes[handler.LOGIN_REQUEST_CODE] == RequestLanes.METADATA
+        assert classes[handler.LIST_FILES_REQUEST_CODE] == RequestLanes.METADATA
+
+    def test_full_bulk_lane_does_not_block_metadata(self):
+        """
+        Fill the bulk lane, and verify another bulk request waits for it while a metadata request is handled
+        right away.
+        """
+        request_lanes = RequestLanes(bulk_capacity=1)
+        transfer_started, release_transfer = threading.Event(), threading.Event()
+
+        def transfer(request):
+            transfer_started.set()
+            release_transfer.wait()
+
+        transfer_thread = threading.Thread(target=request_lanes.handle,
+                                           args=(ServerHandler.UPLOAD_FILE_REQUEST_CODE, transfer, b""))
+        transfer_thread.start()
+        transfer_started.wait()
+
+        waiting_transfer = Mock()
+        waiting_thread = threading.Thread(target=request_lanes.handle,
+                                          args=(ServerHandler.DOWNLOAD_FILE_REQUEST_CODE, waiting_transfer, b""))
+        waiting_thread.start()
+        list_files = Mock()
+        request_lanes.handle(ServerHandler.LIST_FILES_REQUEST_CODE, list_files, b"request")
+        list_files.assert_called_once_with(b"request")
+        waiting_transfer.assert_not_called()
+
+        # Let the waiting transfer reach the full lane before it is released
+        time.sleep(0.1)
+        release_transfer.set()
+        transfer_thread.join()
+        waiting_thread.join()
+        waiting_transfer.assert_called_once()
+        metrics = request_lanes.as_dict()
+        assert metrics[RequestLanes.BULK]["handled"] == 2
+        assert metrics[RequestLanes.BULK]["waits"] == 1
+        assert metrics[RequestLanes.METADATA]["handled"] == 1
+
+    def test_bulk_yields_to_metadata(self):
+        """
+        Check a chunk of a transfer waits while a metadata request is handled, for MAX_BULK_YIELD_TIME at most,
+        and does not wait otherwise.
+        """
+        request_lanes = RequestLanes()
+        metadata_lane = request_lanes.lanes[RequestLanes.METADATA]
+
+        start_time = time.perf_counter()
+        request_lanes.yield_to_metadata()
+        assert time.perf_counter() - start_time < RequestLanes.MAX_BULK_YIELD_TIME
+
+        lane_start_time = metadata_lane.enter()
+        start_time = time.perf_counter()
+        request_lanes.yield_to_metadata()
+        assert time.perf_counter() - start_time >= RequestLanes.MAX_BULK_YIELD_TIME
+        metadata_lane.exit(lane_start_time)
+
+    def test_no_metadata_priority(self):
+        """
+        Check chunks of transfers do not wait for metadata requests when the priority is off.
+        """
+        request_lanes = RequestLanes(prioritize_metadata=False)
+        request_lanes.lanes[RequestLanes.METADATA].enter()
+        start_time = time.perf_counter()
+        request_lanes.yield_to_metadata()
+        assert time.perf_counter() - start_time < RequestLanes.MAX_BULK_YIELD_TIME
+
+    def test_lane_latency(self):
+        """
+        Check a lane measures the latency of its requests, even of requests that failed.
+        """
+        lane = Lane("lane")
+        request_lanes = RequestLanes()
+        request_lanes.lanes[RequestLanes.METADATA] = lane
+        request_lanes.handle(ServerHandler.LIST_FILES_REQUEST_CODE, lambda request: time.sleep(0.01), b"")
+        with self.assertRaises(ValueError):
+            request_lanes.handle(ServerHandler.LIST_FILES_REQUEST_CODE, Mock(side_effect=ValueError), b"")
+        metrics = lane.as_dict()
+        assert metrics["handled"] == 2
+        assert metrics["active"] == 0
+        assert metrics["p99_latency"] >= 0.005
+
+    def test_server_handler_handles_requests_on_lanes(self):
+        """
+        Check the ServerHandler handles every request on the lane of its class.
+        """
+        request_lanes = RequestLanes()
+        handler = ServerHandler(Mock(), 'path', request_lanes=request_lanes)
+        handler._parse_user_command = Mock(return_value=(handler.LIST_FILES_REQUEST_CODE, b""))
+        handler.request_handlers[handler.LIST_FILES_REQUEST_CODE] = Mock()
+        handler._handle_next_request()
+        handler.request_handlers[handler.LIST_FILES_REQUEST_CODE].assert_called_once_with(b"")
+        assert request_lanes.as_dict()[RequestLanes.METADATA]["handled"] == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,7 @@ class TestRequestParser(unittest.TestCase):
     DEFAULT_FILENAME = "file.txt"
     DEFAULT_REQUESTED_DIR = ""
     DEFAULT_FILE_LEN = 500
+    DEFAULT_COMPRESSION = 0
 
     def test_parse_regular_register_request(self):
         """
@@ -52,9 +53,31 @@ class TestRequestParser(unittest.TestCase):
         password_len = struct.pack("I", len(self.DEFAULT_PASSWORD))
         request = username_len + self.DEFAULT_USERNAME.encode() + password_len + self.DEFAULT_PASSWORD.encode()
 
-        parsed_username, parsed_password = parse_login_request(request)
+        parsed_username, parsed_password, request_token = parse_login_request(request)
         self.assertEqual(parsed_username, self.DEFAULT_USERNAME)
         self.assertEqual(parsed_password, self.DEFAULT_PASSWORD)
+        self.assertFalse(request_token)
+
+    def test_parse_login_request_with_token(self):
+        """
+        Check the method parse_login_request with a request that asks for a session token.
+        Verify the parser is returning the expected parsed result.
+        """
+        username_len = struct.pack("I", len(self.DEFAULT_USERNAME))
+        password_len = struct.pack("I", len(self.DEFAULT_PASSWORD))
+        request = username_len + self.DEFAULT_USERNAME.encode() + password_len + self.DEFAULT_PASSWORD.encode() + \
+                  struct.pack("I", 1)
+
+        self.assertEqual(parse_login_request(request), (self.DEFAULT_USERNAME, self.DEFAULT_PASSWORD, 1))
+
+    def test_parse_resume_session_request(self):
+        """
+        Check the method parse_resume_session_request.
+        Verify the parser is returning the token of the request.
+        """
+        token = b"\x00token\xff"
+        request = struct.pack("I", len(token)) + token
+        self.assertEqual(parse_resume_session_request(request), token)
 
     def test_parse_empty_login_request(self):
         """
@@ -62,7 +85,7 @@ class TestRequestParser(unittest.TestCase):
         Verify the parser is returning the expected parsed result even if the request is empty.
         """
         request = struct.pack("I", 0) + struct.pack("I", 0)
-        parsed_username, parsed_password = parse_login_request(request)
+        parsed_username, parsed_password, _ = parse_login_request(request)
         self.assertEqual(parsed_username, "")
         self.assertEqual(parsed_password, "")
 
@@ -85,10 +108,11 @@ class TestRequestParser(unittest.TestCase):
         requested_dir_len = struct.pack("I", len(self.DEFAULT_REQUESTED_DIR))
         request = file_len_field + file_name_len + requested_dir_len + self.DEFAULT_FILENAME.encode() + self.DEFAULT_REQUESTED_DIR.encode()
 
-        parsed_file_len, parsed_file_name, requested_dir = parse_upload_request(request)
+        parsed_file_len, parsed_file_name, requested_dir, compression = parse_upload_request(request)
         self.assertEqual(parsed_file_len, self.DEFAULT_FILE_LEN)
         self.assertEqual(parsed_file_name, self.DEFAULT_FILENAME)
         self.assertEqual(requested_dir, self.DEFAULT_REQUESTED_DIR)
+        self.assertEqual(compression, self.DEFAULT_COMPRESSION)
 
     def test_parse_upload_request_with_empty_name(self):
         """
@@ -99,7 +123,7 @@ class TestRequestParser(unittest.TestCase):
         requested_dir_len = struct.pack("I", len(self.DEFAULT_REQUESTED_DIR))
         request = file_len_field + struct.pack("I", 0) + requested_dir_len + self.DEFAULT_REQUESTED_DIR.encode()
 
-        parsed_file_len, parsed_file_name, requested_dir = parse_upload_request(request)
+        parsed_file_len, parsed_file_name, requested_dir, _ = parse_upload_request(request)
         self.assertEqual(parsed_file_len, self.DEFAULT_FILE_LEN)
         self.assertEqual(parsed_file_name, "")
         self.assertEqual(requested_dir, self.DEFAULT_REQUESTED_DIR)
@@ -121,8 +145,9 @@ class TestRequestParser(unittest.TestCase):
         file_name_len = struct.pack("I", len(self.DEFAULT_FILENAME))
         request = file_name_len + self.DEFAULT_FILENAME.encode()
 
-        parsed_file_name = parse_download_request(request)
+        parsed_file_name, compression = parse_download_request(request)
         self.assertEqual(parsed_file_name, self.DEFAULT_FILENAME)
+        self.assertEqual(compression, self.DEFAULT_COMPRESSION)
 
     def test_parse_download_request_empty_file_name(self):
         """
@@ -130,9 +155,22 @@ class TestRequestParser(unittest.TestCase):
         Verify the parser is returning the expected parsed result even if the request is empty.
         """
         request = struct.pack("I", 0)
-        parsed_file_name = parse_download_request(request)
+        parsed_file_name, _ = parse_download_request(request)
         self.assertEqual(parsed_file_name, "")
 
+    def test_parse_download_request_with_compression(self):
+        """
+        Check the method parse_download_request.
+        Verify the parser is returning the requested compression when the request contains it.
+        """
+        file_name_len = struct.pack("I", len(self.DEFAULT_FILENAME))
+        requested_compression = 2
+        request = file_name_len + self.DEFAULT_FILENAME.encode() + struct.pack("I", requested_compression)
+
+        parsed_file_name, compression = parse_download_request(request)
+        self.assertEqual(parsed_file_name, self.DEFAULT_FILENAME)
+        self.assertEqual(compression, requested_compression)
+
     def test_parse_regular_remove_file_request(self):
         """
         Check the method parse_remove_file_request.
@@ -0,0 +1,61 @@
+import unittest
+import os
+import tempfile
+
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+from dropbox_system.server.reshard_users import reshard_users, ReshardException
+
+
+class TestReshardUsers(unittest.TestCase):
+    DEFAULT_PASSWORD = "password"
+
+    def setUp(self):
+        self.db_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.db_directory.cleanup()
+
+    def open_db(self, shards: int) -> DataBaseCommunicator:
+        return DataBaseCommunicator(DataBaseCommunicator.create_connection_pools(shards, self.db_directory.name))
+
+    def test_reshard_single_file(self):
+        """
+        Reshard a single file users DB to 4 shards, and then back to 2 shards, removing the source files.
+        Verify all the users (and their passwords) are migrated, and the source files are removed.
+        """
+        users = [(f"user_{user_index}", f"{self.DEFAULT_PASSWORD}_{user_index}") for user_index in range(50)]
+        single_file_db = self.open_db(1)
+        single_file_db.create_new_users(users)
+        single_file_db.close()
+
+        self.assertEqual(reshard_users(1, 4, self.db_directory.name, batch_size=7), len(users))
+        self.assertTrue(os.path.exists(os.path.join(self.db_directory.name, DataBaseCommunicator.DB_FILE_NAME)))
+        self.assertEqual(reshard_users(4, 2, self.db_directory.name, remove_source=True), len(users))
+
+        sharded_db = self.open_db(2)
+        self.assertEqual(list(sharded_db.iterate_users()), sorted(users))
+        self.assertTrue(sharded_db.verify_credentials("user_7", f"{self.DEFAULT_PASSWORD}_7"))
+        sharded_db.close()
+        self.assertEqual(sorted(file_name for file_name in os.listdir(self.db_directory.name)
+                                if file_name.endswith(".db")),
+                         [DataBaseCommunicator.DB_FILE_NAME, "clients_0_of_2.db", "clients_1_of_2.db"])
+
+    def test_reshard_to_users_db_with_users(self):
+        """
+        Reshard to a number of shards whose users DB already has users, to the same number of shards, and from a
+        number of shards that has no users DB. Expect to receive ReshardException.
+        """
+        sharded_db = self.open_db(4)
+        sharded_db.create_new_user("user", self.DEFAULT_PASSWORD)
+        sharded_db.close()
+
+        with self.assertRaises(ReshardException):
+            reshard_users(1, 4, self.db_directory.name)
+        with self.assertRaises(ReshardException):
+            reshard_users(4, 4, self.db_directory.name)
+        with self.assertRaises(ReshardException):
+            reshard_users(2, 4, self.db_directory.name)
+        self.assertFalse(os.path.exists(os.path.join(self.db_directory.name, "clients_0_of_2.db")))
+
+if __name__ == '__main__':
+    unittest.main()
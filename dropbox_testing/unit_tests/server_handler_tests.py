@@ -2,21 +2,28 @@ import unittest
 import os
 import struct
 import shutil
+import socket
+import tempfile
+import threading
 from unittest.mock import Mock, patch
 
 from dropbox_system.server.server_handler import ServerHandler
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+from dropbox_system.server.memory_budget import MemoryBudget
+from dropbox_system.server.attempt_limits import AttemptLimits
+from dropbox_system.server.session_tokens import SessionTokens
+from dropbox_system.common import message_codec
+from dropbox_system.common.multiplexer import Multiplexer
 from dropbox_system.server.server import Server
 from dropbox_system.common.xor_encryption import xor_data
 
 class TestServerHandler(unittest.TestCase):
     def setUp(self):
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        db_file_path = os.path.join(project_root, 'dropbox_system', 'server', 'clients.db')
         user_files_path = os.path.join(project_root, 'dropbox_system', 'server', 'user_files')
-        
-        # Remove the database file if it exists
-        if os.path.exists(db_file_path):
-            os.remove(db_file_path)
+
+        # The handlers share the connections of the users DB, so it is emptied instead of removing its file
+        DataBaseCommunicator.get_shared().remove_data_from_users_table()
         
         if os.path.exists(user_files_path):
             for filename in os.listdir(user_files_path):
@@ -44,7 +51,7 @@ class TestServerHandler(unittest.TestCase):
     def test_handle_register_request(self):
         """
         Check the method handle_register_request of ServerHandler.
-        Call the funtion and verify the user is created on the remote DB.
+        Call the funtion and verify the user is created on the remote DB, and the session stays open.
         """
         mock_socket = Mock()
         files_directory_path = 'path'
@@ -56,7 +63,7 @@ class TestServerHandler(unittest.TestCase):
         handler._handle_register_request(request)
 
         assert handler.database_communicator.is_username_exists(username.decode())
-        assert handler.should_exit
+        assert not handler.should_exit
 
     def test_handle_login_request(self):
         """
@@ -76,6 +83,116 @@ class TestServerHandler(unittest.TestCase):
 
         assert handler.logged_in_user == username.decode()
         assert not handler.should_exit
+
+    def test_register_then_login_on_the_same_session(self):
+        """
+        Register, fail to log in and then log in on the same handler.
+        Verify the session stays open and the user is logged in.
+        """
+        mock_socket = Mock()
+        handler = ServerHandler(mock_socket, 'path')
+        username = b"user"
+        request = struct.pack("I", len(username)) + username + struct.pack("I", 4) + b"pass"
+        wrong_password_request = struct.pack("I", len(username)) + username + struct.pack("I", 5) + b"wrong"
+
+        handler._handle_register_request(request)
+        handler._handle_login_request(wrong_password_request)
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.LOGIN_RESPONSE_CODE, handler.INCORRECT_PASSWORD, 0)
+        handler._handle_login_request(request)
+
+        assert handler.logged_in_user == username.decode()
+        assert not handler.should_exit
+
+    def test_login_with_session_token(self):
+        """
+        Log in with a request that asks for a session token, then resume the session with the token on another handler.
+        Verify the session is resumed without a query of the users DB.
+        """
+        session_tokens = SessionTokens()
+        server_socket, client_socket = socket.socketpair()
+        handler = ServerHandler(server_socket, 'path', session_tokens=session_tokens)
+        handler.database_communicator.create_new_user("user", "pass")
+        request = message_codec.LOGIN_REQUEST.pack(username="user", password="pass", request_token=1)
+
+        handler._handle_login_request(request)
+        response_code, error_code, response_len = struct.unpack("III", client_socket.recv(12))
+        assert (response_code, error_code) == (handler.LOGIN_RESPONSE_CODE, handler.SUCCESS)
+        expires_at, token = message_codec.LOGIN_RESPONSE.unpack(xor_data(client_socket.recv(response_len)))
+        server_socket.close()
+        client_socket.close()
+
+        mock_socket = Mock()
+        database_communicator = Mock()
+        resumed_handler = ServerHandler(mock_socket, 'path', database_communicator=database_communicator,
+                                        session_tokens=session_tokens)
+        resumed_handler._handle_resume_session_request(message_codec.RESUME_SESSION_REQUEST.pack(token=token))
+
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.RESUME_SESSION_RESPONSE_CODE, handler.SUCCESS, 0)
+        assert resumed_handler.logged_in_user == "user"
+        assert not database_communicator.method_calls
+
+    def test_resume_session_with_invalid_token(self):
+        """
+        Resume a session with a token that was not issued by the server.
+        Verify the client is answered with INVALID_SESSION_TOKEN and is not logged in.
+        """
+        mock_socket = Mock()
+        handler = ServerHandler(mock_socket, 'path', session_tokens=SessionTokens())
+        token, _ = SessionTokens().issue("user")
+
+        handler._handle_resume_session_request(message_codec.RESUME_SESSION_REQUEST.pack(token=token))
+
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.RESUME_SESSION_RESPONSE_CODE,
+                                                         handler.INVALID_SESSION_TOKEN, 0)
+        assert handler.logged_in_user is None
+        assert not handler.should_exit
+
+    def test_too_many_failed_logins(self):
+        """
+        Fail to log in max_login_attempts times on the same session.
+        Verify the last attempt is answered with TOO_MANY_ATTEMPTS and closes the session.
+        """
+        mock_socket = Mock()
+        attempt_limits = AttemptLimits(max_login_attempts=2)
+        handler = ServerHandler(mock_socket, 'path', attempt_limits=attempt_limits)
+        username = b"non_existing"
+        request = struct.pack("I", len(username)) + username + struct.pack("I", 4) + b"pass"
+
+        handler._handle_login_request(request)
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.LOGIN_RESPONSE_CODE, handler.USER_NOT_EXISTS, 0)
+        assert not handler.should_exit
+
+        with patch('builtins.print'):
+            handler._handle_login_request(request)
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.LOGIN_RESPONSE_CODE, handler.TOO_MANY_ATTEMPTS, 0)
+        assert handler.should_exit
+        assert attempt_limits.as_dict()["failed_logins"] == 2
+        assert attempt_limits.as_dict()["closed_sessions"] == 1
+
+    def test_too_many_register_attempts(self):
+        """
+        Send more than max_register_attempts registration requests on the same session.
+        Verify the extra request is answered with TOO_MANY_ATTEMPTS, closes the session and does not create the user.
+        """
+        mock_socket = Mock()
+        handler = ServerHandler(mock_socket, 'path', attempt_limits=AttemptLimits(max_register_attempts=1))
+        first_request = struct.pack("I", 5) + b"first" + struct.pack("I", 4) + b"pass"
+        second_request = struct.pack("I", 6) + b"second" + struct.pack("I", 4) + b"pass"
+
+        handler._handle_register_request(first_request)
+        assert not handler.should_exit
+        with patch('builtins.print'):
+            handler._handle_register_request(second_request)
+
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.REGISTER_RESPONE_CODE, handler.TOO_MANY_ATTEMPTS, 0)
+        assert handler.should_exit
+        assert not handler.database_communicator.is_username_exists("second")
     
     def test_handle_download_file_request_file_not_found(self):
         """
@@ -94,8 +211,8 @@ class TestServerHandler(unittest.TestCase):
         with patch('os.path.exists', return_value=False):
             handler._handle_download_file_request(request)
 
-        assert mock_socket.send.called
-        response_header = mock_socket.send.call_args[0][0]
+        assert mock_socket.sendall.called
+        response_header = mock_socket.sendall.call_args[0][0]
         assert struct.unpack("III", response_header) == (handler.DOWNLOAD_FILE_RESPONSE_CODE, handler.FILE_NOT_EXISTS, 0)
     
     def test_handle_list_files_request(self):
@@ -114,11 +231,12 @@ class TestServerHandler(unittest.TestCase):
         file1_name = "a.txt"
         file2_name = "b.txt"
     
+        mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
         with patch('os.walk', return_value=[(handler.user_directory_path, [], [file1_name, file2_name])]):
             handler._handle_list_files_request(request)
 
-        assert mock_socket.send.called
-        response = xor_data(mock_socket.send.call_args[0][0])
+        assert mock_socket.sendmsg.called
+        response = xor_data(mock_socket.sendmsg.call_args[0][0][-1])
         assert file1_name.encode() in response and file2_name.encode() in response
 
     def test_handle_upload_file_request_success(self):
@@ -138,13 +256,205 @@ class TestServerHandler(unittest.TestCase):
         requested_file_path = b""
         request = struct.pack("QII", file_len, len(file_name), len(requested_file_path)) + file_name + requested_file_path
 
+        mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
         handler.receive_bytes = Mock(return_value=b'\x00')
         handler._write_file_content = Mock(return_value=None)
         handler._handle_upload_file_request(request)
         
-        assert mock_socket.send.called
-        response_header = mock_socket.send.call_args[0][0]
+        assert mock_socket.sendall.called
+        response_header = mock_socket.sendall.call_args[0][0]
         assert struct.unpack("III", response_header) == (handler.UPLOAD_FILE_RESPONSE_CODE, handler.SUCCESS, 0)
 
+    def test_handle_upload_file_request_invalid_content(self):
+        """
+        Check the method handle_upload_file_request of ServerHandler, when the received content is invalid.
+        Verify the partially written file is removed, an error response is sent and the v1 connection is closed.
+        """
+        mock_socket = Mock()
+        files_directory_path = 'path'
+        handler = ServerHandler(mock_socket, files_directory_path)
+
+        handler.logged_in_user = 'user'
+        handler.user_directory_path = 'path'
+
+        file_name = b"file.txt"
+        request = struct.pack("QII", 1, len(file_name), 0) + file_name + struct.pack("I", 1)
+
+        mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
+        handler.receive_file_content = Mock(side_effect=ValueError)
+        with patch('os.path.exists', side_effect=[True, False]), patch('builtins.open'), patch('os.remove') as mock_remove:
+            handler._handle_upload_file_request(request)
+
+        mock_remove.assert_called_once_with(os.path.join('path', 'file.txt'))
+        start_response_header = mock_socket.sendmsg.call_args[0][0][0]
+        assert struct.unpack("III", start_response_header) == (handler.UPLOAD_FILE_RESPONSE_CODE, handler.START_UPLOADING_FILE, 4)
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.UPLOAD_FILE_RESPONSE_CODE, handler.INVALID_FILE_CONTENT, 0)
+        assert handler.should_exit
+
+    def test_handle_upload_file_request_connection_dropped(self):
+        """
+        Check the method handle_upload_file_request of ServerHandler, when the client disconnects in the middle of
+        the upload. Verify the connection error is raised and the partially written file is removed, so the file can
+        be uploaded again.
+        """
+        server_socket, client_socket = socket.socketpair()
+        handler = ServerHandler(server_socket, 'path')
+        handler.logged_in_user = 'user'
+        handler.user_directory_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, handler.user_directory_path)
+
+        file_name = b"file.txt"
+        request = struct.pack("QII", 1000, len(file_name), 0) + file_name
+        # The client stops sending in the middle of the content, and still reads the response that starts the upload
+        client_socket.sendall(b"partial content")
+        client_socket.shutdown(socket.SHUT_WR)
+        with self.assertRaises(ConnectionError):
+            handler._handle_upload_file_request(request)
+        server_socket.close()
+        client_socket.close()
+
+        assert not os.path.exists(os.path.join(handler.user_directory_path, "file.txt"))
+
+    def test_handle_upload_file_request_created_concurrently(self):
+        """
+        Check the method handle_upload_file_request of ServerHandler, when the file is created by another session
+        (possibly of another server process) after the existence check.
+        Verify the content is received and discarded, and the existing file is not overwritten.
+        """
+        mock_socket = Mock()
+        files_directory_path = 'path'
+        handler = ServerHandler(mock_socket, files_directory_path)
+
+        handler.logged_in_user = 'user'
+        handler.user_directory_path = 'path'
+
+        file_name = b"file.txt"
+        request = struct.pack("QII", 1, len(file_name), 0) + file_name
+
+        mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
+        handler.receive_file_content = Mock()
+        with patch('os.path.exists', side_effect=[True, False]), \
+             patch('builtins.open', side_effect=[FileExistsError, open(os.devnull, 'wb')]) as mock_open:
+            handler._handle_upload_file_request(request)
+
+        self.assertEqual(mock_open.call_args_list[0].args, (os.path.join('path', 'file.txt'), 'xb'))
+        handler.receive_file_content.assert_called_once()
+        self.assertEqual(handler.receive_file_content.call_args.args[0].name, os.devnull)
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.UPLOAD_FILE_RESPONSE_CODE, handler.FILE_ALREADY_EXISTS, 0)
+
+    def test_handle_protocol_negotiation_request(self):
+        """
+        Check the method handle_protocol_negotiation_request of ServerHandler.
+        Request a protocol version higher than supported and verify the highest supported version is chosen.
+        """
+        mock_socket = Mock()
+        mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
+        files_directory_path = 'path'
+        handler = ServerHandler(mock_socket, files_directory_path)
+        assert handler.protocol_version == handler.PROTOCOL_VERSION_1
+
+        request = struct.pack("I", handler.SUPPORTED_PROTOCOL_VERSION + 1)
+        handler._handle_protocol_negotiation_request(request)
+
+        assert handler.protocol_version == handler.SUPPORTED_PROTOCOL_VERSION
+        response_header, response = mock_socket.sendmsg.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.PROTOCOL_NEGOTIATION_RESPONSE_CODE, handler.SUCCESS, 4)
+        assert struct.unpack("I", xor_data(response)) == (handler.SUPPORTED_PROTOCOL_VERSION,)
+    def test_multiplexed_handler_invalid_request_and_quit(self):
+        """
+        Check the protocol v2 handling of ServerHandler.
+        Send a request with an unknown request code on a stream, and verify the failure is logged and the stream is
+        closed. Then send a quit session request on another stream, and verify the connection handling ends.
+        """
+        server_socket, client_socket = socket.socketpair()
+        handler = ServerHandler(server_socket, 'path')
+        handler.protocol_version = handler.PROTOCOL_VERSION_2
+        client_multiplexer = Multiplexer(client_socket)
+        client_multiplexer.start_receiving()
+
+        with patch('builtins.print') as mock_print:
+            handler_thread = threading.Thread(target=handler.start_handler, daemon=True)
+            handler_thread.start()
+
+            invalid_stream = client_multiplexer.open_stream()
+            invalid_stream.sendall(message_codec.REQUEST_HEADER.pack(request_code=9999, request_len=0))
+            assert invalid_stream.recv_into(bytearray(1)) == 0
+            assert "Failed handling the request" in mock_print.call_args[0][0]
+
+            quit_stream = client_multiplexer.open_stream()
+            quit_stream.sendall(message_codec.REQUEST_HEADER.pack(request_code=handler.QUIT_SESSION_REQUEST_CODE,
+                                                                  request_len=0))
+            handler_thread.join(timeout=5)
+
+        assert not handler_thread.is_alive()
+        assert handler.should_exit
+        client_socket.close()
+
+    def test_request_too_large(self):
+        """
+        Check a request header that declares a request longer than MAX_REQUEST_LEN.
+        Verify the request is not allocated nor received, the client is answered with REQUEST_TOO_LARGE and the
+        session is closed.
+        """
+        mock_socket = Mock()
+        handler = ServerHandler(mock_socket, 'path')
+        request_len = 2 ** 32 - 1
+        handler.receive_header = Mock(return_value=(handler.UPLOAD_FILE_REQUEST_CODE, request_len))
+        handler.receive_bytes = Mock()
+
+        with patch('builtins.print'):
+            handler._handle_next_request()
+
+        handler.receive_bytes.assert_not_called()
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.UPLOAD_FILE_RESPONSE_CODE, handler.REQUEST_TOO_LARGE, 0)
+        assert handler.should_exit
+
+    def test_handle_upload_file_request_insufficient_memory(self):
+        """
+        Check the method handle_upload_file_request of ServerHandler, when the memory budget has no room for the
+        buffer of the upload. Verify the client is answered with INSUFFICIENT_MEMORY and no content is received.
+        """
+        mock_socket = Mock()
+        memory_budget = MemoryBudget(capacity=1024, wait_timeout=0)
+        handler = ServerHandler(mock_socket, 'path', chunk_size=4096, memory_budget=memory_budget)
+        handler.logged_in_user = 'user'
+        handler.user_directory_path = 'path'
+        handler.receive_file_content = Mock()
+
+        file_name = b"file.txt"
+        request = struct.pack("QII", 4096, len(file_name), 0) + file_name
+        with patch('os.path.exists', side_effect=[True, False]):
+            handler._handle_upload_file_request(request)
+
+        handler.receive_file_content.assert_not_called()
+        response_header = mock_socket.sendall.call_args[0][0]
+        assert struct.unpack("III", response_header) == (handler.UPLOAD_FILE_RESPONSE_CODE, handler.INSUFFICIENT_MEMORY, 0)
+        assert memory_budget.rejected == 1 and memory_budget.reserved == 0
+
+    def test_handle_upload_file_request_releases_memory(self):
+        """
+        Check the method handle_upload_file_request of ServerHandler with a memory budget.
+        Verify the buffer of the upload is reserved while the content is received, and released afterwards.
+        """
+        mock_socket = Mock()
+        mock_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
+        memory_budget = MemoryBudget(capacity=1024 * 1024)
+        handler = ServerHandler(mock_socket, 'path', chunk_size=4096, memory_budget=memory_budget)
+        handler.logged_in_user = 'user'
+        handler.user_directory_path = 'path'
+        reserved_while_writing = []
+        handler._write_file_content = Mock(side_effect=lambda *args: reserved_while_writing.append(memory_budget.reserved))
+
+        file_name = b"file.txt"
+        request = struct.pack("QII", 100, len(file_name), 0) + file_name
+        with patch('os.path.exists', side_effect=[True, False]):
+            handler._handle_upload_file_request(request)
+
+        assert reserved_while_writing == [100]
+        assert memory_budget.reserved == 0 and memory_budget.peak_reserved == 100
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,11 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 import argparse
+import socket
+import struct
 from dropbox_system.server.server import Server, get_arguments_from_user
+from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.xor_encryption import xor_data
 
 class TestServer(unittest.TestCase):
 
@@ -34,20 +38,105 @@ class TestServer(unittest.TestCase):
         mock_socket_instance.accept.side_effect = [(mock_client_socket, ('client_ip', 12345)), KeyboardInterrupt]
 
         # The server is starting and immediately stops, duo to KeyboardInterrupt
-        server.start()
+        with patch.object(server.worker_pool, 'submit', return_value=True) as mock_submit:
+            server.start()
 
-        mock_thread.assert_called_once_with(target=server.handle_client, args=(mock_client_socket,))
-        mock_thread.return_value.start.assert_called_once()
+        # The worker threads are started, and the client is queued for them
+        self.assertEqual(mock_thread.call_count, Server.DEFAULT_WORKERS)
+        mock_thread.assert_called_with(target=server.worker_pool._work, daemon=True)
+        mock_submit.assert_called_once_with(mock_client_socket)
         mock_socket_instance.close.assert_called_once()
 
+    @patch('socket.socket')
+    def test_server_rejects_clients_when_queue_is_full(self, mock_socket):
+        """
+        Check the method `_accept_clients` of Server, when the queue of the worker pool is full.
+        Verify the client is answered with the SERVER_BUSY error code and a retry-after hint, and disconnected.
+        """
+        mock_socket_instance = MagicMock()
+        mock_socket.return_value = mock_socket_instance
+        queued_client_socket = MagicMock()
+        mock_client_socket = MagicMock()
+        mock_client_socket.sendmsg.side_effect = lambda buffers: sum(len(buffer) for buffer in buffers)
+        # The request the client sent is read with socket.socket.recv before the connection is closed
+        mock_socket.recv.return_value = b''
+
+        server = Server('127.0.0.1', 9090, workers=1, queue_size=1)
+        mock_socket_instance.accept.side_effect = [(queued_client_socket, ''), (mock_client_socket, ''), KeyboardInterrupt]
+        # The workers are not started, so the first client waits in the queue and the second one is rejected
+        with self.assertRaises(KeyboardInterrupt):
+            server._accept_clients(mock_socket_instance)
+
+        header, response = mock_client_socket.sendmsg.call_args.args[0]
+        self.assertEqual(struct.unpack("III", header),
+                         (RequestHandler.SERVER_BUSY_RESPONSE_CODE, RequestHandler.SERVER_BUSY, 4))
+        self.assertEqual(struct.unpack("I", xor_data(bytes(response))), (int(server.worker_pool.MIN_RETRY_AFTER * 1000),))
+        mock_client_socket.close.assert_called()
+        queued_client_socket.sendmsg.assert_not_called()
+        self.assertEqual(server.worker_pool.metrics.queued, 1)
+        self.assertEqual(server.worker_pool.metrics.rejected, 1)
+
+    @patch('socket.socket')
+    def test_server_initialization_reuse_port(self, mock_socket):
+        """
+        Check the constructor of Server with reuse_port, like in every worker process of the multi-process mode.
+        Verify the TCP socket is bound with SO_REUSEPORT.
+        """
+        mock_socket_instance = MagicMock()
+        mock_socket.return_value = mock_socket_instance
+
+        Server('127.0.0.1', 9090, reuse_port=True)
+        mock_socket_instance.setsockopt.assert_called_once_with(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        mock_socket_instance.bind.assert_called_once_with(('127.0.0.1', 9090))
+
+    @patch('socket.socket')
+    def test_server_initialization_unix_socket_only(self, mock_socket):
+        """
+        Check the constructor of Server with a Unix domain socket path and no TCP port.
+        Verify only a Unix domain socket is bound to the path.
+        """
+        mock_socket_instance = MagicMock()
+        mock_socket.return_value = mock_socket_instance
+
+        server = Server('127.0.0.1', None, unix_socket_path='/tmp/dropbox_server_test.sock')
+        mock_socket.assert_called_once_with(socket.AF_UNIX, socket.SOCK_STREAM)
+        mock_socket_instance.bind.assert_called_once_with('/tmp/dropbox_server_test.sock')
+        mock_socket_instance.listen.assert_called_once_with(60)
+        self.assertIsNone(server.server_socket)
+        self.assertTrue(server.is_initialized)
+
+    @patch('socket.socket')
+    @patch('threading.Thread')
+    def test_server_start_tcp_and_unix_socket(self, mock_thread, mock_socket):
+        """
+        Check the method `start` of Server, when listening on both TCP and a Unix domain socket.
+        Verify the TCP socket is accepted on from a thread, and the Unix domain socket from the calling thread.
+        """
+        tcp_socket = MagicMock()
+        unix_socket = MagicMock()
+        mock_socket.side_effect = [tcp_socket, unix_socket]
+        mock_client_socket = MagicMock()
+
+        server = Server('127.0.0.1', 9090, unix_socket_path='/tmp/dropbox_server_test.sock')
+        unix_socket.accept.side_effect = [(mock_client_socket, ''), KeyboardInterrupt]
+
+        with patch.object(server.worker_pool, 'submit', return_value=True) as mock_submit:
+            server.start()
+
+        self.assertEqual(mock_thread.call_args_list[-1], call(target=server._accept_clients, args=(tcp_socket,),
+                                                              daemon=True))
+        mock_submit.assert_called_once_with(mock_client_socket)
+        tcp_socket.close.assert_called_once()
+        unix_socket.close.assert_called_once()
+
     @patch('argparse.ArgumentParser.parse_args', return_value=argparse.Namespace(address='192.168.1.1', port=9090))
     def test_get_arguments_from_user(self, mock_parse_args):
         """
         Test the argument parser that executed on the __main__ function.
         """
-        address, port = get_arguments_from_user()
-        self.assertEqual(address, '192.168.1.1')
-        self.assertEqual(port, 9090)
+        args = get_arguments_from_user()
+        self.assertEqual(args.address, '192.168.1.1')
+        self.assertEqual(args.port, 9090)
         print("Server correctly parses arguments.")
 
 if __name__ == '__main__':
@@ -0,0 +1,161 @@
+import unittest
+import os
+import shutil
+import socket
+import tempfile
+from unittest.mock import patch
+
+from dropbox_system.server.session_timeouts import SessionTimeouts, SocketDeadline, TimeoutCounters
+from dropbox_system.server.server_handler import ServerHandler
+from dropbox_system.common import message_codec
+from dropbox_system.common.xor_encryption import xor_data
+
+
+class TestSocketDeadline(unittest.TestCase):
+    def setUp(self):
+        self.timeouts = SessionTimeouts(idle_timeout=10, header_timeout=2, min_transfer_rate=100, transfer_window=5)
+        self.deadline = self.timeouts.new_deadline()
+        self.time = 1000.0
+        patcher = patch("dropbox_system.server.session_timeouts.time.monotonic", side_effect=lambda: self.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_limit_before_a_phase_starts(self):
+        """
+        Check a new deadline does not limit the socket operations.
+        """
+        assert self.deadline.get_timeout() is None
+
+    def test_idle_then_header_timeout(self):
+        """
+        Check the idle timeout limits the wait for a request, and the header timeout limits the rest of it,
+        from its first received bytes.
+        """
+        self.deadline.expect_request()
+        self.time += 4
+        assert self.deadline.get_timeout() == 6
+        self.deadline.record(1)
+        assert self.deadline.phase == SocketDeadline.HEADER
+        assert self.deadline.get_timeout() == 2
+        self.time += 2
+        with self.assertRaises(TimeoutError):
+            self.deadline.get_timeout()
+
+    def test_stop_removes_the_limit(self):
+        """
+        Check the time limit is removed while a request is handled.
+        """
+        self.deadline.expect_request()
+        self.deadline.stop()
+        self.time += 100
+        assert self.deadline.get_timeout() is None
+
+    def test_transfer_window_is_extended_at_the_minimal_rate(self):
+        """
+        Check a transfer gets a new window once it transferred min_transfer_rate bytes per second of a window,
+        and times out if it did not.
+        """
+        self.deadline.start_transfer()
+        self.time += 4
+        self.deadline.record(499)
+        assert self.deadline.get_timeout() == 1
+        self.deadline.record(1)
+        assert self.deadline.get_timeout() == 5
+        self.time += 5
+        with self.assertRaises(TimeoutError):
+            self.deadline.get_timeout()
+
+    def test_send_of_a_large_buffer_gets_time_for_the_minimal_rate(self):
+        """
+        Check a send of all of a buffer gets enough time to send it at the minimal transfer rate.
+        """
+        self.deadline.start_transfer()
+        assert self.deadline.get_timeout(size=1000) == 10
+
+    def test_disabled_timeouts(self):
+        """
+        Check timeouts of 0 do not limit the socket operations.
+        """
+        deadline = SessionTimeouts(idle_timeout=0, header_timeout=0, min_transfer_rate=0).new_deadline()
+        deadline.expect_request()
+        assert deadline.get_timeout() is None
+        deadline.record(1)
+        assert deadline.get_timeout() is None
+        deadline.start_transfer()
+        deadline.record(1)
+        assert deadline.get_timeout(size=1000) is None
+
+    def test_count_timeout(self):
+        """
+        Check timeouts are counted by the phase they happened in.
+        """
+        self.deadline.expect_request()
+        self.deadline.count_timeout()
+        self.deadline.start_transfer()
+        self.deadline.count_timeout()
+        assert self.timeouts.counters.as_dict() == {"idle_timeouts": 1, "header_timeouts": 0, "transfer_timeouts": 1}
+
+
+class TestTimeoutCounters(unittest.TestCase):
+    def test_reset(self):
+        """
+        Check reset sets all the counters to zero.
+        """
+        counters = TimeoutCounters()
+        counters.count_timeout(SocketDeadline.HEADER)
+        counters.reset()
+        assert counters.as_dict() == {"idle_timeouts": 0, "header_timeouts": 0, "transfer_timeouts": 0}
+
+
+class TestServerHandlerTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.files_directory_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.files_directory_path)
+        self.server_socket, self.client_socket = socket.socketpair()
+        self.addCleanup(self.client_socket.close)
+
+    def _start_handler(self, timeouts: SessionTimeouts) -> ServerHandler:
+        handler = ServerHandler(self.server_socket, self.files_directory_path, session_timeouts=timeouts)
+        handler.start_handler()
+        return handler
+
+    def test_idle_session_is_closed(self):
+        """
+        Check a session that sends no request is counted and closed once it is idle for idle_timeout.
+        """
+        timeouts = SessionTimeouts(idle_timeout=0.1)
+        handler = self._start_handler(timeouts)
+        assert handler.should_exit
+        assert self.client_socket.recv(1) == b""
+        assert timeouts.counters.idle_timeouts == 1
+
+    def test_trickled_request_is_closed(self):
+        """
+        Check a session whose request does not arrive within header_timeout of its first byte is counted and closed.
+        """
+        timeouts = SessionTimeouts(idle_timeout=10, header_timeout=0.1)
+        header = message_codec.REQUEST_HEADER.pack(request_code=ServerHandler.LIST_FILES_REQUEST_CODE, request_len=0)
+        self.client_socket.sendall(header[:1])
+        self._start_handler(timeouts)
+        assert self.client_socket.recv(1) == b""
+        assert timeouts.counters.as_dict() == {"idle_timeouts": 0, "header_timeouts": 1, "transfer_timeouts": 0}
+
+    def test_slow_upload_is_closed(self):
+        """
+        Check an upload slower than min_transfer_rate is counted and closed, and its partial file is removed.
+        """
+        timeouts = SessionTimeouts(idle_timeout=10, header_timeout=10, min_transfer_rate=1000, transfer_window=0.1)
+        handler = ServerHandler(self.server_socket, self.files_directory_path, session_timeouts=timeouts)
+        handler.logged_in_user = "user"
+        handler.user_directory_path = self.files_directory_path
+        request = message_codec.UPLOAD_FILE_REQUEST.pack(file_len=1000, file_name="file", requested_dir="")
+        header = message_codec.REQUEST_HEADER.pack(request_code=ServerHandler.UPLOAD_FILE_REQUEST_CODE,
+                                                   request_len=len(request))
+        self.client_socket.sendall(header + xor_data(request) + b"a" * 10)
+        handler.start_handler()
+        assert timeouts.counters.transfer_timeouts == 1
+        assert not os.path.exists(os.path.join(self.files_directory_path, "file"))
+
+
+if __name__ == "__main__":
+    unittest.main()
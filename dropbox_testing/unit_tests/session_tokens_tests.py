@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+
+from dropbox_system.server.session_tokens import SessionTokens
+
+
+class TestSessionTokens(unittest.TestCase):
+    def test_issue_and_verify(self):
+        """
+        Check a token that was issued for a user resumes a session of the user.
+        """
+        session_tokens = SessionTokens(lifetime=60)
+        token, expires_at = session_tokens.issue("user")
+        assert session_tokens.verify(token) == "user"
+        assert session_tokens.as_dict()["issued"] == 1
+        assert session_tokens.as_dict()["resumed"] == 1
+
+    def test_tampered_token(self):
+        """
+        Check a token whose payload or signature was changed, or that was signed with another secret, is rejected.
+        """
+        session_tokens = SessionTokens(lifetime=60)
+        token, _ = session_tokens.issue("user")
+        tampered_username = token.replace(b"user", b"usex")
+        tampered_signature = token[:-1] + bytes([token[-1] ^ 1])
+        other_server_token, _ = SessionTokens(lifetime=60).issue("user")
+
+        for invalid_token in [tampered_username, tampered_signature, other_server_token, b"", b"short"]:
+            assert session_tokens.verify(invalid_token) is None
+        assert session_tokens.as_dict()["rejected"] == 5
+
+    def test_shared_secret(self):
+        """
+        Check servers that share the secret accept the tokens of each other.
+        """
+        token, _ = SessionTokens(secret=b"secret").issue("user")
+        assert SessionTokens(secret=b"secret").verify(token) == "user"
+
+    def test_expired_token(self):
+        """
+        Check a token is rejected once its lifetime passed.
+        """
+        session_tokens = SessionTokens(lifetime=60)
+        with patch("dropbox_system.server.session_tokens.time.time", return_value=1000):
+            token, expires_at = session_tokens.issue("user")
+        assert expires_at == 1060
+        with patch("dropbox_system.server.session_tokens.time.time", return_value=1061):
+            assert session_tokens.verify(token) is None
+        assert session_tokens.as_dict()["expired"] == 1
+
+    def test_disabled_tokens(self):
+        """
+        Check a server whose tokens are disabled does not resume sessions.
+        """
+        token, _ = SessionTokens(secret=b"secret").issue("user")
+        session_tokens = SessionTokens(lifetime=0, secret=b"secret")
+        assert not session_tokens.enabled
+        assert session_tokens.verify(token) is None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import time
+from unittest.mock import patch
+
+from dropbox_system.server.supervisor import Supervisor
+
+
+class FailingServer:
+    """A server that failed to bind."""
+    is_initialized = False
+
+
+class IdleServer:
+    """A server that serves forever without clients."""
+    is_initialized = True
+
+    def start(self):
+        while True:
+            time.sleep(1)
+
+
+class TestSupervisor(unittest.TestCase):
+
+    @patch.object(Supervisor, 'RESTART_DELAY', 0)
+    def test_restart_dead_workers(self):
+        """
+        Check the method `_restart_dead_workers` of Supervisor.
+        Start a worker whose server fails to bind, and verify it is restarted in a new process.
+        """
+        supervisor = Supervisor(FailingServer, processes=1)
+        supervisor._start_worker(0)
+        first_worker, _ = supervisor._workers[0]
+
+        supervisor._restart_dead_workers()
+        restarted_worker, _ = supervisor._workers[0]
+
+        self.assertEqual(first_worker.exitcode, 1)
+        self.assertEqual(supervisor.restarts, 1)
+        self.assertNotEqual(restarted_worker.pid, first_worker.pid)
+        supervisor._stop_workers()
+
+    def test_stop_workers(self):
+        """
+        Check the method `_stop_workers` of Supervisor.
+        Start serving workers, and verify all of them are terminated.
+        """
+        supervisor = Supervisor(IdleServer, processes=2)
+        for worker_index in range(supervisor.processes):
+            supervisor._start_worker(worker_index)
+        workers = [worker for worker, _ in supervisor._workers.values()]
+        self.assertTrue(all(worker.is_alive() for worker in workers))
+
+        supervisor._stop_workers()
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+
+if __name__ == '__main__':
+    unittest.main()
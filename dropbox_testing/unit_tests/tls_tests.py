@@ -0,0 +1,143 @@
+import unittest
+import io
+import os
+import socket
+import ssl
+import tempfile
+import threading
+
+from dropbox_system.common import tls
+from dropbox_system.common.request_handler import RequestHandler
+from dropbox_system.common.multiplexer import Multiplexer
+
+HOST = "127.0.0.1"
+
+
+class TestTls(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.certificates_directory = tempfile.TemporaryDirectory()
+        cls.certificate_path = os.path.join(cls.certificates_directory.name, "cert.pem")
+        key_path = os.path.join(cls.certificates_directory.name, "key.pem")
+        tls.generate_self_signed_certificate(cls.certificate_path, key_path)
+        cls.server_context = tls.create_server_context(cls.certificate_path, key_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.certificates_directory.cleanup()
+
+    def setUp(self):
+        self.listening_socket = socket.create_server((HOST, 0))
+        self.port = self.listening_socket.getsockname()[1]
+        self.client_context = tls.ClientTlsContext(self.certificate_path)
+
+    def tearDown(self):
+        self.listening_socket.close()
+
+    def _connect(self):
+        """
+        Connects a TLS client to the listening socket.
+
+        Returns:
+            tuple: The client and server TLS sockets.
+        """
+        accepted = {}
+
+        def accept():
+            server_socket, _ = self.listening_socket.accept()
+            accepted["socket"] = self.server_context.wrap_socket(server_socket, server_side=True)
+
+        accepting_thread = threading.Thread(target=accept)
+        accepting_thread.start()
+        client_socket = self.client_context.wrap_socket(socket.create_connection((HOST, self.port)), HOST, self.port)
+        accepting_thread.join()
+        return client_socket, accepted["socket"]
+
+    def test_is_tls_socket(self):
+        """
+        Check the function `is_tls_socket`.
+        Verify TLS sockets and streams of multiplexed TLS connections are detected, and plain sockets are not.
+        """
+        client_socket, server_socket = self._connect()
+        plain_socket, other_plain_socket = socket.socketpair()
+        try:
+            self.assertTrue(tls.is_tls_socket(client_socket))
+            self.assertTrue(tls.is_tls_socket(Multiplexer(client_socket).open_stream()))
+            self.assertFalse(tls.is_tls_socket(plain_socket))
+            self.assertFalse(tls.is_tls_socket(Multiplexer(plain_socket).open_stream()))
+        finally:
+            for sock in [client_socket, server_socket, plain_socket, other_plain_socket]:
+                sock.close()
+
+    def test_request_handler_without_xor(self):
+        """
+        Send a message and file content between request handlers on a TLS connection.
+        Verify the XOR encryption is off and the data arrives as sent.
+        """
+        client_socket, server_socket = self._connect()
+        sender = RequestHandler(client_socket)
+        receiver = RequestHandler(server_socket)
+        self.assertFalse(sender.is_xor_enabled)
+
+        sender.send_message(b"header", b"payload")
+        self.assertEqual(receiver.receive_bytes(len(b"header")), b"header")
+        self.assertEqual(receiver.receive_bytes(len(b"payload")), b"payload")
+
+        content = os.urandom(200000)
+        sending_thread = threading.Thread(target=sender.send_file_content, args=(content, len(content)))
+        sending_thread.start()
+        received = io.BytesIO()
+        receiver.receive_file_content(received, len(content))
+        sending_thread.join()
+        self.assertEqual(received.getvalue(), content)
+
+    def test_session_resumption(self):
+        """
+        Check the methods `wrap_socket` and `save_session` of ClientTlsContext.
+        Connect, save the session and connect again. Verify only the second connection resumed the session.
+        """
+        client_socket, server_socket = self._connect()
+        self.assertFalse(client_socket.session_reused)
+        # With TLS 1.3 the session ticket is sent after the handshake, with the first data
+        server_socket.sendall(b"x")
+        client_socket.recv(1)
+        self.client_context.save_session(client_socket, HOST, self.port)
+        client_socket.close()
+        server_socket.close()
+
+        client_socket, server_socket = self._connect()
+        try:
+            self.assertTrue(client_socket.session_reused)
+        finally:
+            client_socket.close()
+            server_socket.close()
+
+    def test_untrusted_certificate(self):
+        """
+        Connect with a client context that does not trust the self-signed certificate.
+        Expect the handshake to fail.
+        """
+        self.client_context = tls.ClientTlsContext()
+        with self.assertRaises(ssl.SSLCertVerificationError):
+            self._connect_client_only()
+
+    def _connect_client_only(self):
+        """
+        Connects a TLS client, while the server side handshake runs (and fails) on a thread.
+        """
+        def accept():
+            server_socket, _ = self.listening_socket.accept()
+            try:
+                self.server_context.wrap_socket(server_socket, server_side=True)
+            except ssl.SSLError:
+                server_socket.close()
+
+        accepting_thread = threading.Thread(target=accept)
+        accepting_thread.start()
+        try:
+            self.client_context.wrap_socket(socket.create_connection((HOST, self.port)), HOST, self.port)
+        finally:
+            accepting_thread.join()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import io
+import os
+import tempfile
+
+from dropbox_system.server import users_admin
+from dropbox_system.server.connection_pool import ConnectionPool
+from dropbox_system.server.db_communicator import DataBaseCommunicator
+
+
+class TestUsersAdmin(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        connection_pool = ConnectionPool(os.path.join(self.directory.name, DataBaseCommunicator.DB_FILE_NAME),
+                                         DataBaseCommunicator.BUSY_TIMEOUT)
+        self.db = DataBaseCommunicator(connection_pool)
+        self.files_directory_path = os.path.join(self.directory.name, "user_files")
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def write_users_file(self, file_name: str, content: str) -> str:
+        users_file_path = os.path.join(self.directory.name, file_name)
+        with open(users_file_path, "w") as users_file:
+            users_file.write(content)
+        return users_file_path
+
+    def test_import_csv(self):
+        """
+        Import users from a CSV file, with a user that already exists and invalid lines.
+        Verify the valid users are created with their directories of files, and the invalid lines are skipped.
+        """
+        self.db.create_new_user("existing", "Passw0rd")
+        users_file_path = self.write_users_file("users.csv", "username,password\n"
+                                                             "first,Passw0rd1\n"
+                                                             "second,Passw0rd2\n"
+                                                             "existing,Passw0rd\n"
+                                                             "../escape,Passw0rd\n"
+                                                             "no_password,\n")
+
+        valid_users, created_users = users_admin.import_users(self.db, users_file_path, "csv",
+                                                              self.files_directory_path, batch_size=2)
+
+        assert (valid_users, created_users) == (3, 2)
+        assert self.db.verify_credentials("first", "Passw0rd1")
+        assert self.db.verify_credentials("second", "Passw0rd2")
+        assert not self.db.is_username_exists("../escape")
+        assert sorted(os.listdir(self.files_directory_path)) == ["existing", "first", "second"]
+
+    def test_import_jsonl(self):
+        """
+        Import users from a JSONL file with an invalid line.
+        Verify the valid users are created.
+        """
+        users_file_path = self.write_users_file("users.jsonl", '{"username": "first", "password": "Passw0rd1"}\n'
+                                                               'not json\n'
+                                                               '\n'
+                                                               '{"username": "second", "password": "Passw0rd2"}\n')
+
+        assert users_admin.import_users(self.db, users_file_path, users_admin.get_file_format(users_file_path),
+                                        self.files_directory_path) == (2, 2)
+        assert self.db.is_username_exists("first")
+        assert self.db.is_username_exists("second")
+
+    def test_import_csv_without_header(self):
+        """
+        Import users from a CSV file without the header of the fields, and expect to receive ValueError.
+        """
+        users_file_path = self.write_users_file("users.csv", "first,Passw0rd1\n")
+        with self.assertRaises(ValueError):
+            users_admin.import_users(self.db, users_file_path, "csv", self.files_directory_path)
+
+    def test_export_and_import(self):
+        """
+        Export the users in both formats, and import every export to a new database.
+        Verify the same users are imported.
+        """
+        self.db.create_new_users([("second", "Passw0rd2"), ("first", "Passw0rd1")])
+
+        for file_format in users_admin.FORMATS:
+            users_file = io.StringIO()
+            assert users_admin.export_users(self.db, users_file, file_format, batch_size=1) == 2
+            users_file_path = self.write_users_file(f"users.{file_format}", users_file.getvalue())
+
+            with tempfile.TemporaryDirectory() as other_directory:
+                other_db = DataBaseCommunicator(ConnectionPool(os.path.join(other_directory, "other.db"),
+                                                               DataBaseCommunicator.BUSY_TIMEOUT))
+                users_admin.import_users(other_db, users_file_path, file_format, self.files_directory_path)
+                assert list(other_db.iterate_users()) == [("first", "Passw0rd1"), ("second", "Passw0rd2")]
+                other_db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import threading
+
+from dropbox_system.server.worker_pool import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.release_workers = threading.Event()
+        self.handled_items = []
+        self.worker_pool = WorkerPool(self._handle, workers=2, queue_size=2)
+
+    def tearDown(self):
+        self.release_workers.set()
+
+    def _handle(self, item):
+        self.release_workers.wait()
+        self.handled_items.append(item)
+
+    def _wait_for_busy_workers(self, busy_workers):
+        for _ in range(100):
+            if self.worker_pool.metrics.busy_workers == busy_workers:
+                return
+            threading.Event().wait(0.01)
+        self.fail(f"Expected {busy_workers} busy workers, got {self.worker_pool.metrics.busy_workers}")
+
+    def test_submit_rejects_when_queue_is_full(self):
+        """
+        Check the method `submit` of WorkerPool.
+        Occupy both workers and fill the queue, and verify the next item is rejected and all the others are handled.
+        """
+        self.worker_pool.start()
+        self.assertTrue(self.worker_pool.submit(1))
+        self.assertTrue(self.worker_pool.submit(2))
+        self._wait_for_busy_workers(2)
+
+        self.assertTrue(self.worker_pool.submit(3))
+        self.assertTrue(self.worker_pool.submit(4))
+        self.assertFalse(self.worker_pool.submit(5))
+
+        metrics = self.worker_pool.metrics.as_dict()
+        self.assertEqual(metrics["queue_depth"], 2)
+        self.assertEqual(metrics["peak_queue_depth"], 2)
+        self.assertEqual(metrics["queued"], 4)
+        self.assertEqual(metrics["rejected"], 1)
+
+        self.release_workers.set()
+        self._wait_for_busy_workers(0)
+        self.assertEqual(sorted(self.handled_items), [1, 2, 3, 4])
+        self.assertEqual(self.worker_pool.metrics.started, 4)
+        self.assertEqual(self.worker_pool.metrics.queue_depth, 0)
+
+    def test_wait_time_and_retry_after(self):
+        """
+        Check the wait time metrics and the method `get_retry_after` of WorkerPool.
+        Verify the retry-after hint follows the average wait time, within its bounds.
+        """
+        self.assertEqual(self.worker_pool.get_retry_after(), WorkerPool.MIN_RETRY_AFTER)
+
+        self.worker_pool.metrics.count_started(2.0, 0)
+        self.worker_pool.metrics.count_started(4.0, 0)
+        self.assertEqual(self.worker_pool.metrics.average_wait_time, 3.0)
+        self.assertEqual(self.worker_pool.metrics.max_wait_time, 4.0)
+        self.assertEqual(self.worker_pool.get_retry_after(), 3.0)
+
+        self.worker_pool.metrics.count_started(1000.0, 0)
+        self.assertEqual(self.worker_pool.get_retry_after(), WorkerPool.MAX_RETRY_AFTER)
+
+    def test_invalid_sizes(self):
+        """
+        Check the constructor of WorkerPool rejects a pool without workers or without a queue.
+        """
+        with self.assertRaises(ValueError):
+            WorkerPool(self._handle, workers=0, queue_size=1)
+        with self.assertRaises(ValueError):
+            WorkerPool(self._handle, workers=1, queue_size=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from dropbox_system.common.xor_encryption import xor_data, XOR_KEY
+from dropbox_system.common.xor_encryption import xor_data, get_keystream, XorStream, XOR_KEY, XOR_BACKENDS, KEYSTREAM_MIN_SIZE, PlainStream
 
 class TestXORData(unittest.TestCase):
     SHORT_DATA_TO_XOR = b"data"
@@ -46,5 +46,79 @@ class TestXORData(unittest.TestCase):
         reversed_data = xor_data(xor_result)
         self.assertEqual(reversed_data, self.SHORT_DATA_TO_XOR)
 
+    def test_xor_backends(self):
+        """
+        Check the method `xor_data`
+        Execute the method with every XOR backend on data shorter and longer than the keystream,
+        and verify all of them return the expected output.
+        """
+        for data_len in [1, len(XOR_KEY) + 1, KEYSTREAM_MIN_SIZE + len(XOR_KEY) + 1]:
+            data = bytes(range(256)) * (data_len // 256) + b"A" * (data_len % 256)
+            expected = self._xor_data(data)
+            for backend in XOR_BACKENDS:
+                self.assertEqual(xor_data(data, backend=backend), expected)
+
+    def test_keystream_cached(self):
+        """
+        Check the method `get_keystream`
+        Verify the keystream is built from whole keys and cached between calls.
+        """
+        keystream = get_keystream(XOR_KEY)
+        self.assertEqual(len(keystream) % len(XOR_KEY), 0)
+        self.assertGreaterEqual(len(keystream), KEYSTREAM_MIN_SIZE)
+        self.assertIs(get_keystream(XOR_KEY), keystream)
+
+class TestXorStream(unittest.TestCase):
+    DATA_TO_XOR = bytes(range(256)) * 50
+
+    def test_update_in_chunks(self):
+        """
+        Check the method `update` of XorStream.
+        Execute the method on chunks of different sizes and verify the joined output is equal to `xor_data` output.
+        """
+        for backend in XOR_BACKENDS:
+            stream = XorStream(backend=backend)
+            chunks = []
+            start = 0
+            for chunk_size in [1, 7, 999, 1000, 1001, 2500]:
+                chunks.append(stream.update(self.DATA_TO_XOR[start:start + chunk_size]))
+                start += chunk_size
+            chunks.append(stream.update(self.DATA_TO_XOR[start:]))
+            self.assertEqual(b"".join(chunks), xor_data(self.DATA_TO_XOR))
+
+    def test_update_into_in_place(self):
+        """
+        Check the method `update_into` of XorStream.
+        Execute the method with the same buffer as source and destination and verify the buffer is xored.
+        """
+        buffer = bytearray(self.DATA_TO_XOR)
+        stream = XorStream()
+        written = stream.update_into(buffer, buffer)
+        self.assertEqual(written, len(self.DATA_TO_XOR))
+        self.assertEqual(buffer, xor_data(self.DATA_TO_XOR))
+        self.assertEqual(stream.offset, len(self.DATA_TO_XOR) % len(XOR_KEY))
+
+    def test_update_into_small_destination(self):
+        """
+        Check the method `update_into` of XorStream.
+        Execute the method with a destination shorter than the source and expect to receive an error.
+        """
+        with self.assertRaises(ValueError):
+            XorStream().update_into(self.DATA_TO_XOR, bytearray(1))
+
+    def test_plain_stream(self):
+        """
+        Check the methods of PlainStream.
+        Verify the data is passed as is, both to a new buffer and in place.
+        """
+        stream = PlainStream()
+        self.assertEqual(stream.update(self.DATA_TO_XOR), self.DATA_TO_XOR)
+
+        destination = bytearray(len(self.DATA_TO_XOR))
+        self.assertEqual(stream.update_into(self.DATA_TO_XOR, destination), len(self.DATA_TO_XOR))
+        self.assertEqual(destination, self.DATA_TO_XOR)
+        self.assertEqual(stream.update_into(destination, destination), len(self.DATA_TO_XOR))
+        self.assertEqual(destination, self.DATA_TO_XOR)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -7,5 +7,8 @@ setup(
     install_requires=[
         'pytest'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     include_package_data=True,
 )
\ No newline at end of file